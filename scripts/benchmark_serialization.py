@@ -0,0 +1,89 @@
+"""
+benchmark_serialization.py — Cost of encoding one /api/analyze response.
+
+Analyses a log once, then times the response path before and after
+content negotiation (src/web/encoding.py):
+
+  before   AnalysisResponse validation + FastAPI's jsonable_encoder +
+           JSONResponse (what returning the model from the endpoint did)
+  after    one validation + model_dump, then each negotiated encoding,
+           compression and a few fields= projections
+
+Usage
+-----
+    python scripts/benchmark_serialization.py <path_to_log.BIN> [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from src.web import app as web_app  # noqa: E402
+from src.web import encoding  # noqa: E402
+from src.web.encoding import encode_response, project  # noqa: E402
+from src.web.schemas import AnalysisResponse  # noqa: E402
+
+
+def _time(func, repeat: int) -> tuple[float, int]:
+    samples = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(func())
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("log")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    web_app._SERIES_STORE = None
+    web_app.RESULT_CACHE_DIR, web_app.RESULT_CACHE_ENTRIES = "", 0
+    result = web_app._analyze_temp_log(args.log, os.path.basename(args.log))
+
+    def before() -> bytes:
+        return JSONResponse(jsonable_encoder(AnalysisResponse(**result))).body
+
+    def after(accept=None, accept_encoding=None, fields=None):
+        def run() -> bytes:
+            payload = AnalysisResponse(**result).model_dump(mode="json")
+            return encode_response(project(payload, fields), accept, accept_encoding).body
+
+        return run
+
+    cases = [
+        ("before: model + jsonable_encoder + JSONResponse", before),
+        ("after: json", after()),
+        ("after: json + gzip", after(accept_encoding="gzip")),
+        ("after: msgpack", after("application/msgpack")),
+        ("after: msgpack + gzip", after("application/msgpack", "gzip")),
+        ("after: json, fields=metadata,diagnoses", after(fields="metadata,diagnoses")),
+        ("after: json, fields=time_series", after(fields="time_series")),
+    ]
+    if encoding.brotli is not None:
+        cases.insert(3, ("after: json + br", after(accept_encoding="br")))
+    print(f"JSON encoder: {'orjson' if encoding.orjson is not None else 'stdlib json'} · "
+          f"MessagePack: {'msgpack' if encoding.msgpack is not None else 'built-in packer'}")
+    print(f"{'Path':<48} | {'median ms':>9} | {'bytes':>9}")
+    print("-" * 72)
+    for name, func in cases:
+        ms, size = _time(func, args.repeat)
+        print(f"{name:<48} | {ms:>9.2f} | {size:>9,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import json
+import math
+from typing import Any, Callable, Iterator, Optional
+
+import numpy as np
+
+from src.constants import FEATURE_NAMES
+
+
+CHUNK_SIZE = 2048
+MAX_CLUSTERS = 64
+TOP_CLUSTERS = 10
+MEMBER_SAMPLES = 10
+# Scaled features are clipped so a single extreme log cannot own a cluster axis.
+SCALED_CLIP = 10.0
+DBSCAN_EPS = 1.0
+DBSCAN_MIN_SAMPLES = 3
+DBSCAN_COMPONENTS = 8
+CLUSTER_METHODS = ("kmeans", "dbscan")
+
+
+def _incident_chunks(
+    jsonl_path: str, chunk_size: int = CHUNK_SIZE
+) -> Iterator[tuple[list[dict], np.ndarray]]:
+    """Yield ``(rows, X)`` chunks of incident rows (not HEALTHY/ERROR) with a feature vector."""
+    rows: list[dict] = []
+    vectors: list[list[float]] = []
+    with open(jsonl_path, "r", encoding="utf-8") as jsonl_file:
+        for line in jsonl_file:
+            row = json.loads(line)
+            vector = row.get("feature_vector")
+            if (
+                row.get("status") in ("ERROR", "HEALTHY")
+                or not vector
+                or len(vector) != len(FEATURE_NAMES)
+            ):
+                continue
+            rows.append(
+                {"filename": row["filename"], "top_diagnosis": row.get("top_diagnosis", "unknown")}
+            )
+            vectors.append(vector)
+            if len(rows) >= chunk_size:
+                yield (
+                    rows,
+                    np.nan_to_num(np.asarray(vectors, dtype=np.float64), posinf=0.0, neginf=0.0),
+                )
+                rows, vectors = [], []
+    if rows:
+        yield rows, np.nan_to_num(np.asarray(vectors, dtype=np.float64), posinf=0.0, neginf=0.0)
+
+
+def label_clusters(jsonl_path: str, examples: int = MEMBER_SAMPLES) -> list[dict[str, Any]]:
+    """Incidents grouped by top diagnosis, largest group first.
+
+    The fallback when the rows carry no feature vectors.
+    """
+    counts: dict[str, int] = {}
+    samples: dict[str, list[str]] = {}
+    with open(jsonl_path, "r", encoding="utf-8") as jsonl_file:
+        for line in jsonl_file:
+            row = json.loads(line)
+            if row.get("status") in ("ERROR", "HEALTHY"):
+                continue
+            label = row.get("top_diagnosis", "unknown")
+            counts[label] = counts.get(label, 0) + 1
+            bucket = samples.setdefault(label, [])
+            if len(bucket) < examples:
+                bucket.append(row["filename"])
+    return [
+        {"label": label, "size": count, "members_sample": samples[label]}
+        for label, count in sorted(counts.items(), key=lambda item: -item[1])
+    ]
+
+
+def model_scaler() -> Optional[dict[str, np.ndarray]]:
+    """The trained classifier's scaler as ``X * mul + add`` over FEATURE_NAMES, if loadable."""
+    from src.diagnosis.anomaly_detector import _export_scaler
+    from src.diagnosis.ml_classifier import MLClassifier
+
+    classifier = MLClassifier()
+    if not classifier.available or list(classifier.feature_columns) != list(FEATURE_NAMES):
+        return None
+    try:
+        return _export_scaler(classifier.scaler)
+    except ValueError:
+        return None
+
+
+class IncidentClusterer:
+    """Cluster batch incidents on scaled feature vectors streamed from JSONL.
+
+    Features are scaled with the ML classifier's scaler when the trained
+    artifacts are present, otherwise standardised with statistics gathered
+    in a first streaming pass. ``kmeans`` runs ``MiniBatchKMeans.partial_fit``
+    chunk by chunk, so memory stays flat for tens of thousands of logs.
+    ``dbscan`` finds density clusters (no k needed) with a KD-tree over the
+    leading principal components, and holds the scaled matrix in memory.
+    """
+
+    def __init__(
+        self,
+        method: str = "kmeans",
+        n_clusters: Optional[int] = None,
+        eps: float = DBSCAN_EPS,
+        min_samples: int = DBSCAN_MIN_SAMPLES,
+        chunk_size: int = CHUNK_SIZE,
+        top_clusters: int = TOP_CLUSTERS,
+        scaler: Optional[dict[str, np.ndarray]] = None,
+        random_state: int = 0,
+    ):
+        if method not in CLUSTER_METHODS:
+            raise ValueError(f"Unknown clustering method: {method}")
+        self.method = method
+        self.n_clusters = n_clusters
+        self.eps = eps
+        self.min_samples = min_samples
+        self.chunk_size = chunk_size
+        self.top_clusters = top_clusters
+        self.scaler = scaler
+        self.random_state = random_state
+
+    def _scale(self, X: np.ndarray, mul: np.ndarray, add: np.ndarray) -> np.ndarray:
+        return np.clip(X * mul + add, -SCALED_CLIP, SCALED_CLIP)
+
+    def _fit_scaler(self, jsonl_path: str) -> tuple[np.ndarray, np.ndarray, int, str]:
+        count = 0
+        total = np.zeros(len(FEATURE_NAMES))
+        total_sq = np.zeros(len(FEATURE_NAMES))
+        for _rows, X in _incident_chunks(jsonl_path, self.chunk_size):
+            count += len(X)
+            total += X.sum(axis=0)
+            total_sq += np.square(X).sum(axis=0)
+        if self.scaler is not None:
+            return self.scaler["scaler_mul"], self.scaler["scaler_add"], count, "model"
+        mean = total / max(count, 1)
+        std = np.sqrt(np.maximum(total_sq / max(count, 1) - np.square(mean), 0.0))
+        std[std < 1e-12] = 1.0
+        return 1.0 / std, -mean / std, count, "batch"
+
+    def default_k(self, n: int) -> int:
+        return max(1, min(MAX_CLUSTERS, n, int(round(math.sqrt(n / 2.0)))))
+
+    def fit(self, jsonl_path: str) -> dict[str, Any]:
+        mul, add, n, scaling = self._fit_scaler(jsonl_path)
+        result: dict[str, Any] = {
+            "method": self.method,
+            "scaling": scaling,
+            "n_incidents": n,
+            "clusters": [],
+        }
+        if n == 0:
+            result["similarity"] = {"clusters": [], "matrix": []}
+            return result
+        if self.method == "kmeans":
+            assign, centers = self._kmeans(jsonl_path, mul, add, n)
+        else:
+            assign, centers = self._dbscan(jsonl_path, mul, add)
+        return self._summarize(jsonl_path, mul, add, assign, centers, result)
+
+    def _kmeans(self, jsonl_path: str, mul: np.ndarray, add: np.ndarray, n: int):
+        from sklearn.cluster import MiniBatchKMeans
+
+        k = self.n_clusters or self.default_k(n)
+        k = min(k, n)
+        model = MiniBatchKMeans(
+            n_clusters=k, random_state=self.random_state, batch_size=self.chunk_size, n_init=3
+        )
+        # partial_fit needs at least k rows per call; carry short chunks over.
+        pending: list[np.ndarray] = []
+        pending_rows = 0
+        for _rows, X in _incident_chunks(jsonl_path, self.chunk_size):
+            pending.append(self._scale(X, mul, add))
+            pending_rows += len(X)
+            if pending_rows >= k:
+                model.partial_fit(np.vstack(pending))
+                pending, pending_rows = [], 0
+        if pending:
+            if hasattr(model, "cluster_centers_"):
+                model.partial_fit(np.vstack(pending))
+            else:
+                model.fit(np.vstack(pending))
+        return (lambda Xs: model.predict(Xs)), model.cluster_centers_
+
+    def _dbscan(self, jsonl_path: str, mul: np.ndarray, add: np.ndarray):
+        from sklearn.cluster import DBSCAN
+        from sklearn.decomposition import PCA
+
+        Xs = np.vstack(
+            [self._scale(X, mul, add) for _rows, X in _incident_chunks(jsonl_path, self.chunk_size)]
+        )
+        # KD-trees degrade towards brute force in ~100 dimensions; neighbour
+        # search runs on the leading principal components instead.
+        components = min(DBSCAN_COMPONENTS, Xs.shape[0], Xs.shape[1])
+        projected = PCA(n_components=components, random_state=self.random_state).fit_transform(Xs)
+        labels = DBSCAN(
+            eps=self.eps, min_samples=self.min_samples, algorithm="kd_tree"
+        ).fit_predict(projected)
+        ids = sorted(set(labels.tolist()) - {-1})
+        centers = np.array([Xs[labels == cid].mean(axis=0) for cid in ids]).reshape(
+            len(ids), Xs.shape[1]
+        )
+        # Renumber so cluster ids index ``centers``; noise stays -1.
+        remap = {cid: i for i, cid in enumerate(ids)}
+        labels = np.array([remap.get(label, -1) for label in labels.tolist()], dtype=int)
+        offset = 0
+
+        def assign(chunk: np.ndarray) -> np.ndarray:
+            nonlocal offset
+            out = labels[offset:offset + len(chunk)]
+            offset += len(chunk)
+            return out
+
+        return assign, centers
+
+    def _summarize(
+        self,
+        jsonl_path: str,
+        mul: np.ndarray,
+        add: np.ndarray,
+        assign: Callable[[np.ndarray], np.ndarray],
+        centers: np.ndarray,
+        result: dict[str, Any],
+    ) -> dict[str, Any]:
+        """Final streaming pass: sizes, label mix, exemplar (closest to centroid) and similarity."""
+        n_centers = len(centers)
+        sizes = np.zeros(n_centers, dtype=int)
+        dist_sum = np.zeros(n_centers)
+        exemplar_dist = np.full(n_centers, np.inf)
+        exemplars: list[Optional[str]] = [None] * n_centers
+        members: list[list[str]] = [[] for _ in range(n_centers)]
+        label_counts: list[dict[str, int]] = [{} for _ in range(n_centers)]
+        noise = 0
+
+        for rows, X in _incident_chunks(jsonl_path, self.chunk_size):
+            Xs = self._scale(X, mul, add)
+            labels = assign(Xs)
+            for row, x, cid in zip(rows, Xs, labels):
+                if cid < 0:
+                    noise += 1
+                    continue
+                distance = float(np.linalg.norm(x - centers[cid]))
+                sizes[cid] += 1
+                dist_sum[cid] += distance
+                counts = label_counts[cid]
+                counts[row["top_diagnosis"]] = counts.get(row["top_diagnosis"], 0) + 1
+                if len(members[cid]) < MEMBER_SAMPLES:
+                    members[cid].append(row["filename"])
+                if distance < exemplar_dist[cid]:
+                    exemplar_dist[cid] = distance
+                    exemplars[cid] = row["filename"]
+
+        order = [int(cid) for cid in np.argsort(-sizes, kind="stable") if sizes[cid] > 0]
+        for rank, cid in enumerate(order):
+            labels_sorted = dict(sorted(label_counts[cid].items(), key=lambda item: -item[1]))
+            result["clusters"].append(
+                {
+                    "cluster": rank,
+                    "size": int(sizes[cid]),
+                    "dominant_label": next(iter(labels_sorted)),
+                    "labels": labels_sorted,
+                    "exemplar": exemplars[cid],
+                    "mean_distance": round(float(dist_sum[cid] / sizes[cid]), 4),
+                    "members_sample": members[cid],
+                }
+            )
+        result["n_clusters"] = len(order)
+        result["noise"] = noise
+
+        top = order[: self.top_clusters]
+        top_centers = centers[top] if top else np.zeros((0, centers.shape[1] if n_centers else 0))
+        norms = np.linalg.norm(top_centers, axis=1, keepdims=True)
+        unit = top_centers / np.where(norms == 0, 1.0, norms)
+        matrix = unit @ unit.T
+        result["similarity"] = {
+            "metric": "cosine between scaled cluster centroids",
+            "clusters": list(range(len(top))),
+            "matrix": [[round(float(v), 4) for v in row] for row in matrix],
+        }
+        return result
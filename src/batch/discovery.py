@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import fnmatch
+import heapq
+import os
+from typing import Callable, Iterable, Iterator, Sequence
+
+
+DEFAULT_INCLUDE = ("*.bin",)
+
+
+def _matches(path: str, patterns: Sequence[str]) -> bool:
+    """Case-insensitive glob match against the relative path or its basename."""
+    lowered = path.lower()
+    basename = lowered.rsplit("/", 1)[-1]
+    return any(
+        fnmatch.fnmatchcase(lowered, pattern.lower())
+        or fnmatch.fnmatchcase(basename, pattern.lower())
+        for pattern in patterns
+    )
+
+
+def discover_logs(
+    directory: str,
+    recursive: bool = False,
+    include: Sequence[str] = DEFAULT_INCLUDE,
+    exclude: Sequence[str] = (),
+) -> Iterator[str]:
+    """Yield log paths relative to ``directory`` (POSIX separators) in sorted walk order.
+
+    Directories are walked lazily with entries sorted per directory, so the
+    order is deterministic and nothing but the current directory listing is
+    held in memory. Excluded directories are pruned without being entered.
+    """
+    for root, dirnames, filenames in os.walk(directory):
+        rel_root = os.path.relpath(root, directory).replace(os.sep, "/")
+        rel_root = "" if rel_root == "." else rel_root + "/"
+        if recursive:
+            dirnames[:] = sorted(
+                name for name in dirnames if not _matches(rel_root + name, exclude)
+                and not _matches(rel_root + name + "/", exclude)
+            )
+        else:
+            dirnames[:] = []
+        for filename in sorted(filenames):
+            rel_path = rel_root + filename
+            if _matches(rel_path, include) and not _matches(rel_path, exclude):
+                yield rel_path
+
+
+def largest_first(
+    tasks: Iterable[tuple], size_of: Callable[[tuple], int], window: int
+) -> Iterator[tuple]:
+    """Reorder ``tasks`` largest-first within a bounded lookahead window."""
+    heap: list[tuple[int, int, tuple]] = []
+    for sequence, task in enumerate(tasks):
+        heapq.heappush(heap, (-size_of(task), sequence, task))
+        if len(heap) >= window:
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
@@ -0,0 +1,534 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from src.batch.manifest import code_version, file_sha256, model_version
+from src.batch.pool import LogWorkerPool, TaskOutcome
+
+
+LEASE_SEC = 120.0
+HEARTBEAT_SEC = 15.0
+MAX_ATTEMPTS = 3
+IDLE_POLL_SEC = 2.0
+# SQLite on a shared filesystem: wait this long for another host's write lock.
+BUSY_TIMEOUT_SEC = 60.0
+# add_items commits this many rows per transaction, so other hosts' leases
+# and heartbeats get the lock in between.
+ADD_ITEMS_BATCH = 500
+
+
+@dataclass
+class WorkItem:
+    job: str
+    item_id: str
+    path: str
+    sha256: Optional[str]
+    attempts: int
+    # job_version the item was published under (None for unversioned items).
+    version: Optional[str] = None
+
+
+def _json_default(value: Any) -> Any:
+    item = getattr(value, "item", None)
+    return item() if callable(item) else str(value)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def hashed_items(root: str, filenames: Iterable[str]) -> Iterator[tuple[str, str, Optional[str]]]:
+    """``(item_id, path, sha256)`` per log under ``root``, for ``add_items``.
+
+    A log that cannot be read gets no hash instead of aborting the publish;
+    the worker then records it as an error row.
+    """
+    for filename in filenames:
+        try:
+            sha256: Optional[str] = file_sha256(os.path.join(root, filename))
+        except OSError:
+            sha256 = None
+        yield filename, filename, sha256
+
+
+def job_version(kind: str, config: dict[str, Any]) -> str:
+    """Hash of what decides an item's result besides its bytes: code, models, engine and options."""
+    identity = {
+        "kind": kind,
+        "config": config,
+        "code": code_version(),
+        "models": model_version(config.get("engine", "hybrid")),
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class LeaseQueue:
+    """Shared SQLite work queue with leases, heartbeats, retries and quarantine.
+
+    The database file lives on storage every host can reach. A worker
+    *leases* items for ``lease_sec`` and extends the lease with heartbeats;
+    an item whose lease lapses (host lost, process killed) becomes leasable
+    again. Each lease counts as an attempt, and an item that fails or lapses
+    ``max_attempts`` times is quarantined as a poison log instead of being
+    retried forever. Completion is only accepted from the current lease
+    holder, so a late result from a presumed-dead worker is dropped.
+
+    Results are stored in the same database and form the shared results store.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        lease_sec: float = LEASE_SEC,
+        max_attempts: int = MAX_ATTEMPTS,
+    ):
+        self.path = str(path)
+        self.lease_sec = lease_sec
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SEC, isolation_level=None)
+        with self._transaction():
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    root TEXT NOT NULL,
+                    config_json TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS items (
+                    job TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    sha256 TEXT,
+                    version TEXT,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    last_error TEXT,
+                    result_json TEXT,
+                    finished_by TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (job, item_id)
+                )
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(items)")}
+            if "version" not in columns:  # queues created before items were versioned
+                self._conn.execute("ALTER TABLE items ADD COLUMN version TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS items_state ON items (job, state, seq)")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "LeaseQueue":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        # IMMEDIATE takes the write lock up front so two hosts never lease
+        # the same item.
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    # -- coordinator side -------------------------------------------------
+
+    def create_job(self, job: str, kind: str, root: str, config: dict[str, Any]) -> None:
+        with self._transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?)",
+                (job, kind, os.path.abspath(root), json.dumps(config), time.time()),
+            )
+
+    def job(self, job: str) -> Optional[dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT kind, root, config_json FROM jobs WHERE job = ?", (job,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"job": job, "kind": row[0], "root": row[1], "config": json.loads(row[2])}
+
+    def jobs(self) -> list[str]:
+        return [row[0] for row in self._conn.execute("SELECT job FROM jobs ORDER BY created_at")]
+
+    def add_items(
+        self,
+        job: str,
+        items: Iterable[tuple[str, str, Optional[str]]],
+        version: Optional[str] = None,
+    ) -> int:
+        """Add ``(item_id, path, sha256)`` items; return how many were new or reset.
+
+        Re-adding an item with the same hash and ``version`` (see
+        ``job_version``) is a no-op, so a restarted coordinator does not redo
+        finished work. An item whose hash or version changed, or that was
+        quarantined, is reset to queued with no attempts.
+        """
+        added = 0
+        items = iter(items)
+        # Pulling a chunk runs the caller's generator (usually hashing logs)
+        # before the write lock is taken.
+        while chunk := list(itertools.islice(items, ADD_ITEMS_BATCH)):
+            added += self._add_chunk(job, chunk, version)
+        return added
+
+    def _add_chunk(
+        self, job: str, chunk: list[tuple[str, str, Optional[str]]], version: Optional[str]
+    ) -> int:
+        added = 0
+        now = time.time()
+        with self._transaction():
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM items WHERE job = ?", (job,)
+            ).fetchone()[0]
+            for item_id, path, sha256 in chunk:
+                known = self._conn.execute(
+                    "SELECT sha256, version, state FROM items WHERE job = ? AND item_id = ?",
+                    (job, item_id),
+                ).fetchone()
+                if (
+                    known is not None
+                    and known[:2] == (sha256, version)
+                    and known[2] != "quarantined"
+                ):
+                    continue
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO items "
+                    "(job, item_id, seq, path, sha256, version, state, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?)",
+                    (job, item_id, seq, path, sha256, version, now),
+                )
+                seq += 1
+                added += 1
+        return added
+
+    def progress(self, job: str) -> dict[str, int]:
+        counts = {"queued": 0, "leased": 0, "done": 0, "quarantined": 0}
+        for state, count in self._conn.execute(
+            "SELECT state, COUNT(*) FROM items WHERE job = ? GROUP BY state", (job,)
+        ):
+            counts[state] = count
+        return counts
+
+    def is_drained(self, job: str) -> bool:
+        counts = self.progress(job)
+        return counts["queued"] == 0 and counts["leased"] == 0
+
+    def results(
+        self, job: str
+    ) -> Iterator[tuple[str, str, Optional[dict[str, Any]], Optional[str]]]:
+        """Yield ``(item_id, state, result, last_error)`` in the order items were added."""
+        cursor = self._conn.execute(
+            "SELECT item_id, state, result_json, last_error FROM items WHERE job = ? ORDER BY seq",
+            (job,),
+        )
+        for item_id, state, result_json, last_error in cursor:
+            yield item_id, state, json.loads(result_json) if result_json else None, last_error
+
+    # -- worker side ------------------------------------------------------
+
+    def lease(self, worker_id: str, job: str, limit: int = 1) -> list[WorkItem]:
+        """Lease up to ``limit`` queued or lapsed items, oldest first."""
+        now = time.time()
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE items SET state = 'quarantined', lease_owner = NULL, updated_at = ?, "
+                "last_error = COALESCE(last_error, 'lease expired') "
+                "|| ' (gave up after ' || attempts || ' attempts)' "
+                "WHERE job = ? AND state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, job, now, self.max_attempts),
+            )
+            rows = self._conn.execute(
+                "SELECT item_id, path, sha256, attempts, version FROM items WHERE job = ? AND "
+                "(state = 'queued' OR (state = 'leased' AND lease_expires < ?)) "
+                "ORDER BY seq LIMIT ?",
+                (job, now, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE items SET state = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires = ?, updated_at = ? WHERE job = ? AND item_id = ?",
+                [(worker_id, now + self.lease_sec, now, job, row[0]) for row in rows],
+            )
+        return [
+            WorkItem(job, item_id, path, sha256, attempts + 1, version)
+            for item_id, path, sha256, attempts, version in rows
+        ]
+
+    def heartbeat(self, worker_id: str, job: str, item_ids: Iterable[str]) -> set[str]:
+        """Extend this worker's leases; return the item ids whose lease was lost."""
+        item_ids = list(item_ids)
+        now = time.time()
+        lost = set()
+        with self._transaction():
+            for item_id in item_ids:
+                updated = self._conn.execute(
+                    "UPDATE items SET lease_expires = ?, updated_at = ? "
+                    "WHERE job = ? AND item_id = ? AND state = 'leased' AND lease_owner = ?",
+                    (now + self.lease_sec, now, job, item_id, worker_id),
+                ).rowcount
+                if not updated:
+                    lost.add(item_id)
+        return lost
+
+    def complete(self, worker_id: str, job: str, item_id: str, result: dict[str, Any]) -> bool:
+        with self._transaction():
+            return bool(
+                self._conn.execute(
+                    "UPDATE items SET state = 'done', result_json = ?, finished_by = ?, "
+                    "lease_owner = NULL, last_error = NULL, updated_at = ? "
+                    "WHERE job = ? AND item_id = ? AND state = 'leased' AND lease_owner = ?",
+                    (
+                        json.dumps(result, default=_json_default),
+                        worker_id,
+                        time.time(),
+                        job,
+                        item_id,
+                        worker_id,
+                    ),
+                ).rowcount
+            )
+
+    def fail(self, worker_id: str, job: str, item_id: str, error: str, retry: bool = True) -> bool:
+        """Record a failed attempt: re-queue it, or quarantine it once attempts run out."""
+        with self._transaction():
+            return bool(
+                self._conn.execute(
+                    "UPDATE items SET "
+                    "state = CASE WHEN ? AND attempts < ? THEN 'queued' ELSE 'quarantined' END, "
+                    "last_error = ?, lease_owner = NULL, updated_at = ? "
+                    "WHERE job = ? AND item_id = ? AND state = 'leased' AND lease_owner = ?",
+                    (retry, self.max_attempts, error, time.time(), job, item_id, worker_id),
+                ).rowcount
+            )
+
+    def release(
+        self, worker_id: str, job: Optional[str] = None, item_ids: Optional[Iterable[str]] = None
+    ) -> int:
+        """Hand back leases held by ``worker_id`` without charging an attempt.
+
+        Every lease by default; with ``job`` and ``item_ids``, only those items.
+        """
+        query = (
+            "UPDATE items SET state = 'queued', attempts = MAX(attempts - 1, 0), "
+            "lease_owner = NULL, updated_at = ? WHERE state = 'leased' AND lease_owner = ?"
+        )
+        params: list[Any] = [time.time(), worker_id]
+        if item_ids is not None:
+            item_ids = list(item_ids)
+            query += f" AND job = ? AND item_id IN ({', '.join('?' * len(item_ids))})"
+            params += [job, *item_ids]
+        with self._transaction():
+            return self._conn.execute(query, params).rowcount
+
+
+def _task_kinds() -> dict[
+    str, tuple[Callable[..., None], Callable[..., Any], Callable[[dict], tuple]]
+]:
+    """kind -> (initializer, per-log function, initargs from the job config)."""
+    from src.batch.worker import analyze_file, init_worker
+    from src.benchmark.suite import evaluate_benchmark_log, init_benchmark_worker
+
+    return {
+        "batch": (
+            init_worker,
+            analyze_file,
+            lambda cfg: (cfg.get("engine", "hybrid"), cfg.get("output_dir")),
+        ),
+        "benchmark": (
+            init_benchmark_worker,
+            evaluate_benchmark_log,
+            lambda cfg: (cfg.get("engine", "hybrid"),),
+        ),
+    }
+
+
+class QueueWorker:
+    """Lease items from a ``LeaseQueue`` and run them on a local ``LogWorkerPool``.
+
+    Any number of these can run on any number of hosts against one queue.
+    Leases are heartbeated from the polling loop while the pool works, a
+    crashed or timed-out pool worker counts as a failed attempt, and on exit
+    any unfinished leases are handed back so other workers pick them up.
+    """
+
+    def __init__(
+        self,
+        queue_path: str,
+        job: str,
+        jobs: int = 1,
+        timeout: Optional[float] = None,
+        root: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        heartbeat_sec: float = HEARTBEAT_SEC,
+        lease_sec: float = LEASE_SEC,
+        max_attempts: int = MAX_ATTEMPTS,
+        verify_hash: bool = True,
+    ):
+        self.queue = LeaseQueue(queue_path, lease_sec=lease_sec, max_attempts=max_attempts)
+        spec = self.queue.job(job)
+        if spec is None:
+            raise ValueError(f"Job {job!r} not found in {queue_path}")
+        self.job = job
+        # Hosts may mount the shared archive at different paths.
+        self._root_override = root
+        self.worker_id = worker_id or default_worker_id()
+        self.heartbeat_sec = heartbeat_sec
+        self.verify_hash = verify_hash
+        self.jobs = jobs
+        self.timeout = timeout
+        self.completed = 0
+        self.failed = 0
+        # Set when this host cannot run the job's items (see _reconcile).
+        self.mismatch: Optional[str] = None
+        self._stale = False
+        self._configure(spec)
+
+    def _configure(self, spec: dict[str, Any]) -> None:
+        initializer, func, initargs = _task_kinds()[spec["kind"]]
+        self.spec = spec
+        self.root = self._root_override or spec["root"]
+        # What this host would publish for the spec: its own code and models.
+        self.version = job_version(spec["kind"], spec["config"])
+        self.pool = LogWorkerPool(
+            self.jobs,
+            func,
+            initializer=initializer,
+            initargs=initargs(spec["config"]),
+            timeout=self.timeout,
+        )
+
+    def _reconcile(self) -> bool:
+        """Re-read the job after a version mismatch; False when this host cannot serve it.
+
+        A republished job (new engine or options) rebuilds the pool; a
+        mismatch that persists means this host's code or models differ from
+        the coordinator's, and the worker stops rather than produce stale rows.
+        """
+        spec = self.queue.job(self.job)
+        if spec is None:
+            self.mismatch = "job was removed from the queue"
+            return False
+        if spec["kind"] == self.spec["kind"] and spec["config"] == self.spec["config"]:
+            self.mismatch = "items were published with different code or models than this host has"
+            return False
+        self.pool.close()
+        self._configure(spec)
+        self._stale = False
+        return True
+
+    def _dispatch(self) -> None:
+        free = self.pool.jobs - self.pool.in_flight
+        if free <= 0 or self._stale:
+            return
+        for item in self.queue.lease(self.worker_id, self.job, free):
+            if item.version is not None and item.version != self.version:
+                self.queue.release(self.worker_id, self.job, [item.item_id])
+                self._stale = True
+                continue
+            filepath = os.path.join(self.root, item.path)
+            if self.verify_hash and item.sha256:
+                try:
+                    actual = file_sha256(filepath)
+                except OSError as exc:
+                    self.queue.fail(self.worker_id, self.job, item.item_id, f"unreadable: {exc}")
+                    self.failed += 1
+                    continue
+                if actual != item.sha256:
+                    self.queue.fail(
+                        self.worker_id, self.job, item.item_id, "content hash changed", retry=False
+                    )
+                    self.failed += 1
+                    continue
+            self.pool.submit((filepath, item.item_id))
+
+    def _finish(self, outcome: TaskOutcome) -> None:
+        item_id = outcome.task[1]
+        if outcome.ok:
+            self.completed += self.queue.complete(self.worker_id, self.job, item_id, outcome.value)
+        else:
+            self.queue.fail(self.worker_id, self.job, item_id, outcome.error)
+            self.failed += 1
+
+    def run(self, wait: bool = False, idle_poll_sec: float = IDLE_POLL_SEC) -> None:
+        """Work until the job is drained (or forever with ``wait``); safe to interrupt.
+
+        Stops early, with ``mismatch`` set, if the job's items need other code
+        or models than this host has.
+        """
+        last_beat = time.monotonic()
+        try:
+            while True:
+                if self._stale and not self.pool.in_flight and not self._reconcile():
+                    break
+                self._dispatch()
+                if not self.pool.in_flight:
+                    if not wait and self.queue.is_drained(self.job):
+                        break
+                    # Other hosts hold leases that may still lapse back to us.
+                    time.sleep(idle_poll_sec)
+                    continue
+                for outcome in self.pool.poll(timeout=self.heartbeat_sec):
+                    self._finish(outcome)
+                if time.monotonic() - last_beat >= self.heartbeat_sec:
+                    item_ids = [task[1] for task in self.pool.in_flight_tasks()]
+                    self.queue.heartbeat(self.worker_id, self.job, item_ids)
+                    last_beat = time.monotonic()
+        finally:
+            self.pool.close()
+            self.queue.release(self.worker_id)
+            self.queue.close()
+
+
+def run_job(
+    queue_path: str,
+    job: str,
+    kind: str,
+    root: str,
+    config: dict[str, Any],
+    items: Iterable[tuple[str, str, Optional[str]]],
+    jobs: int = 1,
+    timeout: Optional[float] = None,
+    local_worker: bool = True,
+    poll_sec: float = IDLE_POLL_SEC,
+    on_progress: Optional[Callable[[dict[str, int]], None]] = None,
+) -> LeaseQueue:
+    """Coordinator: publish ``items`` as ``job``, work on it locally, wait until drained.
+
+    Items already done under the same code, models and ``config`` are kept;
+    the rest are (re)queued. Returns the open queue so the caller can read
+    ``results(job)``; other hosts join with ``QueueWorker`` (the
+    ``queue-worker`` command).
+    """
+    queue = LeaseQueue(queue_path)
+    queue.create_job(job, kind, root, config)
+    queue.add_items(job, items, version=job_version(kind, config))
+    if local_worker:
+        QueueWorker(queue_path, job, jobs=jobs, timeout=timeout).run()
+    while not queue.is_drained(job):
+        if on_progress is not None:
+            on_progress(queue.progress(job))
+        time.sleep(poll_sec)
+    return queue
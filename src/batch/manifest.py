@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from src.runtime_paths import MODELS_DIR, project_root
+
+
+MANIFEST_FILENAME = "batch_manifest.sqlite"
+HASH_CHUNK_SIZE = 1024 * 1024
+# Source trees whose contents decide a log's diagnosis.
+CODE_VERSION_PATHS = (
+    "src/parser",
+    "src/features",
+    "src/diagnosis",
+    "src/constants.py",
+    "src/batch/worker.py",
+)
+RULE_MODEL_FILES = ("rule_thresholds.yaml",)
+HYBRID_MODEL_FILES = RULE_MODEL_FILES + (
+    "classifier.joblib",
+    "scaler.joblib",
+    "feature_columns.json",
+    "label_columns.json",
+    "manifest.json",
+    "anomaly_detector.joblib",
+)
+
+
+def file_sha256(path: str | os.PathLike[str]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version() -> str:
+    """Content hash of the parser/feature/diagnosis source that produces a row."""
+    root = project_root()
+    digest = hashlib.sha256()
+    for entry in CODE_VERSION_PATHS:
+        path = root / entry
+        files = sorted(path.rglob("*.py")) if path.is_dir() else [path]
+        for file_path in files:
+            if file_path.exists():
+                digest.update(str(file_path.relative_to(root)).encode())
+                digest.update(file_path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def model_stat_signature(models_dir: Path) -> tuple:
+    """(name, size, mtime) of every hybrid model artifact; cheap to compare on each request."""
+    signature = []
+    for name in HYBRID_MODEL_FILES:
+        try:
+            stat = (models_dir / name).stat()
+            signature.append((name, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            signature.append((name, None, None))
+    return tuple(signature)
+
+
+def model_version(engine_name: str, models_dir: Path = MODELS_DIR) -> str:
+    """Hash of the model artifacts ``engine_name`` reads (missing files count too)."""
+    names = RULE_MODEL_FILES if engine_name == "rule" else HYBRID_MODEL_FILES
+    digest = hashlib.sha256(engine_name.encode())
+    for name in names:
+        path = models_dir / name
+        digest.update(name.encode())
+        digest.update(file_sha256(path).encode() if path.exists() else b"missing")
+    return digest.hexdigest()[:16]
+
+
+class RunManifest:
+    """SQLite record of processed logs for resumable, incremental batch runs.
+
+    Each row keys a log by its path relative to the batch root and stores
+    its size, mtime, content hash, the code/model version it was analysed
+    with and the resulting summary row. Rows are committed as each log
+    finishes, so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], code: str, model: str):
+        self.path = str(path)
+        self.code_version = code
+        self.model_version = model
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS logs (
+                filename TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT,
+                code_version TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                status TEXT NOT NULL,
+                row_json TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "RunManifest":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    def _entry(self, filename: str) -> Optional[tuple]:
+        return self._conn.execute(
+            "SELECT size, mtime_ns, sha256, code_version, model_version, status, row_json "
+            "FROM logs WHERE filename = ?",
+            (filename,),
+        ).fetchone()
+
+    def is_current(self, filename: str, filepath: str, report_path: Optional[str] = None) -> bool:
+        """True if ``filepath`` was analysed with the current code/models and is unchanged.
+
+        A changed mtime with an unchanged size falls back to a content hash, so
+        copied or touched logs are not reprocessed. ERROR rows are always retried.
+        """
+        entry = self._entry(filename)
+        if entry is None:
+            return False
+        size, mtime_ns, sha256, code, model, status, _row = entry
+        if status == "ERROR" or code != self.code_version or model != self.model_version:
+            return False
+        if report_path is not None and not os.path.exists(report_path):
+            return False
+        try:
+            stat = os.stat(filepath)
+            if stat.st_size != size:
+                return False
+            if stat.st_mtime_ns == mtime_ns:
+                return True
+            if not sha256 or file_sha256(filepath) != sha256:
+                return False
+        except OSError:
+            # Vanished or unreadable since discovery: let the analysis report it.
+            return False
+        self._conn.execute(
+            "UPDATE logs SET mtime_ns = ? WHERE filename = ?", (stat.st_mtime_ns, filename)
+        )
+        self._conn.commit()
+        return True
+
+    def record(self, filename: str, filepath: str, row: dict[str, Any]) -> None:
+        """Store ``row``; a vanished log is skipped and an unhashable one is stored as ERROR."""
+        status = row.get("status", "ERROR")
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return
+        sha256 = row.get("sha256")
+        if not sha256 and status != "ERROR":
+            try:
+                sha256 = file_sha256(filepath)
+            except OSError:
+                # Without a hash the row cannot be trusted on resume; ERROR rows are retried.
+                status = "ERROR"
+        self._conn.execute(
+            "INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                filename,
+                stat.st_size,
+                stat.st_mtime_ns,
+                sha256,
+                self.code_version,
+                self.model_version,
+                status,
+                json.dumps(row),
+                time.time(),
+            ),
+        )
+        self._conn.commit()
+
+    def row(self, filename: str) -> Optional[dict[str, Any]]:
+        entry = self._entry(filename)
+        return json.loads(entry[6]) if entry else None
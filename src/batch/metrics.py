@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import time
+from array import array
+from typing import Any, Optional
+
+import numpy as np
+
+from src.batch.worker import peak_rss_mb
+from src.telemetry import MetricsRegistry
+
+
+RUN_REPORT_FILENAME = "batch_run_report.json"
+STAGES = ("read", "parse", "extract", "diagnose", "write")
+SLOWEST_N = 10
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m{seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m"
+
+
+class RunMetrics:
+    """Throughput, stage-time and latency accounting for one batch run.
+
+    Fed one summary row at a time, so it works on streamed runs: per-log
+    latencies are kept as a packed float array and only the ``slowest_n``
+    rows are retained. Rows reused from the manifest count as skipped and
+    are left out of throughput and latency.
+    """
+
+    def __init__(
+        self,
+        total: Optional[int] = None,
+        jobs: int = 1,
+        slowest_n: int = SLOWEST_N,
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        self.total = total
+        self.registry = registry
+        self.jobs = jobs
+        self.slowest_n = slowest_n
+        self.started_at = time.time()
+        self._t0 = time.monotonic()
+        self.processed = 0
+        self.skipped = 0
+        self.errors = 0
+        self.bytes_processed = 0
+        self.stage_sec = {stage: 0.0 for stage in STAGES}
+        self.worker_peak_rss_mb: Optional[float] = None
+        self._latency = array("d")
+        self._slowest: list[tuple[float, int, dict[str, Any]]] = []
+
+    @property
+    def done(self) -> int:
+        return self.processed + self.skipped
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._t0
+
+    def observe(self, row: dict[str, Any], fresh: bool = True) -> None:
+        if not fresh:
+            self.skipped += 1
+            return
+        self.processed += 1
+        if row.get("status") == "ERROR":
+            self.errors += 1
+        self.bytes_processed += int(row.get("size_bytes") or 0)
+        for stage, sec in (row.get("timings") or {}).items():
+            self.stage_sec[stage] = self.stage_sec.get(stage, 0.0) + float(sec)
+        rss = row.get("peak_rss_mb")
+        if rss is not None:
+            self.worker_peak_rss_mb = max(self.worker_peak_rss_mb or 0.0, float(rss))
+        if self.registry is not None:
+            self._record(row)
+
+        elapsed = row.get("elapsed_sec")
+        if elapsed is None:
+            return
+        elapsed = float(elapsed)
+        self._latency.append(elapsed)
+        entry = {
+            "filename": row.get("filename"),
+            "status": row.get("status"),
+            "elapsed_sec": round(elapsed, 4),
+            "size_mb": round(int(row.get("size_bytes") or 0) / 1e6, 3),
+            "timings": row.get("timings", {}),
+        }
+        item = (elapsed, self.processed, entry)
+        if len(self._slowest) < self.slowest_n:
+            heapq.heappush(self._slowest, item)
+        elif elapsed > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def _record(self, row: dict[str, Any]) -> None:
+        """Mirror one fresh row into the telemetry registry (``batch --metrics-file``)."""
+        registry = self.registry
+        assert registry is not None
+        for stage, sec in (row.get("timings") or {}).items():
+            registry.record_stage(stage, float(sec), source="batch")
+        registry.inc("bytes_processed_total", int(row.get("size_bytes") or 0), source="batch")
+        registry.inc("batch_logs_total", status=row.get("status", "UNKNOWN"))
+        if row.get("status") == "ERROR":
+            registry.record_error("batch", "AnalysisError")
+        if self.worker_peak_rss_mb is not None:
+            registry.set(
+                "process_resident_memory_bytes",
+                self.worker_peak_rss_mb * 1024 * 1024,
+                role="batch_worker_peak",
+            )
+
+    def eta_sec(self) -> Optional[float]:
+        if self.total is None or self.processed == 0:
+            return None
+        remaining = max(self.total - self.done, 0)
+        return remaining * self.elapsed() / self.processed
+
+    def progress_line(self) -> str:
+        elapsed = max(self.elapsed(), 1e-9)
+        total = f"/{self.total}" if self.total is not None else ""
+        eta = self.eta_sec()
+        return (
+            f"[{self.done}{total}] {self.processed / elapsed:.2f} logs/s · "
+            f"{self.bytes_processed / 1e6 / elapsed:.1f} MB/s · elapsed {_format_duration(elapsed)}"
+            + (f" · ETA {_format_duration(eta)}" if eta is not None else "")
+        )
+
+    def report(self) -> dict[str, Any]:
+        wall = max(self.elapsed(), 1e-9)
+        latency: dict[str, float] = {}
+        if len(self._latency):
+            values = np.frombuffer(self._latency, dtype=np.float64)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            latency = {
+                "mean": round(float(values.mean()), 4),
+                "p50": round(float(p50), 4),
+                "p95": round(float(p95), 4),
+                "p99": round(float(p99), 4),
+                "max": round(float(values.max()), 4),
+            }
+        stage_total = sum(self.stage_sec.values())
+        return {
+            "started_at": self.started_at,
+            "wall_sec": round(wall, 3),
+            "jobs": self.jobs,
+            "logs": {
+                "total": self.done,
+                "processed": self.processed,
+                "skipped": self.skipped,
+                "errors": self.errors,
+            },
+            "bytes_processed": self.bytes_processed,
+            "throughput": {
+                "logs_per_sec": round(self.processed / wall, 4),
+                "mb_per_sec": round(self.bytes_processed / 1e6 / wall, 3),
+            },
+            # Summed across workers, so with --jobs > 1 totals exceed wall time.
+            "stage_sec": {
+                stage: {
+                    "total": round(sec, 4),
+                    "mean": round(sec / self.processed, 4) if self.processed else 0.0,
+                    "share": round(sec / stage_total, 4) if stage_total else 0.0,
+                }
+                for stage, sec in self.stage_sec.items()
+            },
+            "latency_sec": latency,
+            "peak_rss_mb": {"coordinator": peak_rss_mb(), "worker_max": self.worker_peak_rss_mb},
+            "slowest": [
+                entry for _sec, _seq, entry in sorted(self._slowest, key=lambda item: -item[0])
+            ],
+        }
+
+    def write(self, path: str) -> dict[str, Any]:
+        report = self.report()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+        os.replace(tmp_path, path)
+        return report
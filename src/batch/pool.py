@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import multiprocessing
+import time
+import traceback
+from dataclasses import dataclass
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+
+@dataclass
+class TaskOutcome:
+    """Result of one task: ``ok`` is False for exceptions, crashes and timeouts."""
+
+    index: int
+    ok: bool
+    task: tuple = ()
+    value: Any = None
+    error: str = ""
+    elapsed_sec: float = 0.0
+
+
+def _worker_main(
+    conn: Connection,
+    initializer: Optional[Callable[..., None]],
+    initargs: tuple,
+    func: Callable[..., Any],
+) -> None:
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+        try:
+            conn.send(("ok", func(*message)))
+        except Exception as exc:
+            conn.send(("error", str(exc) or type(exc).__name__))
+        except BaseException:
+            # SystemExit and friends: report, then let the parent replace us.
+            conn.send(("fatal", traceback.format_exc(limit=1).strip().splitlines()[-1]))
+            break
+    conn.close()
+
+
+@dataclass
+class _Worker:
+    process: Any
+    conn: Connection
+    task_index: Optional[int] = None
+    started: float = 0.0
+
+
+class LogWorkerPool:
+    """Process pool with one pipe per worker so failures map to a single task.
+
+    Unlike ``concurrent.futures.ProcessPoolExecutor`` a worker that crashes
+    (segfault, OOM kill) or exceeds ``timeout`` only fails the task it was
+    running: the worker is replaced and the run continues. Each worker runs
+    ``initializer(*initargs)`` once, so engines are loaded once per process.
+    Tasks are pulled lazily from the iterable, in order, only when a worker
+    is free, so arbitrarily long task streams run in bounded memory.
+
+    ``run`` drives a finite task stream; long-lived callers such as the
+    watch daemon use ``submit``/``poll``/``close`` directly so workers stay
+    warm between arrivals.
+    """
+
+    def __init__(
+        self,
+        jobs: int,
+        func: Callable[..., Any],
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: tuple = (),
+        timeout: Optional[float] = None,
+    ):
+        self.jobs = max(1, int(jobs))
+        self.func = func
+        self.initializer = initializer
+        self.initargs = initargs
+        self.timeout = timeout
+        self._ctx = multiprocessing.get_context()
+        self._workers: list[_Worker] = []
+        self._busy: list[_Worker] = []
+        self._in_flight: dict[int, tuple] = {}
+        self._counter = 0
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.initializer, self.initargs, self.func),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process=process, conn=parent_conn)
+
+    @staticmethod
+    def _stop(worker: _Worker, kill: bool = False) -> None:
+        if kill:
+            worker.process.terminate()
+        else:
+            try:
+                worker.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        worker.process.join(timeout=5)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+        worker.conn.close()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._busy)
+
+    def in_flight_tasks(self) -> list[tuple]:
+        return list(self._in_flight.values())
+
+    def pids(self) -> list[int]:
+        """PIDs of the live worker processes."""
+        return [w.process.pid for w in self._workers if w.process.is_alive()]
+
+    def has_capacity(self) -> bool:
+        return self.in_flight < self.jobs
+
+    def submit(self, task: tuple) -> int:
+        """Hand ``task`` to an idle (or newly spawned) worker and return its index."""
+        idle = [w for w in self._workers if w.task_index is None]
+        if idle:
+            worker = idle[0]
+        elif len(self._workers) < self.jobs:
+            worker = self._spawn()
+            self._workers.append(worker)
+        else:
+            raise RuntimeError("no idle worker; check has_capacity() before submit()")
+        index = self._counter
+        self._counter += 1
+        self._in_flight[index] = task
+        worker.task_index = index
+        worker.started = time.monotonic()
+        worker.conn.send(task)
+        self._busy.append(worker)
+        return index
+
+    def poll(self, timeout: Optional[float] = None) -> list[TaskOutcome]:
+        """Wait up to ``timeout`` seconds (None = until one finishes) for outcomes.
+
+        Crashed, fatal and timed-out workers are discarded; ``submit`` spawns
+        a replacement the next time work arrives.
+        """
+        if not self._busy:
+            if timeout:
+                time.sleep(timeout)
+            return []
+        wait_timeout = timeout
+        if self.timeout is not None:
+            now = time.monotonic()
+            deadline = max(0.0, min(w.started + self.timeout - now for w in self._busy))
+            wait_timeout = deadline if wait_timeout is None else min(wait_timeout, deadline)
+        handles: list[Any] = [w.conn for w in self._busy] + [w.process.sentinel for w in self._busy]
+        ready = set(wait(handles, timeout=wait_timeout))
+
+        outcomes: list[TaskOutcome] = []
+        for worker in list(self._busy):
+            index = worker.task_index
+            assert index is not None
+            elapsed = time.monotonic() - worker.started
+            outcome: Optional[TaskOutcome] = None
+            replace = False
+
+            if worker.conn in ready or worker.process.sentinel in ready:
+                try:
+                    if not worker.conn.poll():
+                        raise EOFError
+                    status, payload = worker.conn.recv()
+                    if status == "ok":
+                        outcome = TaskOutcome(index, True, value=payload, elapsed_sec=elapsed)
+                    else:
+                        outcome = TaskOutcome(index, False, error=payload, elapsed_sec=elapsed)
+                        replace = status == "fatal"
+                except (EOFError, OSError):
+                    worker.process.join(timeout=1)
+                    outcome = TaskOutcome(
+                        index,
+                        False,
+                        error=f"worker crashed (exit code {worker.process.exitcode})",
+                        elapsed_sec=elapsed,
+                    )
+                    replace = True
+            elif self.timeout is not None and elapsed >= self.timeout:
+                outcome = TaskOutcome(
+                    index, False, error=f"timed out after {self.timeout:g}s", elapsed_sec=elapsed
+                )
+                replace = True
+
+            if outcome is None:
+                continue
+
+            self._busy.remove(worker)
+            worker.task_index = None
+            outcome.task = self._in_flight.pop(index)
+            if replace:
+                self._stop(worker, kill=True)
+                self._workers.remove(worker)
+            outcomes.append(outcome)
+        return outcomes
+
+    def close(self) -> None:
+        """Stop every worker; busy ones are killed."""
+        for worker in self._workers:
+            alive = worker.process.is_alive()
+            self._stop(worker, kill=worker.task_index is not None or not alive)
+        self._workers.clear()
+        self._busy.clear()
+        self._in_flight.clear()
+
+    def run(self, tasks: Iterable[tuple]) -> Iterator[TaskOutcome]:
+        """Yield a ``TaskOutcome`` per task as each one finishes (unordered).
+
+        ``TaskOutcome.index`` is the task's position in ``tasks``.
+        """
+        self._counter = 0
+        source = iter(tasks)
+        exhausted = False
+
+        def refill() -> None:
+            nonlocal exhausted
+            while not exhausted and self.has_capacity():
+                task = next(source, None)
+                if task is None:
+                    exhausted = True
+                else:
+                    self.submit(task)
+
+        try:
+            refill()
+            while self._busy:
+                for outcome in self.poll():
+                    # Refill before handing control back to the consumer.
+                    refill()
+                    yield outcome
+        finally:
+            self.close()
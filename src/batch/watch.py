@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+
+import numpy as np
+
+from src.batch.discovery import DEFAULT_INCLUDE, discover_logs
+from src.batch.pool import LogWorkerPool, TaskOutcome
+from src.batch.worker import SUMMARY_FIELDNAMES, analyze_file, error_row, init_worker
+
+
+QUEUE_FILENAME = "watch_queue.sqlite"
+STATS_FILENAME = "watch_stats.json"
+POLL_INTERVAL_SEC = 1.0
+# A file counts as fully uploaded once its size and mtime hold this long.
+SETTLE_SEC = 3.0
+THROUGHPUT_WINDOW_SEC = 60.0
+LATENCY_SAMPLES = 1000
+
+
+class WorkQueue:
+    """Persistent SQLite work queue for the watch daemon.
+
+    Rows move ``queued`` -> ``running`` -> ``done``/``error``. Rows left
+    ``running`` by a killed daemon are re-queued on open, and a file whose
+    size or mtime changes after it was processed is queued again. A file
+    rewritten while it is running is only marked ``dirty``; ``finish`` then
+    re-queues it instead of closing it, so one file never runs twice at once.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS queue (
+                filename TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                enqueued_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                error TEXT,
+                dirty INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(queue)")}
+        if "dirty" not in columns:  # queues created before rewrites were tracked
+            self._conn.execute("ALTER TABLE queue ADD COLUMN dirty INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS queue_state ON queue (state, enqueued_at)")
+        self._conn.execute(
+            "UPDATE queue SET state = 'queued', started_at = NULL, dirty = 0 "
+            "WHERE state = 'running'"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "WorkQueue":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    def enqueue(self, filename: str, size: int, mtime_ns: int, first_seen: float) -> bool:
+        """Queue ``filename`` unless this exact version is already known.
+
+        A running file is not queued a second time: it is marked ``dirty``
+        and re-queued by ``finish``.
+        """
+        known = self._conn.execute(
+            "SELECT size, mtime_ns, state FROM queue WHERE filename = ?", (filename,)
+        ).fetchone()
+        if known is not None and known[:2] == (size, mtime_ns):
+            return False
+        if known is not None and known[2] == "running":
+            self._conn.execute(
+                "UPDATE queue SET size = ?, mtime_ns = ?, first_seen = ?, dirty = 1 "
+                "WHERE filename = ?",
+                (size, mtime_ns, first_seen, filename),
+            )
+        else:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO queue "
+                "(filename, size, mtime_ns, state, first_seen, enqueued_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (filename, size, mtime_ns, first_seen, time.time()),
+            )
+        self._conn.commit()
+        return True
+
+    def claim(self, limit: int) -> list[tuple[str, float, float]]:
+        """Mark up to ``limit`` oldest queued files running.
+
+        Returns ``(filename, first_seen, enqueued_at)`` per claimed file.
+        """
+        rows = self._conn.execute(
+            "SELECT filename, first_seen, enqueued_at FROM queue WHERE state = 'queued' "
+            "ORDER BY enqueued_at LIMIT ?",
+            (limit,),
+        ).fetchall()
+        now = time.time()
+        self._conn.executemany(
+            "UPDATE queue SET state = 'running', started_at = ? WHERE filename = ?",
+            [(now, row[0]) for row in rows],
+        )
+        self._conn.commit()
+        return rows
+
+    def finish(self, filename: str, error: Optional[str] = None) -> bool:
+        """Close the running version of ``filename``.
+
+        False when the file was rewritten while running and is queued again.
+        """
+        now = time.time()
+        requeued = self._conn.execute(
+            "UPDATE queue SET state = 'queued', enqueued_at = ?, started_at = NULL, dirty = 0 "
+            "WHERE filename = ? AND state = 'running' AND dirty = 1",
+            (now, filename),
+        ).rowcount
+        if not requeued:
+            self._conn.execute(
+                "UPDATE queue SET state = ?, finished_at = ?, error = ? "
+                "WHERE filename = ? AND state = 'running'",
+                ("error" if error else "done", now, error, filename),
+            )
+        self._conn.commit()
+        return not requeued
+
+    def counts(self) -> dict[str, int]:
+        counts = {"queued": 0, "running": 0, "done": 0, "error": 0}
+        for state, count in self._conn.execute("SELECT state, COUNT(*) FROM queue GROUP BY state"):
+            counts[state] = count
+        return counts
+
+
+class StabilityTracker:
+    """Track size/mtime per file and report files that stopped changing.
+
+    Field laptops copy logs over slow links, so a file is only handed on
+    once it has been non-empty with the same size and mtime for ``settle_sec``.
+    """
+
+    def __init__(self, settle_sec: float = SETTLE_SEC):
+        self.settle_sec = settle_sec
+        # filename -> (size, mtime_ns, first_seen, unchanged_since, reported)
+        self._seen: dict[str, tuple[int, int, float, float, bool]] = {}
+
+    def observe(
+        self, stats: dict[str, os.stat_result], now: float
+    ) -> list[tuple[str, int, int, float]]:
+        """Feed one directory listing; return the files that just became stable.
+
+        Each is ``(filename, size, mtime_ns, first_seen)``.
+        """
+        stable = []
+        for filename in list(self._seen):
+            if filename not in stats:
+                del self._seen[filename]
+        for filename, stat in stats.items():
+            previous = self._seen.get(filename)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if previous is None:
+                self._seen[filename] = (*signature, now, now, False)
+                continue
+            size, mtime_ns, first_seen, since, reported = previous
+            if (size, mtime_ns) != signature:
+                self._seen[filename] = (*signature, first_seen, now, False)
+                continue
+            if not reported and stat.st_size > 0 and now - since >= self.settle_sec:
+                self._seen[filename] = (size, mtime_ns, first_seen, since, True)
+                stable.append((filename, size, mtime_ns, first_seen))
+        return stable
+
+
+class WatchStats:
+    """Queue depth, throughput and latency counters for the watch daemon."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.processed = 0
+        self.errors = 0
+        self._finished: deque[float] = deque()
+        self._latency: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._queue_wait: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._analysis: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(
+        self, ok: bool, first_seen: float, enqueued_at: float, started_at: float, elapsed_sec: float
+    ) -> None:
+        now = time.time()
+        self.processed += 1
+        self.errors += 0 if ok else 1
+        self._finished.append(now)
+        self._latency.append(now - first_seen)
+        self._queue_wait.append(max(0.0, started_at - enqueued_at))
+        self._analysis.append(elapsed_sec)
+
+    @staticmethod
+    def _percentiles(samples: deque[float]) -> dict[str, float]:
+        if not samples:
+            return {}
+        p50, p95, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), [50, 95, 99])
+        return {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+        }
+
+    def snapshot(self, queue_counts: dict[str, int], in_flight: int) -> dict[str, Any]:
+        now = time.time()
+        while self._finished and now - self._finished[0] > THROUGHPUT_WINDOW_SEC:
+            self._finished.popleft()
+        uptime = max(now - self.started_at, 1e-9)
+        return {
+            "uptime_sec": round(uptime, 1),
+            "queue_depth": queue_counts.get("queued", 0),
+            "in_flight": in_flight,
+            "processed": self.processed,
+            "errors": self.errors,
+            "queue_totals": queue_counts,
+            "throughput_logs_per_min": round(
+                len(self._finished) * 60.0 / min(uptime, THROUGHPUT_WINDOW_SEC), 2
+            ),
+            "throughput_logs_per_sec_total": round(self.processed / uptime, 4),
+            "latency_sec": self._percentiles(self._latency),
+            "queue_wait_sec": self._percentiles(self._queue_wait),
+            "analysis_sec": self._percentiles(self._analysis),
+        }
+
+
+@dataclass
+class _Running:
+    first_seen: float
+    enqueued_at: float
+    started_at: float
+
+
+class FolderWatcher:
+    """Poll a drop folder, queue size-stable logs and analyse them on warm workers.
+
+    Each poll is a cheap ``stat`` listing; only new or changed files are
+    queued, so nothing is rescanned or re-analysed. Rows are appended to
+    ``batch_summary.csv`` and ``batch_results.jsonl`` in ``output_dir`` and
+    per-log JSON reports are written next to them.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        output_dir: str,
+        engine_name: str = "hybrid",
+        jobs: int = 1,
+        timeout: Optional[float] = None,
+        recursive: bool = False,
+        include: Sequence[str] = DEFAULT_INCLUDE,
+        exclude: Sequence[str] = (),
+        poll_interval: float = POLL_INTERVAL_SEC,
+        settle_sec: float = SETTLE_SEC,
+        queue_path: Optional[str] = None,
+        on_row: Optional[Callable[[dict[str, Any]], None]] = None,
+    ):
+        self.directory = directory
+        self.output_dir = output_dir
+        self.recursive = recursive
+        self.include = include
+        self.exclude = exclude
+        self.poll_interval = poll_interval
+        self.on_row = on_row
+        os.makedirs(output_dir, exist_ok=True)
+        self.queue = WorkQueue(queue_path or os.path.join(output_dir, QUEUE_FILENAME))
+        self.tracker = StabilityTracker(settle_sec)
+        self.stats = WatchStats()
+        self.pool = LogWorkerPool(
+            jobs,
+            analyze_file,
+            initializer=init_worker,
+            initargs=(engine_name, output_dir),
+            timeout=timeout,
+        )
+        self._running: dict[str, _Running] = {}
+        self.final_stats: dict[str, Any] = {}
+        self._next_scan = 0.0
+        self.stats_path = os.path.join(output_dir, STATS_FILENAME)
+        self.csv_path = os.path.join(output_dir, "batch_summary.csv")
+        self.jsonl_path = os.path.join(output_dir, "batch_results.jsonl")
+
+    def scan(self, now: Optional[float] = None) -> int:
+        """List the drop folder once and queue newly stable logs; return how many were queued."""
+        now = time.time() if now is None else now
+        stats: dict[str, os.stat_result] = {}
+        for filename in discover_logs(self.directory, self.recursive, self.include, self.exclude):
+            try:
+                stats[filename] = os.stat(os.path.join(self.directory, filename))
+            except OSError:
+                continue
+        queued = 0
+        for filename, size, mtime_ns, first_seen in self.tracker.observe(stats, now):
+            queued += self.queue.enqueue(filename, size, mtime_ns, first_seen)
+        return queued
+
+    def _dispatch(self) -> None:
+        free = self.pool.jobs - self.pool.in_flight
+        if free <= 0:
+            return
+        for filename, first_seen, enqueued_at in self.queue.claim(free):
+            self._running[filename] = _Running(first_seen, enqueued_at, time.time())
+            self.pool.submit((os.path.join(self.directory, filename), filename))
+
+    def _append_row(self, row: dict[str, Any]) -> None:
+        new_csv = not os.path.exists(self.csv_path)
+        with open(self.csv_path, "a", newline="") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=SUMMARY_FIELDNAMES, extrasaction="ignore")
+            if new_csv:
+                writer.writeheader()
+            writer.writerow(row)
+        with open(self.jsonl_path, "a", encoding="utf-8") as jsonl_file:
+            jsonl_file.write(json.dumps(row) + "\n")
+
+    def _complete(self, outcome: TaskOutcome) -> dict[str, Any]:
+        filename = outcome.task[1]
+        row = outcome.value if outcome.ok else error_row(filename, outcome.error)
+        running = self._running.pop(filename)
+        self.queue.finish(filename, None if outcome.ok else outcome.error)
+        self.stats.record(
+            outcome.ok,
+            running.first_seen,
+            running.enqueued_at,
+            running.started_at,
+            outcome.elapsed_sec,
+        )
+        row = dict(row, latency_sec=round(time.time() - running.first_seen, 3))
+        self._append_row(row)
+        return row
+
+    def write_stats(self) -> dict[str, Any]:
+        snapshot = self.stats.snapshot(self.queue.counts(), self.pool.in_flight)
+        tmp_path = self.stats_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as stats_file:
+            json.dump(snapshot, stats_file, indent=2)
+        os.replace(tmp_path, self.stats_path)
+        return snapshot
+
+    def step(self) -> list[dict[str, Any]]:
+        """One daemon iteration: scan when due, dispatch queued logs, collect results."""
+        now = time.time()
+        if now >= self._next_scan:
+            self.scan(now)
+            self._next_scan = now + self.poll_interval
+        self._dispatch()
+        wait_sec = max(0.0, min(self.poll_interval, self._next_scan - time.time()))
+        rows = [self._complete(outcome) for outcome in self.pool.poll(timeout=wait_sec)]
+        for row in rows:
+            if self.on_row is not None:
+                self.on_row(row)
+        if rows:
+            self._dispatch()
+            self.write_stats()
+        return rows
+
+    def run(self, max_seconds: Optional[float] = None, stats_every_sec: float = 10.0) -> None:
+        """Run until interrupted (or for ``max_seconds``), then stop the workers.
+
+        Logs still running when the daemon stops are re-queued on the next start.
+        """
+        deadline = None if max_seconds is None else time.monotonic() + max_seconds
+        next_stats = 0.0
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                self.step()
+                if time.monotonic() >= next_stats:
+                    self.write_stats()
+                    next_stats = time.monotonic() + stats_every_sec
+        finally:
+            self.final_stats = self.close()
+
+    def close(self) -> dict[str, Any]:
+        """Stop the workers, write final stats and close the queue; return the stats."""
+        self.pool.close()
+        snapshot = self.write_stats()
+        self.queue.close()
+        return snapshot
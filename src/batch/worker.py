@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from src.batch.manifest import file_sha256
+from src.cli.formatter import DiagnosisFormatter
+from src.constants import FEATURE_NAMES
+from src.diagnosis.context import _safe_float
+from src.diagnosis.decision_policy import evaluate_decision
+from src.diagnosis.hybrid_engine import HybridEngine
+from src.diagnosis.rule_engine import RuleEngine
+from src.features.pipeline import FeaturePipeline
+from src.parser.bin_parser import LogParser
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+
+SUMMARY_FIELDNAMES = [
+    "filename",
+    "status",
+    "top_diagnosis",
+    "confidence",
+    "severity",
+    "requires_review",
+]
+
+# Per-process engines, loaded once by init_worker() and reused for every log.
+_STATE: dict[str, Any] = {}
+
+
+def init_worker(
+    engine_name: str = "hybrid", output_dir: str | None = None, engine: Any = None
+) -> None:
+    """Load the per-process state; ``engine`` overrides the one ``engine_name`` would build."""
+    _STATE["pipeline"] = FeaturePipeline()
+    if engine is None:
+        engine = RuleEngine() if engine_name == "rule" else HybridEngine()
+    _STATE["engine"] = engine
+    _STATE["formatter"] = DiagnosisFormatter()
+    _STATE["output_dir"] = output_dir
+
+
+def report_path(output_dir: str, filename: str) -> str:
+    """Flat report path; nested logs map ``sub/dir/x.bin`` to ``sub__dir__x_report.json``."""
+    flat = Path(filename).with_suffix("").as_posix().replace("/", "__")
+    return os.path.join(output_dir, f"{flat}_report.json")
+
+
+def error_row(filename: str, message: str) -> dict[str, Any]:
+    return {"filename": filename, "status": "ERROR", "error": message}
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def analyze_file(filepath: str, filename: str) -> dict[str, Any]:
+    """Diagnose one log and write its JSON report; return the batch summary row.
+
+    The row carries per-stage wall times (read, parse, extract, diagnose,
+    write) for the run report. Exceptions propagate so the caller can turn
+    them into ERROR rows.
+    """
+    if not _STATE:
+        init_worker()
+    pipeline: FeaturePipeline = _STATE["pipeline"]
+    engine = _STATE["engine"]
+    output_dir = _STATE["output_dir"]
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+
+    # Hashing streams the whole file once, so it doubles as the read stage
+    # and leaves the log in the page cache for the parser.
+    sha256 = file_sha256(filepath)
+    mark = time.perf_counter()
+    timings["read"] = mark - started
+
+    parsed = LogParser(filepath).parse()
+    timings["parse"] = time.perf_counter() - mark
+    mark = time.perf_counter()
+
+    features = pipeline.extract(parsed)
+    metadata = features.get("_metadata", {})
+    if not metadata.get("extraction_success", True):
+        raise ValueError("Extraction failed: empty or corrupt log")
+    timings["extract"] = time.perf_counter() - mark
+    mark = time.perf_counter()
+
+    diagnoses = engine.diagnose(features)
+    decision = evaluate_decision(diagnoses)
+    timings["diagnose"] = time.perf_counter() - mark
+    mark = time.perf_counter()
+
+    if not diagnoses:
+        status = "HEALTHY"
+        top_label = "-"
+        conf = 0.0
+        severity = "-"
+    else:
+        top = diagnoses[0]
+        top_label = top["failure_type"]
+        conf = top["confidence"]
+        severity = top["severity"]
+        status = "CRITICAL" if severity == "critical" else "WARNING"
+
+    if output_dir:
+        report_json = _STATE["formatter"].format_json(
+            diagnoses, metadata, features, decision=decision
+        )
+        with open(report_path(output_dir, filename), "w") as json_file:
+            json_file.write(report_json)
+    timings["write"] = time.perf_counter() - mark
+
+    return {
+        "filename": filename,
+        "status": status,
+        "top_diagnosis": top_label,
+        "confidence": f"{conf:.2f}",
+        "severity": severity,
+        "requires_review": decision.get("requires_human_review", False),
+        "sha256": sha256,
+        "size_bytes": os.path.getsize(filepath),
+        "elapsed_sec": round(time.perf_counter() - started, 4),
+        "timings": {stage: round(sec, 4) for stage, sec in timings.items()},
+        "peak_rss_mb": peak_rss_mb(),
+        # Aligned with FEATURE_NAMES; feeds feature-space incident clustering.
+        "feature_vector": [
+            round(_safe_float(features.get(name, 0.0)), 6) for name in FEATURE_NAMES
+        ],
+    }
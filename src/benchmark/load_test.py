@@ -0,0 +1,551 @@
+"""Load test for the web API: replay .BIN uploads and measure the service.
+
+``run_load`` sends a corpus of logs to ``/api/analyze`` (multipart) or
+``/api/analyze/stream`` (raw body). It runs closed-loop, where
+``concurrency`` clients send back to back, or open-loop, where requests
+arrive as a Poisson process at ``rate`` per second and are capped at
+``concurrency`` in flight. It records every request's latency and status.
+While the load runs, ``RssSampler`` samples the resident memory of the
+server's process tree.
+
+``summarize`` reduces a run to:
+
+- latency percentiles, overall and per file
+- throughput
+- error rate
+- RSS peak and mean
+
+``to_markdown`` renders that summary in the layout of
+``release_benchmark_results.md``. ``compare`` flags regressions against a
+baseline summary.
+
+``synthetic_log`` writes DataFlash logs of any size, with 400 Hz IMU and
+10 Hz attitude, vibration and battery data, so large uploads can be tested
+without shipping large logs. Standard library only; ``ServerProcess`` starts
+``ui`` in a subprocess when no ``--url`` is given.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from src.telemetry import current_rss_bytes
+
+
+PERCENTILES = (50, 90, 95, 99)
+RSS_SAMPLE_SEC = 0.5
+SERVER_START_TIMEOUT_SEC = 60.0
+REQUEST_TIMEOUT_SEC = 600.0
+# compare(): relative change that counts as a regression, and the absolute
+# error-rate increase (in percentage points) that does.
+MAX_REGRESSION_PCT = 10.0
+MAX_ERROR_RATE_INCREASE = 1.0
+
+_HEAD = b"\xa3\x95"
+IMU_HZ = 400
+SLOW_HZ = 10
+
+
+def _fmt(type_id: int, name: str, fmt: str, columns: str) -> bytes:
+    length = 3 + struct.calcsize("<" + fmt.replace("Z", "64s").replace("N", "16s"))
+    return _HEAD + struct.pack(
+        "<BBB4s16s64s", 0x80, type_id, length, name.encode(), fmt.encode(), columns.encode()
+    )
+
+
+def synthetic_log(path: str | os.PathLike[str], size_mb: float, seed: int = 0) -> Path:
+    """Write a Copter DataFlash log of about ``size_mb`` MB to ``path``.
+
+    Signals are smooth with noise and a mid-flight vibration burst, so the
+    log exercises the full analysis (features, rules, series) rather than
+    an early exit.
+    """
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    imu = struct.Struct("<BBBQBffffff")
+    att = struct.Struct("<BBBQffff")
+    vibe = struct.Struct("<BBBQBfffI")
+    bat = struct.Struct("<BBBQBff")
+    path = Path(path)
+    with open(path, "wb") as out:
+        out.write(_fmt(0x81, "MSG", "QZ", "TimeUS,Message"))
+        out.write(_fmt(0x82, "PARM", "QNf", "TimeUS,Name,Value"))
+        out.write(_fmt(0x83, "IMU", "QBffffff", "TimeUS,I,GyrX,GyrY,GyrZ,AccX,AccY,AccZ"))
+        out.write(_fmt(0x84, "ATT", "Qffff", "TimeUS,Roll,Pitch,Yaw,DesYaw"))
+        out.write(_fmt(0x85, "VIBE", "QBfffI", "TimeUS,IMU,VibeX,VibeY,VibeZ,Clip"))
+        out.write(_fmt(0x86, "BAT", "QBff", "TimeUS,Inst,Volt,Curr"))
+        out.write(_HEAD + struct.pack("<BQ64s", 0x81, 1_000_000, b"ArduCopter V4.5.1 (synthetic)"))
+        for name, value in (
+            (b"FRAME_CLASS", 1.0),
+            (b"INS_ACCEL_FILTER", 20.0),
+            (b"BATT_LOW_VOLT", 10.5),
+        ):
+            out.write(_HEAD + struct.pack("<BQ16sf", 0x82, 1_100_000, name, value))
+        written = out.tell()
+        step_us = 1_000_000 // IMU_HZ
+        slow_every = IMU_HZ // SLOW_HZ
+        tick = 0
+        while written < target:
+            time_us = 2_000_000 + tick * step_us
+            t = tick / IMU_HZ
+            burst = 1.0 if 0.45 < (written / target) < 0.55 else 0.0
+            noise = 0.3 + 2.5 * burst
+            chunk = bytearray()
+            for instance in (0, 1):
+                chunk += imu.pack(
+                    0xA3, 0x95, 0x83, time_us, instance,
+                    0.02 * math.sin(t), 0.02 * math.cos(t), 0.01 * rng.gauss(0, 1),
+                    rng.gauss(0, noise), rng.gauss(0, noise), -9.81 + rng.gauss(0, noise),
+                )
+            if tick % slow_every == 0:
+                chunk += att.pack(
+                    0xA3,
+                    0x95,
+                    0x84,
+                    time_us,
+                    5 * math.sin(t / 3),
+                    3 * math.cos(t / 4),
+                    (t * 2) % 360,
+                    0.0,
+                )
+                level = 8 + 40 * burst
+                chunk += vibe.pack(
+                    0xA3, 0x95, 0x85, time_us, 0, level * 0.6, level * 0.7, level + rng.random(), 0
+                )
+                chunk += bat.pack(
+                    0xA3, 0x95, 0x86, time_us, 0, 16.4 - t * 0.002, 12 + 3 * burst + rng.random()
+                )
+            out.write(chunk)
+            written += len(chunk)
+            tick += 1
+    return path
+
+
+def collect_logs(paths: Iterable[str]) -> list[Path]:
+    """``.bin`` files named directly or found (recursively) under the given directories."""
+    logs: list[Path] = []
+    for name in paths:
+        path = Path(name)
+        if path.is_dir():
+            logs.extend(
+                sorted(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() == ".bin")
+            )
+        elif path.is_file():
+            logs.append(path)
+        else:
+            raise FileNotFoundError(f"no such log or directory: {name}")
+    return logs
+
+
+def _multipart(filename: str, data: bytes) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    head = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    return (
+        head + data + f"\r\n--{boundary}--\r\n".encode(),
+        f"multipart/form-data; boundary={boundary}",
+    )
+
+
+def _prepare(log: Path, base_url: str, endpoint: str) -> dict[str, Any]:
+    data = log.read_bytes()
+    if endpoint == "stream":
+        query = urllib.parse.quote(log.name)
+        return {
+            "name": log.name,
+            "url": f"{base_url}/api/analyze/stream?filename={query}",
+            "body": data,
+            "content_type": "application/octet-stream",
+            "size": len(data),
+        }
+    body, content_type = _multipart(log.name, data)
+    return {
+        "name": log.name,
+        "url": f"{base_url}/api/analyze",
+        "body": body,
+        "content_type": content_type,
+        "size": len(data),
+    }
+
+
+def _send(upload: dict[str, Any], timeout: float) -> dict[str, Any]:
+    request = urllib.request.Request(
+        upload["url"],
+        data=upload["body"],
+        method="POST",
+        headers={"Content-Type": upload["content_type"]},
+    )
+    started = time.perf_counter()
+    status, error = 0, None
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status, error = e.code, f"HTTP {e.code}"
+        e.read()
+    except (OSError, urllib.error.URLError) as e:
+        error = type(e).__name__ if not str(e) else f"{type(e).__name__}: {e}"
+    return {
+        "file": upload["name"],
+        "size": upload["size"],
+        "status": status,
+        "error": error,
+        "latency_sec": time.perf_counter() - started,
+    }
+
+
+def run_load(
+    logs: list[Path],
+    base_url: str,
+    requests: int,
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+    endpoint: str = "analyze",
+    seed: int = 0,
+    timeout: float = REQUEST_TIMEOUT_SEC,
+) -> dict[str, Any]:
+    """Send ``requests`` uploads cycling through ``logs``; returns the per-request records.
+
+    Without ``rate`` the run is closed-loop: ``concurrency`` clients send
+    back to back. With ``rate``, arrivals are Poisson at ``rate`` per second.
+    A request that finds ``concurrency`` already in flight waits, and that
+    wait counts toward its latency.
+    """
+    if not logs:
+        raise ValueError("the load test needs at least one log")
+    uploads = [_prepare(log, base_url.rstrip("/"), endpoint) for log in logs]
+    rng = random.Random(seed)
+    records: list[dict[str, Any]] = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def one(index: int, scheduled: float) -> None:
+        record = _send(uploads[index % len(uploads)], timeout)
+        # Open loop: latency runs from the scheduled arrival, including queueing.
+        record["latency_sec"] = time.perf_counter() - scheduled if rate else record["latency_sec"]
+        record["started_sec"] = scheduled - started
+        with lock:
+            records.append(record)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        if rate:
+            arrival = started
+            for index in range(requests):
+                arrival += rng.expovariate(rate)
+                delay = arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(one, index, arrival)
+        else:
+            next_index = iter(range(requests))
+            next_lock = threading.Lock()
+
+            def client() -> None:
+                while True:
+                    with next_lock:
+                        index = next(next_index, None)
+                    if index is None:
+                        return
+                    one(index, time.perf_counter())
+
+            for _ in range(max(1, concurrency)):
+                pool.submit(client)
+    return {"records": records, "duration_sec": time.perf_counter() - started}
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low, high = math.floor(rank), math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def _latency(values: list[float]) -> dict[str, float]:
+    ordered = sorted(value * 1000 for value in values)
+    stats = {f"p{pct}": round(_percentile(ordered, pct), 2) for pct in PERCENTILES}
+    stats["mean"] = round(sum(ordered) / len(ordered), 2) if ordered else 0.0
+    stats["max"] = round(ordered[-1], 2) if ordered else 0.0
+    return stats
+
+
+def _succeeded(record: dict[str, Any]) -> bool:
+    return record["error"] is None and 200 <= record["status"] < 300
+
+
+def summarize(
+    run: dict[str, Any],
+    rss_samples: Optional[list[int]] = None,
+    config: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    """Latency percentiles (ms), throughput, error rate and RSS of one ``run_load`` run."""
+    records = run["records"]
+    duration = max(run["duration_sec"], 1e-9)
+    ok = [r for r in records if _succeeded(r)]
+    errors: dict[str, int] = {}
+    for record in records:
+        if not _succeeded(record):
+            key = record["error"] or f"HTTP {record['status']}"
+            errors[key] = errors.get(key, 0) + 1
+    per_file = {}
+    for name in sorted({r["file"] for r in records}):
+        file_records = [r for r in records if r["file"] == name]
+        file_ok = [r for r in file_records if _succeeded(r)]
+        per_file[name] = {
+            "size_mb": round(file_records[0]["size"] / 2**20, 2),
+            "requests": len(file_records),
+            "errors": len(file_records) - len(file_ok),
+            "latency_ms": _latency([r["latency_sec"] for r in file_ok]),
+        }
+    samples = [s for s in (rss_samples or []) if s]
+    return {
+        "config": config or {},
+        "overall": {
+            "requests": len(records),
+            "ok": len(ok),
+            "errors": len(records) - len(ok),
+            "error_rate_pct": round(100.0 * (len(records) - len(ok)) / max(len(records), 1), 2),
+            "duration_sec": round(duration, 2),
+            "throughput_rps": round(len(ok) / duration, 3),
+            "throughput_mb_per_sec": round(sum(r["size"] for r in ok) / 2**20 / duration, 2),
+            "latency_ms": _latency([r["latency_sec"] for r in ok]),
+            "rss_peak_mb": round(max(samples) / 2**20, 1) if samples else None,
+            "rss_mean_mb": round(sum(samples) / len(samples) / 2**20, 1) if samples else None,
+        },
+        "errors_by_type": errors,
+        "per_file": per_file,
+    }
+
+
+# (path in "overall", direction): +1 when higher is worse, -1 when lower is.
+COMPARED_METRICS = (
+    (("latency_ms", "p50"), 1),
+    (("latency_ms", "p95"), 1),
+    (("latency_ms", "p99"), 1),
+    (("throughput_rps",), -1),
+    (("rss_peak_mb",), 1),
+)
+
+
+def _lookup(overall: dict[str, Any], path: tuple[str, ...]) -> Optional[float]:
+    value: Any = overall
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    max_regression_pct: float = MAX_REGRESSION_PCT,
+    max_error_rate_increase: float = MAX_ERROR_RATE_INCREASE,
+) -> list[dict[str, Any]]:
+    """One row per compared metric; ``regression`` marks those worse than allowed."""
+    rows = []
+    for path, direction in COMPARED_METRICS:
+        before = _lookup(baseline["overall"], path)
+        after = _lookup(current["overall"], path)
+        if before is None or after is None:
+            continue
+        change_pct = 100.0 * (after - before) / before if before else 0.0
+        rows.append({
+            "metric": ".".join(path),
+            "baseline": before,
+            "current": after,
+            "change_pct": round(change_pct, 1),
+            "regression": direction * change_pct > max_regression_pct,
+        })
+    before = baseline["overall"]["error_rate_pct"]
+    after = current["overall"]["error_rate_pct"]
+    rows.append({
+        "metric": "error_rate_pct",
+        "baseline": before,
+        "current": after,
+        "change_pct": round(after - before, 2),
+        "regression": after - before > max_error_rate_increase,
+    })
+    return rows
+
+
+def to_markdown(summary: dict[str, Any], comparison: Optional[list[dict[str, Any]]] = None) -> str:
+    ov = summary["overall"]
+    config = summary.get("config", {})
+    lat = ov["latency_ms"]
+    lines = [
+        "# Load Test Results",
+        "",
+        "## Configuration",
+        *[f"- {key}: {value}" for key, value in config.items()],
+        "",
+        "## Overall Metrics",
+        f"- Requests: {ov['requests']} ({ov['ok']} ok, {ov['errors']} errors)",
+        f"- Error rate: {ov['error_rate_pct']:.2f}%",
+        f"- Duration: {ov['duration_sec']:.1f}s",
+        f"- Throughput: {ov['throughput_rps']:.2f} req/s "
+        f"({ov['throughput_mb_per_sec']:.2f} MB/s uploaded)",
+        f"- Latency (ms): p50 {lat['p50']:.0f} · p90 {lat['p90']:.0f} · p95 {lat['p95']:.0f} · "
+        f"p99 {lat['p99']:.0f} · max {lat['max']:.0f}",
+    ]
+    if ov["rss_peak_mb"] is not None:
+        lines.append(
+            f"- Server RSS: peak {ov['rss_peak_mb']:.0f} MB, mean {ov['rss_mean_mb']:.0f} MB"
+        )
+    lines += [
+        "",
+        "## Per-File Latency",
+        "| File | MB | Requests | Errors | p50 ms | p95 ms | p99 ms |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for name, stats in summary["per_file"].items():
+        file_lat = stats["latency_ms"]
+        lines.append(
+            f"| {name} | {stats['size_mb']:.2f} | {stats['requests']} | {stats['errors']} "
+            f"| {file_lat['p50']:.0f} | {file_lat['p95']:.0f} | {file_lat['p99']:.0f} |"
+        )
+    if summary.get("errors_by_type"):
+        lines += ["", "## Errors"]
+        lines += [f"- {kind}: {count}" for kind, count in sorted(summary["errors_by_type"].items())]
+    if comparison is not None:
+        lines += [
+            "",
+            "## Comparison with Baseline",
+            "| Metric | Baseline | Current | Change | |",
+            "|---|---|---|---|---|",
+        ]
+        for row in comparison:
+            unit = " pts" if row["metric"] == "error_rate_pct" else "%"
+            flag = "**REGRESSION**" if row["regression"] else ""
+            lines.append(
+                f"| {row['metric']} | {row['baseline']} | {row['current']} "
+                f"| {row['change_pct']:+}{unit} | {flag} |"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def _process_tree(root_pid: int) -> list[int]:
+    """``root_pid`` and its descendants, from ``/proc``; just the root elsewhere."""
+    children: dict[int, list[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return [root_pid]
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as stat:
+                # The command name may contain spaces; fields resume after its ")".
+                parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    tree, pending = [], [root_pid]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(children.get(pid, []))
+    return tree
+
+
+class RssSampler:
+    """Background sampler of the summed RSS of a process and its descendants."""
+
+    def __init__(self, pid: int, interval_sec: float = RSS_SAMPLE_SEC):
+        self.pid = pid
+        self.interval_sec = interval_sec
+        self.samples: list[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            total = sum(current_rss_bytes(pid) or 0 for pid in _process_tree(self.pid))
+            if total:
+                self.samples.append(total)
+            self._stop.wait(self.interval_sec)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerProcess:
+    """``python -m src.cli.main ui`` in a subprocess, with the result cache off by default."""
+
+    def __init__(
+        self, port: Optional[int] = None, ui_args: Iterable[str] = (), result_cache: bool = False
+    ):
+        self.port = port or _free_port()
+        self.args = [sys.executable, "-m", "src.cli.main", "ui", "--port", str(self.port), *ui_args]
+        if not result_cache:
+            # Identical replays would otherwise measure cache hits, not analyses.
+            self.args += ["--result-cache-dir", "", "--result-cache-entries", "0"]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "ServerProcess":
+        self.process = subprocess.Popen(
+            self.args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + SERVER_START_TIMEOUT_SEC
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"server exited with {self.process.returncode} during startup")
+            try:
+                with urllib.request.urlopen(f"{self.url}/metrics", timeout=2):
+                    return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f"server did not answer within {SERVER_START_TIMEOUT_SEC:.0f}s")
+
+    def __exit__(self, *_exc: Any) -> None:
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def save(
+    summary: dict[str, Any], output_prefix: str, comparison: Optional[list[dict[str, Any]]] = None
+) -> tuple[str, str]:
+    json_path, md_path = f"{output_prefix}.json", f"{output_prefix}.md"
+    payload = dict(summary, comparison=comparison) if comparison is not None else summary
+    with open(json_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    with open(md_path, "w") as f:
+        f.write(to_markdown(summary, comparison))
+    return json_path, md_path
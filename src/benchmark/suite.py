@@ -1,5 +1,7 @@
 import os
 import json
+from typing import Any, Optional
+
 from .results import BenchmarkResults
 from src.contracts import DiagnosisDict
 from src.parser.bin_parser import LogParser
@@ -31,59 +33,102 @@ class BenchmarkSuite:
         else:
             self.engine = HybridEngine()
 
-    def run(self) -> BenchmarkResults:
+    def entries(self) -> list[dict]:
+        """Ground-truth entries this suite scores (non-trainable ones filtered out)."""
+        with open(self.ground_truth_path, "r") as f:
+            data = json.load(f)
+        return [
+            log_entry
+            for log_entry in data.get("logs", [])
+            if self.include_non_trainable or log_entry.get("trainable") is not False
+        ]
+
+    def evaluate_file(self, filepath: str, pipeline: Optional[FeaturePipeline] = None) -> dict:
+        """Diagnose one log; failures come back as ``{"error", "type"}`` instead of raising."""
+        if not os.path.exists(filepath):
+            return {"error": "File not found", "type": "EXTRACTION_FAILED"}
+
+        parser = LogParser(filepath)
+        pipeline = pipeline or FeaturePipeline()
+
+        try:
+            parsed = parser.parse()
+            if not parsed.get("messages"):
+                raise Exception("Parsed empty messages dict")
+            features = pipeline.extract(parsed)
+            metadata = features.get("_metadata", {})
+            if not metadata.get("extraction_success", True):
+                raise Exception("Extraction failed: empty or corrupt log")
+        except Exception as e:
+            return {"error": str(e), "type": "EXTRACTION_FAILED"}
+
+        try:
+            if self.engine_type == "ml":
+                if isinstance(self.engine, MLClassifier):
+                    predictions = self.engine.predict(features)
+                else:
+                    predictions: list[DiagnosisDict] = []
+            else:
+                if isinstance(self.engine, (RuleEngine, HybridEngine)):
+                    predictions = self.engine.diagnose(features)
+                else:
+                    predictions = []
+        except Exception as e:
+            return {"error": str(e), "type": "DIAGNOSIS_FAILED"}
+        return {"predicted": predictions, "features_extracted": len(features)}
+
+    def collect(self, entries: list[dict], evaluations: dict[str, dict]) -> BenchmarkResults:
+        """Build ``BenchmarkResults`` from per-filename ``evaluate_file`` outputs.
+
+        Entries without an evaluation (e.g. quarantined by a distributed run)
+        are recorded as errors.
+        """
         results = BenchmarkResults()
+        for log_entry in entries:
+            filename = log_entry["filename"]
+            evaluation = evaluations.get(filename) or {
+                "error": "Not evaluated",
+                "type": "EXTRACTION_FAILED",
+            }
+            if "error" in evaluation:
+                results.add_error(
+                    filename, evaluation["error"], evaluation.get("type", "EXTRACTION_FAILED")
+                )
+            else:
+                results.add_result(
+                    filename,
+                    log_entry["labels"],
+                    evaluation["predicted"],
+                    evaluation["features_extracted"],
+                )
+        return results
 
+    def run(self) -> BenchmarkResults:
         if not os.path.exists(self.ground_truth_path):
             print(f"Error: {self.ground_truth_path} not found.")
-            return results
+            return BenchmarkResults()
 
-        with open(self.ground_truth_path, "r") as f:
-            data = json.load(f)
-
-        logs = data.get("logs", [])
+        entries = self.entries()
         pipeline = FeaturePipeline()
+        evaluations = {
+            log_entry["filename"]: self.evaluate_file(
+                os.path.join(self.dataset_dir, log_entry["filename"]), pipeline
+            )
+            for log_entry in entries
+        }
+        return self.collect(entries, evaluations)
 
-        for log_entry in logs:
-            if not self.include_non_trainable and log_entry.get("trainable") is False:
-                continue
 
-            filename = log_entry["filename"]
-            ground_truth = log_entry["labels"]
-            filepath = os.path.join(self.dataset_dir, filename)
-
-            if not os.path.exists(filepath):
-                results.add_error(filename, "File not found")
-                continue
-
-            parser = LogParser(filepath)
-
-            try:
-                parsed = parser.parse()
-                if not parsed.get("messages"):
-                    raise Exception("Parsed empty messages dict")
-                features = pipeline.extract(parsed)
-                metadata = features.get("_metadata", {})
-                if not metadata.get("extraction_success", True):
-                    raise Exception("Extraction failed: empty or corrupt log")
-            except Exception as e:
-                results.add_error(filename, str(e), "EXTRACTION_FAILED")
-                continue
-
-            try:
-                if self.engine_type == "ml":
-                    if isinstance(self.engine, MLClassifier):
-                        predictions = self.engine.predict(features)
-                    else:
-                        predictions: list[DiagnosisDict] = []
-                else:
-                    if isinstance(self.engine, (RuleEngine, HybridEngine)):
-                        predictions = self.engine.diagnose(features)
-                    else:
-                        predictions = []
+# Per-process suite for distributed queue workers (see src/batch/distributed.py).
+_WORKER_SUITE: dict[str, Any] = {}
 
-                results.add_result(filename, ground_truth, predictions, len(features))
-            except Exception as e:
-                results.add_error(filename, str(e), "DIAGNOSIS_FAILED")
 
-        return results
+def init_benchmark_worker(engine: str = "hybrid") -> None:
+    _WORKER_SUITE["suite"] = BenchmarkSuite(engine=engine)
+    _WORKER_SUITE["pipeline"] = FeaturePipeline()
+
+
+def evaluate_benchmark_log(filepath: str, _filename: str) -> dict:
+    if not _WORKER_SUITE:
+        init_benchmark_worker()
+    return _WORKER_SUITE["suite"].evaluate_file(filepath, _WORKER_SUITE["pipeline"])
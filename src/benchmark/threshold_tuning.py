@@ -0,0 +1,722 @@
+"""Fast threshold tuning over a cached feature matrix.
+
+Re-running ``BenchmarkSuite`` for every candidate threshold set re-parses every
+log. This module instead works from a feature cache (parsed once) and evaluates
+thousands of threshold configurations per second:
+
+- Rule checks are evaluated once per (log, threshold combination of the keys the
+  check actually reads) with the real rule functions. Any full configuration is
+  then a gather from those lookup tables, so rule verdicts stay exact.
+- ML label thresholds are applied to a cached probability matrix.
+- Hybrid fusion (merge weights, minimum merged confidence, label cap) is
+  evaluated as array operations over a batch of configurations.
+
+The tuning objective is a surrogate for ``HybridEngine.diagnose``: temporal
+arbitration, anomaly gating and the ML compass/vibration context filter are not
+modelled, so a chosen candidate should be confirmed with ``benchmark``.
+"""
+
+from __future__ import annotations
+
+import csv
+import itertools
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Sequence
+
+import numpy as np
+import yaml
+
+from src.constants import DEFAULT_THRESHOLDS, FEATURE_NAMES, VALID_LABELS
+from src.diagnosis.hybrid_engine import MAX_HYBRID_DIAGNOSES, MIN_MERGED_CONFIDENCE
+from src.diagnosis.ml_classifier import LABEL_PROB_THRESHOLDS, MAX_PREDICTED_LABELS, MLClassifier
+from src.diagnosis.rule_engine import RuleEngine
+from src.diagnosis.rules import (
+    check_compass,
+    check_ekf,
+    check_gps,
+    check_motors,
+    check_pid_tuning,
+    check_power,
+    check_system,
+    check_vibration,
+)
+from src.runtime_paths import MODELS_DIR
+
+
+FCR_TARGET = 0.10
+ML_THRESHOLD_GRID = [round(value, 2) for value in np.arange(0.30, 0.951, 0.05)]
+RULE_GRID_FACTORS = [0.5, 0.625, 0.75, 0.875, 1.0, 1.25, 1.5, 1.75, 2.0]
+
+# Threshold keys read by each tunable rule check. Checks not listed here do not
+# read thresholds and are evaluated once.
+RULE_THRESHOLD_KEYS: dict[Callable, tuple[str, ...]] = {
+    check_vibration: ("vibe_max_warn", "vibe_max_fail"),
+    check_pid_tuning: ("vibe_max_warn",),
+    check_compass: ("mag_range_limit", "mag_std_limit"),
+    check_power: ("bat_volt_range_limit", "powr_vcc_min", "volt_min_absolute"),
+    check_gps: ("gps_hdop_limit", "gps_nsats_min"),
+    check_motors: ("motor_spread_limit", "spread_mean_limit"),
+    check_ekf: ("ekf_variance_fail",),
+    check_system: ("long_loops_limit", "cpu_load_limit"),
+}
+
+# Section layout of models/rule_thresholds.yaml, used when writing candidates.
+THRESHOLD_SECTIONS = {
+    "vibration": ["vibe_max_warn", "vibe_max_fail", "vibe_clip_limit"],
+    "compass": ["mag_range_limit", "mag_std_limit"],
+    "power": ["bat_volt_range_limit", "volt_min_absolute", "powr_vcc_min"],
+    "gps": ["gps_hdop_limit", "gps_nsats_min"],
+    "motors": ["motor_spread_limit", "spread_mean_limit"],
+    "ekf": ["ekf_variance_warn", "ekf_variance_fail"],
+    "system": ["long_loops_limit", "cpu_load_limit"],
+}
+INTEGER_THRESHOLDS = {"gps_nsats_min", "long_loops_limit", "cpu_load_limit", "vibe_clip_limit"}
+
+
+# ---------------------------------------------------------------------------
+# Feature cache
+# ---------------------------------------------------------------------------
+
+@dataclass
+class FeatureCache:
+    """Feature matrix plus multi-hot ground truth for a labeled dataset."""
+
+    filenames: list[str]
+    columns: list[str]
+    features: np.ndarray
+    labels: np.ndarray
+    vehicle_types: list[str] = field(default_factory=list)
+    ml_label_columns: list[str] = field(default_factory=list)
+    ml_probabilities: np.ndarray | None = None
+
+    def __post_init__(self) -> None:
+        if not self.vehicle_types:
+            self.vehicle_types = ["Unknown"] * len(self.filenames)
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def row_features(self, index: int) -> dict[str, Any]:
+        row = {name: float(value) for name, value in zip(self.columns, self.features[index])}
+        row["_metadata"] = {"vehicle_type": self.vehicle_types[index]}
+        return row
+
+    def save(self, path: str) -> None:
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        arrays: dict[str, Any] = {
+            "filenames": np.array(self.filenames),
+            "columns": np.array(self.columns),
+            "features": self.features,
+            "labels": self.labels,
+            "vehicle_types": np.array(self.vehicle_types),
+            "ml_label_columns": np.array(self.ml_label_columns),
+        }
+        if self.ml_probabilities is not None:
+            arrays["ml_probabilities"] = self.ml_probabilities
+        with open(path, "wb") as file_obj:
+            np.savez_compressed(file_obj, **arrays)
+
+
+def build_feature_cache(
+    dataset_dir: str,
+    ground_truth_path: str,
+    include_non_trainable: bool = False,
+    ml_classifier: MLClassifier | None = None,
+) -> FeatureCache:
+    """Parse and extract every benchmark log once, mirroring ``BenchmarkSuite``."""
+    from src.features.pipeline import FeaturePipeline
+    from src.parser.bin_parser import LogParser
+
+    with open(ground_truth_path, "r") as file_obj:
+        logs = json.load(file_obj).get("logs", [])
+
+    pipeline = FeaturePipeline()
+    filenames: list[str] = []
+    vehicle_types: list[str] = []
+    feature_dicts: list[dict[str, Any]] = []
+    label_rows: list[list[str]] = []
+
+    for log_entry in logs:
+        if not include_non_trainable and log_entry.get("trainable") is False:
+            continue
+        filepath = os.path.join(dataset_dir, log_entry["filename"])
+        if not os.path.exists(filepath):
+            continue
+        try:
+            parsed = LogParser(filepath).parse()
+            if not parsed.get("messages"):
+                continue
+            features = pipeline.extract(parsed)
+        except Exception:
+            continue
+        metadata = features.get("_metadata", {})
+        if not metadata.get("extraction_success", True):
+            continue
+
+        filenames.append(log_entry["filename"])
+        vehicle_types.append(str(metadata.get("vehicle_type", "Unknown")))
+        feature_dicts.append(features)
+        label_rows.append(list(log_entry.get("labels", [])))
+
+    columns = list(FEATURE_NAMES)
+    for features in feature_dicts:
+        for key, value in features.items():
+            is_hidden_numeric = key.startswith("_") and isinstance(value, (int, float))
+            if is_hidden_numeric and key not in columns:
+                columns.append(key)
+
+    matrix = np.zeros((len(feature_dicts), len(columns)), dtype=float)
+    for row, features in enumerate(feature_dicts):
+        for col, name in enumerate(columns):
+            value = features.get(name, 0.0)
+            if isinstance(value, (int, float)):
+                matrix[row, col] = float(value)
+
+    cache = FeatureCache(
+        filenames=filenames,
+        columns=columns,
+        features=matrix,
+        labels=_multi_hot(label_rows),
+        vehicle_types=vehicle_types,
+    )
+    attach_ml_probabilities(cache, ml_classifier)
+    return cache
+
+
+def load_feature_cache(
+    path: str,
+    labels_path: str | None = None,
+    ml_classifier: MLClassifier | None = None,
+) -> FeatureCache:
+    """Load a ``.npz`` cache, or a ``training/features.csv`` + ``labels.csv`` pair."""
+    if path.endswith(".npz"):
+        with np.load(path, allow_pickle=False) as data:
+            probabilities = data["ml_probabilities"] if "ml_probabilities" in data else None
+            return FeatureCache(
+                filenames=[str(name) for name in data["filenames"]],
+                columns=[str(name) for name in data["columns"]],
+                features=np.asarray(data["features"], dtype=float),
+                labels=np.asarray(data["labels"], dtype=bool),
+                vehicle_types=[str(name) for name in data["vehicle_types"]],
+                ml_label_columns=[str(name) for name in data["ml_label_columns"]],
+                ml_probabilities=probabilities,
+            )
+
+    if not labels_path:
+        raise ValueError("A labels CSV is required when loading features from CSV.")
+
+    with open(path, "r", newline="") as file_obj:
+        reader = csv.reader(file_obj)
+        columns = next(reader)
+        feature_rows = [[float(value or 0.0) for value in row] for row in reader]
+    with open(labels_path, "r", newline="") as file_obj:
+        reader = csv.reader(file_obj)
+        label_header = next(reader)
+        label_rows = [
+            [label for label, flag in zip(label_header, row) if flag.strip() in ("1", "1.0")]
+            for row in reader
+        ]
+
+    cache = FeatureCache(
+        filenames=[f"row_{index:05d}" for index in range(len(feature_rows))],
+        columns=columns,
+        features=np.array(feature_rows, dtype=float).reshape(len(feature_rows), len(columns)),
+        labels=_multi_hot(label_rows),
+    )
+    attach_ml_probabilities(cache, ml_classifier)
+    return cache
+
+
+def attach_ml_probabilities(cache: FeatureCache, ml_classifier: MLClassifier | None = None) -> None:
+    """Run the classifier once over the whole cache and store label probabilities."""
+    ml = ml_classifier or MLClassifier()
+    if not ml.available or len(cache) == 0:
+        return
+    column_index = {name: index for index, name in enumerate(cache.columns)}
+    X = np.zeros((len(cache), len(ml.feature_columns)), dtype=float)
+    for col, name in enumerate(ml.feature_columns):
+        if name in column_index:
+            X[:, col] = cache.features[:, column_index[name]]
+    cache.ml_probabilities = ml.label_probabilities(X)
+    cache.ml_label_columns = list(ml.label_columns)
+
+
+def _multi_hot(label_rows: Sequence[Iterable[str]]) -> np.ndarray:
+    label_index = {label: index for index, label in enumerate(VALID_LABELS)}
+    labels = np.zeros((len(label_rows), len(VALID_LABELS)), dtype=bool)
+    for row, row_labels in enumerate(label_rows):
+        for label in row_labels:
+            if label in label_index:
+                labels[row, label_index[label]] = True
+    return labels
+
+
+# ---------------------------------------------------------------------------
+# Search space
+# ---------------------------------------------------------------------------
+
+def load_base_thresholds(config_path: str | None = None) -> dict[str, float]:
+    """Flattened rule thresholds as ``RuleEngine`` would load them."""
+    path = config_path or str(MODELS_DIR / "rule_thresholds.yaml")
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    thresholds.setdefault("long_loops_limit", 50)
+    thresholds.setdefault("cpu_load_limit", 80)
+    if os.path.exists(path):
+        thresholds.update(RuleEngine(config_path=path).thresholds)
+    return thresholds
+
+
+def default_search_space(
+    base_thresholds: dict[str, float],
+    ml_labels: Sequence[str] = (),
+    rule_keys: Sequence[str] | None = None,
+) -> dict[str, list[float]]:
+    """Candidate values per key: scaled rule thresholds plus an ML probability grid.
+
+    ML keys are prefixed with ``ml:`` to keep them apart from rule threshold keys.
+    """
+    tunable = sorted({key for keys in RULE_THRESHOLD_KEYS.values() for key in keys})
+    space: dict[str, list[float]] = {}
+    for key in rule_keys if rule_keys is not None else tunable:
+        base = float(base_thresholds.get(key, DEFAULT_THRESHOLDS.get(key, 0.0)))
+        values = {base * factor for factor in RULE_GRID_FACTORS}
+        if key in INTEGER_THRESHOLDS:
+            values = {float(round(value)) for value in values}
+        values.add(base)
+        space[key] = sorted(values)
+    for label in ml_labels:
+        base = float(LABEL_PROB_THRESHOLDS.get(label, 0.55))
+        space[f"ml:{label}"] = sorted(set(ML_THRESHOLD_GRID) | {base})
+    return space
+
+
+# ---------------------------------------------------------------------------
+# Evaluation engine
+# ---------------------------------------------------------------------------
+
+class ThresholdEvaluator:
+    """Evaluates batches of threshold configurations against a ``FeatureCache``."""
+
+    def __init__(
+        self,
+        cache: FeatureCache,
+        search_space: dict[str, list[float]],
+        base_thresholds: dict[str, float] | None = None,
+        engine: str = "hybrid",
+    ):
+        self.cache = cache
+        self.engine = engine
+        self.base_thresholds = dict(base_thresholds or load_base_thresholds())
+        self.keys = list(search_space)
+        self.values = [np.asarray(search_space[key], dtype=float) for key in self.keys]
+        self.label_index = {label: index for index, label in enumerate(VALID_LABELS)}
+        self.healthy = cache.labels[:, self.label_index["healthy"]]
+
+        self._rule_tables = self._build_rule_tables()
+        self._ml_columns = self._ml_column_map()
+
+    def _build_rule_tables(self) -> list[tuple[list[int], np.ndarray, np.ndarray, np.ndarray]]:
+        engine = RuleEngine(thresholds=self.base_thresholds)
+        key_position = {key: index for index, key in enumerate(self.keys)}
+        rows = [self.cache.row_features(index) for index in range(len(self.cache))]
+        active = [set(engine._checks_for_vehicle(vt)) for vt in self.cache.vehicle_types]
+
+        tables = []
+        for check in engine.checks:
+            tuned = [key for key in RULE_THRESHOLD_KEYS.get(check, ()) if key in key_position]
+            positions = [key_position[key] for key in tuned]
+            grids = [self.values[pos] for pos in positions]
+            combos = list(itertools.product(*grids)) if grids else [()]
+
+            label_ids = np.full((len(combos), len(rows)), -1, dtype=np.int16)
+            confidence = np.zeros((len(combos), len(rows)), dtype=float)
+            critical = np.zeros((len(combos), len(rows)), dtype=bool)
+            for combo_index, combo in enumerate(combos):
+                thresholds = dict(self.base_thresholds)
+                thresholds.update(zip(tuned, combo))
+                for row_index, row in enumerate(rows):
+                    if check not in active[row_index]:
+                        continue
+                    result = check(row, thresholds)
+                    if not result or result["confidence"] <= 0:
+                        continue
+                    label = result["failure_type"]
+                    if label not in self.label_index:
+                        continue
+                    label_ids[combo_index, row_index] = self.label_index[label]
+                    confidence[combo_index, row_index] = float(result["confidence"])
+                    critical[combo_index, row_index] = result.get("severity") == "critical"
+            tables.append((positions, label_ids, confidence, critical))
+        return tables
+
+    def _ml_column_map(self) -> list[tuple[int, int, int]]:
+        """(config key position, probability column, VALID_LABELS index) per ML key."""
+        if self.cache.ml_probabilities is None:
+            return []
+        mapping = []
+        for position, key in enumerate(self.keys):
+            if not key.startswith("ml:"):
+                continue
+            label = key[3:]
+            if label in self.cache.ml_label_columns and label in self.label_index:
+                mapping.append(
+                    (position, self.cache.ml_label_columns.index(label), self.label_index[label])
+                )
+        return mapping
+
+    def default_indices(self) -> np.ndarray:
+        """Index of the current (base) value of every key."""
+        indices = []
+        for key, values in zip(self.keys, self.values):
+            if key.startswith("ml:"):
+                base = LABEL_PROB_THRESHOLDS.get(key[3:], 0.55)
+            else:
+                base = self.base_thresholds.get(key, values[0])
+            indices.append(int(np.argmin(np.abs(values - float(base)))))
+        return np.array(indices, dtype=int)
+
+    def config_from_indices(self, indices: Sequence[int]) -> dict[str, float]:
+        return {key: float(values[i]) for key, values, i in zip(self.keys, self.values, indices)}
+
+    def _rule_scores(self, configs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        n_configs, n_rows, n_labels = len(configs), len(self.cache), len(VALID_LABELS)
+        rule_conf = np.full((n_configs, n_rows, n_labels), np.inf)
+        rule_critical = np.zeros((n_configs, n_rows), dtype=bool)
+        label_range = np.arange(n_labels)
+
+        for positions, label_ids, confidence, critical in self._rule_tables:
+            combo = np.zeros(n_configs, dtype=int)
+            for position in positions:
+                combo = combo * len(self.values[position]) + configs[:, position]
+            ids = label_ids[combo]
+            hits = ids[:, :, None] == label_range
+            # RuleEngine output is keyed by failure type downstream; the last entry
+            # in confidence order (the lowest confidence) wins for duplicates.
+            rule_conf = np.minimum(rule_conf, np.where(hits, confidence[combo][:, :, None], np.inf))
+            rule_critical |= critical[combo]
+
+        rule_conf[np.isinf(rule_conf)] = 0.0
+        return rule_conf, rule_critical
+
+    def _ml_scores(self, configs: np.ndarray) -> np.ndarray:
+        n_configs, n_rows, n_labels = len(configs), len(self.cache), len(VALID_LABELS)
+        ml_conf = np.zeros((n_configs, n_rows, n_labels))
+        probabilities = self.cache.ml_probabilities
+        if probabilities is None or not self._ml_columns:
+            return ml_conf
+
+        for position, column, label in self._ml_columns:
+            threshold = self.values[position][configs[:, position]][:, None]
+            prob = probabilities[None, :, column]
+            ml_conf[:, :, label] = np.where(prob >= threshold, prob, 0.0)
+        return _keep_top_k(ml_conf, MAX_PREDICTED_LABELS)
+
+    def evaluate(self, configs: np.ndarray) -> dict[str, np.ndarray]:
+        """Score a (n_configs, n_keys) array of value indices.
+
+        Returns per-config ``macro_f1``, ``false_critical_rate`` and
+        ``any_match_accuracy`` arrays.
+        """
+        configs = np.atleast_2d(np.asarray(configs, dtype=int))
+        rule_conf, rule_critical = self._rule_scores(configs)
+
+        if self.engine == "rule":
+            predicted = rule_conf > 0
+            critical = rule_critical
+        else:
+            ml_conf = self._ml_scores(configs)
+            merged = np.where(
+                (rule_conf > 0) & (ml_conf > 0),
+                0.65 * ml_conf + 0.35 * rule_conf,
+                np.where(ml_conf > 0, 0.85 * ml_conf, 0.85 * rule_conf),
+            )
+            merged = np.where(merged >= MIN_MERGED_CONFIDENCE, merged, 0.0)
+            merged = _keep_top_k(merged, MAX_HYBRID_DIAGNOSES)
+            predicted = merged > 0
+            critical = (merged > 0.6).any(axis=2)
+
+        return self._metrics(predicted, critical)
+
+    def _metrics(self, predicted: np.ndarray, critical: np.ndarray) -> dict[str, np.ndarray]:
+        truth = self.cache.labels[None, :, :]
+        tp = (predicted & truth).sum(axis=1)
+        fp = (predicted & ~truth).sum(axis=1)
+        fn = (~predicted & truth).sum(axis=1)
+        support = truth.sum(axis=1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+            recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+            f1 = np.where(
+                precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0
+            )
+        active = (support > 0) | (fp > 0)
+        macro_f1 = (f1 * active).sum(axis=1) / np.maximum(active.sum(axis=1), 1)
+
+        n_healthy = int(self.healthy.sum())
+        if n_healthy:
+            fcr = (critical & self.healthy[None, :]).sum(axis=1) / n_healthy
+        else:
+            fcr = np.zeros(len(predicted))
+
+        any_match = (predicted & truth).any(axis=2).sum(axis=1) / max(len(self.cache), 1)
+        return {
+            "macro_f1": macro_f1.astype(float),
+            "false_critical_rate": fcr.astype(float),
+            "any_match_accuracy": any_match.astype(float),
+        }
+
+
+def _keep_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    if scores.shape[-1] <= k:
+        return scores
+    kth = -np.sort(-scores, axis=-1)[..., k - 1 : k]
+    return np.where(scores >= kth, scores, 0.0)
+
+
+# ---------------------------------------------------------------------------
+# Search strategies
+# ---------------------------------------------------------------------------
+
+@dataclass
+class TuningResult:
+    evaluator: ThresholdEvaluator
+    configs: np.ndarray
+    metrics: dict[str, np.ndarray]
+    best_index: int | None
+    baseline: dict[str, float]
+    max_fcr: float
+    search: str
+
+    @property
+    def best_config(self) -> dict[str, float] | None:
+        if self.best_index is None:
+            return None
+        return self.evaluator.config_from_indices(self.configs[self.best_index])
+
+    def pareto_indices(self) -> list[int]:
+        """Configs not dominated on (higher macro F1, lower false-critical rate)."""
+        f1 = self.metrics["macro_f1"]
+        fcr = self.metrics["false_critical_rate"]
+        order = np.lexsort((-f1, fcr))
+        front: list[int] = []
+        best_f1 = -np.inf
+        for index in order:
+            if f1[index] > best_f1:
+                front.append(int(index))
+                best_f1 = f1[index]
+        return front
+
+
+def _select_best(metrics: dict[str, np.ndarray], max_fcr: float) -> int | None:
+    feasible = metrics["false_critical_rate"] <= max_fcr + 1e-12
+    if not feasible.any():
+        return None
+    score = np.where(feasible, metrics["macro_f1"], -np.inf)
+    return int(np.argmax(score))
+
+
+def _evaluate_in_batches(
+    evaluator: ThresholdEvaluator, configs: np.ndarray, batch_size: int
+) -> dict[str, np.ndarray]:
+    chunks = [
+        evaluator.evaluate(configs[start : start + batch_size])
+        for start in range(0, len(configs), batch_size)
+    ]
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+
+def tune_thresholds(
+    evaluator: ThresholdEvaluator,
+    search: str = "coordinate",
+    max_fcr: float = FCR_TARGET,
+    samples: int = 2000,
+    max_rounds: int = 5,
+    max_grid: int = 200_000,
+    batch_size: int = 64,
+    seed: int = 0,
+) -> TuningResult:
+    """Search threshold configurations, maximising macro F1 subject to ``max_fcr``."""
+    default = evaluator.default_indices()
+    sizes = np.array([len(values) for values in evaluator.values], dtype=int)
+
+    if search == "grid":
+        total = int(np.prod(sizes)) if len(sizes) else 1
+        if total > max_grid:
+            raise ValueError(
+                f"Grid has {total} configurations (limit {max_grid}); "
+                "narrow the search space or use random/coordinate search."
+            )
+        configs = np.array(list(itertools.product(*(range(size) for size in sizes))), dtype=int)
+        configs = configs.reshape(-1, len(sizes))
+        metrics = _evaluate_in_batches(evaluator, configs, batch_size)
+    elif search == "random":
+        rng = np.random.default_rng(seed)
+        configs = np.vstack([default, rng.integers(0, sizes, size=(samples, len(sizes)))])
+        metrics = _evaluate_in_batches(evaluator, configs, batch_size)
+    elif search == "coordinate":
+        configs, metrics = _coordinate_descent(evaluator, default, sizes, max_fcr, max_rounds)
+    else:
+        raise ValueError(f"Unknown search strategy: {search}")
+
+    baseline_metrics = evaluator.evaluate(default[None, :])
+    return TuningResult(
+        evaluator=evaluator,
+        configs=configs,
+        metrics=metrics,
+        best_index=_select_best(metrics, max_fcr),
+        baseline={key: float(value[0]) for key, value in baseline_metrics.items()},
+        max_fcr=max_fcr,
+        search=search,
+    )
+
+
+def _coordinate_descent(
+    evaluator: ThresholdEvaluator,
+    start: np.ndarray,
+    sizes: np.ndarray,
+    max_fcr: float,
+    max_rounds: int,
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    seen_configs = [start[None, :]]
+    seen_metrics = [evaluator.evaluate(start[None, :])]
+    current = start.copy()
+
+    def objective(metrics: dict[str, np.ndarray]) -> np.ndarray:
+        feasible = metrics["false_critical_rate"] <= max_fcr + 1e-12
+        # Infeasible points are ranked by how far they are over the FCR budget so
+        # the search can walk back into the feasible region.
+        return np.where(feasible, metrics["macro_f1"], -1.0 - metrics["false_critical_rate"])
+
+    current_score = float(objective(seen_metrics[0])[0])
+    for _ in range(max_rounds):
+        improved = False
+        for position, size in enumerate(sizes):
+            candidates = np.repeat(current[None, :], size, axis=0)
+            candidates[:, position] = np.arange(size)
+            metrics = evaluator.evaluate(candidates)
+            seen_configs.append(candidates)
+            seen_metrics.append(metrics)
+
+            scores = objective(metrics)
+            best = int(np.argmax(scores))
+            if scores[best] > current_score + 1e-12:
+                current = candidates[best].copy()
+                current_score = float(scores[best])
+                improved = True
+        if not improved:
+            break
+
+    configs = np.vstack(seen_configs)
+    metrics = {key: np.concatenate([m[key] for m in seen_metrics]) for key in seen_metrics[0]}
+    return configs, metrics
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def candidate_thresholds_yaml(result: TuningResult) -> str:
+    """Render the best config in the section layout of ``rule_thresholds.yaml``."""
+    thresholds = dict(result.evaluator.base_thresholds)
+    for key, value in (result.best_config or {}).items():
+        if not key.startswith("ml:"):
+            thresholds[key] = value
+
+    document: dict[str, dict[str, float | int]] = {}
+    for section, keys in THRESHOLD_SECTIONS.items():
+        entries: dict[str, float | int] = {}
+        for key in keys:
+            if key not in thresholds:
+                continue
+            value = thresholds[key]
+            entries[key] = int(round(value)) if key in INTEGER_THRESHOLDS else float(value)
+        if entries:
+            document[section] = entries
+    return yaml.safe_dump(document, sort_keys=False)
+
+
+def tuning_report(result: TuningResult, top_n: int = 20) -> dict[str, Any]:
+    evaluator = result.evaluator
+    pareto = []
+    for index in result.pareto_indices()[:top_n]:
+        pareto.append(
+            {
+                "macro_f1": round(float(result.metrics["macro_f1"][index]), 4),
+                "false_critical_rate": round(
+                    float(result.metrics["false_critical_rate"][index]), 4
+                ),
+                "any_match_accuracy": round(float(result.metrics["any_match_accuracy"][index]), 4),
+                "config": evaluator.config_from_indices(result.configs[index]),
+            }
+        )
+
+    best = None
+    if result.best_index is not None:
+        best = {
+            key: round(float(values[result.best_index]), 4)
+            for key, values in result.metrics.items()
+        }
+    ml_thresholds = {
+        key[3:]: value for key, value in (result.best_config or {}).items() if key.startswith("ml:")
+    }
+    return {
+        "engine": evaluator.engine,
+        "search": result.search,
+        "n_logs": len(evaluator.cache),
+        "n_healthy": int(evaluator.healthy.sum()),
+        "configs_evaluated": int(len(result.configs)),
+        "max_false_critical_rate": result.max_fcr,
+        "baseline": {key: round(value, 4) for key, value in result.baseline.items()},
+        "baseline_config": evaluator.config_from_indices(evaluator.default_indices()),
+        "best": best,
+        "best_config": result.best_config,
+        "ml_label_thresholds": ml_thresholds,
+        "pareto_front": pareto,
+    }
+
+
+def tuning_report_markdown(report: dict[str, Any]) -> str:
+    lines = [
+        "# Threshold Tuning Report",
+        "",
+        f"- Engine: {report['engine']}",
+        f"- Search: {report['search']}",
+        f"- Logs: {report['n_logs']} ({report['n_healthy']} healthy)",
+        f"- Configurations evaluated: {report['configs_evaluated']}",
+        f"- Max false-critical rate: {report['max_false_critical_rate']:.2f}",
+        f"- Baseline: macro F1 {report['baseline']['macro_f1']:.3f}, "
+        f"FCR {report['baseline']['false_critical_rate']:.3f}",
+    ]
+    if report["best"]:
+        lines.append(
+            f"- Best feasible: macro F1 {report['best']['macro_f1']:.3f}, "
+            f"FCR {report['best']['false_critical_rate']:.3f}"
+        )
+    else:
+        lines.append("- Best feasible: none (no configuration met the FCR constraint)")
+
+    lines.extend(
+        [
+            "",
+            "## Pareto Front (macro F1 vs. false-critical rate)",
+            "| Macro F1 | FCR | Any-Match | Changed thresholds |",
+            "|---|---|---|---|",
+        ]
+    )
+    baseline_config = report.get("baseline_config", {})
+    for point in report["pareto_front"]:
+        changed = ", ".join(
+            f"{key}={value:g}"
+            for key, value in point["config"].items()
+            if baseline_config.get(key) != value
+        )
+        lines.append(
+            f"| {point['macro_f1']:.3f} | {point['false_critical_rate']:.3f} "
+            f"| {point['any_match_accuracy']:.3f} | {changed or '-'} |"
+        )
+    return "\n".join(lines) + "\n"
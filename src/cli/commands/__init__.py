@@ -1,14 +1,35 @@
-from . import analyze, batch, benchmark, collect_forum, demo, features, import_clean, label, mine_expert_labels, ui
+from . import (
+    analyze,
+    batch,
+    benchmark,
+    collect_forum,
+    demo,
+    features,
+    import_clean,
+    label,
+    load_test,
+    mine_expert_labels,
+    queue_worker,
+    serve,
+    tune_thresholds,
+    ui,
+    watch,
+)
 
 COMMAND_MODULES = [
     analyze,
     features,
     benchmark,
+    load_test,
     batch,
+    watch,
+    queue_worker,
     label,
     demo,
     import_clean,
     collect_forum,
     mine_expert_labels,
+    tune_thresholds,
+    serve,
     ui,
 ]
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import sys
 from argparse import _SubParsersAction
-from typing import Any, cast
+from typing import TYPE_CHECKING, Any, Optional, cast
 
+from src.diagnosis.context import DiagnosisContext
 from src.diagnosis.decision_policy import evaluate_decision
 from src.diagnosis.hybrid_engine import HybridEngine
 from src.diagnosis.parameter_validation import validate_parameters
 from src.diagnosis.rule_engine import RuleEngine
+from src.diagnosis.segmentation import FlightSegmentAnalyzer
+from src.diagnosis.timeline import WINDOW_OVERLAP, WINDOW_SEC, DiagnosisTimeline
+from src.diagnosis.triage import run_triage
+from src.parser.bin_parser import TRIAGE_SAMPLE_EVERY, LogParser
 from src.retrieval.similarity import FailureRetrieval
 from src.cli.formatter import DiagnosisFormatter
+from src.cli.server import SERVER_MODES
 
 from .common import (
     ensure_extraction_success,
@@ -17,6 +24,9 @@ from .common import (
     write_or_print_output,
 )
 
+if TYPE_CHECKING:
+    from src.cli.server import WarmAnalyzer
+
 
 def register(subparsers: _SubParsersAction) -> None:
     parser = subparsers.add_parser("analyze", help="Analyze a single log file")
@@ -31,33 +41,158 @@ def register(subparsers: _SubParsersAction) -> None:
     parser.add_argument("-o", "--output", help="Save report to file")
     parser.add_argument("--explain", action="store_true", help="Show Hybrid Engine Arbitration Breakdown")
     parser.add_argument("--no-ml", action="store_true", help="Force rule-based only diagnosis")
+    parser.add_argument(
+        "--timeline",
+        action="store_true",
+        help="Score overlapping windows and report per-label onset times",
+    )
+    parser.add_argument(
+        "--window-sec", type=float, default=WINDOW_SEC, help="Timeline window length"
+    )
+    parser.add_argument(
+        "--window-overlap", type=float, default=WINDOW_OVERLAP, help="Timeline window overlap (0-1)"
+    )
+    parser.add_argument(
+        "--segments",
+        action="store_true",
+        help="Split the log into arm-to-disarm flights, skip ground time and diagnose each flight",
+    )
+    parser.add_argument(
+        "--triage",
+        action="store_true",
+        help="Print a preliminary rule verdict from a partial decode before the full analysis",
+    )
+    parser.add_argument(
+        "--triage-sample-every",
+        type=int,
+        default=TRIAGE_SAMPLE_EVERY,
+        help="Decode every Nth message of high-rate families during triage",
+    )
+    parser.add_argument(
+        "--server",
+        choices=SERVER_MODES,
+        default="auto",
+        help="Use a running `serve` daemon: auto (if reachable), on (required) or off",
+    )
+    parser.add_argument(
+        "--socket", help="Analysis server socket path (default: per-user runtime dir)"
+    )
     parser.set_defaults(func=run)
 
 
-def run(args) -> None:
-    parsed, features = load_parsed_and_features(args.logfile)
-    ensure_extraction_success(args.logfile, features)
+def _print_triage(triage: dict[str, Any]) -> None:
+    decision = triage["decision"]
+    verdict = decision["top_guess"] or "healthy"
+    print(
+        f"[TRIAGE] preliminary (partial): {verdict} "
+        f"({decision['top_confidence'] * 100:.0f}%, {decision['status']}) · "
+        f"{triage['decoded_messages']}/{triage['total_messages']} messages decoded "
+        f"in {triage['elapsed_sec']:.2f}s · full analysis running...",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def run(args, warm: Optional[WarmAnalyzer] = None) -> None:
+    """Analyze one log; ``warm`` carries the analysis server's long-lived components."""
+    triage = None
+    if getattr(args, "triage", False):
+        if warm is not None:
+            triage = run_triage(
+                args.logfile,
+                args.triage_sample_every,
+                pipeline=warm.pipeline,
+                engine=warm.rule_engine,
+            )
+        else:
+            triage = run_triage(args.logfile, sample_every=args.triage_sample_every)
+        _print_triage(triage)
+
+    if warm is not None:
+        engine = warm.rule_engine if args.no_ml else warm.hybrid_engine
+        window_engine = warm.hybrid_engine
+    else:
+        engine = RuleEngine() if args.no_ml else HybridEngine()
+        # --no-ml never loads the classifier or anomaly detector, not even for windows.
+        window_engine = HybridEngine.rule_only(engine) if args.no_ml else engine
+
+    segmentation = None
+    if getattr(args, "segments", False):
+        # Ground idle is cut before extraction; the rest of the report runs
+        # on the in-flight union of the segments.
+        if warm is not None:
+            parsed = warm.load(args.logfile)[0]
+        else:
+            parsed = LogParser(args.logfile).parse()
+        segmentation = FlightSegmentAnalyzer(
+            engine=cast(HybridEngine, window_engine),
+            pipeline=warm.pipeline if warm is not None else None,
+            use_ml=not args.no_ml,
+        ).analyze(parsed)
+        parsed = segmentation.pop("parsed")
+        features = segmentation.pop("features")
+        context = segmentation.pop("context")
+        ensure_extraction_success(args.logfile, features)
+    else:
+        if warm is not None:
+            parsed, features = warm.load(args.logfile)
+        else:
+            parsed, features = load_parsed_and_features(args.logfile)
+        ensure_extraction_success(args.logfile, features)
+        context = DiagnosisContext(features, parsed)
 
-    engine = RuleEngine() if args.no_ml else HybridEngine()
-    diagnoses = engine.diagnose(features)
+    timeline = None
+    if getattr(args, "timeline", False):
+        timeline = DiagnosisTimeline(
+            engine=cast(HybridEngine, window_engine),
+            window_sec=args.window_sec,
+            overlap=args.window_overlap,
+            use_ml=not args.no_ml,
+        ).analyze(parsed, context=context)
+    if args.no_ml:
+        diagnoses = context.rule_results(engine)
+    else:
+        diagnoses = cast(HybridEngine, engine).diagnose(features, context=context)
     decision = evaluate_decision(diagnoses)
     parameter_warnings = validate_parameters(
         parsed.get("parameters", {}),
         features,
-        features.get("_metadata", {}).get("vehicle_type", "Unknown"),
+        context.vehicle_type,
     )
 
-    retrieval = FailureRetrieval()
-    similar_cases = retrieval.find_similar(features)
+    retrieval = warm.retrieval if warm is not None else FailureRetrieval()
+    similar_cases = retrieval.find_similar(features, context=context)
 
     formatter = DiagnosisFormatter()
-    metadata = features.get("_metadata", {})
+    metadata = context.metadata
     runtime_info = {
         "engine": "rule" if args.no_ml else "hybrid",
         "ml_available": False if args.no_ml else getattr(getattr(engine, "ml", None), "available", False),
         "ml_reason": None if args.no_ml else getattr(getattr(engine, "ml", None), "unavailable_reason", "ml unavailable"),
     }
+    if triage is not None:
+        runtime_info["triage"] = {
+            "superseded": True,
+            "top_guess": triage["decision"]["top_guess"],
+            "top_confidence": triage["decision"]["top_confidence"],
+            "status": triage["decision"]["status"],
+            "agrees_with_full": triage["decision"]["top_guess"] == decision["top_guess"],
+            "sample_every": triage["sample_every"],
+            "decoded_messages": triage["decoded_messages"],
+            "elapsed_sec": triage["elapsed_sec"],
+        }
     explain_data = getattr(cast(object, engine), "last_explain_data", None)
+    if timeline is not None:
+        explain_data = dict(explain_data or {})
+        explain_data["timeline"] = timeline
+    if segmentation is not None:
+        explain_data = dict(explain_data or {})
+        explain_data["segments"] = {
+            "segments": segmentation["segments"],
+            "flight_sec": segmentation["flight_sec"],
+            "ground_sec": segmentation["ground_sec"],
+            "by_label": segmentation["aggregate"]["by_label"],
+        }
 
     if args.json or getattr(args, "format", "terminal") == "json":
         output = formatter.format_json(
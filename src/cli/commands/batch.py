@@ -1,16 +1,48 @@
 from __future__ import annotations
 
 import csv
+import itertools
+import json
 import os
+import sys
+import tempfile
+import time
 from argparse import _SubParsersAction
-from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
 
-from src.cli.formatter import DiagnosisFormatter
-from src.diagnosis.decision_policy import evaluate_decision
-from src.diagnosis.hybrid_engine import HybridEngine
-from src.diagnosis.rule_engine import RuleEngine
-from src.features.pipeline import FeaturePipeline
-from src.parser.bin_parser import LogParser
+from src import telemetry
+from src.batch.clustering import (
+    CLUSTER_METHODS,
+    DBSCAN_EPS,
+    TOP_CLUSTERS,
+    IncidentClusterer,
+    label_clusters,
+    model_scaler,
+)
+from src.batch.discovery import DEFAULT_INCLUDE, discover_logs, largest_first
+from src.batch.distributed import hashed_items, run_job
+from src.batch.manifest import MANIFEST_FILENAME, RunManifest, code_version, model_version
+from src.batch.metrics import RUN_REPORT_FILENAME, SLOWEST_N, RunMetrics
+from src.batch.pool import LogWorkerPool
+from src.batch.worker import (
+    SUMMARY_FIELDNAMES,
+    analyze_file,
+    error_row,
+    init_worker,
+    report_path as _report_path,
+)
+
+
+CSV_FIELDNAMES = SUMMARY_FIELDNAMES
+RESULTS_JSONL = "batch_results.jsonl"
+CLUSTERS_FILENAME = "batch_clusters.json"
+# Largest-first scheduling looks this many logs ahead per worker.
+SCHEDULE_LOOKAHEAD_PER_JOB = 16
+CLUSTER_EXAMPLES = 10
+PROGRESS_EVERY_SEC = 10.0
+# Per-log limit with --jobs > 1, so one hung log cannot hold back the ordered output.
+JOB_TIMEOUT_SEC = 600.0
+FILE_COLUMN_WIDTH = 32
 
 
 def register(subparsers: _SubParsersAction) -> None:
@@ -22,6 +54,100 @@ def register(subparsers: _SubParsersAction) -> None:
     parser.add_argument("directory", help="Directory containing .BIN files")
     parser.add_argument("--output-dir", "-o", default=None, help="Directory for per-log JSON reports and batch_summary.csv")
     parser.add_argument("--engine", choices=["rule", "hybrid"], default="hybrid", help="Diagnosis engine to use (default: hybrid)")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1, help="Worker processes (0 = all CPUs, default: 1)"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=JOB_TIMEOUT_SEC,
+        help=(
+            "Per-log timeout in seconds when --jobs > 1; 0 disables it "
+            f"(default: {JOB_TIMEOUT_SEC:g})"
+        ),
+    )
+    parser.add_argument(
+        "--manifest",
+        default=None,
+        help=f"Run manifest for resumable runs (default: <output-dir>/{MANIFEST_FILENAME})",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Reprocess every log, ignoring the manifest"
+    )
+    parser.add_argument(
+        "--recursive", "-r", action="store_true", help="Descend into subdirectories"
+    )
+    parser.add_argument(
+        "--include",
+        nargs="+",
+        default=list(DEFAULT_INCLUDE),
+        help="Glob patterns (relative path or basename, case-insensitive) to include",
+    )
+    parser.add_argument(
+        "--exclude", nargs="+", default=[], help="Glob patterns to skip (files or directories)"
+    )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=SLOWEST_N,
+        help=f"Slowest logs listed in the run report (default: {SLOWEST_N})",
+    )
+    parser.add_argument(
+        "--progress-every",
+        type=float,
+        default=PROGRESS_EVERY_SEC,
+        help=(
+            "Seconds between progress/ETA lines on stderr, 0 to disable "
+            f"(default: {PROGRESS_EVERY_SEC:g})"
+        ),
+    )
+    parser.add_argument(
+        "--count-first",
+        action="store_true",
+        help="Walk the tree once up front so progress lines show a total and ETA from the start",
+    )
+    parser.add_argument(
+        "--cluster-method",
+        choices=[*CLUSTER_METHODS, "label"],
+        default="kmeans",
+        help=(
+            "Incident clustering: feature-space mini-batch k-means, DBSCAN, "
+            "or plain top-label grouping"
+        ),
+    )
+    parser.add_argument(
+        "--clusters",
+        type=int,
+        default=None,
+        help="k for --cluster-method kmeans (default: sqrt(n/2))",
+    )
+    parser.add_argument(
+        "--cluster-eps",
+        type=float,
+        default=DBSCAN_EPS,
+        help=f"DBSCAN neighbourhood radius in scaled feature units (default: {DBSCAN_EPS:g})",
+    )
+    parser.add_argument(
+        "--queue",
+        default=None,
+        help="Shared SQLite work queue for multi-host runs; other hosts join with `queue-worker`",
+    )
+    parser.add_argument(
+        "--job", default=None, help="Job name in --queue (default: the directory name)"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help=(
+            "Write stage histograms and counters in Prometheus text format "
+            "(node_exporter textfile)"
+        ),
+    )
+    parser.add_argument(
+        "--no-local-worker",
+        action="store_true",
+        help="With --queue, only publish and wait; leave all analysis to remote workers",
+    )
     parser.set_defaults(func=run)
 
 
@@ -35,103 +161,386 @@ def run(args) -> None:
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
 
-    pipeline = FeaturePipeline()
-    engine = HybridEngine() if getattr(args, "engine", "hybrid") != "rule" else RuleEngine()
+    engine_name = getattr(args, "engine", "hybrid")
+    jobs = getattr(args, "jobs", 1) or (os.cpu_count() or 1)
+    timeout = getattr(args, "timeout", JOB_TIMEOUT_SEC) or None
 
-    bin_files = sorted(filename for filename in os.listdir(directory) if filename.upper().endswith(".BIN"))
-    if not bin_files:
+    def discovered() -> Iterator[str]:
+        return discover_logs(
+            directory,
+            recursive=getattr(args, "recursive", False),
+            include=getattr(args, "include", None) or DEFAULT_INCLUDE,
+            exclude=getattr(args, "exclude", None) or (),
+        )
+
+    # One walk feeds the whole run; the total is known once it is exhausted,
+    # or up front with --count-first at the cost of a second walk.
+    walk = discovered()
+    first = next(walk, None)
+    if first is None:
         print(f"No .BIN files found in {directory}")
         if output_dir:
             csv_path = os.path.join(output_dir, "batch_summary.csv")
-            fieldnames = ["filename", "status", "top_diagnosis", "confidence", "severity", "requires_review"]
             with open(csv_path, "w", newline="") as csv_file:
-                csv.DictWriter(csv_file, fieldnames=fieldnames).writeheader()
+                csv.DictWriter(csv_file, fieldnames=CSV_FIELDNAMES).writeheader()
             print(f"Summary CSV  -> {csv_path} (header only — no logs found)")
         return
 
-    formatter = DiagnosisFormatter()
-    rows = []
-    healthy = fail = error = 0
+    def filenames() -> Iterator[str]:
+        count = 0
+        for filename in itertools.chain([first], walk):
+            count += 1
+            yield filename
+        metrics.total = count
+
+    queue_path = getattr(args, "queue", None)
+    manifest = None
+    manifest_path = getattr(args, "manifest", None) or (
+        os.path.join(output_dir, MANIFEST_FILENAME) if output_dir else None
+    )
+    if manifest_path and not queue_path:
+        manifest = RunManifest(manifest_path, code_version(), model_version(engine_name))
+    use_cache = manifest is not None and not getattr(args, "force", False)
+
+    def entries() -> Iterator[tuple[str, dict[str, Any] | None]]:
+        for filename in filenames():
+            cached = None
+            if use_cache:
+                assert manifest is not None
+                filepath = os.path.join(directory, filename)
+                report = _report_path(output_dir, filename) if output_dir else None
+                if manifest.is_current(filename, filepath, report):
+                    cached = manifest.row(filename)
+            yield filename, cached
+
+    def record(filename: str, row: dict[str, Any]) -> None:
+        assert manifest is not None
+        manifest.record(filename, os.path.join(directory, filename), row)
+
+    # Rows stream to JSONL/CSV as they complete; without --output-dir the JSONL
+    # is a temporary file that only feeds the cluster summary.
+    if output_dir:
+        jsonl_path = os.path.join(output_dir, RESULTS_JSONL)
+        csv_path: str | None = os.path.join(output_dir, "batch_summary.csv")
+    else:
+        fd, jsonl_path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        csv_path = None
 
-    col_w = max(len(filename) for filename in bin_files) + 2
-    header = f"{'File':<{col_w}} | {'Status':<9} | {'Top Diagnosis':<30} | Conf"
+    healthy = fail = error = skipped = total = 0
+    metrics_file = getattr(args, "metrics_file", None)
+    metrics = RunMetrics(
+        total=sum(1 for _ in discovered()) if getattr(args, "count_first", False) else None,
+        jobs=jobs,
+        slowest_n=getattr(args, "slowest", SLOWEST_N),
+        registry=telemetry.REGISTRY if metrics_file else None,
+    )
+    progress_every = getattr(args, "progress_every", PROGRESS_EVERY_SEC)
+    next_progress = time.monotonic() + progress_every
+    header = f"{'File':<{FILE_COLUMN_WIDTH}} | {'Status':<9} | {'Top Diagnosis':<30} | Conf"
     print(header)
     print("-" * len(header))
 
-    for filename in bin_files:
-        filepath = os.path.join(directory, filename)
-        try:
-            parsed = LogParser(filepath).parse()
-            features = pipeline.extract(parsed)
-            metadata = features.get("_metadata", {})
-            if not metadata.get("extraction_success", True):
-                raise ValueError("Extraction failed: empty or corrupt log")
-
-            diagnoses = engine.diagnose(features)
-            decision = evaluate_decision(diagnoses)
-
-            if not diagnoses:
-                status = "HEALTHY"
-                top_label = "-"
-                conf = 0.0
-                severity = "-"
-                healthy += 1
+    try:
+        with open(jsonl_path, "w", encoding="utf-8") as jsonl_file, (
+            open(csv_path, "w", newline="") if csv_path else open(os.devnull, "w")
+        ) as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDNAMES, extrasaction="ignore")
+            writer.writeheader()
+            if queue_path:
+                rows = _queue_rows(
+                    args, directory, filenames(), engine_name, output_dir, jobs, timeout
+                )
             else:
-                top = diagnoses[0]
-                top_label = top["failure_type"]
-                conf = top["confidence"]
-                severity = top["severity"]
-                status = "CRITICAL" if severity == "critical" else "WARNING"
-                fail += 1
-
-            rows.append(
-                {
-                    "filename": filename,
-                    "status": status,
-                    "top_diagnosis": top_label,
-                    "confidence": f"{conf:.2f}",
-                    "severity": severity,
-                    "requires_review": decision.get("requires_human_review", False),
-                }
-            )
-            conf_str = f"{conf:.0%}" if conf > 0 else "-"
-            print(f"{filename:<{col_w}} | {status:<9} | {top_label:<30} | {conf_str}")
+                on_complete = record if manifest is not None else None
+                rows = _iter_rows(
+                    directory, entries(), engine_name, output_dir, jobs, timeout, on_complete
+                )
+            for row, fresh in rows:
+                total += 1
+                metrics.observe(row, fresh)
+                if progress_every and time.monotonic() >= next_progress:
+                    print(metrics.progress_line(), file=sys.stderr, flush=True)
+                    next_progress = time.monotonic() + progress_every
+                filename = row["filename"]
+                if row["status"] == "ERROR":
+                    error += 1
+                elif row["status"] == "HEALTHY":
+                    healthy += 1
+                else:
+                    fail += 1
+
+                jsonl_file.write(json.dumps(row) + "\n")
+                jsonl_file.flush()
+                writer.writerow(row)
+                csv_file.flush()
 
+                if not fresh:
+                    skipped += 1
+                    continue
+                if row["status"] == "ERROR":
+                    error_text = str(row["error"])[:30]
+                    print(f"{filename:<{FILE_COLUMN_WIDTH}} | {'ERROR':<9} | {error_text:<30} | -")
+                    continue
+                conf = float(row["confidence"])
+                conf_str = f"{conf:.0%}" if conf > 0 else "-"
+                print(
+                    f"{filename:<{FILE_COLUMN_WIDTH}} | {row['status']:<9} | "
+                    f"{row['top_diagnosis']:<30} | {conf_str}"
+                )
+        if manifest is not None:
+            manifest.close()
+            if skipped:
+                print(f"({skipped} unchanged logs skipped — manifest: {manifest_path})")
+
+        print(f"\nSummary: {healthy} healthy · {fail} issues · {error} errors · {total} total")
+        report = (
+            metrics.write(os.path.join(output_dir, RUN_REPORT_FILENAME))
+            if output_dir
+            else metrics.report()
+        )
+        _print_run_metrics(report)
+        if metrics_file:
+            telemetry.REGISTRY.write_textfile(metrics_file)
+            print(f"Metrics      -> {metrics_file}")
+        cluster_method = getattr(args, "cluster_method", "kmeans")
+        clusters = None
+        if cluster_method != "label":
+            clusters = _feature_clusters(jsonl_path, args, cluster_method)
+        if clusters is not None:
+            _print_feature_clusters(clusters)
             if output_dir:
-                stem = Path(filename).stem
-                report_json = formatter.format_json(diagnoses, metadata, features, decision=decision)
-                json_path = os.path.join(output_dir, f"{stem}_report.json")
-                with open(json_path, "w") as json_file:
-                    json_file.write(report_json)
-        except Exception as exc:
-            error += 1
-            rows.append({"filename": filename, "status": "ERROR", "error": str(exc)})
-            print(f"{filename:<{col_w}} | {'ERROR':<9} | {str(exc)[:30]:<30} | -")
-
-    print(f"\nSummary: {healthy} healthy · {fail} issues · {error} errors · {len(bin_files)} total")
-
-    incident_rows = [row for row in rows if row.get("status") not in ("ERROR", "HEALTHY")]
-    if incident_rows:
-        clusters: dict[str, list[str]] = {}
-        for row in incident_rows:
-            label = row.get("top_diagnosis", "unknown")
-            clusters.setdefault(label, []).append(row["filename"])
-        print("\nDuplicate Incident Clusters:")
-        for label, files in sorted(clusters.items(), key=lambda item: -len(item[1])):
-            print(f"  [{len(files):>2}x] {label}")
-            for filename in files:
-                print(f"         · {filename}")
+                with open(
+                    os.path.join(output_dir, CLUSTERS_FILENAME), "w", encoding="utf-8"
+                ) as clusters_file:
+                    json.dump(clusters, clusters_file, indent=2)
+        else:
+            _print_incident_clusters(jsonl_path)
+    finally:
+        if not output_dir and os.path.exists(jsonl_path):
+            os.remove(jsonl_path)
 
     if output_dir:
-        csv_path = os.path.join(output_dir, "batch_summary.csv")
-        fieldnames = ["filename", "status", "top_diagnosis", "confidence", "severity", "requires_review"]
-        with open(csv_path, "w", newline="") as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=fieldnames, extrasaction="ignore")
-            writer.writeheader()
-            if rows:
-                writer.writerows(rows)
-        if rows:
-            print(f"Summary CSV  -> {csv_path}")
-            print(f"JSON reports -> {output_dir}/*.json")
+        print(f"Summary CSV  -> {csv_path}")
+        print(f"Results JSONL -> {jsonl_path}")
+        print(f"Run report   -> {os.path.join(output_dir, RUN_REPORT_FILENAME)}")
+        if os.path.exists(os.path.join(output_dir, CLUSTERS_FILENAME)):
+            print(f"Clusters     -> {os.path.join(output_dir, CLUSTERS_FILENAME)}")
+        print(f"JSON reports -> {output_dir}/*.json")
+
+
+def _print_run_metrics(report: dict[str, Any]) -> None:
+    if not report["logs"]["processed"]:
+        return
+    throughput = report["throughput"]
+    latency = report["latency_sec"]
+    line = (
+        f"Throughput: {throughput['logs_per_sec']:.2f} logs/s · "
+        f"{throughput['mb_per_sec']:.1f} MB/s over {report['wall_sec']:.1f}s"
+    )
+    if latency:
+        line += (
+            f" · latency p50 {latency['p50']:.2f}s / p95 {latency['p95']:.2f}s "
+            f"/ p99 {latency['p99']:.2f}s"
+        )
+    print(line)
+    shares = [
+        f"{stage} {timing['share']:.0%}"
+        for stage, timing in report["stage_sec"].items()
+        if timing["total"] > 0
+    ]
+    if shares:
+        print("Stage share: " + " · ".join(shares))
+    rss = report["peak_rss_mb"]
+    rss_parts = [f"{name} {value:.0f} MB" for name, value in rss.items() if value is not None]
+    if rss_parts:
+        print("Peak RSS: " + " · ".join(rss_parts))
+
+
+def _feature_clusters(jsonl_path: str, args, method: str) -> dict[str, Any] | None:
+    """Feature-space clusters, or None when fewer than two incidents carry feature vectors."""
+    clusterer = IncidentClusterer(
+        method=method,
+        n_clusters=getattr(args, "clusters", None),
+        eps=getattr(args, "cluster_eps", DBSCAN_EPS),
+        scaler=model_scaler(),
+    )
+    result = clusterer.fit(jsonl_path)
+    return result if result["n_incidents"] >= 2 else None
+
+
+def _print_feature_clusters(result: dict[str, Any]) -> None:
+    print(
+        f"\nDuplicate Incident Clusters ({result['method']} on "
+        f"{result['scaling']}-scaled features, {result['n_incidents']} incidents):"
+    )
+    for cluster in result["clusters"][:TOP_CLUSTERS]:
+        labels = ", ".join(f"{label} {count}" for label, count in cluster["labels"].items())
+        print(
+            f"  [{cluster['size']:>2}x] #{cluster['cluster']} "
+            f"{cluster['dominant_label']} ({labels})"
+        )
+        print(
+            f"         exemplar: {cluster['exemplar']} · "
+            f"mean distance {cluster['mean_distance']:.2f}"
+        )
+        for filename in cluster["members_sample"]:
+            if filename != cluster["exemplar"]:
+                print(f"         · {filename}")
+        if cluster["size"] > len(cluster["members_sample"]):
+            print(f"         · … and {cluster['size'] - len(cluster['members_sample'])} more")
+    if result.get("noise"):
+        print(f"  ({result['noise']} incidents not in any dense cluster)")
+    if len(result["clusters"]) > TOP_CLUSTERS:
+        print(
+            f"  ({len(result['clusters']) - TOP_CLUSTERS} smaller clusters in {CLUSTERS_FILENAME})"
+        )
+
+
+def _print_incident_clusters(jsonl_path: str) -> None:
+    """Group incidents by top diagnosis, reading the streamed JSONL back line by line."""
+    groups = label_clusters(jsonl_path, CLUSTER_EXAMPLES)
+    if not groups:
+        return
+    print("\nDuplicate Incident Clusters:")
+    for group in groups:
+        print(f"  [{group['size']:>2}x] {group['label']}")
+        for filename in group["members_sample"]:
+            print(f"         · {filename}")
+        if group["size"] > len(group["members_sample"]):
+            print(f"         · … and {group['size'] - len(group['members_sample'])} more")
+
+
+def _queue_rows(
+    args,
+    directory: str,
+    filenames: Iterable[str],
+    engine_name: str,
+    output_dir: str | None,
+    jobs: int,
+    timeout: float | None,
+) -> Iterator[tuple[dict[str, Any], bool]]:
+    """Publish logs to the shared queue, help process them, then yield stored rows."""
+    job = getattr(args, "job", None) or os.path.basename(os.path.abspath(directory))
+    items = hashed_items(directory, filenames)
+    config = {
+        "engine": engine_name,
+        "output_dir": os.path.abspath(output_dir) if output_dir else None,
+    }
+
+    def _progress(counts: dict[str, int]) -> None:
+        print(
+            f"  waiting on remote workers: {counts['queued']} queued · {counts['leased']} leased",
+            flush=True,
+        )
+
+    queue = run_job(
+        args.queue,
+        job,
+        "batch",
+        directory,
+        config,
+        items,
+        jobs=jobs,
+        timeout=timeout,
+        local_worker=not getattr(args, "no_local_worker", False),
+        on_progress=_progress,
+    )
+    try:
+        for filename, state, row, last_error in queue.results(job):
+            if state == "done" and row is not None:
+                yield row, True
+            else:
+                yield error_row(filename, f"quarantined: {last_error}"), True
+    finally:
+        queue.close()
+
+
+def _iter_rows(
+    directory: str,
+    entries: Iterable[tuple[str, dict[str, Any] | None]],
+    engine_name: str,
+    output_dir: str | None,
+    jobs: int,
+    timeout: float | None,
+    on_complete: Callable[[str, dict[str, Any]], None] | None = None,
+) -> Iterator[tuple[dict[str, Any], bool]]:
+    """Yield ``(row, fresh)`` per entry in input order.
+
+    ``entries`` pairs each filename with a cached row (or None to analyse it).
+    With ``jobs > 1`` logs are dispatched largest-first within a bounded
+    lookahead window to a pool of warm workers, and rows are released as soon
+    as every earlier entry is done, so memory stays bounded.
+    ``on_complete(filename, row)`` runs for each fresh row as soon as it is
+    finished, before it waits on earlier entries, so the manifest keeps
+    every completed log even if the run is interrupted.
+    """
+    if jobs <= 1:
+        init_worker(engine_name, output_dir)
+        for filename, cached in entries:
+            if cached is not None:
+                yield cached, False
+                continue
+            started = time.perf_counter()
+            try:
+                row = analyze_file(os.path.join(directory, filename), filename)
+            except Exception as exc:
+                filepath = os.path.join(directory, filename)
+                row = _failed_row(filepath, filename, str(exc), time.perf_counter() - started)
+            if on_complete is not None:
+                on_complete(filename, row)
+            yield row, True
+        return
+
+    done: dict[int, tuple[dict[str, Any], bool]] = {}
+    order_of: dict[str, int] = {}
+    next_index = 0
+
+    def tasks() -> Iterator[tuple[str, str]]:
+        for index, (filename, cached) in enumerate(entries):
+            if cached is not None:
+                done[index] = (cached, False)
+                continue
+            order_of[filename] = index
+            yield os.path.join(directory, filename), filename
+
+    pool = LogWorkerPool(
+        jobs,
+        analyze_file,
+        initializer=init_worker,
+        initargs=(engine_name, output_dir),
+        timeout=timeout,
+    )
+    scheduled = largest_first(
+        tasks(), lambda task: _file_size(task[0]), SCHEDULE_LOOKAHEAD_PER_JOB * jobs
+    )
+    for outcome in pool.run(scheduled):
+        filename = outcome.task[1]
+        if outcome.ok:
+            row = outcome.value
         else:
-            print(f"Summary CSV  -> {csv_path} (header only — no logs processed)")
+            row = _failed_row(outcome.task[0], filename, outcome.error, outcome.elapsed_sec)
+        if on_complete is not None:
+            on_complete(filename, row)
+        done[order_of.pop(filename)] = (row, True)
+        while next_index in done:
+            yield done.pop(next_index)
+            next_index += 1
+    while next_index in done:
+        yield done.pop(next_index)
+        next_index += 1
+
+
+def _failed_row(filepath: str, filename: str, message: str, elapsed_sec: float) -> dict[str, Any]:
+    """ERROR row that still carries size and wall time for the run report."""
+    row = error_row(filename, message)
+    row["size_bytes"] = _file_size(filepath)
+    row["elapsed_sec"] = round(elapsed_sec, 4)
+    return row
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import os
 import sys
 from argparse import _SubParsersAction
 from pathlib import Path
 
+from src.batch.distributed import hashed_items, run_job
 from src.benchmark.reporter import BenchmarkReporter
+from src.benchmark.results import BenchmarkResults
 from src.benchmark.suite import BenchmarkSuite
 
 from .common import find_latest_clean_benchmark
@@ -24,6 +27,22 @@ def register(subparsers: _SubParsersAction) -> None:
         metavar="THRESHOLD",
         help="Fail with exit code 1 if overall macro F1 is below this threshold.",
     )
+    parser.add_argument(
+        "--queue",
+        default=None,
+        help="Shared SQLite work queue for multi-host runs (see `queue-worker`)",
+    )
+    parser.add_argument(
+        "--job", default=None, help="Job name in --queue (default: benchmark-<engine>)"
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1, help="Local worker processes with --queue (default: 1)"
+    )
+    parser.add_argument(
+        "--no-local-worker",
+        action="store_true",
+        help="With --queue, only publish and wait; leave all evaluation to remote workers",
+    )
     parser.set_defaults(func=run)
 
 
@@ -47,7 +66,10 @@ def run(args) -> None:
         engine=args.engine,
         include_non_trainable=args.include_non_trainable,
     )
-    results = suite.run()
+    if getattr(args, "queue", None):
+        results = _run_distributed(args, suite)
+    else:
+        results = suite.run()
 
     reporter = BenchmarkReporter()
     reporter.print_terminal(results)
@@ -64,3 +86,38 @@ def run(args) -> None:
             print(f"\nMacro F1 {macro_f1:.3f} is below required minimum {args.assert_min_f1:.2f}.")
             sys.exit(1)
         print(f"\nMacro F1 {macro_f1:.3f} meets the minimum requirement {args.assert_min_f1:.2f}.")
+
+
+def _run_distributed(args, suite: BenchmarkSuite) -> BenchmarkResults:
+    if not os.path.exists(suite.ground_truth_path):
+        print(f"Error: {suite.ground_truth_path} not found.")
+        return BenchmarkResults()
+
+    entries = suite.entries()
+    job = args.job or f"benchmark-{args.engine}"
+
+    queue = run_job(
+        args.queue,
+        job,
+        "benchmark",
+        suite.dataset_dir,
+        {"engine": args.engine},
+        # Missing files are still queued; the worker records "File not found".
+        hashed_items(suite.dataset_dir, (log_entry["filename"] for log_entry in entries)),
+        jobs=args.jobs or (os.cpu_count() or 1),
+        local_worker=not args.no_local_worker,
+        on_progress=lambda c: print(
+            f"  waiting on remote workers: {c['queued']} queued · {c['leased']} leased"
+        ),
+    )
+    with queue:
+        evaluations = {}
+        for filename, state, evaluation, last_error in queue.results(job):
+            if state == "done" and evaluation is not None:
+                evaluations[filename] = evaluation
+            else:
+                evaluations[filename] = {
+                    "error": f"quarantined: {last_error}",
+                    "type": "EXTRACTION_FAILED",
+                }
+    return suite.collect(entries, evaluations)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+from argparse import _SubParsersAction
+from pathlib import Path
+
+from src.benchmark import load_test
+from src.benchmark.load_test import (
+    MAX_ERROR_RATE_INCREASE,
+    MAX_REGRESSION_PCT,
+    RssSampler,
+    ServerProcess,
+)
+
+
+def register(subparsers: _SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "load-test", help="Replay .BIN uploads against the web API and record latency"
+    )
+    parser.add_argument("logs", nargs="*", help=".BIN files or directories to replay")
+    parser.add_argument(
+        "--synthetic-mb",
+        type=float,
+        action="append",
+        default=[],
+        metavar="MB",
+        help=(
+            "Also replay a generated log of this size; repeat for several "
+            "(e.g. --synthetic-mb 50 --synthetic-mb 200)"
+        ),
+    )
+    parser.add_argument(
+        "--requests", type=int, default=20, help="Uploads to send in total (default: 20)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Requests in flight at most (default: 4)"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help=(
+            "Open-loop Poisson arrivals per second; omit for closed-loop clients "
+            "sending back to back"
+        ),
+    )
+    parser.add_argument(
+        "--endpoint",
+        choices=["analyze", "stream"],
+        default="analyze",
+        help="Multipart /api/analyze or raw-body /api/analyze/stream (default: analyze)",
+    )
+    parser.add_argument(
+        "--url", default=None, help="Test a running server instead of starting `ui` locally"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="`ui --workers` for the local server (default: 1)"
+    )
+    parser.add_argument(
+        "--result-cache",
+        action="store_true",
+        help="Keep the local server's result cache on (repeated uploads are then cache hits)",
+    )
+    parser.add_argument(
+        "--output-prefix",
+        default="load_test_results",
+        help="Output filename prefix (without extension)",
+    )
+    parser.add_argument(
+        "--compare",
+        default=None,
+        metavar="BASELINE_JSON",
+        help="Flag regressions against an earlier run",
+    )
+    parser.add_argument(
+        "--max-regression-pct",
+        type=float,
+        default=MAX_REGRESSION_PCT,
+        help=(
+            "Latency, throughput or RSS change counted as a regression "
+            f"(default: {MAX_REGRESSION_PCT:g}%%)"
+        ),
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed for synthetic logs and arrivals (default: 0)"
+    )
+    parser.set_defaults(func=run)
+
+
+def run(args) -> None:
+    try:
+        logs = load_test.collect_logs(args.logs)
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(1)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix="load_test_") as synthetic_dir:
+        for index, size_mb in enumerate(args.synthetic_mb):
+            path = Path(synthetic_dir) / f"synthetic_{size_mb:g}MB.BIN"
+            print(f"Generating {path.name}...")
+            logs.append(load_test.synthetic_log(path, size_mb, seed=args.seed + index))
+        if not logs:
+            print("No logs to replay: pass .BIN files/directories or --synthetic-mb.")
+            sys.exit(1)
+
+        config = {
+            "logs": len(logs),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "rate": args.rate if args.rate else "closed-loop",
+            "endpoint": args.endpoint,
+            "server": args.url or f"local ui --workers {args.workers}",
+            "result_cache": bool(args.result_cache) if not args.url else "server default",
+        }
+        pacing = f"rate {args.rate:g}/s" if args.rate else "closed-loop"
+        print(
+            f"Replaying {len(logs)} logs: {args.requests} requests, "
+            f"concurrency {args.concurrency}, {pacing}"
+        )
+        if args.url:
+            result = load_test.run_load(
+                logs, args.url, args.requests, args.concurrency, args.rate, args.endpoint, args.seed
+            )
+            summary = load_test.summarize(result, config=config)
+        else:
+            # Only /api/analyze is replayed, and ui needs the job API off to pre-fork.
+            ui_args = ["--workers", str(args.workers), "--memory-report-sec", "0", "--no-job-api"]
+            try:
+                with ServerProcess(ui_args=ui_args, result_cache=args.result_cache) as server:
+                    assert server.process is not None
+                    with RssSampler(server.process.pid) as sampler:
+                        result = load_test.run_load(
+                            logs,
+                            server.url,
+                            args.requests,
+                            args.concurrency,
+                            args.rate,
+                            args.endpoint,
+                            args.seed,
+                        )
+            except RuntimeError as e:
+                print(f"Could not start the web server: {e}")
+                sys.exit(1)
+            summary = load_test.summarize(result, sampler.samples, config=config)
+
+    comparison = None
+    if baseline is not None:
+        comparison = load_test.compare(
+            baseline, summary, args.max_regression_pct, MAX_ERROR_RATE_INCREASE
+        )
+    json_path, md_path = load_test.save(summary, args.output_prefix, comparison)
+    print()
+    print(load_test.to_markdown(summary, comparison))
+    print(f"Saved {md_path} and {json_path}")
+
+    regressions = [row["metric"] for row in comparison or [] if row["regression"]]
+    if regressions:
+        print(f"\nRegressions against {args.compare}: {', '.join(regressions)}")
+        sys.exit(1)
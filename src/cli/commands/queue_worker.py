@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+import sys
+from argparse import _SubParsersAction
+
+from src.batch.distributed import HEARTBEAT_SEC, LEASE_SEC, MAX_ATTEMPTS, LeaseQueue, QueueWorker
+
+
+def register(subparsers: _SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "queue-worker",
+        help="Join a shared batch/benchmark work queue and process leased logs",
+    )
+    parser.add_argument(
+        "queue", help="Shared SQLite work queue (as passed to --queue by the coordinator)"
+    )
+    parser.add_argument(
+        "--job", default=None, help="Only work on this job (default: every job in the queue)"
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Local worker processes (0 = all CPUs, default: 1)",
+    )
+    parser.add_argument("--timeout", type=float, default=None, help="Per-log timeout in seconds")
+    parser.add_argument(
+        "--root", default=None, help="Local mount point of the job's log directory, if it differs"
+    )
+    parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="Keep polling --job for work instead of exiting when drained (requires --job)",
+    )
+    parser.add_argument(
+        "--lease-sec", type=float, default=LEASE_SEC, help=f"Lease length (default: {LEASE_SEC:g}s)"
+    )
+    parser.add_argument(
+        "--heartbeat-sec",
+        type=float,
+        default=HEARTBEAT_SEC,
+        help=f"Lease heartbeat interval (default: {HEARTBEAT_SEC:g}s)",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=MAX_ATTEMPTS,
+        help=f"Attempts before a log is quarantined as poison (default: {MAX_ATTEMPTS})",
+    )
+    parser.set_defaults(func=run)
+
+
+def run(args) -> None:
+    if args.wait and not args.job:
+        # Jobs are worked one after another, so waiting on the first would starve the rest.
+        print("--wait needs --job: without it, jobs are worked in turn and exit once drained.")
+        sys.exit(2)
+    if not os.path.exists(args.queue):
+        print(f"Queue {args.queue} not found.")
+        return
+    with LeaseQueue(args.queue) as queue:
+        job_names = [args.job] if args.job else queue.jobs()
+    if not job_names:
+        print(f"No jobs in {args.queue}")
+        return
+
+    for job in job_names:
+        worker = QueueWorker(
+            args.queue,
+            job,
+            jobs=args.jobs or (os.cpu_count() or 1),
+            timeout=args.timeout,
+            root=args.root,
+            heartbeat_sec=args.heartbeat_sec,
+            lease_sec=args.lease_sec,
+            max_attempts=args.max_attempts,
+        )
+        print(f"[{worker.worker_id}] working on job {job!r}")
+        try:
+            worker.run(wait=args.wait)
+        except KeyboardInterrupt:
+            print("Interrupted — unfinished leases handed back to the queue.")
+            return
+        print(
+            f"[{worker.worker_id}] {job}: {worker.completed} completed · "
+            f"{worker.failed} failed attempts"
+        )
+        if worker.mismatch:
+            print(
+                f"[{worker.worker_id}] stopped working on {job!r}: {worker.mismatch}; "
+                "update this host and rejoin."
+            )
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+from argparse import _SubParsersAction
+
+from src.cli.server import PARSE_CACHE_SIZE, AnalysisServer, default_socket_path, request
+
+
+def register(subparsers: _SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "serve",
+        help="Run a local analysis server that keeps engines warm for `analyze --server auto`",
+    )
+    parser.add_argument(
+        "--socket", default=None, help="Unix socket path (default: per-user runtime dir)"
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=0.0,
+        help="Exit after this many idle seconds (default: never)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=PARSE_CACHE_SIZE,
+        help=f"Parsed logs kept warm (default: {PARSE_CACHE_SIZE})",
+    )
+    parser.add_argument(
+        "--status", action="store_true", help="Print the running server's status and exit"
+    )
+    parser.add_argument("--stop", action="store_true", help="Ask the running server to shut down")
+    parser.set_defaults(func=run)
+
+
+def run(args) -> None:
+    socket_path = args.socket or default_socket_path()
+    if args.status or args.stop:
+        try:
+            response = request({"op": "shutdown" if args.stop else "status"}, socket_path)
+        except (OSError, ValueError):
+            print(f"No analysis server running at {socket_path}")
+            raise SystemExit(1)
+        print(json.dumps(response, indent=2))
+        return
+
+    try:
+        server = AnalysisServer(
+            socket_path, idle_timeout=args.idle_timeout, cache_size=args.cache_size
+        )
+    except RuntimeError as e:
+        print(e)
+        raise SystemExit(1)
+    print(
+        f"Analysis server listening on {server.socket_path} (pid {server.status()['pid']})",
+        flush=True,
+    )
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    print("Analysis server stopped.")
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from argparse import _SubParsersAction
+
+from src.benchmark.threshold_tuning import (
+    FCR_TARGET,
+    ThresholdEvaluator,
+    build_feature_cache,
+    candidate_thresholds_yaml,
+    default_search_space,
+    load_base_thresholds,
+    load_feature_cache,
+    tune_thresholds,
+    tuning_report,
+    tuning_report_markdown,
+)
+
+from .common import find_latest_clean_benchmark
+
+
+def register(subparsers: _SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "tune-thresholds",
+        help="Search rule/ML thresholds over a cached feature matrix",
+    )
+    parser.add_argument(
+        "--cache",
+        default="training/feature_cache.npz",
+        help="Feature cache (.npz) or features CSV (with --labels-csv)",
+    )
+    parser.add_argument("--labels-csv", default=None, help="Labels CSV paired with a features CSV")
+    parser.add_argument(
+        "--build-cache",
+        action="store_true",
+        help="Parse --dataset-dir/--ground-truth once and write --cache before tuning",
+    )
+    parser.add_argument("--dataset-dir", default="dataset/", help="Benchmark .BIN directory")
+    parser.add_argument(
+        "--ground-truth", default="ground_truth.json", help="Ground truth JSON path"
+    )
+    parser.add_argument(
+        "--include-non-trainable",
+        action="store_true",
+        help="Include entries marked trainable=false",
+    )
+    parser.add_argument(
+        "--thresholds", default=None, help="Base rule_thresholds.yaml (default: models/)"
+    )
+    parser.add_argument(
+        "--engine", choices=["rule", "hybrid"], default="hybrid", help="Fusion to optimise"
+    )
+    parser.add_argument("--search", choices=["grid", "random", "coordinate"], default="coordinate")
+    parser.add_argument(
+        "--keys", nargs="+", default=None, help="Restrict rule threshold keys to tune"
+    )
+    parser.add_argument(
+        "--no-ml-thresholds", action="store_true", help="Keep ML label thresholds fixed"
+    )
+    parser.add_argument(
+        "--max-fcr", type=float, default=FCR_TARGET, help="Maximum false-critical rate"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=2000, help="Configurations for random search"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random search seed")
+    parser.add_argument(
+        "--output-prefix", default="threshold_tuning", help="Prefix for .md/.json/.yaml outputs"
+    )
+    parser.set_defaults(func=run)
+
+
+def run(args) -> None:
+    if args.build_cache:
+        dataset_dir, ground_truth = args.dataset_dir, args.ground_truth
+        if args.dataset_dir == "dataset/" and args.ground_truth == "ground_truth.json":
+            fallback_dataset, fallback_gt = find_latest_clean_benchmark()
+            if fallback_dataset and fallback_gt:
+                dataset_dir, ground_truth = fallback_dataset, fallback_gt
+                print(f"Using latest clean-import benchmark set: {ground_truth}")
+        cache = build_feature_cache(dataset_dir, ground_truth, args.include_non_trainable)
+        cache.save(args.cache)
+        print(f"Feature cache ({len(cache)} logs) -> {args.cache}")
+    else:
+        try:
+            cache = load_feature_cache(args.cache, args.labels_csv)
+        except (OSError, ValueError) as exc:
+            print(f"[ERROR] Could not load feature cache {args.cache}: {exc}")
+            print(
+                "Build one with: tune-thresholds --build-cache --dataset-dir ... --ground-truth ..."
+            )
+            sys.exit(2)
+
+    if len(cache) == 0:
+        print("[ERROR] Feature cache is empty; nothing to tune.")
+        sys.exit(2)
+
+    base_thresholds = load_base_thresholds(args.thresholds)
+    ml_labels = [] if args.no_ml_thresholds or args.engine == "rule" else cache.ml_label_columns
+    space = default_search_space(base_thresholds, ml_labels, args.keys)
+
+    started = time.perf_counter()
+    evaluator = ThresholdEvaluator(cache, space, base_thresholds, engine=args.engine)
+    precompute_sec = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = tune_thresholds(
+        evaluator,
+        search=args.search,
+        max_fcr=args.max_fcr,
+        samples=args.samples,
+        seed=args.seed,
+    )
+    search_sec = time.perf_counter() - started
+
+    report = tuning_report(result)
+    report["timing"] = {
+        "precompute_sec": round(precompute_sec, 3),
+        "search_sec": round(search_sec, 3),
+        "configs_per_sec": round(len(result.configs) / max(search_sec, 1e-9), 1),
+    }
+
+    md_path = f"{args.output_prefix}.md"
+    json_path = f"{args.output_prefix}.json"
+    yaml_path = f"{args.output_prefix}_candidate.yaml"
+    with open(md_path, "w", encoding="utf-8") as file_obj:
+        file_obj.write(tuning_report_markdown(report))
+    with open(json_path, "w", encoding="utf-8") as file_obj:
+        json.dump(report, file_obj, indent=2)
+
+    print(
+        f"Evaluated {len(result.configs)} configurations on {len(cache)} logs "
+        f"in {search_sec:.2f}s ({report['timing']['configs_per_sec']:.0f}/s)"
+    )
+    print(
+        f"Baseline: macro F1 {report['baseline']['macro_f1']:.3f}, "
+        f"FCR {report['baseline']['false_critical_rate']:.3f}"
+    )
+    if report["best"] is None:
+        print(f"No configuration met FCR <= {args.max_fcr:.2f}; no candidate YAML written.")
+    else:
+        with open(yaml_path, "w", encoding="utf-8") as file_obj:
+            file_obj.write(candidate_thresholds_yaml(result))
+        print(
+            f"Best:     macro F1 {report['best']['macro_f1']:.3f}, "
+            f"FCR {report['best']['false_critical_rate']:.3f}"
+        )
+        print(f"Candidate thresholds -> {yaml_path}")
+    print(f"Saved {md_path} and {json_path}")
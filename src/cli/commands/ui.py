@@ -1,9 +1,131 @@
 import argparse
+import os
+
+from src.web.jobs import BATCH_CONCURRENCY, BATCH_LIMIT, JOB_QUEUE_LIMIT, JOB_TTL_SEC, JOB_WORKERS
+from src.web.model_store import RELOAD_POLL_SEC
+from src.web.prefork import MAX_REQUESTS, MAX_REQUESTS_JITTER, MEMORY_REPORT_SEC
+from src.web.result_cache import CACHE_DIR, CACHE_TTL_SEC, DISK_MAX_MB, MEMORY_ENTRIES
 
 
 def register(subparsers: argparse._SubParsersAction) -> None:
     parser = subparsers.add_parser("ui", help="Launch the interactive Web Dashboard")
     parser.add_argument("--port", type=int, default=8000, help="Port to run the web server on")
+    parser.add_argument(
+        "--host", default="127.0.0.1", help="Interface to bind (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Pre-forked server processes sharing the models loaded in the parent; "
+            "1 runs a single process (default: 1). Job and batch state lives in the worker "
+            "that accepted it, so more than one worker requires --no-job-api"
+        ),
+    )
+    parser.add_argument(
+        "--no-job-api",
+        action="store_true",
+        help="Disable /api/jobs, /api/analyze-batch and /api/batches; /api/analyze still works",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=MAX_REQUESTS,
+        help=f"Requests before a pre-forked worker is recycled; 0 never (default: {MAX_REQUESTS})",
+    )
+    parser.add_argument(
+        "--max-requests-jitter",
+        type=int,
+        default=MAX_REQUESTS_JITTER,
+        help=(
+            "Random extra requests per worker, so recycling is staggered "
+            f"(default: {MAX_REQUESTS_JITTER})"
+        ),
+    )
+    parser.add_argument(
+        "--max-worker-rss-mb",
+        type=float,
+        default=0.0,
+        help="RSS in MB past which a pre-forked worker is recycled; 0 never (default: 0)",
+    )
+    parser.add_argument(
+        "--memory-report-sec",
+        type=float,
+        default=MEMORY_REPORT_SEC,
+        help=(
+            "Seconds between per-worker memory reports; 0 disables them "
+            f"(default: {MEMORY_REPORT_SEC:g})"
+        ),
+    )
+    parser.add_argument(
+        "--job-workers",
+        type=int,
+        default=JOB_WORKERS,
+        help=f"Processes for /api/jobs analyses (default: {JOB_WORKERS})",
+    )
+    parser.add_argument(
+        "--job-queue",
+        type=int,
+        default=JOB_QUEUE_LIMIT,
+        help=f"Queued jobs before /api/jobs answers 429 (default: {JOB_QUEUE_LIMIT})",
+    )
+    parser.add_argument(
+        "--job-ttl",
+        type=float,
+        default=JOB_TTL_SEC,
+        help=f"Seconds finished job results are kept (default: {JOB_TTL_SEC:g})",
+    )
+    parser.add_argument(
+        "--job-batch-concurrency",
+        type=int,
+        default=BATCH_CONCURRENCY,
+        help=(
+            "Members of one /api/analyze-batch upload analysed at once "
+            f"(default: {BATCH_CONCURRENCY})"
+        ),
+    )
+    parser.add_argument(
+        "--job-batch-limit",
+        type=int,
+        default=BATCH_LIMIT,
+        help=f"Unfinished batches before /api/analyze-batch answers 429 (default: {BATCH_LIMIT})",
+    )
+    parser.add_argument(
+        "--result-cache-dir",
+        default=str(CACHE_DIR),
+        help=(
+            "Disk tier of the /api/analyze result cache; empty string disables it "
+            "(default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--result-cache-entries",
+        type=int,
+        default=MEMORY_ENTRIES,
+        help=f"Results kept in memory; 0 disables the memory tier (default: {MEMORY_ENTRIES})",
+    )
+    parser.add_argument(
+        "--result-cache-mb",
+        type=float,
+        default=DISK_MAX_MB,
+        help=f"Disk tier size cap in MB (default: {DISK_MAX_MB:g})",
+    )
+    parser.add_argument(
+        "--result-cache-ttl",
+        type=float,
+        default=CACHE_TTL_SEC,
+        help=f"Seconds a cached result stays valid (default: {CACHE_TTL_SEC:g})",
+    )
+    parser.add_argument(
+        "--model-reload-sec",
+        type=float,
+        default=RELOAD_POLL_SEC,
+        help=(
+            "Seconds between checks of models/ for new thresholds or models; "
+            f"0 disables hot reload (default: {RELOAD_POLL_SEC:g})"
+        ),
+    )
     parser.set_defaults(func=run)
 
 
@@ -15,6 +137,14 @@ def run(args: argparse.Namespace) -> None:
     except AttributeError:
         pass
 
+    if args.workers > 1 and not args.no_job_api:
+        print(
+            "[ERROR] --workers > 1 needs --no-job-api: jobs and batches live in the worker that "
+            "accepted them, so other workers would answer 404 and recycling would drop them.",
+            file=sys.stderr,
+        )
+        raise SystemExit(2)
+
     try:
         import uvicorn
     except ImportError:
@@ -22,6 +152,43 @@ def run(args: argparse.Namespace) -> None:
         print("Install them with: pip install -e .[web]")
         raise SystemExit(1)
 
+    os.environ["ARDUPILOT_JOB_API"] = "0" if args.no_job_api else "1"
+    os.environ["ARDUPILOT_JOB_WORKERS"] = str(args.job_workers)
+    os.environ["ARDUPILOT_JOB_QUEUE_LIMIT"] = str(args.job_queue)
+    os.environ["ARDUPILOT_JOB_TTL_SEC"] = str(args.job_ttl)
+    os.environ["ARDUPILOT_JOB_BATCH_CONCURRENCY"] = str(args.job_batch_concurrency)
+    os.environ["ARDUPILOT_JOB_BATCH_LIMIT"] = str(args.job_batch_limit)
+    os.environ["ARDUPILOT_RESULT_CACHE_DIR"] = args.result_cache_dir
+    os.environ["ARDUPILOT_RESULT_CACHE_ENTRIES"] = str(args.result_cache_entries)
+    os.environ["ARDUPILOT_RESULT_CACHE_MB"] = str(args.result_cache_mb)
+    os.environ["ARDUPILOT_RESULT_CACHE_TTL_SEC"] = str(args.result_cache_ttl)
+    os.environ["ARDUPILOT_MODEL_RELOAD_SEC"] = str(args.model_reload_sec)
+
     print("\nLaunching ArduPilot Log Diagnosis Dashboard...")
     print(f"Open your browser at: http://localhost:{args.port}\n")
-    uvicorn.run("src.web.app:app", host="127.0.0.1", port=args.port, reload=False)
+    if args.workers <= 1:
+        uvicorn.run("src.web.app:app", host=args.host, port=args.port, reload=False)
+        return
+
+    import logging
+
+    from src.web.prefork import PreforkServer
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [prefork] %(message)s")
+
+    def preload() -> None:
+        from src.web.app import preload as preload_app
+
+        preload_app()
+
+    PreforkServer(
+        "src.web.app:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        preload=preload,
+        max_requests=args.max_requests,
+        max_requests_jitter=args.max_requests_jitter,
+        max_rss_mb=args.max_worker_rss_mb,
+        memory_report_sec=args.memory_report_sec,
+    ).run()
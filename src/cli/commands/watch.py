@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+from argparse import _SubParsersAction
+
+from src.batch.discovery import DEFAULT_INCLUDE
+from src.batch.watch import POLL_INTERVAL_SEC, QUEUE_FILENAME, SETTLE_SEC, FolderWatcher
+
+
+def register(subparsers: _SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "watch",
+        help="Watch a drop folder and diagnose new .BIN logs as soon as uploads finish",
+    )
+    parser.add_argument("directory", help="Drop folder to watch")
+    parser.add_argument(
+        "--output-dir", "-o", required=True, help="Directory for reports, CSV/JSONL and queue state"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["rule", "hybrid"],
+        default="hybrid",
+        help="Diagnosis engine to use (default: hybrid)",
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1, help="Worker processes (0 = all CPUs, default: 1)"
+    )
+    parser.add_argument("--timeout", type=float, default=None, help="Per-log timeout in seconds")
+    parser.add_argument("--recursive", "-r", action="store_true", help="Watch subdirectories too")
+    parser.add_argument(
+        "--include", nargs="+", default=list(DEFAULT_INCLUDE), help="Glob patterns to include"
+    )
+    parser.add_argument("--exclude", nargs="+", default=[], help="Glob patterns to skip")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=POLL_INTERVAL_SEC,
+        help=f"Poll interval in seconds (default: {POLL_INTERVAL_SEC:g})",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=SETTLE_SEC,
+        help=f"Seconds a file's size must hold before it is queued (default: {SETTLE_SEC:g})",
+    )
+    parser.add_argument(
+        "--queue", default=None, help=f"Queue database (default: <output-dir>/{QUEUE_FILENAME})"
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Stop after this many seconds (default: run forever)",
+    )
+    parser.set_defaults(func=run)
+
+
+def _print_row(row: dict) -> None:
+    if row["status"] == "ERROR":
+        print(f"{row['filename']:<32} | {'ERROR':<9} | {str(row['error'])[:30]:<30} | -")
+        return
+    conf = float(row["confidence"])
+    conf_str = f"{conf:.0%}" if conf > 0 else "-"
+    print(
+        f"{row['filename']:<32} | {row['status']:<9} | {row['top_diagnosis']:<30} | "
+        f"{conf_str:>4} | {row['latency_sec']:.1f}s"
+    )
+
+
+def run(args) -> None:
+    if not os.path.isdir(args.directory):
+        print(f"Directory {args.directory} not found.")
+        return
+
+    watcher = FolderWatcher(
+        args.directory,
+        args.output_dir,
+        engine_name=args.engine,
+        jobs=args.jobs or (os.cpu_count() or 1),
+        timeout=args.timeout,
+        recursive=args.recursive,
+        include=args.include,
+        exclude=args.exclude,
+        poll_interval=args.interval,
+        settle_sec=args.settle,
+        queue_path=args.queue,
+        on_row=_print_row,
+    )
+    print(
+        f"Watching {args.directory} (settle {args.settle:g}s, {watcher.pool.jobs} workers) "
+        "— Ctrl+C to stop"
+    )
+    header = f"{'File':<32} | {'Status':<9} | {'Top Diagnosis':<30} | Conf | Latency"
+    print(header)
+    print("-" * len(header))
+    try:
+        watcher.run(max_seconds=args.max_seconds)
+    except KeyboardInterrupt:
+        pass
+    stats = watcher.final_stats
+    latency = stats["latency_sec"].get("p50")
+    print(
+        f"\nStopped: {stats['processed']} processed · {stats['errors']} errors · "
+        f"{stats['queue_depth']} still queued"
+        + (f" · p50 latency {latency:.1f}s" if latency is not None else "")
+    )
+    print(f"Stats -> {watcher.stats_path}")
@@ -142,6 +142,35 @@ class DiagnosisFormatter:
                 lines.append(f"  Causal Arbiter: {arbiter.get('reason', 'no arbiter summary')}")
             lines.append("")
 
+        onsets = (explain_data or {}).get("timeline", {}).get("onsets", {})
+        if onsets:
+            lines.append(_c("Windowed Onsets", _BOLD))
+            for label, onset in sorted(onsets.items(), key=lambda item: item[1]["time_us"]):
+                lines.append(
+                    f"  {label}: from T+{onset['time_us'] / 1e6:.1f}s "
+                    f"(peak {onset['peak_confidence'] * 100:.0f}% "
+                    f"at T+{onset['peak_time_us'] / 1e6:.1f}s)"
+                )
+            lines.append("")
+
+        segmentation = (explain_data or {}).get("segments")
+        if segmentation:
+            lines.append(_c("Flight Segments", _BOLD))
+            lines.append(
+                f"  In flight {segmentation.get('flight_sec', 0.0):.0f}s, "
+                f"ground skipped {segmentation.get('ground_sec', 0.0):.0f}s"
+            )
+            for segment in segmentation.get("segments", []):
+                top = (segment.get("decision") or {}).get("top_guess") or "healthy"
+                confidence = (segment.get("decision") or {}).get("top_confidence", 0.0)
+                lines.append(
+                    f"  #{segment['index'] + 1} "
+                    f"T+{segment['t_start']:.0f}s..T+{segment['t_end']:.0f}s "
+                    f"({segment['duration_sec']:.0f}s): {top}"
+                    + (f" ({confidence * 100:.0f}%)" if segment.get("diagnoses") else "")
+                )
+            lines.append("")
+
         if decision:
             lines.append(f"Decision: {decision.get('status', 'unknown').upper()}")
             top_guess = decision.get("top_guess")
@@ -164,6 +193,13 @@ class DiagnosisFormatter:
             lines.append(f"Runtime: {runtime_info.get('engine', 'unknown')}")
             if runtime_info.get("ml_available") is False:
                 lines.append(f"ML Status: fallback ({runtime_info.get('ml_reason', 'ml unavailable')})")
+            triage = runtime_info.get("triage")
+            if triage:
+                outcome = "confirmed" if triage.get("agrees_with_full") else "superseded"
+                lines.append(
+                    f"Triage: {triage.get('top_guess') or 'healthy'} "
+                    f"(partial, {triage.get('elapsed_sec', 0):.2f}s) {outcome} by full analysis"
+                )
 
         if similar_cases:
             lines.append("")
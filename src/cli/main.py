@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 import argparse
+import sys
 
-from .commands import COMMAND_MODULES
+from .server import forward_to_server
 
 
 def build_parser() -> argparse.ArgumentParser:
+    # Imported here so commands forwarded to the analysis server skip the
+    # diagnosis stack entirely.
+    from .commands import COMMAND_MODULES
+
     parser = argparse.ArgumentParser(description="ArduPilot Log Diagnosis Tool")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
@@ -16,6 +21,9 @@ def build_parser() -> argparse.ArgumentParser:
 
 
 def main() -> None:
+    exit_code = forward_to_server(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
     parser = build_parser()
     args = parser.parse_args()
     args.func(args)
@@ -0,0 +1,371 @@
+"""Long-lived local analysis server on a Unix-domain socket.
+
+``serve`` keeps a warm ``FeaturePipeline``/``HybridEngine``/``FailureRetrieval``
+and a small parse cache in one process; ``analyze`` forwards its argv here
+when the server is reachable (``--server auto``, the default) and otherwise
+runs in-process. Only the standard library and the version helpers of
+``src.batch.manifest`` are imported at module level so the forwarding path
+in ``main()`` skips the heavy diagnosis imports.
+
+Wire format: one JSON request line. The server answers with JSON lines:
+``{"stream": "stdout"|"stderr", "data": ...}`` frames as the command writes
+(so ``analyze --triage`` shows its preliminary verdict right away), then one
+final response line, then closes.
+
+``run`` requests carry the client's ``code_version()``; a server started
+from other source answers with ``code_mismatch`` and the client runs
+in-process instead. The server re-checks the model artifacts' stat
+signature before every run and rebuilds its engines when they change.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from src.batch.manifest import code_version, model_stat_signature
+from src.runtime_paths import MODELS_DIR
+
+
+SOCKET_ENV = "ARDUPILOT_DIAGNOSIS_SOCKET"
+PROTOCOL_VERSION = 3
+SERVED_COMMANDS = ("analyze",)
+SERVER_MODES = ("auto", "on", "off")
+PARSE_CACHE_SIZE = 8
+CONNECT_TIMEOUT_SEC = 0.5
+
+
+def default_socket_path() -> str:
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join(runtime_dir, f"ardupilot-diagnosis-{uid}.sock")
+
+
+def _option(argv: list[str], name: str) -> Optional[str]:
+    """Value of ``--name X`` / ``--name=X`` in argv, without argparse."""
+    value = None
+    for i, arg in enumerate(argv):
+        if arg == name and i + 1 < len(argv):
+            value = argv[i + 1]
+        elif arg.startswith(name + "="):
+            value = arg.split("=", 1)[1]
+    return value
+
+
+def request(
+    payload: dict[str, Any],
+    socket_path: Optional[str] = None,
+    timeout: Optional[float] = None,
+    on_output: Optional[Callable[[str, str], None]] = None,
+) -> dict[str, Any]:
+    """Send one request and return the final response; raises OSError if unreachable.
+
+    Output frames that precede the response are passed to ``on_output(stream, data)``.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT_SEC)
+        sock.connect(socket_path or default_socket_path())
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("rb") as lines:
+            for line in lines:
+                frame = json.loads(line)
+                if "stream" not in frame:
+                    return frame
+                if on_output is not None:
+                    on_output(frame["stream"], frame.get("data", ""))
+    finally:
+        sock.close()
+    raise ConnectionError("analysis server closed the connection without a response")
+
+
+def forward_to_server(argv: list[str]) -> Optional[int]:
+    """Run ``argv`` on the analysis server if it applies; None means run in-process.
+
+    Returns the remote exit code; its stdout/stderr are replayed as they arrive.
+    """
+    if not argv or argv[0] not in SERVED_COMMANDS or not hasattr(socket, "AF_UNIX"):
+        return None
+    if "-h" in argv or "--help" in argv:
+        return None
+    mode = _option(argv, "--server") or "auto"
+    if mode == "off" or mode not in SERVER_MODES:
+        return None
+    payload = {
+        "op": "run",
+        "version": PROTOCOL_VERSION,
+        "code": code_version(),
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "color": sys.stdout.isatty() and os.environ.get("NO_COLOR", "") == "",
+    }
+    socket_path = _option(argv, "--socket") or default_socket_path()
+    replayed = False
+    stdout, stderr = sys.stdout, sys.stderr
+
+    def replay(stream: str, data: str) -> None:
+        nonlocal replayed
+        replayed = True
+        target = stderr if stream == "stderr" else stdout
+        target.write(data)
+        target.flush()
+
+    try:
+        response = request(payload, socket_path, on_output=replay)
+    except (OSError, ValueError) as e:
+        # Once output has been shown, re-running in-process would repeat it.
+        if mode == "on" or replayed:
+            print(f"Analysis server unavailable at {socket_path}: {e}", file=sys.stderr)
+            return 2
+        return None
+    if response.get("code_mismatch"):
+        # The server runs older or newer source; its results would not match this checkout.
+        if mode == "on":
+            print(
+                f"Analysis server at {socket_path} runs other code; analysing in-process.",
+                file=sys.stderr,
+            )
+        return None
+    if response.get("error"):
+        if mode == "on" or replayed:
+            print(f"Analysis server error: {response['error']}", file=sys.stderr)
+            return 2
+        return None
+    return int(response.get("exit_code", 0))
+
+
+class _StreamedOutput(io.TextIOBase):
+    """stdout/stderr stand-in that sends every write to the client as an output frame.
+
+    ``isatty`` reports the client's terminal, so colour output matches. A
+    client that hung up stops receiving output; the command still finishes.
+    """
+
+    def __init__(self, name: str, emit: Callable[[dict[str, Any]], None], tty: bool = False):
+        super().__init__()
+        self._name = name
+        self._emit = emit
+        self._tty = tty
+        self._gone = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: str) -> int:
+        if data and not self._gone:
+            try:
+                self._emit({"stream": self._name, "data": data})
+            except OSError:
+                self._gone = True
+        return len(data)
+
+    def isatty(self) -> bool:
+        return self._tty
+
+
+class WarmAnalyzer:
+    """Analysis components kept alive across requests, plus an LRU parse cache.
+
+    Cache entries are keyed on ``(realpath, size, mtime_ns)`` so an edited
+    or replaced log is re-parsed. ``refresh`` rebuilds the engines when the
+    model artifacts' stat signature changes.
+    """
+
+    def __init__(self, cache_size: int = PARSE_CACHE_SIZE, models_dir: Path = MODELS_DIR):
+        from src.features.pipeline import FeaturePipeline
+        from src.retrieval.similarity import FailureRetrieval
+
+        self.pipeline = FeaturePipeline()
+        self.retrieval = FailureRetrieval()
+        self.models_dir = models_dir
+        self.model_signature: tuple = ()
+        self.rebuilds = 0
+        self._build_engines()
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple, tuple[dict[str, Any], dict[str, Any]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _build_engines(self) -> None:
+        from src.diagnosis.hybrid_engine import HybridEngine
+        from src.diagnosis.rule_engine import RuleEngine
+
+        # Taken before loading, so a write during the load is seen next time.
+        self.model_signature = model_stat_signature(self.models_dir)
+        self.rule_engine = RuleEngine()
+        self.hybrid_engine = HybridEngine(rule_engine=self.rule_engine)
+
+    def refresh(self) -> bool:
+        """Rebuild the engines if the model artifacts changed since they were loaded."""
+        if model_stat_signature(self.models_dir) == self.model_signature:
+            return False
+        self._build_engines()
+        self.rebuilds += 1
+        return True
+
+    def load(self, logfile: str) -> tuple[dict[str, Any], dict[str, Any]]:
+        from src.parser.bin_parser import LogParser
+
+        stat = os.stat(logfile)
+        key = (os.path.realpath(logfile), stat.st_size, stat.st_mtime_ns)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        else:
+            self.misses += 1
+            parsed = LogParser(logfile).parse()
+            cached = (parsed, self.pipeline.extract(parsed))
+            self._cache[key] = cached
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        parsed, features = cached
+        # Callers may annotate features; keep the cached copy pristine.
+        return parsed, dict(features)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "AnalysisServer"
+
+    def emit(self, frame: dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(frame).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        try:
+            payload = json.loads(self.rfile.readline() or b"{}")
+            response = self.server.dispatch(payload, self.emit)
+        except Exception as e:  # never let one bad request kill the daemon
+            response = {"error": f"{type(e).__name__}: {e}"}
+        self.emit(response)
+
+
+class AnalysisServer(socketserver.UnixStreamServer):
+    """Serial Unix-socket server; requests share warm state and process-wide stdout capture."""
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        idle_timeout: float = 0.0,
+        cache_size: int = PARSE_CACHE_SIZE,
+    ):
+        self.socket_path = socket_path or default_socket_path()
+        _claim_socket_path(self.socket_path)
+        self.code_version = code_version()
+        self.warm = WarmAnalyzer(cache_size=cache_size)
+        self.started_at = time.time()
+        self.requests = 0
+        self._stop = False
+        super().__init__(self.socket_path, _Handler)
+        os.chmod(self.socket_path, 0o600)
+        self.timeout = idle_timeout or None
+
+    def handle_timeout(self) -> None:
+        self._stop = True
+
+    def serve(self) -> None:
+        try:
+            while not self._stop:
+                self.handle_request()
+        finally:
+            self.server_close()
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "socket": self.socket_path,
+            "uptime_sec": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "code": self.code_version,
+            "models": [list(entry) for entry in self.warm.model_signature],
+            "engine_rebuilds": self.warm.rebuilds,
+            "parse_cache": {
+                "entries": len(self.warm._cache),
+                "hits": self.warm.hits,
+                "misses": self.warm.misses,
+            },
+        }
+
+    def dispatch(
+        self, payload: dict[str, Any], emit: Callable[[dict[str, Any]], None]
+    ) -> dict[str, Any]:
+        """Answer one request; ``run`` output is sent through ``emit`` as it is written."""
+        op = payload.get("op", "run")
+        if op == "status":
+            return self.status()
+        if op == "shutdown":
+            self._stop = True
+            return {"stopped": True}
+        if op != "run":
+            return {"error": f"unknown op: {op}"}
+        if payload.get("version") != PROTOCOL_VERSION:
+            return {"error": "protocol version mismatch"}
+        if payload.get("code") != self.code_version:
+            return {
+                "error": "code version mismatch",
+                "code_mismatch": True,
+                "code": self.code_version,
+            }
+        self.requests += 1
+        self.warm.refresh()
+        return self._run(
+            payload["argv"], payload.get("cwd") or os.getcwd(), bool(payload.get("color")), emit
+        )
+
+    def _run(
+        self, argv: list[str], cwd: str, color: bool, emit: Callable[[dict[str, Any]], None]
+    ) -> dict[str, Any]:
+        from src.cli.main import build_parser
+
+        if not argv or argv[0] not in SERVED_COMMANDS:
+            return {"error": f"command not served: {argv[:1]}"}
+        stdout = _StreamedOutput("stdout", emit, tty=color)
+        stderr = _StreamedOutput("stderr", emit)
+        exit_code = 0
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                args = build_parser().parse_args(argv)
+                # Paths are relative to the client, not the daemon.
+                args.logfile = os.path.join(cwd, args.logfile)
+                if getattr(args, "output", None):
+                    args.output = os.path.join(cwd, args.output)
+                args.func(args, warm=self.warm)
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                if isinstance(e.code, str):
+                    print(e.code, file=sys.stderr)
+            except Exception as e:
+                print(f"Error: {type(e).__name__}: {e}", file=sys.stderr)
+                exit_code = 1
+        return {"exit_code": exit_code}
+
+
+def _claim_socket_path(socket_path: str) -> None:
+    """Remove a stale socket file; refuse to start if a live server owns it."""
+    if not os.path.exists(socket_path):
+        return
+    try:
+        request({"op": "status"}, socket_path, timeout=CONNECT_TIMEOUT_SEC)
+    except (OSError, ValueError):
+        os.unlink(socket_path)
+        return
+    raise RuntimeError(f"An analysis server is already running at {socket_path}")
@@ -6,6 +6,160 @@ from pathlib import Path
 import numpy as np
 
 from src.runtime_paths import MODELS_DIR
+from src.telemetry import REGISTRY as METRICS
+
+TOP_DEVIATIONS = 5
+_EULER_GAMMA = 0.5772156649015329
+_ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x)),
+    "tanh": np.tanh,
+    "elu": lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0.0))),
+    "softplus": lambda x: np.logaddexp(0.0, x),
+}
+_PASSTHROUGH_LAYERS = {"InputLayer", "Dropout", "GaussianNoise", "GaussianDropout", "Flatten"}
+
+
+def _safe_float(value) -> float:
+    if value is None:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """Expected path length of an unsuccessful BST search, c(n) in the iForest paper."""
+    n = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n)
+    result[n == 2] = 1.0
+    big = n > 2
+    result[big] = 2.0 * (np.log(n[big] - 1.0) + _EULER_GAMMA) - 2.0 * (n[big] - 1.0) / n[big]
+    return result
+
+
+def _export_scaler(scaler) -> dict[str, np.ndarray]:
+    """Reduce a fitted sklearn scaler to an affine ``X * mul + add``."""
+    name = type(scaler).__name__
+    if name == "StandardScaler":
+        n = scaler.n_features_in_
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n)
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n)
+        mul = 1.0 / np.asarray(scale, dtype=np.float64)
+        return {"scaler_mul": mul, "scaler_add": -np.asarray(mean, dtype=np.float64) * mul}
+    if name == "MinMaxScaler":
+        return {
+            "scaler_mul": np.asarray(scaler.scale_, dtype=np.float64),
+            "scaler_add": np.asarray(scaler.min_, dtype=np.float64),
+        }
+    if name == "RobustScaler":
+        n = scaler.n_features_in_
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n)
+        center = scaler.center_ if scaler.center_ is not None else np.zeros(n)
+        mul = 1.0 / np.asarray(scale, dtype=np.float64)
+        return {"scaler_mul": mul, "scaler_add": -np.asarray(center, dtype=np.float64) * mul}
+    raise ValueError(f"Unsupported scaler for NumPy export: {name}")
+
+
+def _export_dense_stack(model, prefix: str) -> dict[str, np.ndarray]:
+    """Flatten a Keras-style model into ``(weight, bias, activation)`` layers.
+
+    Dense layers keep their ``(in, out)`` kernel; BatchNormalization is folded
+    into an element-wise scale/shift (1-D weight). Inference-time no-op layers
+    are skipped and anything else is rejected.
+    """
+    arrays: dict[str, np.ndarray] = {}
+    activations: list[str] = []
+    for layer in getattr(model, "layers", []):
+        kind = type(layer).__name__
+        if kind in _PASSTHROUGH_LAYERS:
+            continue
+        config = layer.get_config() if hasattr(layer, "get_config") else {}
+        weights = layer.get_weights()
+        if kind == "Dense":
+            kernel = np.asarray(weights[0], dtype=np.float64)
+            bias = (
+                np.asarray(weights[1], dtype=np.float64)
+                if len(weights) > 1
+                else np.zeros(kernel.shape[1])
+            )
+            activation = config.get("activation", "linear")
+        elif kind == "BatchNormalization":
+            gamma, beta, moving_mean, moving_var = (
+                np.asarray(w, dtype=np.float64) for w in weights
+            )
+            kernel = gamma / np.sqrt(moving_var + float(config.get("epsilon", 1e-3)))
+            bias = beta - moving_mean * kernel
+            activation = "linear"
+        elif kind == "Activation":
+            kernel = None
+            bias = None
+            activation = config.get("activation", "linear")
+        else:
+            raise ValueError(f"Unsupported layer for NumPy export: {kind}")
+        if not isinstance(activation, str) or activation not in _ACTIVATIONS:
+            raise ValueError(f"Unsupported activation for NumPy export: {activation}")
+
+        index = len(activations)
+        if kernel is not None:
+            arrays[f"{prefix}_{index}_w"] = kernel
+            arrays[f"{prefix}_{index}_b"] = bias
+        activations.append(activation)
+    arrays[f"{prefix}_activations"] = np.array(activations, dtype=np.str_)
+    return arrays
+
+
+def _export_isolation_forest(iso_forest) -> dict[str, np.ndarray]:
+    """Concatenate every tree of a fitted IsolationForest into flat node arrays.
+
+    Child indices are rewritten to global node ids, split features are mapped
+    back through ``estimators_features_`` and each leaf stores its full path
+    length contribution ``depth + c(n_node_samples)``.
+    """
+    lefts, rights, features, thresholds, leaf_values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator, feature_subset in zip(iso_forest.estimators_, iso_forest.estimators_features_):
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        left = tree.children_left.astype(np.int64)
+        right = tree.children_right.astype(np.int64)
+        is_leaf = left == -1
+
+        depth = np.zeros(n_nodes, dtype=np.float64)
+        for node in range(n_nodes):  # children always have larger ids than parents
+            if not is_leaf[node]:
+                depth[left[node]] = depth[node] + 1.0
+                depth[right[node]] = depth[node] + 1.0
+
+        feature = np.where(is_leaf, 0, np.asarray(feature_subset)[np.maximum(tree.feature, 0)])
+        roots.append(offset)
+        lefts.append(np.where(is_leaf, np.arange(n_nodes), left) + offset)
+        rights.append(np.where(is_leaf, np.arange(n_nodes), right) + offset)
+        features.append(feature.astype(np.int64))
+        thresholds.append(tree.threshold.astype(np.float64))
+        leaf_values.append(
+            np.where(is_leaf, depth + _average_path_length(tree.n_node_samples), 0.0)
+        )
+        offset += n_nodes
+
+    return {
+        "iso_left": np.concatenate(lefts),
+        "iso_right": np.concatenate(rights),
+        "iso_feature": np.concatenate(features),
+        "iso_threshold": np.concatenate(thresholds),
+        "iso_leaf_value": np.concatenate(leaf_values),
+        "iso_roots": np.array(roots, dtype=np.int64),
+        "iso_max_depth": np.array(
+            max(estimator.tree_.max_depth for estimator in iso_forest.estimators_), dtype=np.int64
+        ),
+        "iso_denominator": np.array(
+            len(iso_forest.estimators_) * _average_path_length([iso_forest.max_samples_])[0]
+        ),
+        "iso_offset": np.array(float(iso_forest.offset_)),
+    }
+
 
 class AnomalyDetector:
     """Autoencoder-based anomaly detection trained on healthy flights.
@@ -15,6 +169,11 @@ class AnomalyDetector:
     normal distribution, it flags an anomaly.
 
     This approach requires ZERO failure data — only healthy flights.
+
+    Fitted bundles are converted on load into plain NumPy arrays (scaler as an
+    affine map, autoencoder as dense matrices, isolation forest as flattened
+    node arrays) so scoring needs neither Keras nor sklearn. ``export_numpy``
+    writes those arrays to a ``.npz`` that can be loaded directly.
     """
 
     def __init__(self, model_path: str | os.PathLike[str] | None = None):
@@ -23,10 +182,26 @@ class AnomalyDetector:
         )
         self.model_path = str(resolved_model_path)
         self.available = False
+        self.numpy_arrays: dict[str, np.ndarray] | None = None
         self._load()
+        METRICS.inc(
+            "model_loads_total",
+            component="anomaly_detector",
+            outcome="loaded" if self.available else "unavailable",
+        )
 
     def _load(self):
         try:
+            if self.model_path.endswith(".npz"):
+                with np.load(self.model_path, allow_pickle=False) as data:
+                    self.numpy_arrays = {key: data[key] for key in data.files}
+                self.model_type = str(self.numpy_arrays["model_type"])
+                self.scaler = None
+                if self.model_type == "autoencoder":
+                    self.threshold = float(self.numpy_arrays["threshold"])
+                self.available = True
+                return
+
             import joblib
             bundle = joblib.load(self.model_path)
             # Support both Autoencoder and Isolation Forest
@@ -45,79 +220,162 @@ class AnomalyDetector:
             self.available = True
         except Exception:
             self.available = False
+            return
 
-    def score(self, features: dict, feature_columns: list) -> dict:
-        """Compute anomaly score for a feature vector.
+        try:
+            self.numpy_arrays = self._build_numpy_arrays()
+        except Exception:
+            # Unusual layers/scalers keep the framework inference path.
+            self.numpy_arrays = None
 
-        Returns:
-            {
-                "anomaly_score": float,     # 0.0 = perfectly normal
-                "is_anomaly": bool,         # True if score > threshold
-                "top_deviations": list,     # which features deviated most
-            }
-        """
+    def _build_numpy_arrays(self) -> dict[str, np.ndarray]:
+        arrays: dict[str, np.ndarray] = {"model_type": np.array(self.model_type)}
+        arrays.update(_export_scaler(self.scaler))
+        if self.model_type == "autoencoder":
+            arrays.update(_export_dense_stack(self.encoder, "encoder"))
+            arrays.update(_export_dense_stack(self.decoder, "decoder"))
+            arrays["threshold"] = np.array(float(self.threshold))
+        else:
+            arrays.update(_export_isolation_forest(self.iso_forest))
+        return arrays
+
+    def export_numpy(self, path: str | os.PathLike[str] | None = None) -> dict[str, np.ndarray]:
+        """Return (and optionally save as ``.npz``) the framework-free model arrays."""
         if not self.available:
-            return {"anomaly_score": 0.0, "is_anomaly": False, "top_deviations": []}
+            raise ValueError("No anomaly model loaded")
+        if self.numpy_arrays is None:
+            self.numpy_arrays = self._build_numpy_arrays()
+        if path is not None:
+            np.savez(path, **self.numpy_arrays)
+        return self.numpy_arrays
+
+    # ------------------------------------------------------------------
+    # NumPy inference
+    # ------------------------------------------------------------------
+
+    def _dense_forward(self, X: np.ndarray, prefix: str) -> np.ndarray:
+        arrays = self.numpy_arrays
+        assert arrays is not None
+        for index, activation in enumerate(arrays[f"{prefix}_activations"]):
+            weight = arrays.get(f"{prefix}_{index}_w")
+            if weight is not None:
+                X = (X @ weight if weight.ndim == 2 else X * weight) + arrays[f"{prefix}_{index}_b"]
+            X = _ACTIVATIONS[str(activation)](X)
+        return X
+
+    def _isolation_decision(self, X: np.ndarray) -> np.ndarray:
+        """``IsolationForest.decision_function`` over all trees at once."""
+        arrays = self.numpy_arrays
+        assert arrays is not None
+        # sklearn compares float32 inputs against float64 thresholds.
+        X32 = X.astype(np.float32).astype(np.float64)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(arrays["iso_roots"], (len(X), len(arrays["iso_roots"]))).copy()
+        for _ in range(int(arrays["iso_max_depth"])):
+            go_left = X32[rows, arrays["iso_feature"][nodes]] <= arrays["iso_threshold"][nodes]
+            nodes = np.where(go_left, arrays["iso_left"][nodes], arrays["iso_right"][nodes])
 
-        def _safe_float(value):
-            if value is None:
-                return 0.0
-            try:
-                return float(value)
-            except (TypeError, ValueError):
-                return 0.0
+        depths = arrays["iso_leaf_value"][nodes].sum(axis=1)
+        denominator = float(arrays["iso_denominator"])
+        if denominator == 0:
+            scores = np.ones(len(X))
+        else:
+            scores = 2.0 ** (-depths / denominator)
+        return -scores - float(arrays["iso_offset"])
 
-        vector = np.array([_safe_float(features.get(f, 0.0)) for f in feature_columns])
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
 
-        # We need to reshape for sklearn/keras
+    def _transform(self, matrix: np.ndarray) -> np.ndarray | None:
+        if self.numpy_arrays is not None:
+            if matrix.shape[1] != len(self.numpy_arrays["scaler_mul"]):
+                return None
+            return matrix * self.numpy_arrays["scaler_mul"] + self.numpy_arrays["scaler_add"]
         try:
-            X = self.scaler.transform(vector.reshape(1, -1))
+            return self.scaler.transform(matrix)
         except ValueError:
-            # Handle if feature columns don't match scaler exactly (fallback for robustness)
-            return {"anomaly_score": 0.0, "is_anomaly": False, "top_deviations": []}
+            return None
+
+    def score_batch(self, rows, feature_columns: list) -> dict:
+        """Score N logs in one vectorized pass.
+
+        ``rows`` is a list of feature dicts or an ``(N, len(feature_columns))``
+        matrix. Returns ``anomaly_score`` (float array), ``is_anomaly`` (bool
+        array) and ``top_deviations`` (one list per row), matching ``score``.
+        """
+        if isinstance(rows, np.ndarray):
+            matrix = np.asarray(rows, dtype=np.float64).reshape(len(rows), -1)
+        else:
+            matrix = np.array(
+                [[_safe_float(row.get(f, 0.0)) for f in feature_columns] for row in rows],
+                dtype=np.float64,
+            ).reshape(len(rows), len(feature_columns))
+
+        n_rows = len(matrix)
+        empty = {
+            "anomaly_score": np.zeros(n_rows),
+            "is_anomaly": np.zeros(n_rows, dtype=bool),
+            "top_deviations": [[] for _ in range(n_rows)],
+        }
+        if not self.available or n_rows == 0:
+            return empty
+
+        # Handle if feature columns don't match scaler exactly (fallback for robustness)
+        X = self._transform(matrix)
+        if X is None:
+            return empty
 
         if self.model_type == "autoencoder":
             # Encode → Decode → measure reconstruction error
-            encoded = self.encoder.predict(X, verbose=0)
-            reconstructed = self.decoder.predict(encoded, verbose=0)
-            errors = np.abs(X[0] - reconstructed[0])
-
-            anomaly_score = float(np.mean(errors))
-            is_anomaly = anomaly_score > self.threshold
-
-            # Find which features contributed most to the anomaly
-            top_indices = np.argsort(errors)[-5:][::-1]
-            top_deviations = [
-                {"feature": feature_columns[i], "error": float(errors[i])}
-                for i in top_indices
-            ]
-
-            return {
-                "anomaly_score": anomaly_score,
-                "is_anomaly": is_anomaly,
-                "top_deviations": top_deviations,
-            }
-
+            if self.numpy_arrays is not None:
+                reconstructed = self._dense_forward(self._dense_forward(X, "encoder"), "decoder")
+            else:
+                encoded = self.encoder.predict(X, verbose=0)
+                reconstructed = self.decoder.predict(encoded, verbose=0)
+            deviations = np.abs(X - reconstructed)
+            anomaly_scores = deviations.mean(axis=1)
+            is_anomaly = anomaly_scores > self.threshold
         elif self.model_type == "isolation_forest":
-            # predict returns 1 for inliers, -1 for outliers
-            # decision_function returns anomaly score (negative for anomalies)
-            score = float(self.iso_forest.decision_function(X)[0])
-            is_anomaly = self.iso_forest.predict(X)[0] == -1
-
+            # decision_function is negative for anomalies; predict() is just its sign,
+            # so a single evaluation yields both the score and the flag.
+            if self.numpy_arrays is not None:
+                decision = self._isolation_decision(X)
+            else:
+                decision = self.iso_forest.decision_function(X)
+            # Invert score so higher = more anomalous (for consistency)
+            anomaly_scores = -np.asarray(decision, dtype=np.float64)
+            is_anomaly = decision < 0
             # Isolation forest doesn't directly give feature contributions
             # We can proxy it by looking at normalized absolute deviation from mean
-            deviations = np.abs(X[0]) # X is already scaled, so 0 is mean
-            top_indices = np.argsort(deviations)[-5:][::-1]
-            top_deviations = [
-                {"feature": feature_columns[i], "error": float(deviations[i])}
-                for i in top_indices
-            ]
+            deviations = np.abs(X)  # X is already scaled, so 0 is mean
+        else:
+            return empty
 
-            # Invert score so higher = more anomalous (for consistency)
-            return {
-                "anomaly_score": -score,
-                "is_anomaly": bool(is_anomaly),
-                "top_deviations": top_deviations,
-            }
+        top_indices = np.argsort(deviations, axis=1)[:, -TOP_DEVIATIONS:][:, ::-1]
+        top_deviations = [
+            [{"feature": feature_columns[i], "error": float(row_errors[i])} for i in row_top]
+            for row_top, row_errors in zip(top_indices, deviations)
+        ]
+        return {
+            "anomaly_score": np.asarray(anomaly_scores, dtype=np.float64),
+            "is_anomaly": np.asarray(is_anomaly, dtype=bool),
+            "top_deviations": top_deviations,
+        }
+
+    def score(self, features: dict, feature_columns: list) -> dict:
+        """Compute anomaly score for a feature vector.
 
-        return {"anomaly_score": 0.0, "is_anomaly": False, "top_deviations": []}
+        Returns:
+            {
+                "anomaly_score": float,     # 0.0 = perfectly normal
+                "is_anomaly": bool,         # True if score > threshold
+                "top_deviations": list,     # which features deviated most
+            }
+        """
+        batch = self.score_batch([features], feature_columns)
+        return {
+            "anomaly_score": float(batch["anomaly_score"][0]),
+            "is_anomaly": bool(batch["is_anomaly"][0]),
+            "top_deviations": batch["top_deviations"][0],
+        }
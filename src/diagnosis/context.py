@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Optional, TypeVar
+
+import numpy as np
+
+from src.contracts import DiagnosisDict, FeatureDict
+
+T = TypeVar("T")
+
+
+def _safe_float(value) -> float:
+    if value is None:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class DiagnosisContext:
+    """Per-log memo of the intermediates shared by engines and report builders.
+
+    One context is created per analysed log and handed to every consumer
+    (HybridEngine, MLClassifier, AnomalyDetector, FailureRetrieval and the
+    web visualisation builder), so each of the following is computed once:
+
+    - the ordered feature vector for a given column list
+    - the scaled ML input and label probabilities
+    - rule, ML and anomaly results per engine instance
+    - the unit-normalised retrieval query vector
+    - message time indices and the log start time
+    """
+
+    def __init__(self, features: FeatureDict, parsed: Optional[dict[str, Any]] = None):
+        self.features = features
+        self.parsed = parsed or {}
+        self._memo: dict[tuple, Any] = {}
+        # Windowed onset (TimeUS) per failure type, filled by DiagnosisTimeline.
+        self.onsets_us: dict[str, float] = {}
+
+    def memo(self, key: tuple, compute: Callable[[], T]) -> T:
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    @property
+    def metadata(self) -> dict[str, Any]:
+        return self.features.get("_metadata", {})
+
+    @property
+    def vehicle_type(self) -> str:
+        return self.metadata.get("vehicle_type", "Unknown")
+
+    # ------------------------------------------------------------------
+    # Feature vectors
+    # ------------------------------------------------------------------
+
+    def feature_vector(self, columns: list[str]) -> np.ndarray:
+        """Unscaled float64 vector of ``features`` ordered by ``columns``."""
+        return self.memo(
+            ("feature_vector", tuple(columns)),
+            lambda: np.array(
+                [_safe_float(self.features.get(name, 0.0)) for name in columns], dtype=np.float64
+            ),
+        )
+
+    def retrieval_vector(self) -> np.ndarray:
+        """Unit-normalised query vector used by ``FailureRetrieval``."""
+        from src.retrieval.similarity import _normalized_vector
+
+        return self.memo(("retrieval_vector",), lambda: _normalized_vector(self.features))
+
+    def ml_input(self, classifier) -> np.ndarray:
+        """Scaled (1, n_features) input row for ``classifier``."""
+        return self.memo(
+            ("ml_input", id(classifier.scaler)),
+            lambda: classifier.scaler.transform(
+                self.feature_vector(classifier.feature_columns)[None, :]
+            ),
+        )
+
+    def ml_probabilities(self, classifier) -> np.ndarray:
+        """Per-label probabilities (one row) for ``classifier``."""
+        return self.memo(
+            ("ml_probabilities", id(classifier)),
+            lambda: classifier.scaled_label_probabilities(self.ml_input(classifier))[0],
+        )
+
+    # ------------------------------------------------------------------
+    # Engine results
+    # ------------------------------------------------------------------
+
+    def rule_results(self, rule_engine) -> list[DiagnosisDict]:
+        return self.memo(("rules", id(rule_engine)), lambda: rule_engine.diagnose(self.features))
+
+    def ml_results(self, classifier) -> list[DiagnosisDict]:
+        def compute() -> list[DiagnosisDict]:
+            # Injected classifiers only need predict(features); MLClassifier reuses the memo.
+            if hasattr(classifier, "scaled_label_probabilities"):
+                return classifier.predict(self.features, context=self)
+            return classifier.predict(self.features)
+
+        return self.memo(("ml", id(classifier)), compute)
+
+    def anomaly_info(self, detector, feature_columns: list[str]) -> dict[str, Any]:
+        def compute() -> dict[str, Any]:
+            if not hasattr(detector, "score_batch"):
+                return detector.score(self.features, feature_columns)
+            batch = detector.score_batch(
+                self.feature_vector(feature_columns)[None, :], feature_columns
+            )
+            return {
+                "anomaly_score": float(batch["anomaly_score"][0]),
+                "is_anomaly": bool(batch["is_anomaly"][0]),
+                "top_deviations": batch["top_deviations"][0],
+            }
+
+        return self.memo(("anomaly", id(detector), tuple(feature_columns)), compute)
+
+    # ------------------------------------------------------------------
+    # Time indices
+    # ------------------------------------------------------------------
+
+    def message_times_us(self, message_type: str) -> np.ndarray:
+        """``TimeUS`` values of ``message_type`` messages that carry one."""
+
+        def compute() -> np.ndarray:
+            messages = self.parsed.get("messages", {}).get(message_type, [])
+            return np.array(
+                [msg["TimeUS"] for msg in messages if msg.get("TimeUS") is not None],
+                dtype=np.float64,
+            )
+
+        return self.memo(("times", message_type), compute)
+
+    @property
+    def start_time_us(self) -> int | None:
+        """First timestamp in VIBE, then GPS, then errors/mode changes/events."""
+
+        def compute() -> int | None:
+            message_groups = self.parsed.get("messages", {})
+            for message_type in ("VIBE", "GPS"):
+                for msg in message_groups.get(message_type, []):
+                    t_us = msg.get("TimeUS")
+                    if t_us is not None:
+                        return t_us
+
+            for collection_name in ("errors", "mode_changes", "events"):
+                for item in self.parsed.get(collection_name, []):
+                    t_us = item.get("time_us")
+                    if t_us is not None:
+                        return t_us
+            return None
+
+        return self.memo(("start_time_us",), compute)
@@ -1,6 +1,7 @@
 from typing import Optional, cast
 
 from .anomaly_detector import AnomalyDetector
+from .context import DiagnosisContext
 from .ml_classifier import MLClassifier
 from .rule_engine import RuleEngine
 from src.contracts import DiagnosisDict, FeatureDict
@@ -28,6 +29,13 @@ LABEL_PRIORITY = {
 }
 
 
+class _DisabledModel:
+    """Stand-in for a model component that is deliberately never loaded."""
+
+    available = False
+    unavailable_reason = "disabled"
+
+
 class HybridEngine:
     """Combines RuleEngine + AnomalyDetector + MLClassifier results."""
 
@@ -41,9 +49,22 @@ class HybridEngine:
         self.ml = ml_classifier or MLClassifier()
         self.anomaly_detector = anomaly_detector or AnomalyDetector()
 
-    def diagnose(self, features: FeatureDict) -> list[DiagnosisDict]:
-        rule_results = self.rules.diagnose(features)
-        ml_results = self.ml.predict(features) if self.ml.available else []
+    @classmethod
+    def rule_only(cls, rule_engine: Optional[RuleEngine] = None) -> "HybridEngine":
+        """Engine that runs the rules alone without touching the model artifacts."""
+        return cls(
+            rule_engine=rule_engine,
+            ml_classifier=cast(MLClassifier, _DisabledModel()),
+            anomaly_detector=cast(AnomalyDetector, _DisabledModel()),
+        )
+
+    def diagnose(
+        self, features: FeatureDict, context: Optional[DiagnosisContext] = None
+    ) -> list[DiagnosisDict]:
+        if context is None:
+            context = DiagnosisContext(features)
+        rule_results = context.rule_results(self.rules)
+        ml_results = context.ml_results(self.ml) if self.ml.available else []
         anomaly_info = {"is_anomaly": False, "anomaly_score": 0.0}
 
         has_rule = len(rule_results) > 0
@@ -52,7 +73,7 @@ class HybridEngine:
             and self.ml.available
             and hasattr(self.ml, "feature_columns")
         ):
-            anomaly_info = self.anomaly_detector.score(features, self.ml.feature_columns)
+            anomaly_info = context.anomaly_info(self.anomaly_detector, self.ml.feature_columns)
             if not anomaly_info["is_anomaly"] and not has_rule:
                 ml_results = []
 
@@ -128,6 +149,10 @@ class HybridEngine:
             return mapping.get(ftype)
 
         def tanomaly_for(ftype: str) -> float:
+            # Windowed onsets (when a timeline was computed) take precedence
+            # over the single per-log extractor timestamp.
+            if ftype in context.onsets_us:
+                return float(context.onsets_us[ftype])
             key = tanomaly_key_for(ftype)
             if not key:
                 return -1.0
@@ -2,10 +2,12 @@ import os
 import json
 import hashlib
 import numpy as np
-from typing import Any, cast
+from typing import Any, Optional, cast
 from src.constants import FEATURE_NAMES, VALID_LABELS
 from src.contracts import DiagnosisDict, FeatureDict
+from src.diagnosis.context import DiagnosisContext
 from src.runtime_paths import MODELS_DIR, resolve_repo_path
+from src.telemetry import REGISTRY as METRICS
 
 try:
     import joblib
@@ -48,6 +50,7 @@ class MLClassifier:
         self.available = False
         if joblib is None:
             self.unavailable_reason = "joblib unavailable"
+            METRICS.inc("model_loads_total", component="ml_classifier", outcome="unavailable")
             return
 
         required_paths = [
@@ -81,6 +84,11 @@ class MLClassifier:
                 self.available = False
         else:
             self.unavailable_reason = "missing classifier, scaler, schema, or manifest artifact"
+        METRICS.inc(
+            "model_loads_total",
+            component="ml_classifier",
+            outcome="loaded" if self.available else "unavailable",
+        )
 
     def _hash_json_list(self, values: list[str]) -> str:
         payload = json.dumps(values, sort_keys=True).encode()
@@ -198,12 +206,7 @@ class MLClassifier:
         out.sort(key=lambda x: x["confidence"], reverse=True)
         return out
 
-    def predict(self, features: FeatureDict) -> list[DiagnosisDict]:
-        if not self.available:
-            return []
-
-        from src.diagnosis.failure_types import FAILURE_RECOMMENDATIONS
-
+    def feature_vector(self, features: FeatureDict) -> np.ndarray:
         vector = []
         for feat in self.feature_columns:
             val = features.get(feat, 0.0)
@@ -211,30 +214,47 @@ class MLClassifier:
                 vector.append(float(val))
             else:
                 vector.append(0.0)
+        return np.array(vector, dtype=float)
 
-        X = np.array(vector).reshape(1, -1)
-        X_scaled = self.scaler.transform(X)
+    def label_probabilities(self, X: np.ndarray) -> np.ndarray:
+        """Return an (n_rows, n_labels) probability matrix for unscaled rows of X."""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        return self.scaled_label_probabilities(self.scaler.transform(X))
 
+    def scaled_label_probabilities(self, X_scaled: np.ndarray) -> np.ndarray:
+        """Same as ``label_probabilities`` for rows already passed through the scaler."""
         probas = cast(Any, self.model).predict_proba(X_scaled)
 
-        diagnoses = []
-        label_probs = {}
         if isinstance(probas, list):
-            for i, label in enumerate(self.label_columns):
-                prob = float(probas[i][0, 1]) if probas[i].shape[1] > 1 else 0.0
-                label_probs[label] = prob
-                if prob >= self._threshold_for_label(label):
-                    diagnoses.append(
-                        self._build_diagnosis(label, prob, FAILURE_RECOMMENDATIONS)
-                    )
+            columns = [
+                proba[:, 1] if proba.shape[1] > 1 else np.zeros(proba.shape[0])
+                for proba in probas
+            ]
+            return np.column_stack(columns).astype(float)
+        return np.asarray(probas, dtype=float)[:, : len(self.label_columns)]
+
+    def predict(
+        self, features: FeatureDict, context: Optional[DiagnosisContext] = None
+    ) -> list[DiagnosisDict]:
+        if not self.available:
+            return []
+
+        from src.diagnosis.failure_types import FAILURE_RECOMMENDATIONS
+
+        if context is not None:
+            probs = context.ml_probabilities(self)
         else:
-            for i, label in enumerate(self.label_columns):
-                prob = float(probas[0, i])
-                label_probs[label] = prob
-                if prob >= self._threshold_for_label(label):
-                    diagnoses.append(
-                        self._build_diagnosis(label, prob, FAILURE_RECOMMENDATIONS)
-                    )
+            probs = self.label_probabilities(self.feature_vector(features))[0]
+
+        diagnoses = []
+        label_probs = {}
+        for i, label in enumerate(self.label_columns):
+            prob = float(probs[i])
+            label_probs[label] = prob
+            if prob >= self._threshold_for_label(label):
+                diagnoses.append(
+                    self._build_diagnosis(label, prob, FAILURE_RECOMMENDATIONS)
+                )
 
         diagnoses = self._contextual_compass_vibration_filter(
             features,
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import numpy as np
+
+from src.contracts import DiagnosisDict, FeatureDict
+from src.features.pipeline import FeaturePipeline
+
+from .context import DiagnosisContext
+from .decision_policy import evaluate_decision
+from .hybrid_engine import HybridEngine
+from .timeline import _MessageIndex
+
+
+# ArduPilot LogEvent ids (EV.Id).
+EV_ARMED = 10
+EV_DISARMED = 11
+
+BIN_SEC = 1.0
+PAD_SEC = 2.0
+MERGE_GAP_SEC = 15.0
+MIN_SEGMENT_SEC = 5.0
+# Spin-when-armed sits around 1100-1180 PWM; flight is well above.
+ACTIVE_PWM = 1250
+ACTIVE_THROTTLE = 0.05
+ACTIVE_GPS_SPEED = 1.0
+# Sub and Rover outputs idle at a 1500 neutral, so PWM says nothing about motion.
+NEUTRAL_PWM_VEHICLES = {"sub", "rover"}
+TIMED_LIST_KEYS = ("errors", "events", "mode_changes", "status_messages")
+
+
+def armed_intervals(
+    events: list[dict[str, Any]], start_us: float, end_us: float
+) -> list[tuple[float, float]]:
+    """ARMED/DISARMED event pairs as intervals; open ends are clamped to the log span."""
+    intervals = []
+    armed_at: Optional[float] = None
+    saw_event = False
+    for event in sorted(events, key=lambda item: item.get("time_us") or 0):
+        time_us = event.get("time_us")
+        if time_us is None:
+            continue
+        if event.get("id") == EV_ARMED:
+            saw_event = True
+            if armed_at is None:
+                armed_at = float(time_us)
+        elif event.get("id") == EV_DISARMED:
+            if armed_at is None and not saw_event:
+                # Log started while already armed.
+                armed_at = start_us
+            saw_event = True
+            if armed_at is not None:
+                intervals.append((armed_at, float(time_us)))
+                armed_at = None
+    if armed_at is not None:
+        intervals.append((armed_at, end_us))
+    return intervals
+
+
+def _series(msgs: list[dict], fields: tuple[str, ...]) -> tuple[np.ndarray, np.ndarray]:
+    """TimeUS vector and (n, len(fields)) value matrix for messages carrying TimeUS."""
+    rows = [msg for msg in msgs if msg.get("TimeUS") is not None]
+    times = np.array([msg["TimeUS"] for msg in rows], dtype=np.float64)
+    values = np.array(
+        [[float(msg.get(field) or 0.0) for field in fields] for msg in rows], dtype=np.float64
+    ).reshape(len(rows), len(fields))
+    return times, values
+
+
+def activity_mask(
+    parsed: dict[str, Any], origin_us: float, n_bins: int, bin_sec: float = BIN_SEC
+) -> tuple[np.ndarray, bool]:
+    """Per-bin "flying" mask from throttle output and GPS speed.
+
+    Returns the mask and whether any activity source was available; when
+    none was, callers should not trim on the mask.
+    """
+    messages = parsed.get("messages", {})
+    vehicle = str(parsed.get("metadata", {}).get("vehicle_type") or "Unknown").lower()
+    mask = np.zeros(n_bins, dtype=bool)
+    has_source = False
+
+    def mark(times: np.ndarray, active: np.ndarray) -> None:
+        bins = ((times[active] - origin_us) / (bin_sec * 1e6)).astype(np.int64)
+        mask[bins[(bins >= 0) & (bins < n_bins)]] = True
+
+    if vehicle not in NEUTRAL_PWM_VEHICLES:
+        # Copter motors are C1-C4; plane throttle is C3.
+        channels = ("C3",) if vehicle == "plane" else ("C1", "C2", "C3", "C4")
+        times, values = _series(messages.get("RCOU", []), channels)
+        if len(times):
+            has_source = True
+            mark(times, values.max(axis=1) >= ACTIVE_PWM)
+
+        times, values = _series(messages.get("CTUN", []), ("ThO",))
+        if len(times):
+            throttle = values[:, 0]
+            # Plane logs throttle in percent, copter as a 0-1 fraction.
+            if throttle.max() > 1.5:
+                throttle = throttle / 100.0
+            has_source = True
+            mark(times, throttle >= ACTIVE_THROTTLE)
+
+    times, values = _series(messages.get("GPS", []), ("Spd",))
+    if len(times):
+        has_source = True
+        mark(times, values[:, 0] >= ACTIVE_GPS_SPEED)
+    return mask, has_source
+
+
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """(n, 2) [start, end) bin index pairs of consecutive True runs."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.column_stack([np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)])
+
+
+def find_flight_segments(
+    parsed: dict[str, Any],
+    bin_sec: float = BIN_SEC,
+    pad_sec: float = PAD_SEC,
+    merge_gap_sec: float = MERGE_GAP_SEC,
+    min_segment_sec: float = MIN_SEGMENT_SEC,
+    index: Optional[_MessageIndex] = None,
+) -> list[dict[str, Any]]:
+    """Armed, in-flight intervals of a parsed log.
+
+    Each ARMED..DISARMED interval is trimmed to its first and last active
+    bin (throttle or GPS speed above the ground-idle limits, padded by
+    ``pad_sec``); arms without any active bin were ground-only and are
+    dropped. Without arm events, active runs closer than ``merge_gap_sec``
+    are merged instead. Logs with no usable signal yield a single
+    whole-log segment.
+    """
+    index = index or _MessageIndex(parsed.get("messages", {}))
+    span = index.span_us()
+    if span is None:
+        return []
+    start_us, end_us = span
+    bin_us = bin_sec * 1e6
+    n_bins = int((end_us - start_us) // bin_us) + 1
+    mask, has_source = activity_mask(parsed, start_us, n_bins, bin_sec)
+    pad_us = pad_sec * 1e6
+    bin_starts = start_us + np.arange(n_bins) * bin_us
+
+    candidates: list[tuple[float, float, str]] = []
+    arms = armed_intervals(parsed.get("events", []), start_us, end_us)
+    if arms:
+        for arm_start, arm_end in arms:
+            if not has_source:
+                candidates.append((arm_start, arm_end, "arm"))
+                continue
+            inside = np.flatnonzero(
+                mask & (bin_starts + bin_us > arm_start) & (bin_starts < arm_end)
+            )
+            if not len(inside):
+                continue
+            candidates.append(
+                (
+                    max(arm_start, bin_starts[inside[0]] - pad_us),
+                    min(arm_end, bin_starts[inside[-1]] + bin_us + pad_us),
+                    "arm",
+                )
+            )
+    elif has_source and mask.any():
+        runs = _runs(mask)
+        gaps = (runs[1:, 0] - runs[:-1, 1]) * bin_sec
+        # Start a new segment wherever the idle gap exceeds merge_gap_sec.
+        breaks = np.concatenate([[0], np.flatnonzero(gaps > merge_gap_sec) + 1, [len(runs)]])
+        for lo, hi in zip(breaks[:-1], breaks[1:]):
+            candidates.append(
+                (
+                    max(start_us, bin_starts[runs[lo, 0]] - pad_us),
+                    min(end_us, bin_starts[runs[hi - 1, 1] - 1] + bin_us + pad_us),
+                    "activity",
+                )
+            )
+    elif not has_source:
+        candidates.append((start_us, end_us, "log"))
+
+    segments = []
+    for seg_start, seg_end, source in candidates:
+        seg_start, seg_end = float(seg_start), float(seg_end)
+        if (seg_end - seg_start) / 1e6 < min_segment_sec:
+            continue
+        segments.append(
+            {
+                "index": len(segments),
+                "start_us": seg_start,
+                "end_us": seg_end,
+                "t_start": round((seg_start - start_us) / 1e6, 2),
+                "t_end": round((seg_end - start_us) / 1e6, 2),
+                "duration_sec": round((seg_end - seg_start) / 1e6, 2),
+                "source": source,
+            }
+        )
+    return segments
+
+
+def restrict_to_segments(
+    parsed: dict[str, Any], segments: list[dict[str, Any]], index: Optional[_MessageIndex] = None
+) -> dict[str, Any]:
+    """Copy of ``parsed`` holding only samples inside ``segments``.
+
+    Message lists are sliced by binary search; ``errors``/``events``/
+    ``mode_changes``/``status_messages`` are filtered on ``time_us``. The
+    metadata duration becomes the summed segment time.
+    """
+    index = index or _MessageIndex(parsed.get("messages", {}))
+    bounds = np.array(
+        [[seg["start_us"], seg["end_us"]] for seg in segments], dtype=np.float64
+    ).reshape(-1, 2)
+    messages: dict[str, list[dict]] = {}
+    for msg_type, (times, msgs) in index.timed.items():
+        lo = np.searchsorted(times, bounds[:, 0], side="left")
+        hi = np.searchsorted(times, bounds[:, 1], side="right")
+        selected: list[dict] = []
+        for a, b in zip(lo.tolist(), hi.tolist()):
+            selected.extend(msgs[a:b])
+        messages[msg_type] = selected
+    messages.update(index.untimed)
+
+    def inside(item: dict[str, Any]) -> bool:
+        time_us = item.get("time_us")
+        if time_us is None:
+            return True
+        return bool(np.any((bounds[:, 0] <= time_us) & (time_us <= bounds[:, 1])))
+
+    restricted = dict(parsed)
+    restricted["messages"] = messages
+    for key in TIMED_LIST_KEYS:
+        restricted[key] = [item for item in parsed.get(key, []) if inside(item)]
+    metadata = dict(parsed.get("metadata", {}))
+    metadata["duration_sec"] = float((bounds[:, 1] - bounds[:, 0]).sum()) / 1e6
+    restricted["metadata"] = metadata
+    return restricted
+
+
+class FlightSegmentAnalyzer:
+    """Diagnose each arm-to-disarm flight separately and the in-flight union.
+
+    Ground idle is cut before extraction, so every extractor only sees
+    in-flight samples. Per-segment feature sets start at the segment, which
+    re-anchors startup-relative logic (e.g. MotorExtractor's takeoff skip)
+    to each takeoff rather than to the start of the log.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[HybridEngine] = None,
+        pipeline: Optional[FeaturePipeline] = None,
+        use_ml: bool = True,
+    ):
+        self.engine = engine or HybridEngine()
+        self.pipeline = pipeline or FeaturePipeline()
+        self.use_ml = use_ml
+
+    def _diagnose(
+        self, features: FeatureDict, parsed: dict[str, Any]
+    ) -> tuple[list[DiagnosisDict], DiagnosisContext]:
+        context = DiagnosisContext(features, parsed)
+        if self.use_ml:
+            return self.engine.diagnose(features, context=context), context
+        return context.rule_results(self.engine.rules), context
+
+    def analyze(self, parsed: dict[str, Any]) -> dict[str, Any]:
+        """Return the segmentation report plus the in-flight ``parsed``/``features``.
+
+        ``parsed`` and ``features`` in the result are the in-flight union
+        (the whole log when no segment was found) and are meant to replace
+        the whole-log inputs for the rest of the analysis.
+        """
+        index = _MessageIndex(parsed.get("messages", {}))
+        segments = find_flight_segments(parsed, index=index)
+        span = index.span_us()
+        log_sec = (span[1] - span[0]) / 1e6 if span else 0.0
+
+        if not segments:
+            features = self.pipeline.extract(parsed)
+            diagnoses, context = self._diagnose(features, parsed)
+            return {
+                "segments": [],
+                "flight_sec": 0.0,
+                "ground_sec": round(log_sec, 2),
+                "aggregate": {
+                    "diagnoses": diagnoses,
+                    "decision": evaluate_decision(diagnoses),
+                    "by_label": {},
+                },
+                "parsed": parsed,
+                "features": features,
+                "context": context,
+            }
+
+        reports = []
+        segment_features: list[FeatureDict] = []
+        for segment in segments:
+            seg_parsed = restrict_to_segments(parsed, [segment], index=index)
+            features = self.pipeline.extract(seg_parsed)
+            diagnoses, _context = self._diagnose(features, seg_parsed)
+            segment_features.append(features)
+            reports.append(
+                dict(segment, diagnoses=diagnoses, decision=evaluate_decision(diagnoses))
+            )
+
+        flight_parsed = restrict_to_segments(parsed, segments, index=index)
+        # A single flight's features already cover the whole in-flight union.
+        flight_features = (
+            segment_features[0] if len(segments) == 1 else self.pipeline.extract(flight_parsed)
+        )
+        diagnoses, context = self._diagnose(flight_features, flight_parsed)
+
+        by_label: dict[str, dict[str, Any]] = {}
+        for report in reports:
+            for diag in report["diagnoses"]:
+                entry = by_label.setdefault(
+                    diag["failure_type"], {"segments": [], "max_confidence": 0.0}
+                )
+                entry["segments"].append(report["index"])
+                entry["max_confidence"] = max(
+                    entry["max_confidence"], round(float(diag["confidence"]), 4)
+                )
+
+        flight_sec = float(sum(segment["duration_sec"] for segment in segments))
+        return {
+            "segments": reports,
+            "flight_sec": round(flight_sec, 2),
+            "ground_sec": round(max(log_sec - flight_sec, 0.0), 2),
+            "aggregate": {
+                "diagnoses": diagnoses,
+                "decision": evaluate_decision(diagnoses),
+                "by_label": by_label,
+            },
+            "parsed": flight_parsed,
+            "features": flight_features,
+            "context": context,
+        }
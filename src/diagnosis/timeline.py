@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import numpy as np
+
+from src.constants import VALID_LABELS
+from src.contracts import FeatureDict
+from src.features.pipeline import FeaturePipeline
+
+from .context import DiagnosisContext, _safe_float
+from .hybrid_engine import MIN_MERGED_CONFIDENCE, HybridEngine
+
+
+WINDOW_SEC = 5.0
+WINDOW_OVERLAP = 0.5
+# Windows with fewer populated message families are treated as gaps.
+MIN_WINDOW_FAMILIES = 3
+TRACK_LABELS = [label for label in VALID_LABELS if label != "healthy"]
+
+
+class _MessageIndex:
+    """Sorted TimeUS arrays per message type for O(log n) window slicing."""
+
+    def __init__(self, messages: dict[str, list[dict]]):
+        self.timed: dict[str, tuple[np.ndarray, list[dict]]] = {}
+        self.untimed: dict[str, list[dict]] = {}
+        for msg_type, msgs in messages.items():
+            times = np.array(
+                [msg.get("TimeUS", msg.get("_timestamp")) for msg in msgs], dtype=np.float64
+            )
+            if not len(msgs) or np.isnan(times).any():
+                self.untimed[msg_type] = msgs
+                continue
+            if np.any(np.diff(times) < 0):
+                order = np.argsort(times, kind="stable")
+                times = times[order]
+                msgs = [msgs[i] for i in order]
+            self.timed[msg_type] = (times, msgs)
+
+    @property
+    def stream_start_us(self) -> dict[str, float]:
+        return {msg_type: float(times[0]) for msg_type, (times, _msgs) in self.timed.items()}
+
+    def span_us(self) -> tuple[float, float] | None:
+        if not self.timed:
+            return None
+        start = min(float(times[0]) for times, _msgs in self.timed.values())
+        end = max(float(times[-1]) for times, _msgs in self.timed.values())
+        return start, end
+
+    def slice(
+        self, start_us: float, end_us: float, inclusive_end: bool = False
+    ) -> dict[str, list[dict]]:
+        side = "right" if inclusive_end else "left"
+        window = {}
+        for msg_type, (times, msgs) in self.timed.items():
+            lo = int(np.searchsorted(times, start_us, side="left"))
+            hi = int(np.searchsorted(times, end_us, side=side))
+            window[msg_type] = msgs[lo:hi]
+        window.update(self.untimed)
+        return window
+
+
+def window_bounds(
+    start_us: float, end_us: float, window_sec: float = WINDOW_SEC, overlap: float = WINDOW_OVERLAP
+) -> np.ndarray:
+    """(n_windows, 2) start/end TimeUS grid covering ``[start_us, end_us]``.
+
+    Windows advance by ``window_sec * (1 - overlap)``; a final window is
+    aligned to ``end_us`` so the tail of the flight is always covered.
+    """
+    if not 0.0 <= overlap < 1.0:
+        raise ValueError("overlap must be in [0, 1)")
+    window_us = window_sec * 1e6
+    if end_us - start_us <= window_us:
+        return np.array([[start_us, end_us]], dtype=np.float64)
+
+    step_us = window_us * (1.0 - overlap)
+    starts = np.arange(start_us, end_us - window_us + 1.0, step_us)
+    if starts[-1] + window_us < end_us:
+        starts = np.append(starts, end_us - window_us)
+    return np.column_stack([starts, starts + window_us])
+
+
+class DiagnosisTimeline:
+    """Score a flight in overlapping windows and return per-label probability tracks.
+
+    Messages are sliced per window with binary search over per-type TimeUS
+    arrays, each window goes through the regular FeaturePipeline, and the
+    resulting (n_windows, n_features) matrix is scored in one batched call
+    for the ML classifier and the anomaly detector. Rules run per window.
+
+    Each track value uses the HybridEngine fusion weights on the raw ML
+    probability (not the per-label decision threshold), so the tracks are
+    continuous; arbitration and the ML context filter are not applied.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[HybridEngine] = None,
+        pipeline: Optional[FeaturePipeline] = None,
+        window_sec: float = WINDOW_SEC,
+        overlap: float = WINDOW_OVERLAP,
+        use_ml: bool = True,
+    ):
+        self.engine = engine or HybridEngine()
+        self.pipeline = pipeline or FeaturePipeline()
+        self.window_sec = float(window_sec)
+        self.overlap = float(overlap)
+        self.use_ml = use_ml
+
+    def window_features(
+        self, parsed: dict[str, Any]
+    ) -> tuple[np.ndarray, list[FeatureDict], np.ndarray]:
+        """Return window bounds, per-window feature dicts and a validity mask."""
+        index = _MessageIndex(parsed.get("messages", {}))
+        span = index.span_us()
+        if span is None:
+            return np.zeros((0, 2)), [], np.zeros(0, dtype=bool)
+
+        bounds = window_bounds(span[0], span[1], self.window_sec, self.overlap)
+        metadata = dict(parsed.get("metadata", {}))
+        metadata["stream_start_us"] = index.stream_start_us
+        parameters = parsed.get("parameters", {})
+
+        window_features: list[FeatureDict] = []
+        valid = np.zeros(len(bounds), dtype=bool)
+        for row, (start_us, end_us) in enumerate(bounds):
+            messages = index.slice(start_us, end_us, inclusive_end=row == len(bounds) - 1)
+            valid[row] = sum(1 for msgs in messages.values() if msgs) >= MIN_WINDOW_FAMILIES
+            window_meta = dict(metadata)
+            window_meta["duration_sec"] = float(end_us - start_us) / 1e6
+            window_features.append(
+                self.pipeline.extract(
+                    {"metadata": window_meta, "messages": messages, "parameters": parameters}
+                )
+            )
+        return bounds, window_features, valid
+
+    def _rule_matrix(self, window_features: list[FeatureDict], valid: np.ndarray) -> np.ndarray:
+        label_index = {label: i for i, label in enumerate(TRACK_LABELS)}
+        R = np.zeros((len(window_features), len(TRACK_LABELS)))
+        for row, features in enumerate(window_features):
+            if not valid[row]:
+                continue
+            # Same last-wins behaviour as HybridEngine's rule dict.
+            rule_dict = {d["failure_type"]: d for d in self.engine.rules.diagnose(features)}
+            for label, diag in rule_dict.items():
+                if label in label_index:
+                    R[row, label_index[label]] = float(diag.get("confidence", 0.0))
+        return R
+
+    def _ml_matrices(self, window_features: list[FeatureDict]) -> tuple[np.ndarray, np.ndarray]:
+        ml = self.engine.ml
+        P = np.zeros((len(window_features), len(TRACK_LABELS)))
+        anomaly = np.zeros(0)
+        if (
+            not self.use_ml
+            or not getattr(ml, "available", False)
+            or not hasattr(ml, "label_probabilities")
+        ):
+            return P, anomaly
+
+        columns = list(ml.feature_columns)
+        X = np.array(
+            [
+                [_safe_float(features.get(name, 0.0)) for name in columns]
+                for features in window_features
+            ],
+            dtype=np.float64,
+        ).reshape(len(window_features), len(columns))
+        probs = ml.label_probabilities(X)
+        for col, label in enumerate(ml.label_columns):
+            if label in TRACK_LABELS:
+                P[:, TRACK_LABELS.index(label)] = probs[:, col]
+
+        detector = self.engine.anomaly_detector
+        if getattr(detector, "available", False) and hasattr(detector, "score_batch"):
+            anomaly = detector.score_batch(X, columns)["anomaly_score"]
+        return P, anomaly
+
+    def analyze(
+        self, parsed: dict[str, Any], context: Optional[DiagnosisContext] = None
+    ) -> dict[str, Any]:
+        """Per-window tracks plus the first window where each label crosses
+        ``MIN_MERGED_CONFIDENCE``. When ``context`` is given the onsets are
+        stored on it so ``HybridEngine`` arbitrates on windowed onsets.
+        """
+        bounds, window_features, valid = self.window_features(parsed)
+        R = self._rule_matrix(window_features, valid)
+        P, anomaly = self._ml_matrices(window_features)
+
+        both = (R > 0) & (P > 0)
+        tracks = np.where(both, 0.65 * P + 0.35 * R, np.where(P > 0, 0.85 * P, 0.85 * R))
+        tracks = np.minimum(tracks, 1.0)
+        tracks[~valid] = 0.0
+
+        origin_us = float(bounds[0, 0]) if len(bounds) else 0.0
+        t_start = (bounds[:, 0] - origin_us) / 1e6
+        onsets: dict[str, dict[str, float]] = {}
+        for col, label in enumerate(TRACK_LABELS):
+            hits = np.flatnonzero(tracks[:, col] >= MIN_MERGED_CONFIDENCE)
+            if not len(hits):
+                continue
+            peak = int(np.argmax(tracks[:, col]))
+            onsets[label] = {
+                "time_us": float(bounds[hits[0], 0]),
+                "t_sec": round(float(t_start[hits[0]]), 2),
+                "peak_confidence": round(float(tracks[peak, col]), 4),
+                "peak_time_us": float(bounds[peak, 0]),
+                "peak_t_sec": round(float(t_start[peak]), 2),
+            }
+
+        if context is not None:
+            context.onsets_us = {label: onset["time_us"] for label, onset in onsets.items()}
+
+        return {
+            "window_sec": self.window_sec,
+            "overlap": self.overlap,
+            "start_time_us": origin_us,
+            "t_start": [round(float(t), 2) for t in t_start],
+            "t_end": [round(float(t), 2) for t in (bounds[:, 1] - origin_us) / 1e6],
+            "valid": valid.tolist(),
+            "tracks": {
+                label: [round(float(v), 4) for v in tracks[:, col]]
+                for col, label in enumerate(TRACK_LABELS)
+                if tracks[:, col].any()
+            },
+            "anomaly_score": [round(float(v), 4) for v in anomaly],
+            "onsets": onsets,
+        }
@@ -0,0 +1,42 @@
+"""Fast preliminary verdict from a partial decode, superseded by the full analysis."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Optional
+
+from src.diagnosis.context import DiagnosisContext
+from src.diagnosis.decision_policy import evaluate_decision
+from src.diagnosis.rule_engine import RuleEngine
+from src.features.pipeline import FeaturePipeline
+from src.parser.bin_parser import TRIAGE_SAMPLE_EVERY, LogParser
+
+
+def run_triage(
+    filepath: str,
+    sample_every: int = TRIAGE_SAMPLE_EVERY,
+    pipeline: Optional[FeaturePipeline] = None,
+    engine: Optional[RuleEngine] = None,
+) -> dict[str, Any]:
+    """Rule-engine verdict on ``LogParser.parse_triage`` output.
+
+    High-rate families are sampled, so rate- and count-based features are
+    approximate; the result always carries ``partial: True`` and should be
+    replaced by the full analysis once that finishes.
+    """
+    started = time.perf_counter()
+    parsed = LogParser(filepath).parse_triage(sample_every=sample_every)
+    features = (pipeline or FeaturePipeline()).extract(parsed)
+    context = DiagnosisContext(features, parsed)
+    diagnoses = context.rule_results(engine or RuleEngine())
+    return {
+        "partial": True,
+        "engine": "rule",
+        "sample_every": sample_every,
+        "decoded_messages": parsed["metadata"].get("triage", {}).get("decoded_messages", 0),
+        "total_messages": parsed["metadata"].get("total_messages", 0),
+        "extraction_success": features.get("_metadata", {}).get("extraction_success", True),
+        "diagnoses": diagnoses,
+        "decision": evaluate_decision(diagnoses),
+        "elapsed_sec": round(time.perf_counter() - started, 4),
+    }
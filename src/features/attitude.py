@@ -36,9 +36,7 @@ class AttitudeExtractor(BaseExtractor):
         time_to_crash = -1.0  # -1 means no crash detected
 
         if att_msgs:
-            first_t = float(
-                att_msgs[0].get("TimeUS", att_msgs[0].get("_timestamp", 0.0))
-            )
+            first_t = self._stream_start("ATT", att_msgs)
             five_sec = first_t + 5_000_000  # 5 seconds in microseconds
 
             for msg in att_msgs:
@@ -9,9 +9,14 @@ class BaseExtractor(ABC):
     FEATURE_PREFIX: str = ""
     FEATURE_NAMES: list = []
 
-    def __init__(self, messages: dict, parameters: dict):
+    def __init__(
+        self, messages: dict, parameters: dict, stream_start_us: Optional[dict] = None
+    ):
         self.messages = messages
         self.parameters = parameters
+        # First TimeUS per message type in the full log. Set when extracting a
+        # time window so startup-relative logic stays anchored to the flight.
+        self.stream_start_us = stream_start_us or {}
 
     @abstractmethod
     def extract(self) -> dict:
@@ -91,6 +96,12 @@ class BaseExtractor(ABC):
             res["tanomaly"] = -1.0
         return res
 
+    def _stream_start(self, msg_type: str, msgs: list) -> float:
+        """First timestamp of ``msg_type`` in the log (not just in ``msgs``)."""
+        if msg_type in self.stream_start_us:
+            return float(self.stream_start_us[msg_type])
+        return float(msgs[0].get("TimeUS", msgs[0].get("_timestamp", 0.0)))
+
     def _safe_value(self, msg: dict, field: str, default=0.0):
         """Safely get field from message dictionary."""
         val = msg.get(field, default)
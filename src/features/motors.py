@@ -64,9 +64,7 @@ class MotorExtractor(BaseExtractor):
         else:
             # Skip the first 10 seconds of flight (arm/takeoff transients)
             # to avoid false tanomaly triggers at motor startup
-            first_t = float(
-                rcou_msgs[0].get("TimeUS", rcou_msgs[0].get("_timestamp", 0.0))
-            )
+            first_t = self._stream_start("RCOU", rcou_msgs)
             skip_until = first_t + 10_000_000  # 10 seconds in microseconds
 
             for msg in rcou_msgs:
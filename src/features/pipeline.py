@@ -62,11 +62,13 @@ class FeaturePipeline:
         parameters = parsed_log.get("parameters", {})
         vehicle_type = parsed_log.get("metadata", {}).get("vehicle_type", "Unknown")
 
+        stream_start_us = parsed_log.get("metadata", {}).get("stream_start_us")
+
         evt_auto_labels = []
         active_extractors = self._extractors_for_vehicle(vehicle_type)
 
         for ExtractorClass in active_extractors:
-            extractor = ExtractorClass(messages, parameters)
+            extractor = ExtractorClass(messages, parameters, stream_start_us)
             if extractor.has_data():
                 features = extractor.extract()
                 if "_evt_auto_labels" in features:
@@ -1,10 +1,18 @@
 import logging
-from typing import cast
+from typing import Optional, cast
+
+import numpy as np
 from pymavlink import DFReader
 from src.constants import ERR_SUBSYSTEM_MAP, ERR_AUTO_LABEL_MAP, MODE_NAMES, EV_NAMES
 from src.contracts import ParsedLog
 
 
+# Fast triage (LogParser.parse_triage): low-rate families decoded in full,
+# every TRIAGE_SAMPLE_EVERY-th message of the remaining interesting types.
+TRIAGE_FULL_TYPES = frozenset({"ERR", "EV", "MODE", "MSG", "PARM", "VIBE", "BAT", "GPS"})
+TRIAGE_SAMPLE_EVERY = 10
+
+
 class LogParser:
     INTERESTING_MESSAGE_TYPES = {
         "VIBE",
@@ -65,15 +73,11 @@ class LogParser:
             return "Sub"
         return "Unknown"
 
-    def parse(self) -> ParsedLog:
-        """
-        Parse entire .BIN file.
-        Returns a dict containing metadata, messages, parameters, errors, events,
-        mode_changes, and status_messages.
-        """
-        parsed_data = cast(ParsedLog, {
+    @staticmethod
+    def _empty_result(filepath: str) -> ParsedLog:
+        return cast(ParsedLog, {
             "metadata": {
-                "filepath": self.filepath,
+                "filepath": filepath,
                 "duration_sec": 0.0,
                 "vehicle_type": "Unknown",
                 "firmware_version": "Unknown",
@@ -88,6 +92,105 @@ class LogParser:
             "status_messages": [],
         })
 
+    def _ingest(self, parsed_data: ParsedLog, msg) -> Optional[int]:
+        """Fold one decoded message into ``parsed_data``; return its TimeUS."""
+        msg_type = msg.get_type()
+
+        # Metadata
+        parsed_data["metadata"]["total_messages"] += 1
+        parsed_data["metadata"]["message_types"][msg_type] = (
+            parsed_data["metadata"]["message_types"].get(msg_type, 0) + 1
+        )
+
+        time_us = getattr(msg, "TimeUS", None)
+
+        if msg_type in self.INTERESTING_MESSAGE_TYPES:
+            if msg_type not in parsed_data["messages"]:
+                parsed_data["messages"][msg_type] = []
+
+            # Convert message fields to Python native types (dictionary)
+            msg_dict = msg.to_dict()
+            parsed_data["messages"][msg_type].append(msg_dict)
+        else:
+            msg_dict = None
+
+        if msg_type == "MSG" and msg_dict:
+            message_text = msg_dict.get("Message", "")
+            parsed_data["status_messages"].append(
+                {"time_us": time_us, "message": message_text}
+            )
+            vehicle_type, firmware_version = self._vehicle_from_message(
+                message_text
+            )
+            if vehicle_type != "Unknown":
+                parsed_data["metadata"]["vehicle_type"] = vehicle_type
+            if firmware_version:
+                parsed_data["metadata"]["firmware_version"] = firmware_version
+        elif msg_type == "PARM" and msg_dict:
+            name = msg_dict.get("Name")
+            value = msg_dict.get("Value")
+            if name is not None and value is not None:
+                parsed_data["parameters"][name] = (
+                    float(value) if isinstance(value, (int, float)) else value
+                )
+        elif msg_type == "ERR" and msg_dict:
+            subsys = msg_dict.get("Subsys", 0)
+            ecode = msg_dict.get("ECode", 0)
+            subsys_name = ERR_SUBSYSTEM_MAP.get(subsys, f"UNKNOWN_{subsys}")
+            auto_label = ERR_AUTO_LABEL_MAP.get(subsys)
+            if subsys == 11 and ecode != 2:
+                auto_label = None  # special condition for GPS
+            parsed_data["errors"].append(
+                {
+                    "time_us": time_us,
+                    "subsystem": subsys,
+                    "subsystem_name": subsys_name,
+                    "code": ecode,
+                    "auto_label": auto_label,
+                }
+            )
+        elif msg_type == "EV" and msg_dict:
+            ev_id = msg_dict.get("Id", 0)
+            ev_name = EV_NAMES.get(ev_id, f"EVENT_{ev_id}")
+            parsed_data["events"].append(
+                {"time_us": time_us, "id": ev_id, "name": ev_name}
+            )
+        elif msg_type == "MODE" and msg_dict:
+            mode_num = msg_dict.get("ModeNum", msg_dict.get("Mode", 0))
+            reason = msg_dict.get("Reason", 0)
+            mode_name = MODE_NAMES.get(mode_num, f"MODE_{mode_num}")
+            parsed_data["mode_changes"].append(
+                {
+                    "time_us": time_us,
+                    "mode": mode_num,
+                    "mode_name": mode_name,
+                    "reason": reason,
+                }
+            )
+
+        return time_us
+
+    def _finish(
+        self, parsed_data: ParsedLog, first_time: Optional[int], last_time: Optional[int]
+    ) -> ParsedLog:
+        if first_time is not None and last_time is not None and last_time > first_time:
+            parsed_data["metadata"]["duration_sec"] = (last_time - first_time) / 1e6
+
+        if parsed_data["metadata"]["vehicle_type"] == "Unknown":
+            parsed_data["metadata"]["vehicle_type"] = self._vehicle_from_parameters(
+                parsed_data["parameters"]
+            )
+
+        return cast(ParsedLog, parsed_data)
+
+    def parse(self) -> ParsedLog:
+        """
+        Parse entire .BIN file.
+        Returns a dict containing metadata, messages, parameters, errors, events,
+        mode_changes, and status_messages.
+        """
+        parsed_data = self._empty_result(self.filepath)
+
         try:
             log = DFReader.DFReader_binary(self.filepath)
         except Exception as e:
@@ -103,95 +206,79 @@ class LogParser:
                 if msg is None:
                     break
 
-                msg_type = msg.get_type()
-
-                # Metadata
-                parsed_data["metadata"]["total_messages"] += 1
-                parsed_data["metadata"]["message_types"][msg_type] = (
-                    parsed_data["metadata"]["message_types"].get(msg_type, 0) + 1
-                )
-
-                time_us = getattr(msg, "TimeUS", None)
+                time_us = self._ingest(parsed_data, msg)
                 if time_us is not None:
                     if first_time is None:
                         first_time = time_us
                     last_time = time_us
 
-                if msg_type in self.INTERESTING_MESSAGE_TYPES:
-                    if msg_type not in parsed_data["messages"]:
-                        parsed_data["messages"][msg_type] = []
-
-                    # Convert message fields to Python native types (dictionary)
-                    msg_dict = msg.to_dict()
-                    parsed_data["messages"][msg_type].append(msg_dict)
-                else:
-                    msg_dict = None
-
-                if msg_type == "MSG" and msg_dict:
-                    message_text = msg_dict.get("Message", "")
-                    parsed_data["status_messages"].append(
-                        {"time_us": time_us, "message": message_text}
-                    )
-                    vehicle_type, firmware_version = self._vehicle_from_message(
-                        message_text
-                    )
-                    if vehicle_type != "Unknown":
-                        parsed_data["metadata"]["vehicle_type"] = vehicle_type
-                    if firmware_version:
-                        parsed_data["metadata"]["firmware_version"] = firmware_version
-                elif msg_type == "PARM" and msg_dict:
-                    name = msg_dict.get("Name")
-                    value = msg_dict.get("Value")
-                    if name is not None and value is not None:
-                        parsed_data["parameters"][name] = (
-                            float(value) if isinstance(value, (int, float)) else value
-                        )
-                elif msg_type == "ERR" and msg_dict:
-                    subsys = msg_dict.get("Subsys", 0)
-                    ecode = msg_dict.get("ECode", 0)
-                    subsys_name = ERR_SUBSYSTEM_MAP.get(subsys, f"UNKNOWN_{subsys}")
-                    auto_label = ERR_AUTO_LABEL_MAP.get(subsys)
-                    if subsys == 11 and ecode != 2:
-                        auto_label = None  # special condition for GPS
-                    parsed_data["errors"].append(
-                        {
-                            "time_us": time_us,
-                            "subsystem": subsys,
-                            "subsystem_name": subsys_name,
-                            "code": ecode,
-                            "auto_label": auto_label,
-                        }
-                    )
-                elif msg_type == "EV" and msg_dict:
-                    ev_id = msg_dict.get("Id", 0)
-                    ev_name = EV_NAMES.get(ev_id, f"EVENT_{ev_id}")
-                    parsed_data["events"].append(
-                        {"time_us": time_us, "id": ev_id, "name": ev_name}
-                    )
-                elif msg_type == "MODE" and msg_dict:
-                    mode_num = msg_dict.get("ModeNum", msg_dict.get("Mode", 0))
-                    reason = msg_dict.get("Reason", 0)
-                    mode_name = MODE_NAMES.get(mode_num, f"MODE_{mode_num}")
-                    parsed_data["mode_changes"].append(
-                        {
-                            "time_us": time_us,
-                            "mode": mode_num,
-                            "mode_name": mode_name,
-                            "reason": reason,
-                        }
-                    )
-
         except Exception as e:
             self.logger.warning(
                 f"Error or log truncated while reading messages from {self.filepath}: {e}"
             )
 
-        if first_time is not None and last_time is not None and last_time > first_time:
-            parsed_data["metadata"]["duration_sec"] = (last_time - first_time) / 1e6
+        return self._finish(parsed_data, first_time, last_time)
 
-        if parsed_data["metadata"]["vehicle_type"] == "Unknown":
-            parsed_data["metadata"]["vehicle_type"] = self._vehicle_from_parameters(
-                parsed_data["parameters"]
-            )
+    def parse_triage(self, sample_every: int = TRIAGE_SAMPLE_EVERY) -> ParsedLog:
+        """
+        Fast partial parse for a preliminary verdict.
 
-        return cast(ParsedLog, parsed_data)
+        Uses the DFReader type index to decode only ``TRIAGE_FULL_TYPES`` in
+        full and every ``sample_every``-th message of the other interesting
+        (high-rate) types, in file order. Message counts in the metadata come
+        from the index and are exact; ``metadata["triage"]`` marks the result
+        as partial.
+        """
+        parsed_data = self._empty_result(self.filepath)
+
+        try:
+            log = DFReader.DFReader_binary(self.filepath)
+        except Exception as e:
+            self.logger.error(f"Failed to open log file {self.filepath}: {e}")
+            return cast(ParsedLog, parsed_data)
+        if not hasattr(log, "offsets") or not hasattr(log, "counts"):
+            # No type index on this DFReader; a full parse is the honest answer.
+            return self.parse()
+
+        offsets = []
+        message_types: dict[str, int] = {}
+        for type_id, count in enumerate(log.counts):
+            name = log.id_to_name.get(type_id)
+            if not count or name is None:
+                continue
+            message_types[name] = int(count)
+            if name in TRIAGE_FULL_TYPES:
+                offsets.append(np.asarray(log.offsets[type_id][:count]))
+            elif name in self.INTERESTING_MESSAGE_TYPES:
+                offsets.append(
+                    np.asarray(log.offsets[type_id][:count])[:: max(1, int(sample_every))]
+                )
+
+        first_time = None
+        last_time = None
+        decoded = 0
+        try:
+            for offset in np.sort(np.concatenate(offsets)) if offsets else []:
+                log.offset = int(offset)
+                log.remaining = log.data_len - log.offset
+                msg = log.recv_msg()
+                if msg is None:
+                    continue
+                decoded += 1
+                time_us = self._ingest(parsed_data, msg)
+                if time_us is not None:
+                    first_time = time_us if first_time is None else min(first_time, time_us)
+                    last_time = time_us if last_time is None else max(last_time, time_us)
+        except Exception as e:
+            self.logger.warning(f"Error during triage parse of {self.filepath}: {e}")
+
+        # _ingest only counted decoded messages; the index counts are exact.
+        metadata = parsed_data["metadata"]
+        metadata["message_types"] = message_types
+        metadata["total_messages"] = sum(message_types.values())
+        metadata["triage"] = {
+            "partial": True,
+            "sample_every": int(sample_every),
+            "decoded_messages": decoded,
+        }
+        return self._finish(parsed_data, first_time, last_time)
@@ -0,0 +1,126 @@
+"""Incremental DataFlash (.BIN) decoding for logs that arrive in chunks.
+
+``StreamingLogDecoder`` accepts the log a chunk at a time and folds every
+complete message into the same ``ParsedLog`` structure ``LogParser.parse``
+produces, so decoding can overlap with an upload instead of starting after
+it. Of the raw bytes, only one partial message is buffered between chunks;
+the decoded messages themselves accumulate in memory as they would with
+``LogParser``.
+
+Framing and field decoding follow pymavlink's ``DFReader_binary``: messages
+start with ``0xA3 0x95 <type>``, ``FMT`` messages define the layout of later
+types, and unknown types or undecodable bodies are skipped by resyncing on
+the next header.
+"""
+
+from __future__ import annotations
+
+import array
+import logging
+import struct
+from typing import Optional
+
+from pymavlink.DFReader import DFFormat, DFMessage, null_term
+
+from src.contracts import ParsedLog
+from src.parser.bin_parser import LogParser
+
+
+HEAD = b"\xa3\x95"
+FMT_TYPE = 0x80
+
+
+class StreamingLogDecoder:
+    """Feed a .BIN log with ``feed(chunk)``; ``finish()`` returns the ``ParsedLog``."""
+
+    def __init__(self, filepath: str = "<stream>"):
+        self.logger = logging.getLogger(__name__)
+        self._parser = LogParser(filepath)
+        self._parsed = LogParser._empty_result(filepath)
+        self._formats = {
+            FMT_TYPE: DFFormat(FMT_TYPE, "FMT", 89, "BBnNZ", "Type,Length,Name,Format,Columns")
+        }
+        self._unpackers: dict[int, struct.Struct] = {}
+        self._buffer = bytearray()
+        self._first_time: Optional[int] = None
+        self._last_time: Optional[int] = None
+        self._failed = False
+        self.bytes_received = 0
+        self.messages_decoded = 0
+
+    def feed(self, chunk: bytes) -> int:
+        """Decode every message completed by ``chunk``; returns how many were decoded."""
+        self.bytes_received += len(chunk)
+        if self._failed:
+            return 0
+        self._buffer += chunk
+        before = self.messages_decoded
+        try:
+            consumed = self._decode()
+        except Exception as e:
+            # Same contract as LogParser.parse: keep what was decoded so far.
+            self.logger.warning(f"Error while streaming messages from {self._parser.filepath}: {e}")
+            self._failed = True
+            self._buffer.clear()
+            return self.messages_decoded - before
+        del self._buffer[:consumed]
+        return self.messages_decoded - before
+
+    def finish(self) -> ParsedLog:
+        """Finalise metadata; a trailing partial message is dropped, as DFReader does."""
+        self._buffer.clear()
+        return self._parser._finish(self._parsed, self._first_time, self._last_time)
+
+    def _decode(self) -> int:
+        buf = self._buffer
+        size = len(buf)
+        offset = 0
+        while size - offset >= 3:
+            msg_type = buf[offset + 2]
+            if buf[offset] != 0xA3 or buf[offset + 1] != 0x95 or msg_type not in self._formats:
+                next_header = buf.find(HEAD, offset + 1)
+                if next_header < 0:
+                    # Keep a trailing 0xA3 in case the header continues in the next chunk.
+                    return size - 1 if buf[size - 1] == 0xA3 else size
+                offset = next_header
+                continue
+
+            fmt = self._formats[msg_type]
+            end = offset + fmt.len
+            if end > size:
+                break
+            unpacker = self._unpackers.get(msg_type)
+            if unpacker is None:
+                unpacker = self._unpackers[msg_type] = struct.Struct(fmt.msg_struct)
+            try:
+                elements = list(unpacker.unpack_from(buf, offset + 3))
+            except struct.error:
+                offset += 3
+                continue
+            for a_index in fmt.a_indexes:
+                elements[a_index] = array.array("h", elements[a_index])
+
+            if msg_type == FMT_TYPE:
+                try:
+                    ftype = elements[0]
+                    self._formats[ftype] = DFFormat(
+                        ftype,
+                        null_term(elements[2]),
+                        elements[1],
+                        null_term(elements[3]),
+                        null_term(elements[4]),
+                        oldfmt=self._formats.get(ftype),
+                    )
+                    self._unpackers.pop(ftype, None)
+                except Exception:
+                    offset += 3
+                    continue
+
+            offset = end
+            self.messages_decoded += 1
+            time_us = self._parser._ingest(self._parsed, DFMessage(fmt, elements, True, None))
+            if time_us is not None:
+                if self._first_time is None:
+                    self._first_time = time_us
+                self._last_time = time_us
+        return offset
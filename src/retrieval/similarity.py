@@ -1,73 +1,249 @@
+import hashlib
 import json
 import os
+
 import numpy as np
-from scipy.spatial.distance import cosine
+
 from src.constants import FEATURE_NAMES
 from src.runtime_paths import KNOWN_FAILURES_PATH, resolve_repo_path
 
 
+MIN_SIMILARITY = 0.5
+# Above this many cases the index switches to random-projection LSH by default.
+APPROXIMATE_MIN_CASES = 50_000
+LSH_TABLES = 8
+LSH_BITS = 12
+LSH_SEED = 1729
+
+
+def _safe_float(value) -> float:
+    if value is None:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _normalized_vector(features: dict) -> np.ndarray:
+    vector = np.array([_safe_float(features.get(k, 0.0)) for k in FEATURE_NAMES], dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if norm == 0 or not np.isfinite(norm):
+        return np.zeros(len(FEATURE_NAMES), dtype=np.float32)
+    return vector / norm
+
+
 class FailureRetrieval:
-    """Match new logs against database of known failures."""
+    """Match new logs against database of known failures.
 
-    def __init__(self, known_failures_path: str | os.PathLike[str] | None = None):
+    Cases live in ``known_failures.json`` plus an append-only journal
+    (``known_failures.journal.jsonl``). Query vectors are matched against a
+    unit-normalised float32 matrix stored in a binary sidecar
+    (``known_failures.vectors.f32``) that is memory-mapped on load, so an exact
+    top-k query is a single matrix-vector product. For very large libraries an
+    approximate random-projection LSH index narrows the candidate set first.
+    """
+
+    def __init__(
+        self,
+        known_failures_path: str | os.PathLike[str] | None = None,
+        approximate: bool | None = None,
+    ):
         resolved_path = (
             resolve_repo_path(known_failures_path) if known_failures_path is not None else KNOWN_FAILURES_PATH
         )
         self.known_failures_path = str(resolved_path)
+        stem = os.path.splitext(self.known_failures_path)[0]
+        self.journal_path = f"{stem}.journal.jsonl"
+        self.vectors_path = f"{stem}.vectors.f32"
+        self.index_meta_path = f"{stem}.index.json"
+
         self.known = self._load()
         self.scaler = None
+        self._approximate_setting = approximate
+        self._appended: list[np.ndarray] = []
+        self._matrix = self._load_matrix()
+        self._lsh_planes: np.ndarray | None = None
+        self._lsh_buckets: list[dict[int, list[int]]] = []
 
     def _load(self):
+        known = {"failures": []}
+        self._source_hash = ""
         if os.path.exists(self.known_failures_path):
             try:
-                with open(self.known_failures_path, "r") as f:
-                    return json.load(f)
+                with open(self.known_failures_path, "rb") as f:
+                    payload = f.read()
+                self._source_hash = hashlib.sha256(payload).hexdigest()
+                known = json.loads(payload)
             except Exception:
-                return {"failures": []}
-        return {"failures": []}
+                known = {"failures": []}
+        known.setdefault("failures", [])
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        known["failures"].append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn final line from an interrupted append is ignored.
+                        continue
+        return known
 
     def _save(self):
         os.makedirs(os.path.dirname(self.known_failures_path), exist_ok=True)
-        with open(self.known_failures_path, "w") as f:
-            json.dump(self.known, f, indent=2)
+        payload = json.dumps(self.known, indent=2).encode()
+        with open(self.known_failures_path, "wb") as f:
+            f.write(payload)
+        self._source_hash = hashlib.sha256(payload).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Vector index
+    # ------------------------------------------------------------------
+
+    def _index_meta(self) -> dict:
+        return {
+            "feature_schema_hash": hashlib.sha256(json.dumps(FEATURE_NAMES).encode()).hexdigest(),
+            "source_sha256": self._source_hash,
+            "dim": len(FEATURE_NAMES),
+        }
+
+    def _write_index_meta(self) -> None:
+        with open(self.index_meta_path, "w") as f:
+            json.dump(self._index_meta(), f)
+
+    def _index_is_current(self, n_cases: int) -> bool:
+        if not (os.path.exists(self.vectors_path) and os.path.exists(self.index_meta_path)):
+            return False
+        try:
+            with open(self.index_meta_path, "r") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        row_bytes = 4 * len(FEATURE_NAMES)
+        return (
+            meta == self._index_meta()
+            and os.path.getsize(self.vectors_path) == n_cases * row_bytes
+        )
 
-    def find_similar(self, features: dict, top_k: int = 3) -> list:
-        if not self.known.get("failures"):
+    def _load_matrix(self) -> np.ndarray:
+        cases = self.known.get("failures", [])
+        dim = len(FEATURE_NAMES)
+        if self._index_is_current(len(cases)):
+            if not cases:
+                return np.zeros((0, dim), dtype=np.float32)
+            return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(cases), dim))
+
+        matrix = np.zeros((len(cases), dim), dtype=np.float32)
+        for row, case in enumerate(cases):
+            matrix[row] = _normalized_vector(case.get("features", {}))
+        try:
+            with open(self.vectors_path, "wb") as f:
+                f.write(matrix.tobytes())
+            self._write_index_meta()
+        except OSError:
+            # Read-only model directories still work; the index stays in memory.
+            pass
+        return matrix
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._appended:
+            self._matrix = np.vstack([np.asarray(self._matrix), *self._appended])
+            self._appended = []
+        return self._matrix
+
+    @property
+    def approximate(self) -> bool:
+        if self._approximate_setting is not None:
+            return self._approximate_setting
+        return len(self.known.get("failures", [])) >= APPROXIMATE_MIN_CASES
+
+    def _lsh_codes(self, vectors: np.ndarray) -> np.ndarray:
+        """(n_tables, n_rows) integer bucket codes from random hyperplane signs."""
+        assert self._lsh_planes is not None
+        projections = np.einsum("tbd,nd->tnb", self._lsh_planes, vectors)
+        weights = (1 << np.arange(LSH_BITS, dtype=np.int64))
+        return ((projections > 0).astype(np.int64) * weights).sum(axis=2)
+
+    def _build_lsh(self) -> None:
+        rng = np.random.default_rng(LSH_SEED)
+        self._lsh_planes = rng.standard_normal((LSH_TABLES, LSH_BITS, len(FEATURE_NAMES))).astype(
+            np.float32
+        )
+        self._lsh_buckets = [{} for _ in range(LSH_TABLES)]
+        matrix = self.matrix
+        if len(matrix):
+            self._add_to_lsh(np.asarray(matrix), 0)
+
+    def _add_to_lsh(self, vectors: np.ndarray, first_row: int) -> None:
+        codes = self._lsh_codes(vectors)
+        rows = np.arange(first_row, first_row + len(vectors))
+        for table, buckets in enumerate(self._lsh_buckets):
+            order = np.argsort(codes[table], kind="stable")
+            unique_codes, starts = np.unique(codes[table][order], return_index=True)
+            for code, members in zip(unique_codes, np.split(rows[order], starts[1:])):
+                buckets.setdefault(int(code), []).extend(members.tolist())
+
+    def _candidate_rows(self, query: np.ndarray) -> np.ndarray | None:
+        if self._lsh_planes is None:
+            self._build_lsh()
+        codes = self._lsh_codes(query[None, :])[:, 0]
+        rows: set[int] = set()
+        for table, buckets in enumerate(self._lsh_buckets):
+            rows.update(buckets.get(int(codes[table]), ()))
+        if not rows:
+            return None
+        return np.fromiter(rows, dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def find_similar(self, features: dict, top_k: int = 3, context=None) -> list:
+        """Top-k known cases with cosine similarity above ``MIN_SIMILARITY``.
+
+        ``context`` is an optional ``DiagnosisContext`` whose memoised query
+        vector is reused instead of re-normalising ``features``.
+        """
+        cases = self.known.get("failures", [])
+        if not cases:
             return []
 
-        vector = np.array([float(features.get(k, 0.0)) for k in FEATURE_NAMES])
-        norm_v = np.linalg.norm(vector)
-        if norm_v == 0:
+        query = context.retrieval_vector() if context is not None else _normalized_vector(features)
+        if not query.any():
             return []
 
-        results = []
-        for case in self.known["failures"]:
-            k_feats = case.get("features", {})
-            k_vector = np.array([float(k_feats.get(k, 0.0)) for k in FEATURE_NAMES])
-            norm_k = np.linalg.norm(k_vector)
+        matrix = self.matrix
+        rows = None
+        if self.approximate:
+            rows = self._candidate_rows(query)
+        if rows is None or len(rows) < top_k:
+            rows = np.arange(len(matrix))
 
-            if norm_k == 0:
-                continue
+        sims = np.asarray(matrix[rows] @ query, dtype=np.float64)
+        keep = sims > MIN_SIMILARITY
+        rows, sims = rows[keep], sims[keep]
+        if len(rows) > top_k:
+            best = np.argpartition(-sims, top_k - 1)[:top_k]
+            rows, sims = rows[best], sims[best]
+        order = np.argsort(-sims, kind="stable")
 
-            # cosine can throw warning or error if vectors are zero but we checked norm
-            try:
-                sim = 1.0 - cosine(vector, k_vector)
-            except Exception:
-                sim = 0.0
-
-            if sim > 0.5:
-                results.append(
-                    {
-                        "similarity": float(sim),
-                        "failure_type": case.get("failure_type", "unknown"),
-                        "source_url": case.get("source_url", ""),
-                        "root_cause": case.get("root_cause", ""),
-                        "fix": case.get("fix", ""),
-                    }
-                )
-
-        results.sort(key=lambda x: x["similarity"], reverse=True)
-        return results[:top_k]
+        results = []
+        for index in order:
+            case = cases[int(rows[index])]
+            results.append(
+                {
+                    "similarity": float(min(sims[index], 1.0)),
+                    "failure_type": case.get("failure_type", "unknown"),
+                    "source_url": case.get("source_url", ""),
+                    "root_cause": case.get("root_cause", ""),
+                    "fix": case.get("fix", ""),
+                }
+            )
+        return results
 
     def add_known_failure(
         self,
@@ -83,9 +259,33 @@ class FailureRetrieval:
             "source_url": source_url,
             "root_cause": root_cause,
             "fix": fix,
-            "features": {k: float(features.get(k, 0.0)) for k in FEATURE_NAMES},
+            "features": {k: _safe_float(features.get(k, 0.0)) for k in FEATURE_NAMES},
         }
-        if "failures" not in self.known:
-            self.known["failures"] = []
+        vector = _normalized_vector(case["features"])
+
+        os.makedirs(os.path.dirname(self.known_failures_path), exist_ok=True)
+        with open(self.journal_path, "a") as f:
+            f.write(json.dumps(case) + "\n")
+        try:
+            with open(self.vectors_path, "ab") as f:
+                f.write(vector.tobytes())
+            if not os.path.exists(self.index_meta_path):
+                self._write_index_meta()
+        except OSError:
+            pass
+
+        row = len(self.known["failures"])
         self.known["failures"].append(case)
+        self._appended.append(vector[None, :])
+        if self._lsh_planes is not None:
+            self._add_to_lsh(vector[None, :], row)
+
+    def compact(self) -> None:
+        """Fold the append journal back into ``known_failures.json``."""
         self._save()
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        try:
+            self._write_index_meta()
+        except OSError:
+            pass
@@ -0,0 +1,286 @@
+"""Process-wide operational metrics in the Prometheus text exposition format.
+
+``REGISTRY`` collects counters, gauges and histograms from any code path:
+the web app serves it at ``/metrics``, and ``batch --metrics-file`` writes it
+as a node_exporter textfile. Pipeline stages are timed with
+``REGISTRY.stage(name)`` or reported with ``REGISTRY.record_stage``; hooks added
+with ``add_hook`` see every stage timing, e.g. to log slow stages. Standard
+library only, so importing it never drags in the diagnosis stack.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+
+PREFIX = "ardupilot_"
+STAGES = ("upload", "parse", "extract", "diagnose", "visualization", "serialize")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+METRIC_KINDS = ("counter", "gauge", "histogram")
+INF_BUCKET = 'le="+Inf"'
+
+StageHook = Callable[[str, float, dict[str, str]], None]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def current_rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """Resident set size of ``pid`` (default: this process) in bytes.
+
+    Reads ``/proc`` where available; elsewhere only this process's peak RSS
+    is known, which is returned instead.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if pid not in (None, os.getpid()) or resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def memory_breakdown(pid: Optional[int] = None) -> Optional[dict[str, int]]:
+    """RSS, proportional (PSS), shared and private bytes of ``pid`` from ``smaps_rollup``.
+
+    PSS charges each shared page to its sharers in equal parts, so the PSS of
+    forked workers adds up to what they really cost. None where the kernel
+    does not provide ``smaps_rollup`` (non-Linux, or Linux before 4.14).
+    """
+    fields: dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid or 'self'}/smaps_rollup", "r") as rollup:
+            for line in rollup:
+                name, _, value = line.partition(":")
+                parts = value.split()
+                if len(parts) == 2 and parts[1] == "kB":
+                    fields[name] = int(parts[0]) * 1024
+    except (OSError, ValueError):
+        return None
+    if "Rss" not in fields:
+        return None
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    return {
+        "rss": fields["Rss"],
+        "pss": fields.get("Pss", fields["Rss"]),
+        "shared": shared,
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+class MetricsRegistry:
+    """Thread-safe metric families keyed by name and label set.
+
+    Families are declared with ``describe``; using an undeclared name creates
+    it with the kind implied by the call. ``add_collector`` callbacks run at
+    render time to refresh gauges that are cheaper to sample than to track.
+    """
+
+    def __init__(self, prefix: str = PREFIX):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._families: dict[str, dict[str, Any]] = {}
+        self._collectors: list[Callable[["MetricsRegistry"], None]] = []
+        self._hooks: list[StageHook] = []
+
+    def describe(
+        self, name: str, kind: str, help_text: str, buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        if kind not in METRIC_KINDS:
+            raise ValueError(f"unknown metric kind: {kind}")
+        with self._lock:
+            family = self._families.setdefault(name, {"values": {}})
+            family.update(kind=kind, help=help_text, buckets=tuple(sorted(buckets)))
+
+    def _family(self, name: str, kind: str) -> dict[str, Any]:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = {
+                "kind": kind,
+                "help": "",
+                "buckets": LATENCY_BUCKETS,
+                "values": {},
+            }
+        elif family["kind"] != kind:
+            raise ValueError(f"metric {name} is a {family['kind']}, not a {kind}")
+        return family
+
+    @staticmethod
+    def _key(labels: dict[str, Any]) -> tuple[tuple[str, str], ...]:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        with self._lock:
+            values = self._family(name, "counter")["values"]
+            key = self._key(labels)
+            values[key] = values.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._family(name, "gauge")["values"][self._key(labels)] = float(value)
+
+    def clear(self, name: str) -> None:
+        """Drop every label set of ``name`` (for gauges rebuilt by a collector)."""
+        with self._lock:
+            if name in self._families:
+                self._families[name]["values"].clear()
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            family = self._family(name, "histogram")
+            key = self._key(labels)
+            series = family["values"].get(key)
+            if series is None:
+                series = family["values"][key] = {
+                    "buckets": [0] * len(family["buckets"]),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for i, bound in enumerate(family["buckets"]):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def value(self, name: str, **labels: Any) -> Any:
+        """Current value of one series: a counter/gauge float or a histogram dict; None if unset."""
+        with self._lock:
+            family = self._families.get(name)
+            return None if family is None else family["values"].get(self._key(labels))
+
+    def add_hook(self, hook: StageHook) -> None:
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook: StageHook) -> None:
+        with self._lock:
+            if hook in self._hooks:
+                self._hooks.remove(hook)
+
+    def add_collector(self, collector: Callable[["MetricsRegistry"], None]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def record_stage(self, stage: str, seconds: float, **labels: Any) -> None:
+        """Observe one stage timing and pass it to every hook."""
+        self.observe("stage_duration_seconds", seconds, stage=stage, **labels)
+        with self._lock:
+            hooks = list(self._hooks)
+        string_labels = {key: str(value) for key, value in labels.items()}
+        for hook in hooks:
+            hook(stage, seconds, string_labels)
+
+    @contextmanager
+    def stage(self, stage: str, **labels: Any) -> Iterator[None]:
+        """Time the enclosed block as ``stage``; failed blocks are timed too."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - started, **labels)
+
+    def record_error(self, where: str, error: BaseException | str) -> None:
+        error_type = error if isinstance(error, str) else type(error).__name__
+        self.inc("errors_total", where=where, type=error_type)
+
+    def render(self) -> str:
+        for collector in list(self._collectors):
+            collector(self)
+        lines = []
+        with self._lock:
+            for name in sorted(self._families):
+                family = self._families[name]
+                full_name = self.prefix + name
+                if family["help"]:
+                    lines.append(f"# HELP {full_name} {family['help']}")
+                lines.append(f"# TYPE {full_name} {family['kind']}")
+                for key in sorted(family["values"]):
+                    value = family["values"][key]
+                    if family["kind"] != "histogram":
+                        lines.append(f"{full_name}{_format_labels(key)} {_format_value(value)}")
+                        continue
+                    for bound, count in zip(family["buckets"], value["buckets"]):
+                        le = f'le="{_format_value(bound)}"'
+                        lines.append(f"{full_name}_bucket{_format_labels(key, le)} {count}")
+                    lines.append(
+                        f"{full_name}_bucket{_format_labels(key, INF_BUCKET)} {value['count']}"
+                    )
+                    lines.append(
+                        f"{full_name}_sum{_format_labels(key)} {_format_value(value['sum'])}"
+                    )
+                    lines.append(f"{full_name}_count{_format_labels(key)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Atomically write ``render()`` to ``path`` (node_exporter textfile collector)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as textfile:
+            textfile.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def _describe_defaults(registry: MetricsRegistry) -> None:
+    registry.describe("stage_duration_seconds", "histogram", "Wall time per pipeline stage.")
+    registry.describe(
+        "http_requests_total", "counter", "HTTP requests by route, method and status."
+    )
+    registry.describe(
+        "http_request_duration_seconds", "histogram", "HTTP request latency by route."
+    )
+    registry.describe("bytes_processed_total", "counter", "Log bytes analysed, by source.")
+    registry.describe(
+        "errors_total", "counter", "Errors by where they happened and exception type."
+    )
+    registry.describe(
+        "model_loads_total", "counter", "Model artifact load attempts by component and outcome."
+    )
+    registry.describe(
+        "model_reloads_total",
+        "counter",
+        "Hot reloads of the model artifacts by outcome (swapped, rejected).",
+    )
+    registry.describe("job_queue_depth", "gauge", "Background analysis jobs by state.")
+    registry.describe(
+        "job_duration_seconds", "histogram", "Background job run time by final status."
+    )
+    registry.describe("batch_logs_total", "counter", "Logs analysed by batch runs, by status.")
+    registry.describe("result_cache_requests_total", "counter", "Result cache lookups by outcome.")
+    registry.describe(
+        "process_resident_memory_bytes", "gauge", "Resident memory of the server and its workers."
+    )
+    registry.describe(
+        "process_proportional_memory_bytes",
+        "gauge",
+        "Proportional set size (shared pages split among sharers).",
+    )
+
+
+REGISTRY = MetricsRegistry()
+_describe_defaults(REGISTRY)
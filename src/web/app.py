@@ -1,33 +1,242 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import json
 import logging
+import math
 import os
 import tempfile
+import time
+import zipfile
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Callable, Optional
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from pydantic import ValidationError
 
-from src.web.schemas import AnalysisResponse
+from src.batch.clustering import IncidentClusterer, label_clusters, model_scaler
+from src.batch.worker import analyze_file, init_worker
+from src.telemetry import REGISTRY as METRICS
+from src.telemetry import MetricsRegistry, current_rss_bytes, memory_breakdown
+from src.web import jobs, model_store, result_cache
+from src.web.encoding import ProjectionError, encode_response, project
+from src.web.jobs import JobManager, QueueFullError
+from src.web.model_store import ModelSet, ModelStore
+from src.web.result_cache import ResultCache
+from src.web.series import MAX_QUERY_POINTS, SeriesSet, SeriesStore, build_series_set
+from src.web.schemas import AnalysisResponse, TriageResponse
 
+from src.diagnosis.context import DiagnosisContext
 from src.diagnosis.decision_policy import evaluate_decision
 from src.diagnosis.hybrid_engine import HybridEngine
 from src.diagnosis.parameter_validation import validate_parameters
 from src.diagnosis.rule_engine import RuleEngine
+from src.diagnosis.segmentation import FlightSegmentAnalyzer
+from src.diagnosis.timeline import DiagnosisTimeline
+from src.diagnosis.triage import run_triage
 from src.features.pipeline import FeaturePipeline
-from src.parser.bin_parser import LogParser
+from src.parser.bin_parser import TRIAGE_SAMPLE_EVERY, LogParser
+from src.parser.streaming import StreamingLogDecoder
 
 
 LOGGER = logging.getLogger(__name__)
 MAX_UPLOAD_BYTES = 64 * 1024 * 1024
 UPLOAD_CHUNK_SIZE = 1024 * 1024
+# /api/analyze/stream skips the temp file, but the decoded ParsedLog stays in
+# memory at several times the raw size (about 7x for sample.bin), so it keeps
+# the multipart limit until features can be accumulated incrementally.
+MAX_STREAM_UPLOAD_BYTES = int(
+    float(os.environ.get("ARDUPILOT_MAX_STREAM_UPLOAD_MB", MAX_UPLOAD_BYTES / (1024 * 1024)))
+    * 1024
+    * 1024
+)
+STREAM_BACKLOG_BYTES = 8 * 1024 * 1024
 WEB_DIR = Path(__file__).parent.absolute()
+# Background job pool; `ui` sets these from its --job-* flags.
+# Job and batch state lives in the serving process, so the pre-fork launcher
+# (``ui --workers N``) runs with the job API turned off.
+JOB_API = os.environ.get("ARDUPILOT_JOB_API", "1") != "0"
+JOB_DRAIN_SEC = float(os.environ.get("ARDUPILOT_JOB_DRAIN_SEC", jobs.JOB_DRAIN_SEC))
+JOB_WORKERS = int(os.environ.get("ARDUPILOT_JOB_WORKERS", jobs.JOB_WORKERS))
+JOB_QUEUE_LIMIT = int(os.environ.get("ARDUPILOT_JOB_QUEUE_LIMIT", jobs.JOB_QUEUE_LIMIT))
+JOB_TTL_SEC = float(os.environ.get("ARDUPILOT_JOB_TTL_SEC", jobs.JOB_TTL_SEC))
+JOB_BATCH_CONCURRENCY = int(
+    os.environ.get("ARDUPILOT_JOB_BATCH_CONCURRENCY", jobs.BATCH_CONCURRENCY)
+)
+JOB_BATCH_LIMIT = int(os.environ.get("ARDUPILOT_JOB_BATCH_LIMIT", jobs.BATCH_LIMIT))
+JOB_RETRY_AFTER_SEC = 5
+# /api/analyze-batch: uploads plus extracted .zip members, per request.
+MAX_BATCH_UPLOAD_BYTES = int(
+    float(os.environ.get("ARDUPILOT_MAX_BATCH_UPLOAD_MB", 4096)) * 1024 * 1024
+)
+MAX_BATCH_FILES = 1000
+JOB_EVENT_INTERVAL_SEC = 0.5
+JOB_EVENT_HEARTBEAT_SEC = 10.0
+# Result cache for /api/analyze; an empty directory disables the disk tier
+# and zero entries the memory tier.
+RESULT_CACHE_DIR = os.environ.get("ARDUPILOT_RESULT_CACHE_DIR", str(result_cache.CACHE_DIR))
+RESULT_CACHE_ENTRIES = int(
+    os.environ.get("ARDUPILOT_RESULT_CACHE_ENTRIES", result_cache.MEMORY_ENTRIES)
+)
+RESULT_CACHE_DISK_MB = float(os.environ.get("ARDUPILOT_RESULT_CACHE_MB", result_cache.DISK_MAX_MB))
+RESULT_CACHE_TTL_SEC = float(
+    os.environ.get("ARDUPILOT_RESULT_CACHE_TTL_SEC", result_cache.CACHE_TTL_SEC)
+)
+# Points per trace in the response's time_series summary; /api/series serves detail.
+SUMMARY_POINTS = 200
+# Seconds between checks of models/ for new artifacts; 0 disables hot reload.
+MODEL_RELOAD_SEC = float(os.environ.get("ARDUPILOT_MODEL_RELOAD_SEC", model_store.RELOAD_POLL_SEC))
+
+_JOB_MANAGER: Optional[JobManager] = None
+_RESULT_CACHE: Optional[ResultCache] = None
+_SERIES_STORE: Optional[SeriesStore] = None
+# Read-only model artifacts shared by every request of this process; the
+# pre-fork launcher loads them in the parent so workers share the pages.
+_MODEL_STORE: Optional[ModelStore] = None
+# Model version the batch worker state of this (pool) process was built for.
+_BATCH_MODELS_VERSION: Optional[str] = None
+
+
+def get_job_manager() -> JobManager:
+    global _JOB_MANAGER
+    if _JOB_MANAGER is None:
+        _JOB_MANAGER = JobManager(
+            _run_analysis_job,
+            workers=JOB_WORKERS,
+            queue_limit=JOB_QUEUE_LIMIT,
+            ttl_sec=JOB_TTL_SEC,
+            batch_func=_run_batch_member,
+            batch_summary=_batch_summary,
+            batch_concurrency=JOB_BATCH_CONCURRENCY,
+            batch_limit=JOB_BATCH_LIMIT,
+        )
+    return _JOB_MANAGER
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide result cache, or None when both tiers are disabled."""
+    global _RESULT_CACHE
+    if _RESULT_CACHE is None and (RESULT_CACHE_DIR or RESULT_CACHE_ENTRIES > 0):
+        _RESULT_CACHE = ResultCache(
+            cache_dir=RESULT_CACHE_DIR or None,
+            memory_entries=RESULT_CACHE_ENTRIES,
+            disk_max_mb=RESULT_CACHE_DISK_MB,
+            ttl_sec=RESULT_CACHE_TTL_SEC,
+            model_version_func=lambda: get_models().version,
+        )
+    return _RESULT_CACHE
+
+
+def get_series_store() -> Optional[SeriesStore]:
+    """Time-series pyramids kept next to the result cache, under its ``series`` directory."""
+    global _SERIES_STORE
+    if _SERIES_STORE is None and (RESULT_CACHE_DIR or RESULT_CACHE_ENTRIES > 0):
+        _SERIES_STORE = SeriesStore(
+            cache_dir=Path(RESULT_CACHE_DIR) / "series" if RESULT_CACHE_DIR else None,
+            disk_max_mb=RESULT_CACHE_DISK_MB,
+            ttl_sec=RESULT_CACHE_TTL_SEC,
+            model_version_func=lambda: get_models().version,
+        )
+    return _SERIES_STORE
+
+
+def get_model_store() -> ModelStore:
+    global _MODEL_STORE
+    if _MODEL_STORE is None:
+        _MODEL_STORE = ModelStore(poll_sec=MODEL_RELOAD_SEC)
+    return _MODEL_STORE
+
+
+def get_models() -> ModelSet:
+    """The model set new requests use: thresholds, ML classifier and anomaly detector."""
+    return get_model_store().current()
+
+
+def preload() -> None:
+    """Load (or reload) models and warm the analysis imports before worker processes fork."""
+    get_model_store().refresh(settle=False)
+    get_models()
+    FeaturePipeline()
+    RuleEngine()
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    get_model_store().start()
+    yield
+    get_model_store().stop()
+    if _JOB_MANAGER is not None:
+        _JOB_MANAGER.drain(JOB_DRAIN_SEC)
+        _JOB_MANAGER.shutdown()
+
 
-app = FastAPI(title="ArduPilot Log Diagnosis API")
+class _RequestMetricsMiddleware:
+    """ASGI middleware counting requests and timing them per route template."""
+
+    def __init__(self, asgi_app):
+        self.app = asgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Route templates, not raw paths, keep job ids out of the label set.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            METRICS.inc("http_requests_total", route=route, method=scope["method"], status=status)
+            METRICS.observe(
+                "http_request_duration_seconds", time.perf_counter() - started, route=route
+            )
+
+
+def _collect_runtime_metrics(registry: MetricsRegistry) -> None:
+    registry.clear("process_resident_memory_bytes")
+    registry.clear("process_proportional_memory_bytes")
+    registry.clear("job_queue_depth")
+    rss = current_rss_bytes()
+    if rss is not None:
+        registry.set("process_resident_memory_bytes", rss, role="server", pid=os.getpid())
+    memory = memory_breakdown()
+    if memory is not None:
+        registry.set(
+            "process_proportional_memory_bytes", memory["pss"], role="server", pid=os.getpid()
+        )
+    if _JOB_MANAGER is not None:
+        counts = _JOB_MANAGER.stats()
+        for state in ("queued", "running"):
+            registry.set("job_queue_depth", counts[state], state=state)
+        for pid in _JOB_MANAGER.worker_pids():
+            worker_rss = current_rss_bytes(pid)
+            if worker_rss is not None:
+                registry.set(
+                    "process_resident_memory_bytes", worker_rss, role="job_worker", pid=pid
+                )
+
+
+METRICS.add_collector(_collect_runtime_metrics)
+
+app = FastAPI(title="ArduPilot Log Diagnosis API", lifespan=_lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -35,6 +244,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(_RequestMetricsMiddleware)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -45,38 +255,154 @@ async def get_index() -> str:
     return "UI not found"
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Prometheus text exposition of ``src.telemetry.REGISTRY``."""
+    return PlainTextResponse(
+        METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/api/models")
+async def get_model_status() -> dict[str, Any]:
+    """Version, artifact hashes and reload state of the models serving new requests."""
+    return get_model_store().status()
+
+
 @app.post("/api/analyze", response_model=AnalysisResponse)
-async def analyze_log(file: UploadFile = File(...)):
+async def analyze_log(
+    file: UploadFile = File(...),
+    timeline: bool = False,
+    segments: bool = False,
+    fields: Optional[str] = None,
+    request: Request = None,
+):
+    """Analyse a multipart upload.
+
+    ``fields`` (comma-separated) keeps only those top-level response keys;
+    the body format and compression follow ``Accept``/``Accept-Encoding``
+    (see ``src.web.encoding``).
+    """
     if not file.filename or not file.filename.lower().endswith(".bin"):
         return JSONResponse(status_code=400, content={"error": "Only .BIN files are supported."})
+    if (invalid := _invalid_fields(fields)) is not None:
+        return invalid
 
     fd, temp_path = tempfile.mkstemp(suffix=".bin")
     try:
-        total_bytes = 0
-        with os.fdopen(fd, "wb") as handle:
-            while True:
-                chunk = await file.read(UPLOAD_CHUNK_SIZE)
-                if not chunk:
-                    break
-                total_bytes += len(chunk)
-                if total_bytes > MAX_UPLOAD_BYTES:
-                    return JSONResponse(
-                        status_code=413,
-                        content={"error": f"Uploaded file exceeds {MAX_UPLOAD_BYTES} bytes."},
-                    )
-                handle.write(chunk)
-
-        result = await asyncio.to_thread(_analyze_temp_log, temp_path, file.filename)
-        return AnalysisResponse(**result)
+        digest = hashlib.sha256()
+        with METRICS.stage("upload"):
+            saved = await _save_upload(file, fd, digest)
+        if not saved:
+            return _upload_too_large()
+
+        return await _cached_analysis(
+            digest.hexdigest(),
+            file.filename,
+            timeline,
+            segments,
+            lambda series_id: _analyze_temp_log(
+                temp_path, file.filename, timeline, segments, series_id
+            ),
+            request,
+            fields,
+        )
     except ValidationError as e:
         LOGGER.exception("Schema validation failed for model output")
+        METRICS.record_error("analyze", e)
         return JSONResponse(status_code=500, content={"error": "Schema validation failed", "details": e.errors()})
     except Exception as e:
         LOGGER.exception("Error during analysis")
+        METRICS.record_error("analyze", e)
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Analysis failed. Check server logs for details."},
+        )
+    finally:
+        await file.close()
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except PermissionError:
+                pass
+
+
+@app.post("/api/analyze/stream", response_model=AnalysisResponse)
+async def analyze_log_stream(
+    request: Request,
+    filename: str = "upload.bin",
+    timeline: bool = False,
+    segments: bool = False,
+    fields: Optional[str] = None,
+):
+    """Analyse a raw ``application/octet-stream`` body, decoding it while it arrives.
+
+    Multipart uploads are spooled in full before ``/api/analyze`` runs; here
+    the log is fed to a ``StreamingLogDecoder`` chunk by chunk, so parsing
+    overlaps the upload and nothing is written to disk. ``fields`` and
+    content negotiation work as for ``/api/analyze``.
+    """
+    if not filename.lower().endswith(".bin"):
+        return JSONResponse(status_code=400, content={"error": "Only .BIN files are supported."})
+    if (invalid := _invalid_fields(fields)) is not None:
+        return invalid
+
+    decoder = StreamingLogDecoder(filename)
+    digest = hashlib.sha256()
+    try:
+        with METRICS.stage("upload"):
+            streamed = await _stream_decode(request.stream(), decoder, digest)
+        if not streamed:
+            return _upload_too_large(MAX_STREAM_UPLOAD_BYTES)
+
+        return await _cached_analysis(
+            digest.hexdigest(),
+            filename,
+            timeline,
+            segments,
+            lambda series_id: _analyze_parsed(
+                decoder.finish(), filename, timeline, segments, series_id
+            ),
+            request,
+            fields,
+        )
+    except ValidationError as e:
+        LOGGER.exception("Schema validation failed for model output")
+        METRICS.record_error("analyze_stream", e)
+        return JSONResponse(
+            status_code=500, content={"error": "Schema validation failed", "details": e.errors()}
+        )
+    except Exception as e:
+        LOGGER.exception("Error during streamed analysis")
+        METRICS.record_error("analyze_stream", e)
         return JSONResponse(
             status_code=500,
             content={"error": "Analysis failed. Check server logs for details."},
         )
+
+
+@app.post("/api/triage", response_model=TriageResponse)
+async def triage_log(file: UploadFile = File(...), sample_every: int = TRIAGE_SAMPLE_EVERY):
+    """Preliminary rule verdict from a partial decode; ``/api/analyze`` supersedes it."""
+    if not file.filename or not file.filename.lower().endswith(".bin"):
+        return JSONResponse(status_code=400, content={"error": "Only .BIN files are supported."})
+    if sample_every < 1:
+        return JSONResponse(status_code=400, content={"error": "sample_every must be >= 1."})
+
+    fd, temp_path = tempfile.mkstemp(suffix=".bin")
+    try:
+        if not await _save_upload(file, fd):
+            return _upload_too_large()
+
+        result = await asyncio.to_thread(run_triage, temp_path, sample_every)
+        return TriageResponse(filename=file.filename, **result)
+    except Exception as e:
+        LOGGER.exception("Error during triage")
+        METRICS.record_error("triage", e)
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Triage failed. Check server logs for details."},
+        )
     finally:
         await file.close()
         if os.path.exists(temp_path):
@@ -86,34 +412,606 @@ async def analyze_log(file: UploadFile = File(...)):
                 pass
 
 
-def _analyze_temp_log(temp_path: str, original_filename: str) -> dict[str, Any]:
-    parser = LogParser(temp_path)
-    parsed = parser.parse()
+@app.post("/api/jobs", status_code=202)
+async def create_job(file: UploadFile = File(...), timeline: bool = False, segments: bool = False):
+    """Queue an analysis and return its job id; 429 when the queue is full."""
+    if not JOB_API:
+        return _job_api_disabled()
+    if not file.filename or not file.filename.lower().endswith(".bin"):
+        return JSONResponse(status_code=400, content={"error": "Only .BIN files are supported."})
+
+    fd, temp_path = tempfile.mkstemp(suffix=".bin")
+    try:
+        if not await _save_upload(file, fd):
+            os.remove(temp_path)
+            return _upload_too_large()
+        try:
+            job = get_job_manager().submit(
+                temp_path, (temp_path, file.filename, timeline, segments), filename=file.filename
+            )
+        except QueueFullError as e:
+            os.remove(temp_path)
+            return JSONResponse(
+                status_code=429,
+                content={"error": f"Job queue is full ({e}); retry later."},
+                headers={"Retry-After": str(JOB_RETRY_AFTER_SEC)},
+            )
+    finally:
+        await file.close()
+
+    return JSONResponse(
+        status_code=202,
+        content=dict(
+            job,
+            status_url=f"/api/jobs/{job['id']}",
+            events_url=f"/api/jobs/{job['id']}/events",
+        ),
+    )
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, fields: Optional[str] = None, request: Request = None):
+    """Job status; a finished job's ``result`` is its ``AnalysisResponse`` (see ``fields``)."""
+    if not JOB_API:
+        return _job_api_disabled()
+    if (invalid := _invalid_fields(fields)) is not None:
+        return invalid
+    manager = get_job_manager()
+    job = manager.snapshot(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired job."})
+    if job["status"] == "done":
+        job["result"] = project(manager.result(job_id), fields)
+    return _encoded(request, job)
 
-    pipeline = FeaturePipeline()
-    features = pipeline.extract(parsed)
 
-    engine = HybridEngine()
-    diagnoses = engine.diagnose(features)
-    explain_data = dict(getattr(engine, "last_explain_data", {}))
-    parameter_warnings = validate_parameters(
-        parsed.get("parameters", {}),
-        features,
-        features.get("_metadata", {}).get("vehicle_type", "Unknown"),
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events: one event per status change (plus heartbeats) until the job ends."""
+    if not JOB_API:
+        return _job_api_disabled()
+    if get_job_manager().snapshot(job_id) is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired job."})
+    return StreamingResponse(
+        _job_event_stream(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    decision = evaluate_decision(diagnoses)
-    explain_data["decision"] = decision
 
-    time_series, timeline_events = _build_visualization_data(parsed, features)
-    rule_diagnoses = RuleEngine().diagnose(features)
-    rule_output_only = rule_diagnoses[0]["failure_type"] if rule_diagnoses else "nominal"
+async def _job_event_stream(job_id: str) -> AsyncIterator[str]:
+    manager = get_job_manager()
+    loop = asyncio.get_running_loop()
+    last_version = None
+    last_sent = 0.0
+    while True:
+        job = manager.snapshot(job_id)
+        if job is None:
+            error = {"id": job_id, "error": "Unknown or expired job."}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+            return
+        now = loop.time()
+        if job["version"] != last_version or now - last_sent >= JOB_EVENT_HEARTBEAT_SEC:
+            yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+            last_version = job["version"]
+            last_sent = now
+        if job["status"] in jobs.TERMINAL_STATES:
+            return
+        await asyncio.sleep(JOB_EVENT_INTERVAL_SEC)
+
+
+class _BatchUploadError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@app.post("/api/analyze-batch", status_code=202)
+async def analyze_batch(files: list[UploadFile] = File(...)):
+    """Queue every .BIN upload and every .BIN inside uploaded .zip archives as one batch.
+
+    Members run on the job pool under the batch limits; per-file rows and the
+    ``batch-analyze`` summary come from ``GET /api/batches/{id}`` and its
+    ``/events`` stream. Other files are listed under ``skipped``.
+    """
+    if not JOB_API:
+        return _job_api_disabled()
+    members: list[tuple[str, str]] = []
+    skipped: list[str] = []
+    budget = MAX_BATCH_UPLOAD_BYTES
+    try:
+        for upload in files:
+            name = upload.filename or ""
+            try:
+                if name.lower().endswith(".bin"):
+                    _check_batch_size(members)
+                    fd, temp_path = tempfile.mkstemp(suffix=".bin")
+                    members.append((temp_path, name))
+                    if not await _save_upload(upload, fd, limit=min(MAX_UPLOAD_BYTES, budget)):
+                        raise _BatchUploadError(
+                            413, f"{name} exceeds {min(MAX_UPLOAD_BYTES, budget)} bytes."
+                        )
+                    budget -= os.path.getsize(temp_path)
+                elif name.lower().endswith(".zip"):
+                    fd, zip_path = tempfile.mkstemp(suffix=".zip")
+                    try:
+                        if not await _save_upload(upload, fd, limit=budget):
+                            raise _BatchUploadError(413, f"{name} exceeds {budget} bytes.")
+                        budget -= await asyncio.to_thread(
+                            _extract_batch_zip, zip_path, name, members, skipped, budget
+                        )
+                    finally:
+                        os.remove(zip_path)
+                else:
+                    skipped.append(name)
+            finally:
+                await upload.close()
+        if not members:
+            raise _BatchUploadError(400, "No .BIN files in the upload.")
+        batch = get_job_manager().submit_batch(
+            [(path, (path, name), name) for path, name in members]
+        )
+    except _BatchUploadError as e:
+        _remove_files(path for path, _name in members)
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+    except QueueFullError as e:
+        _remove_files(path for path, _name in members)
+        return JSONResponse(
+            status_code=429,
+            content={"error": f"Too many batches in progress ({e}); retry later."},
+            headers={"Retry-After": str(JOB_RETRY_AFTER_SEC)},
+        )
+    except Exception:
+        _remove_files(path for path, _name in members)
+        raise
+
+    return JSONResponse(
+        status_code=202,
+        content=dict(
+            batch,
+            skipped=skipped,
+            status_url=f"/api/batches/{batch['id']}",
+            events_url=f"/api/batches/{batch['id']}/events",
+        ),
+    )
+
+
+@app.get("/api/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    """Batch progress, the rows of finished members and, once all are done, the summary."""
+    if not JOB_API:
+        return _job_api_disabled()
+    batch = get_job_manager().batch_snapshot(batch_id)
+    if batch is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired batch."})
+    return batch
+
+
+@app.get("/api/batches/{batch_id}/events")
+async def batch_events(batch_id: str):
+    """Server-Sent Events: a ``file`` event per finished member, then ``done`` with the summary."""
+    if not JOB_API:
+        return _job_api_disabled()
+    if get_job_manager().batch_snapshot(batch_id) is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired batch."})
+    return StreamingResponse(
+        _batch_event_stream(batch_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _batch_event_stream(batch_id: str) -> AsyncIterator[str]:
+    manager = get_job_manager()
+    loop = asyncio.get_running_loop()
+    sent_rows = 0
+    last_version = None
+    last_sent = 0.0
+    while True:
+        batch = manager.batch_snapshot(batch_id, since=sent_rows)
+        if batch is None:
+            error = {"id": batch_id, "error": "Unknown or expired batch."}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+            return
+        rows = batch.pop("rows")
+        for row in rows:
+            yield f"event: file\ndata: {json.dumps(row)}\n\n"
+        sent_rows += len(rows)
+        now = loop.time()
+        if batch["version"] != last_version or now - last_sent >= JOB_EVENT_HEARTBEAT_SEC:
+            yield f"event: {batch['status']}\ndata: {json.dumps(batch)}\n\n"
+            last_version = batch["version"]
+            last_sent = now
+        if batch["status"] in jobs.TERMINAL_STATES:
+            return
+        await asyncio.sleep(JOB_EVENT_INTERVAL_SEC)
+
+
+def _check_batch_size(members: list[tuple[str, str]]) -> None:
+    if len(members) >= MAX_BATCH_FILES:
+        raise _BatchUploadError(413, f"A batch holds at most {MAX_BATCH_FILES} logs.")
+
+
+def _extract_batch_zip(
+    zip_path: str, zip_name: str, members: list[tuple[str, str]], skipped: list[str], budget: int
+) -> int:
+    """Extract the .BIN members of ``zip_path`` to temp files, appended to ``members``.
+
+    Returns the bytes written. Sizes are counted while decompressing, not
+    taken from the archive's headers, so a zip bomb stops at ``budget``.
+    """
+    written = 0
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                if not info.filename.lower().endswith(".bin"):
+                    skipped.append(f"{zip_name}/{info.filename}")
+                    continue
+                _check_batch_size(members)
+                limit = min(MAX_UPLOAD_BYTES, budget - written)
+                fd, temp_path = tempfile.mkstemp(suffix=".bin")
+                members.append((temp_path, info.filename))
+                size = 0
+                with archive.open(info) as source, os.fdopen(fd, "wb") as target:
+                    while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > limit:
+                            raise _BatchUploadError(
+                                413, f"{zip_name}/{info.filename} exceeds {limit} bytes."
+                            )
+                        target.write(chunk)
+                written += size
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError, RuntimeError) as e:
+        # RuntimeError: encrypted members; NotImplementedError: unsupported compression.
+        raise _BatchUploadError(400, f"Unreadable archive {zip_name}: {e}") from None
+    return written
+
+
+def _remove_files(paths) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _batch_summary(rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """The end-of-run summary of ``batch-analyze``: status counts and incident clusters."""
+    summary: dict[str, Any] = {"total": len(rows), "healthy": 0, "issues": 0, "errors": 0}
+    for row in rows:
+        if row["status"] == "ERROR":
+            summary["errors"] += 1
+        elif row["status"] == "HEALTHY":
+            summary["healthy"] += 1
+        else:
+            summary["issues"] += 1
+    fd, jsonl_path = tempfile.mkstemp(suffix=".jsonl")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as jsonl_file:
+            for row in rows:
+                jsonl_file.write(json.dumps(row) + "\n")
+        clusters = IncidentClusterer(scaler=model_scaler()).fit(jsonl_path)
+        summary["clusters"] = clusters if clusters["n_incidents"] >= 2 else None
+        summary["label_clusters"] = label_clusters(jsonl_path)
+    finally:
+        os.remove(jsonl_path)
+    return summary
+
+
+@app.get("/api/series/{series_id}")
+async def get_series_catalog(series_id: str):
+    """Messages, fields, instances and time spans available for ``series_id``."""
+    series = await _load_series(series_id)
+    if series is None:
+        return _unknown_series()
+    return {"series_id": series_id, "messages": series.catalog}
+
+
+@app.get("/api/series/{series_id}/data")
+async def get_series_data(
+    series_id: str,
+    message: str,
+    field: str,
+    instance: Optional[str] = None,
+    t0: Optional[float] = None,
+    t1: Optional[float] = None,
+    points: int = 500,
+    request: Request = None,
+):
+    """At most ``points`` min/max buckets of one field over ``[t0, t1]`` seconds."""
+    if not 1 <= points <= MAX_QUERY_POINTS:
+        return JSONResponse(
+            status_code=400, content={"error": f"points must be between 1 and {MAX_QUERY_POINTS}."}
+        )
+    series = await _load_series(series_id)
+    if series is None:
+        return _unknown_series()
+    data = series.query(message, field, instance=instance, t0=t0, t1=t1, points=points)
+    if data is None:
+        return JSONResponse(
+            status_code=404, content={"error": f"No series {message}.{field} in this log."}
+        )
+    return _encoded(request, data)
+
+
+async def _load_series(series_id: str) -> Optional[SeriesSet]:
+    store = get_series_store()
+    if store is None or len(series_id) != 64 or any(c not in "0123456789abcdef" for c in series_id):
+        return None
+    return await asyncio.to_thread(store.get, series_id)
+
+
+def _unknown_series() -> JSONResponse:
+    return JSONResponse(
+        status_code=404,
+        content={"error": "Unknown or expired series; analyse the log again."},
+    )
+
+
+def _run_batch_member(filepath: str, filename: str) -> dict[str, Any]:
+    """Job pool entry point for ``/api/analyze-batch`` members.
+
+    Runs ``analyze_file`` on the serving models. The worker's engine is
+    rebuilt whenever the model set changes, so batch members use the same
+    thresholds and models as ``/api/analyze``.
+    """
+    global _BATCH_MODELS_VERSION
+    get_model_store().refresh(settle=False)
+    models = get_models()
+    if _BATCH_MODELS_VERSION != models.version:
+        engine = HybridEngine(
+            rule_engine=RuleEngine(thresholds=models.thresholds),
+            ml_classifier=models.ml_classifier,
+            anomaly_detector=models.anomaly_detector,
+        )
+        init_worker(engine=engine)
+        _BATCH_MODELS_VERSION = models.version
+    return analyze_file(filepath, filename)
+
+
+def _run_analysis_job(
+    temp_path: str, original_filename: str, timeline: bool, segments: bool
+) -> dict[str, Any]:
+    """Job pool entry point: analyse and return the validated ``AnalysisResponse`` as JSON data."""
+    # Pool processes have no watcher thread; pick up new artifacts per job.
+    get_model_store().refresh(settle=False)
+    try:
+        return AnalysisResponse(
+            **_analyze_temp_log(temp_path, original_filename, timeline, segments)
+        ).model_dump(mode="json")
+    except ValidationError as e:
+        raise RuntimeError(f"Schema validation failed: {e.error_count()} errors") from None
+
+
+async def _save_upload(
+    file: UploadFile, fd: int, digest: Optional[Any] = None, limit: Optional[int] = None
+) -> bool:
+    """Stream the upload into ``fd`` (feeding ``digest`` if given); False once it exceeds ``limit``.
+
+    ``limit`` defaults to MAX_UPLOAD_BYTES.
+    """
+    limit = MAX_UPLOAD_BYTES if limit is None else limit
+    total_bytes = 0
+    with os.fdopen(fd, "wb") as handle:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                METRICS.inc("bytes_processed_total", total_bytes, source="upload")
+                return True
+            total_bytes += len(chunk)
+            if total_bytes > limit:
+                return False
+            handle.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+
+
+async def _stream_decode(
+    chunks: AsyncIterator[bytes], decoder: StreamingLogDecoder, digest: Any
+) -> bool:
+    """Feed ``chunks`` to ``decoder`` on a worker thread while the next ones are received.
+
+    Chunks that arrive during a decode are batched for the next one; once
+    STREAM_BACKLOG_BYTES are waiting, reading pauses until the decoder
+    catches up. False once the body exceeds MAX_STREAM_UPLOAD_BYTES.
+    """
+    pending: Optional[asyncio.Future] = None
+    backlog: list[bytes] = []
+    backlog_bytes = 0
+    total_bytes = 0
+    decode_sec = 0.0
+
+    def feed(data: bytes) -> None:
+        # Decodes never overlap (one pending at a time), so the tally needs no lock.
+        nonlocal decode_sec
+        started = time.perf_counter()
+        decoder.feed(data)
+        decode_sec += time.perf_counter() - started
+
+    try:
+        async for chunk in chunks:
+            total_bytes += len(chunk)
+            if total_bytes > MAX_STREAM_UPLOAD_BYTES:
+                return False
+            digest.update(chunk)
+            backlog.append(chunk)
+            backlog_bytes += len(chunk)
+            if pending is not None and (pending.done() or backlog_bytes >= STREAM_BACKLOG_BYTES):
+                await pending
+                pending = None
+            if pending is None:
+                pending = asyncio.ensure_future(asyncio.to_thread(feed, b"".join(backlog)))
+                backlog, backlog_bytes = [], 0
+    finally:
+        if pending is not None:
+            await pending
+    if backlog:
+        await asyncio.to_thread(feed, b"".join(backlog))
+    METRICS.record_stage("parse", decode_sec)
+    METRICS.inc("bytes_processed_total", total_bytes, source="stream")
+    return True
+
+
+async def _cached_analysis(
+    sha256: str,
+    filename: str,
+    timeline: bool,
+    segments: bool,
+    analyze: Callable[[Optional[str]], dict[str, Any]],
+    request: Optional[Request] = None,
+    fields: Optional[str] = None,
+) -> Response:
+    """Serve the result cache hit for this upload, or run ``analyze`` and store its response.
+
+    ``analyze`` receives the id its time-series pyramid should be stored
+    under (None when the series store is disabled). The payload is
+    validated once and encoded directly, bypassing FastAPI's re-validation
+    of ``response_model``.
+    """
+    cache = get_result_cache()
+    series_store = get_series_store()
+    series_id = series_store.key(sha256, {"series": True}) if series_store is not None else None
+    models_version = get_models().version
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key(sha256, {"timeline": timeline, "segments": segments})
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        # The series store evicts on its own; a hit whose series is gone is re-analysed.
+        if cached is not None and series_id is not None:
+            if not await asyncio.to_thread(series_store.contains, series_id):
+                cached = None
+        METRICS.inc("result_cache_requests_total", result="miss" if cached is None else "hit")
+        if cached is not None:
+            # Stored payloads were validated on the way in; only the filename is per-upload.
+            metadata = dict(cached["metadata"], filename=filename)
+            with METRICS.stage("serialize"):
+                return _encoded(request, dict(cached, metadata=metadata, cached=True), fields)
+
+    result = await asyncio.to_thread(analyze, series_id)
+    with METRICS.stage("serialize"):
+        payload = AnalysisResponse(**result).model_dump(mode="json")
+        response = _encoded(request, payload, fields)
+    # A reload during the analysis leaves it unclear which set produced it.
+    if cache is not None and get_models().version == models_version:
+        await asyncio.to_thread(cache.put, cache_key, payload)
+    return response
+
+
+def _invalid_fields(fields: Optional[str]) -> Optional[JSONResponse]:
+    """400 response for ``fields=`` names that are not ``AnalysisResponse`` keys, else None."""
+    try:
+        project(dict.fromkeys(AnalysisResponse.model_fields), fields)
+    except ProjectionError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return None
+
+
+def _encoded(request: Optional[Request], payload: Any, fields: Optional[str] = None) -> Response:
+    headers = request.headers if request is not None else {}
+    return encode_response(
+        project(payload, fields), headers.get("accept"), headers.get("accept-encoding")
+    )
+
+
+def _job_api_disabled() -> JSONResponse:
+    return JSONResponse(
+        status_code=404,
+        content={"error": "The job API is disabled on this server; use /api/analyze instead."},
+    )
+
+
+def _upload_too_large(limit: Optional[int] = None) -> JSONResponse:
+    return JSONResponse(
+        status_code=413,
+        content={"error": f"Uploaded file exceeds {limit or MAX_UPLOAD_BYTES} bytes."},
+    )
+
+
+def _analyze_temp_log(
+    temp_path: str,
+    original_filename: str,
+    timeline: bool = False,
+    segments: bool = False,
+    series_id: Optional[str] = None,
+) -> dict[str, Any]:
+    with METRICS.stage("parse"):
+        parsed = LogParser(temp_path).parse()
+    return _analyze_parsed(parsed, original_filename, timeline, segments, series_id)
+
+
+def _analyze_parsed(
+    parsed: dict[str, Any],
+    original_filename: str,
+    timeline: bool = False,
+    segments: bool = False,
+    series_id: Optional[str] = None,
+) -> dict[str, Any]:
+    full_log = parsed
+    # One set for the whole request, even if a reload swaps in another meanwhile.
+    models = get_models()
+    with METRICS.stage("load_models"):
+        pipeline = FeaturePipeline()
+        # The hybrid engine's rule pass is memoised on the context and reused below
+        # for the rule-only output instead of running the rule engine twice.
+        rule_engine = RuleEngine(thresholds=models.thresholds)
+        engine = HybridEngine(
+            rule_engine=rule_engine,
+            ml_classifier=models.ml_classifier,
+            anomaly_detector=models.anomaly_detector,
+        )
+
+    flight_segments = None
+    if segments:
+        with METRICS.stage("segment"):
+            segmentation = FlightSegmentAnalyzer(engine=engine, pipeline=pipeline).analyze(parsed)
+        parsed = segmentation.pop("parsed")
+        features = segmentation.pop("features")
+        context = segmentation.pop("context")
+        flight_segments = {
+            "segments": segmentation["segments"],
+            "flight_sec": segmentation["flight_sec"],
+            "ground_sec": segmentation["ground_sec"],
+            "by_label": segmentation["aggregate"]["by_label"],
+        }
+    else:
+        with METRICS.stage("extract"):
+            features = pipeline.extract(parsed)
+        context = DiagnosisContext(features, parsed)
+
+    with METRICS.stage("diagnose"):
+        diagnosis_timeline = (
+            DiagnosisTimeline(engine=engine).analyze(parsed, context=context) if timeline else None
+        )
+        diagnoses = engine.diagnose(features, context=context)
+        explain_data = dict(getattr(engine, "last_explain_data", {}))
+        parameter_warnings = validate_parameters(
+            parsed.get("parameters", {}),
+            features,
+            context.vehicle_type,
+        )
+
+        decision = evaluate_decision(diagnoses)
+        explain_data["decision"] = decision
+        rule_diagnoses = context.rule_results(rule_engine)
+        rule_output_only = rule_diagnoses[0]["failure_type"] if rule_diagnoses else "nominal"
+
+    with METRICS.stage("visualization"):
+        time_series, timeline_events = _build_visualization_data(parsed, features, context)
+        if diagnosis_timeline is not None:
+            timeline_events = _with_onset_events(timeline_events, diagnosis_timeline, context)
+
+    series_store = get_series_store() if series_id is not None else None
+    if series_store is not None:
+        with METRICS.stage("series"):
+            series_store.put(series_id, build_series_set(full_log, context.start_time_us))
 
     return {
         "metadata": {
             "filename": original_filename,
-            "duration": features.get("_metadata", {}).get("duration_sec", 0),
-            "vehicle": features.get("_metadata", {}).get("vehicle_type", "Unknown"),
+            "duration": context.metadata.get("duration_sec", 0),
+            "vehicle": context.vehicle_type,
         },
         "features": features,
         "diagnoses": diagnoses,
@@ -123,44 +1021,75 @@ def _analyze_temp_log(temp_path: str, original_filename: str) -> dict[str, Any]:
         "timeline_events": timeline_events,
         "rule_output_only": rule_output_only,
         "rule_output_diagnoses": rule_diagnoses,
+        "diagnosis_timeline": diagnosis_timeline,
+        "flight_segments": flight_segments,
+        "series_id": series_id if series_store is not None else None,
     }
 
 
+def _with_onset_events(
+    timeline_events: list[dict[str, Any]],
+    diagnosis_timeline: dict[str, Any],
+    context: DiagnosisContext,
+) -> list[dict[str, Any]]:
+    start_time = context.start_time_us
+    if start_time is None:
+        return timeline_events
+    events = list(timeline_events)
+    for label, onset in diagnosis_timeline.get("onsets", {}).items():
+        events.append(
+            {
+                "t_sec": round((onset["time_us"] - start_time) / 1e6, 2),
+                "type": "onset",
+                "label": f"{label} onset ({onset['peak_confidence'] * 100:.0f}% peak)",
+                "severity": "warning",
+                "gps": None,
+            }
+        )
+    events.sort(key=lambda event: event["t_sec"])
+    return events
+
+
 def _build_visualization_data(
-    parsed: dict[str, Any], features: dict[str, Any]
+    parsed: dict[str, Any],
+    features: dict[str, Any],
+    context: DiagnosisContext | None = None,
 ) -> tuple[dict[str, list[dict[str, Any]]], list[dict[str, Any]]]:
+    if context is None:
+        context = DiagnosisContext(features, parsed)
     time_series: dict[str, list[dict[str, Any]]] = {"gps": [], "vibe": []}
-    start_time = _find_start_time_us(parsed)
+    start_time = context.start_time_us
 
     vibe_msgs = parsed.get("messages", {}).get("VIBE", [])
     gps_msgs = parsed.get("messages", {}).get("GPS", [])
 
-    vibe_times = [msg.get("TimeUS") for msg in vibe_msgs if msg.get("TimeUS") is not None]
-    gps_times = [msg.get("TimeUS") for msg in gps_msgs if msg.get("TimeUS") is not None]
-    if vibe_times and start_time is not None:
-        log_end_time_s = (vibe_times[-1] - start_time) / 1e6
-    elif gps_times and start_time is not None:
-        log_end_time_s = (gps_times[-1] - start_time) / 1e6
+    vibe_times = context.message_times_us("VIBE")
+    gps_times = context.message_times_us("GPS")
+    if len(vibe_times) and start_time is not None:
+        log_end_time_s = float(vibe_times[-1] - start_time) / 1e6
+    elif len(gps_times) and start_time is not None:
+        log_end_time_s = float(gps_times[-1] - start_time) / 1e6
     else:
         log_end_time_s = features.get("_metadata", {}).get("duration_sec", 0)
 
-    step = max(1, len(vibe_msgs) // 500)
-    for msg in vibe_msgs[::step]:
-        t_us = msg.get("TimeUS")
-        if t_us is None:
-            continue
+    # Each summary point carries its bucket's peaks, so short spikes survive.
+    timed_vibe = [msg for msg in vibe_msgs if msg.get("TimeUS") is not None]
+    step = max(1, math.ceil(len(timed_vibe) / SUMMARY_POINTS))
+    for i in range(0, len(timed_vibe), step):
+        bucket = timed_vibe[i : i + step]
+        t_us = bucket[0]["TimeUS"]
         if start_time is None:
             start_time = t_us
         time_series["vibe"].append(
             {
                 "t": round((t_us - start_time) / 1e6, 2),
-                "x": msg.get("VibeX", 0),
-                "y": msg.get("VibeY", 0),
-                "z": msg.get("VibeZ", 0),
+                "x": max(msg.get("VibeX", 0) for msg in bucket),
+                "y": max(msg.get("VibeY", 0) for msg in bucket),
+                "z": max(msg.get("VibeZ", 0) for msg in bucket),
             }
         )
 
-    step_gps = max(1, len(gps_msgs) // 500)
+    step_gps = max(1, len(gps_msgs) // SUMMARY_POINTS)
     for msg in gps_msgs[::step_gps]:
         lat = msg.get("Lat")
         lng = msg.get("Lng")
@@ -260,17 +1189,4 @@ def _build_visualization_data(
 
 
 def _find_start_time_us(parsed: dict[str, Any]) -> int | None:
-    message_groups = parsed.get("messages", {})
-    for message_type in ("VIBE", "GPS"):
-        for msg in message_groups.get(message_type, []):
-            t_us = msg.get("TimeUS")
-            if t_us is not None:
-                return t_us
-
-    for collection_name in ("errors", "mode_changes", "events"):
-        for item in parsed.get(collection_name, []):
-            t_us = item.get("time_us")
-            if t_us is not None:
-                return t_us
-
-    return None
+    return DiagnosisContext({}, parsed).start_time_us
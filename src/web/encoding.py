@@ -0,0 +1,212 @@
+"""Content negotiation and compression for analysis API responses.
+
+``encode_response`` serialises an already-validated payload in the format
+the client's ``Accept`` header asks for and compresses it per
+``Accept-Encoding``:
+
+- ``application/json`` (default) uses orjson when installed, else compact
+  stdlib JSON.
+- ``application/msgpack`` (or ``application/x-msgpack``) uses msgpack when
+  installed, else the small MessagePack packer below.
+- Compression is ``br`` when brotli is installed, else ``gzip``, for bodies
+  over ``COMPRESS_MIN_BYTES``.
+
+``project`` implements the ``fields=`` parameter, which keeps only the
+requested top-level keys.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import math
+import struct
+from typing import Any, Mapping, Optional
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # type: ignore[assignment]
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # type: ignore[assignment]
+
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK_TYPE, "application/x-msgpack")
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+class ProjectionError(ValueError):
+    """Raised by ``project`` for field names the payload does not have."""
+
+
+def project(payload: Mapping[str, Any], fields: Optional[str]) -> Mapping[str, Any]:
+    """Keep only the comma-separated top-level ``fields`` of ``payload`` (all when empty)."""
+    if not fields:
+        return payload
+    wanted = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in wanted if name not in payload]
+    if unknown:
+        raise ProjectionError(
+            f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(payload)}."
+        )
+    return {name: payload[name] for name in wanted}
+
+
+def _json_default(value: Any) -> Any:
+    # numpy scalars and arrays that slip through un-validated payloads.
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_json(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(",", ":"), default=_json_default).encode()
+
+
+def _pack(value: Any, out: bytearray) -> None:
+    """Append the MessagePack encoding of ``value`` to ``out``."""
+    if value is None:
+        out.append(0xC0)
+    elif value is True:
+        out.append(0xC3)
+    elif value is False:
+        out.append(0xC2)
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            out.append(value)
+        elif -32 <= value < 0:
+            out.append(value & 0xFF)
+        elif -(2**63) <= value < 0:
+            out += struct.pack(">Bq", 0xD3, value)
+        elif value < 2**64:
+            out += struct.pack(">BQ", 0xCF, value)
+        else:
+            raise OverflowError("integer out of MessagePack range")
+    elif isinstance(value, float):
+        out += struct.pack(">Bd", 0xCB, value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        size = len(data)
+        if size < 32:
+            out.append(0xA0 | size)
+        elif size < 0x100:
+            out += struct.pack(">BB", 0xD9, size)
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xDA, size)
+        else:
+            out += struct.pack(">BI", 0xDB, size)
+        out += data
+    elif isinstance(value, (bytes, bytearray)):
+        out += struct.pack(">BI", 0xC6, len(value))
+        out += value
+    elif isinstance(value, Mapping):
+        size = len(value)
+        if size < 16:
+            out.append(0x80 | size)
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xDE, size)
+        else:
+            out += struct.pack(">BI", 0xDF, size)
+        for key, item in value.items():
+            _pack(key if isinstance(key, str) else str(key), out)
+            _pack(item, out)
+    elif isinstance(value, (list, tuple)):
+        size = len(value)
+        if size < 16:
+            out.append(0x90 | size)
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xDC, size)
+        else:
+            out += struct.pack(">BI", 0xDD, size)
+        for item in value:
+            _pack(item, out)
+    elif hasattr(value, "tolist"):
+        _pack(value.tolist(), out)
+    else:
+        raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+def dumps_msgpack(payload: Any) -> bytes:
+    if msgpack is not None:
+        return msgpack.packb(payload, default=_json_default, use_bin_type=True)
+    out = bytearray()
+    _pack(payload, out)
+    return bytes(out)
+
+
+def _accepted(header: str) -> list[str]:
+    """Media types or codings from an Accept-style header, highest q first (q=0 dropped)."""
+    ranked = []
+    for position, part in enumerate(header.split(",")):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0 and not math.isnan(quality):
+            ranked.append((-quality, position, name.strip().lower()))
+    return [name for _q, _position, name in sorted(ranked)]
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    for media_type in _accepted(accept or ""):
+        if media_type in MSGPACK_TYPES:
+            return MSGPACK_TYPE
+        if media_type in (JSON_TYPE, "application/*", "*/*"):
+            return JSON_TYPE
+    return JSON_TYPE
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    for coding in _accepted(accept_encoding or ""):
+        if coding == "br" and brotli is not None:
+            return "br"
+        if coding in ("gzip", "*"):
+            return "gzip"
+    return None
+
+
+def compress(body: bytes, coding: Optional[str]) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if coding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+def encode_response(
+    payload: Any,
+    accept: Optional[str] = None,
+    accept_encoding: Optional[str] = None,
+    status_code: int = 200,
+) -> Response:
+    """A ``Response`` carrying ``payload`` in the negotiated format and coding."""
+    media_type = negotiate_media_type(accept)
+    body = dumps_msgpack(payload) if media_type == MSGPACK_TYPE else dumps_json(payload)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    coding = negotiate_encoding(accept_encoding) if len(body) >= COMPRESS_MIN_BYTES else None
+    if coding is not None:
+        body = compress(body, coding)
+        headers["Content-Encoding"] = coding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
@@ -0,0 +1,403 @@
+"""Background analysis jobs for the web API.
+
+Uploads are queued in a ``JobManager`` and analysed on a dedicated
+``LogWorkerPool`` (one process per slot, crash- and timeout-isolated), so
+long analyses neither hold HTTP requests open nor starve the server's
+thread pool. A single dispatcher thread moves jobs from the bounded queue
+onto the pool, records outcomes and evicts finished jobs after their TTL.
+
+Batches (``submit_batch``) are groups of member jobs with their own queue:
+each batch runs at most ``batch_concurrency`` members at once, all batches
+together never take the last worker while interactive jobs could use it,
+and queued interactive jobs always start first.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from functools import partial
+from typing import Any, Callable, Optional
+
+from src.batch.pool import LogWorkerPool
+from src.telemetry import REGISTRY as METRICS
+
+
+JOB_WORKERS = 2
+JOB_QUEUE_LIMIT = 16
+JOB_TTL_SEC = 3600.0
+JOB_TIMEOUT_SEC = 600.0
+# How long shutdown waits for queued and running jobs before dropping them.
+JOB_DRAIN_SEC = 120.0
+POLL_INTERVAL_SEC = 0.2
+TERMINAL_STATES = ("done", "error")
+BATCH_CONCURRENCY = 1
+BATCH_LIMIT = 4
+# Task kinds, prefixed to every pool task so one pool serves both functions.
+_JOB, _BATCH_MEMBER = 0, 1
+
+
+def _run_task(funcs: tuple[Callable[..., Any], ...], kind: int, *args: Any) -> Any:
+    return funcs[kind](*args)
+
+
+def _failure_type(error: str) -> str:
+    """Coarse error type for metrics from a ``TaskOutcome.error`` message."""
+    if error.startswith("timed out"):
+        return "Timeout"
+    if error.startswith("worker crashed"):
+        return "WorkerCrash"
+    return "AnalysisError"
+
+
+class QueueFullError(Exception):
+    """Raised by ``JobManager.submit``/``submit_batch`` when the queue or batch limit is reached."""
+
+
+class JobManager:
+    """Bounded job queue in front of a ``LogWorkerPool``.
+
+    ``func(*task)`` runs in a worker process and its return value becomes
+    the job result. Jobs are plain dicts; ``version`` increases on every
+    change so streaming clients can tell when to emit an update. A job's
+    upload (``path``) is deleted once it finishes or is evicted.
+
+    Batch members run ``batch_func(*task)``; once every member of a batch
+    has finished, ``batch_summary(rows)`` turns their results (or error rows)
+    into the batch summary.
+    """
+
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        workers: int = JOB_WORKERS,
+        queue_limit: int = JOB_QUEUE_LIMIT,
+        ttl_sec: float = JOB_TTL_SEC,
+        timeout: Optional[float] = JOB_TIMEOUT_SEC,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: tuple = (),
+        batch_func: Optional[Callable[..., Any]] = None,
+        batch_summary: Optional[Callable[[list[dict[str, Any]]], Any]] = None,
+        batch_concurrency: int = BATCH_CONCURRENCY,
+        batch_limit: int = BATCH_LIMIT,
+    ):
+        self.workers = max(1, int(workers))
+        self.queue_limit = max(0, int(queue_limit))
+        self.ttl_sec = float(ttl_sec)
+        self.batch_concurrency = max(1, int(batch_concurrency))
+        self.batch_limit = max(0, int(batch_limit))
+        self.batch_slots = max(1, self.workers - 1)
+        self._batch_func = batch_func
+        self._batch_summary = batch_summary
+        self._pool = LogWorkerPool(
+            self.workers,
+            partial(_run_task, (func, batch_func)),
+            initializer=initializer,
+            initargs=initargs,
+            timeout=timeout,
+        )
+        self._jobs: dict[str, dict[str, Any]] = {}
+        self._batches: dict[str, dict[str, Any]] = {}
+        self._pending: deque[str] = deque()
+        self._running: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._draining = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._dispatch_loop, name="job-dispatcher", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, path: str, task: tuple, filename: str = "") -> dict[str, Any]:
+        """Queue ``task`` (whose input file is ``path``); raises ``QueueFullError`` at the limit."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("job manager is shut down")
+            if self._draining:
+                raise QueueFullError("server is shutting down")
+            if len(self._pending) >= self.queue_limit:
+                raise QueueFullError(f"{len(self._pending)} jobs already queued")
+            job = self._new_job(path, (_JOB, *task), filename)
+            self._pending.append(job["id"])
+            self._start()
+        self._wakeup.set()
+        return self.snapshot(job["id"]) or {}
+
+    def submit_batch(self, members: list[tuple[str, tuple, str]]) -> dict[str, Any]:
+        """Queue ``(path, task, filename)`` members as one batch.
+
+        Raises ``QueueFullError`` at the batch limit.
+        """
+        if self._batch_func is None:
+            raise RuntimeError("job manager has no batch function")
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("job manager is shut down")
+            if self._draining:
+                raise QueueFullError("server is shutting down")
+            active = sum(
+                1 for batch in self._batches.values() if batch["status"] not in TERMINAL_STATES
+            )
+            if active >= self.batch_limit:
+                raise QueueFullError(f"{active} batches already in progress")
+            batch_id = uuid.uuid4().hex
+            jobs = [
+                self._new_job(path, (_BATCH_MEMBER, *task), filename, batch_id)
+                for path, task, filename in members
+            ]
+            self._batches[batch_id] = {
+                "id": batch_id,
+                "status": "queued" if jobs else "done",
+                "created_at": time.time(),
+                "finished_at": None if jobs else time.time(),
+                "total": len(jobs),
+                "completed": 0,
+                "version": 0,
+                "members": [job["id"] for job in jobs],
+                "pending": deque(job["id"] for job in jobs),
+                "running": 0,
+                "rows": [],
+                "summary": None,
+                "error": None,
+            }
+            self._start()
+        self._wakeup.set()
+        return self.batch_snapshot(batch_id) or {}
+
+    def _new_job(
+        self, path: str, task: tuple, filename: str, batch_id: Optional[str] = None
+    ) -> dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "filename": filename,
+            "batch": batch_id,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "elapsed_sec": None,
+            "result": None,
+            "error": None,
+            "version": 0,
+            "path": path,
+            "task": task,
+        }
+        self._jobs[job_id] = job
+        return job
+
+    def snapshot(self, job_id: str) -> Optional[dict[str, Any]]:
+        """Public view of a job (no result), with its queue position while queued."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            view = {key: job[key] for key in job if key not in ("path", "task", "result")}
+            if job["status"] == "queued" and job["batch"] is None:
+                view["queue_position"] = self._pending.index(job_id) + 1
+            elif job["status"] == "running":
+                view["elapsed_sec"] = round(time.time() - job["started_at"], 3)
+            return view
+
+    def result(self, job_id: str) -> Any:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else job["result"]
+
+    def batch_snapshot(self, batch_id: str, since: int = 0) -> Optional[dict[str, Any]]:
+        """Public view of a batch with member results ``rows[since:]`` (in completion order)."""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            view = {key: batch[key] for key in batch if key not in ("pending", "rows")}
+            view["queued"] = len(batch["pending"])
+            view["rows"] = list(batch["rows"][since:])
+            return view
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            queued = len(self._pending) + sum(
+                len(batch["pending"]) for batch in self._batches.values()
+            )
+            counts = {"queued": queued, "running": len(self._running), "done": 0, "error": 0}
+            for job in self._jobs.values():
+                if job["status"] in TERMINAL_STATES:
+                    counts[job["status"]] += 1
+            return counts
+
+    def worker_pids(self) -> list[int]:
+        with self._lock:
+            return self._pool.pids()
+
+    def _touch(self, job: dict[str, Any], **changes: Any) -> None:
+        job.update(changes)
+        job["version"] += 1
+
+    def _remove_upload(self, job: dict[str, Any]) -> None:
+        path = job.get("path")
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _next_job(self) -> Optional[dict[str, Any]]:
+        """Queued interactive job first, else a member of the least busy batch under its limits."""
+        if self._pending:
+            return self._jobs[self._pending.popleft()]
+        if sum(batch["running"] for batch in self._batches.values()) >= self.batch_slots:
+            return None
+        ready = [
+            batch
+            for batch in self._batches.values()
+            if batch["pending"] and batch["running"] < self.batch_concurrency
+        ]
+        if not ready:
+            return None
+        batch = min(ready, key=lambda b: (b["running"], b["created_at"]))
+        batch["running"] += 1
+        if batch["status"] == "queued":
+            batch["status"] = "running"
+            batch["version"] += 1
+        return self._jobs[batch["pending"].popleft()]
+
+    def _finish_member(self, job: dict[str, Any], now: float) -> Optional[dict[str, Any]]:
+        """Record a finished member's row; returns its batch once every member is done."""
+        batch = self._batches[job["batch"]]
+        batch["running"] -= 1
+        batch["completed"] += 1
+        if job["status"] == "done":
+            row = job["result"]
+        else:
+            row = {"filename": job["filename"], "status": "ERROR", "error": job["error"]}
+        batch["rows"].append(row)
+        batch["version"] += 1
+        return batch if batch["completed"] == batch["total"] else None
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                while self._pool.has_capacity():
+                    job = self._next_job()
+                    if job is None:
+                        break
+                    index = self._pool.submit(job["task"])
+                    self._running[index] = job["id"]
+                    self._touch(job, status="running", started_at=time.time())
+                idle = not self._running
+
+            if idle:
+                self._wakeup.wait(POLL_INTERVAL_SEC)
+                self._wakeup.clear()
+                outcomes = []
+            else:
+                outcomes = self._pool.poll(timeout=POLL_INTERVAL_SEC)
+
+            now = time.time()
+            finished_batches = []
+            with self._lock:
+                for outcome in outcomes:
+                    job = self._jobs[self._running.pop(outcome.index)]
+                    self._touch(
+                        job,
+                        status="done" if outcome.ok else "error",
+                        result=outcome.value if outcome.ok else None,
+                        error=None if outcome.ok else outcome.error,
+                        finished_at=now,
+                        elapsed_sec=round(outcome.elapsed_sec, 3),
+                    )
+                    self._remove_upload(job)
+                    METRICS.observe(
+                        "job_duration_seconds", outcome.elapsed_sec, status=job["status"]
+                    )
+                    if not outcome.ok:
+                        METRICS.record_error("job", _failure_type(outcome.error))
+                    if job["batch"] is not None:
+                        batch = self._finish_member(job, now)
+                        if batch is not None:
+                            finished_batches.append((batch, list(batch["rows"])))
+                self._evict(now)
+
+            # Summaries (incident clustering) run outside the lock.
+            for batch, rows in finished_batches:
+                summary, error = None, None
+                if self._batch_summary is not None:
+                    try:
+                        summary = self._batch_summary(rows)
+                    except Exception as e:
+                        error = str(e) or type(e).__name__
+                        METRICS.record_error("batch_summary", e)
+                with self._lock:
+                    batch.update(
+                        status="done", summary=summary, error=error, finished_at=time.time()
+                    )
+                    batch["version"] += 1
+
+    def _evict(self, now: float) -> None:
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["batch"] is None
+            and job["status"] in TERMINAL_STATES
+            and now - job["finished_at"] >= self.ttl_sec
+        ]
+        for job_id in expired:
+            self._remove_upload(self._jobs.pop(job_id))
+        # Members go with their batch.
+        expired = [
+            batch_id
+            for batch_id, batch in self._batches.items()
+            if batch["status"] in TERMINAL_STATES and now - batch["finished_at"] >= self.ttl_sec
+        ]
+        for batch_id in expired:
+            for job_id in self._batches.pop(batch_id)["members"]:
+                self._remove_upload(self._jobs.pop(job_id))
+
+    def drain(self, timeout: float) -> bool:
+        """Refuse new work and wait up to ``timeout`` seconds for queued and running jobs to finish.
+
+        Returns whether everything finished; ``shutdown`` afterwards drops what is left.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._draining = True
+        while True:
+            with self._lock:
+                busy = self._pending or self._running or any(
+                    batch["status"] not in TERMINAL_STATES for batch in self._batches.values()
+                )
+            if not busy:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL_SEC)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            for job_id in self._pending:
+                self._remove_upload(self._jobs[job_id])
+            self._pending.clear()
+            for batch in self._batches.values():
+                for job_id in batch["pending"]:
+                    self._remove_upload(self._jobs[job_id])
+                batch["pending"].clear()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._pool.close()
+        with self._lock:
+            for job_id in self._running.values():
+                self._remove_upload(self._jobs[job_id])
+            self._running.clear()
@@ -0,0 +1,225 @@
+"""Hot-reloadable model artifacts for the web server.
+
+``ModelStore`` holds the current ``ModelSet``: the rule thresholds, the ML
+classifier and the anomaly detector, all loaded from one snapshot of
+``models/``. ``start()`` runs a watcher thread that polls the artifacts' stat
+signature. Once a change has been stable for one poll, the thread loads and
+validates the new set and swaps it in with a single reference assignment.
+Requests take ``current()`` once and keep that set to the end, so analyses in
+flight finish on the old models while new requests get the new ones.
+
+A candidate is rejected, and the running set stays, when:
+
+- the thresholds do not load
+- artifacts that exist fail to load
+- ``manifest.json`` does not match the feature schema, the label schema or
+  the ``rule_thresholds.yaml`` hash
+- the files changed again while loading
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from src.batch.manifest import HYBRID_MODEL_FILES, file_sha256, model_stat_signature, model_version
+from src.constants import DEFAULT_THRESHOLDS
+from src.diagnosis.anomaly_detector import AnomalyDetector
+from src.diagnosis.ml_classifier import MLClassifier
+from src.diagnosis.rule_engine import RuleEngine
+from src.runtime_paths import MODELS_DIR
+from src.telemetry import REGISTRY as METRICS
+
+
+logger = logging.getLogger(__name__)
+
+RELOAD_POLL_SEC = 5.0
+THRESHOLDS_FILE = "rule_thresholds.yaml"
+CLASSIFIER_FILE = "classifier.joblib"
+ANOMALY_FILE = "anomaly_detector.joblib"
+# Retried on the next poll rather than remembered as a rejected signature.
+CHANGED_WHILE_LOADING = "artifacts changed while loading"
+
+
+class ModelLoadError(RuntimeError):
+    """Raised by ``load_model_set`` for artifacts that must not be served."""
+
+
+class ModelSet:
+    """One consistent, read-only snapshot of the model artifacts."""
+
+    def __init__(
+        self,
+        version: str,
+        thresholds: dict[str, Any],
+        ml_classifier: MLClassifier,
+        anomaly_detector: AnomalyDetector,
+        files: dict[str, Optional[str]],
+        signature: tuple,
+    ):
+        self.version = version
+        self.thresholds = thresholds
+        self.ml_classifier = ml_classifier
+        self.anomaly_detector = anomaly_detector
+        self.files = files
+        self.signature = signature
+        self.loaded_at = time.time()
+
+    def status(self) -> dict[str, Any]:
+        manifest = getattr(self.ml_classifier, "manifest", {}) or {}
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "files": self.files,
+            "thresholds": len(self.thresholds),
+            "ml_classifier": {
+                "available": self.ml_classifier.available,
+                "reason": self.ml_classifier.unavailable_reason,
+                "model_version": manifest.get("model_version"),
+                "calibration_date": manifest.get("calibration_date"),
+            },
+            "anomaly_detector": {"available": self.anomaly_detector.available},
+        }
+
+
+def _load_thresholds(path: Path) -> dict[str, Any]:
+    if not path.exists():
+        return dict(DEFAULT_THRESHOLDS)
+    try:
+        thresholds = RuleEngine(config_path=str(path)).thresholds
+    except Exception as e:  # YAML syntax, or a top level that is not a mapping
+        raise ModelLoadError(f"{path.name}: {e}") from None
+    bad = [
+        key
+        for key, value in thresholds.items()
+        if isinstance(value, bool) or not isinstance(value, (int, float))
+    ]
+    if bad:
+        raise ModelLoadError(f"{path.name}: non-numeric thresholds: {', '.join(sorted(bad))}")
+    return thresholds
+
+
+def load_model_set(models_dir: Path = MODELS_DIR, strict: bool = True) -> ModelSet:
+    """Load and validate every artifact in ``models_dir``.
+
+    With ``strict``, artifacts that are present but unusable raise
+    ``ModelLoadError``. Without it, the set degrades as the engines always
+    have: the classifier or detector is marked unavailable and rules still
+    run. Startup loads are not strict; reloads are.
+    """
+    signature = model_stat_signature(models_dir)
+    version = model_version("hybrid", models_dir)
+    thresholds = _load_thresholds(models_dir / THRESHOLDS_FILE)
+    ml_classifier = MLClassifier(model_dir=models_dir)
+    anomaly_detector = AnomalyDetector(model_path=models_dir / ANOMALY_FILE)
+    if strict:
+        if (models_dir / CLASSIFIER_FILE).exists() and not ml_classifier.available:
+            raise ModelLoadError(f"ML classifier rejected: {ml_classifier.unavailable_reason}")
+        if (models_dir / ANOMALY_FILE).exists() and not anomaly_detector.available:
+            raise ModelLoadError("anomaly detector failed to load")
+    if model_stat_signature(models_dir) != signature:
+        raise ModelLoadError(CHANGED_WHILE_LOADING)
+    files = {
+        name: file_sha256(models_dir / name)[:16] if (models_dir / name).exists() else None
+        for name in HYBRID_MODEL_FILES
+    }
+    return ModelSet(version, thresholds, ml_classifier, anomaly_detector, files, signature)
+
+
+class ModelStore:
+    """The current ``ModelSet`` plus an optional watcher that reloads it when artifacts change."""
+
+    def __init__(self, models_dir: Path = MODELS_DIR, poll_sec: float = RELOAD_POLL_SEC):
+        self.models_dir = Path(models_dir)
+        self.poll_sec = float(poll_sec)
+        self._current: Optional[ModelSet] = None
+        # Serialises loads; readers never take it once a set is in place.
+        self._load_lock = threading.Lock()
+        self._seen_signature: Optional[tuple] = None
+        self._rejected_signature: Optional[tuple] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_checked: Optional[float] = None
+
+    def current(self) -> ModelSet:
+        """The set new requests should use; loaded (leniently) on first call."""
+        models = self._current
+        if models is None:
+            with self._load_lock:
+                if self._current is None:
+                    with METRICS.stage("load_models"):
+                        self._current = load_model_set(self.models_dir, strict=False)
+                models = self._current
+        return models
+
+    def refresh(self, settle: bool = True) -> bool:
+        """Reload if the artifacts changed; True when a new set was swapped in.
+
+        With ``settle``, a change is only acted on once the same signature
+        has been seen on two calls in a row, so a deployment copying several
+        files is not loaded half-way.
+        """
+        self.last_checked = time.time()
+        current = self.current()
+        signature = model_stat_signature(self.models_dir)
+        previous_seen, self._seen_signature = self._seen_signature, signature
+        if signature in (current.signature, self._rejected_signature):
+            return False
+        if settle and signature != previous_seen:
+            return False
+        with self._load_lock:
+            try:
+                with METRICS.stage("load_models"):
+                    candidate = load_model_set(self.models_dir, strict=True)
+            except ModelLoadError as e:
+                self.failures += 1
+                self.last_error = str(e)
+                METRICS.inc("model_reloads_total", outcome="rejected")
+                if str(e) != CHANGED_WHILE_LOADING:
+                    self._rejected_signature = signature
+                logger.warning("Model reload rejected, keeping %s: %s", current.version, e)
+                return False
+            self._current = candidate
+        self.reloads += 1
+        self.last_error = None
+        METRICS.inc("model_reloads_total", outcome="swapped")
+        logger.info("Models reloaded: %s -> %s", current.version, candidate.version)
+        return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_sec):
+            try:
+                self.refresh()
+            except Exception:  # keep watching; the next poll retries
+                logger.exception("Model reload check failed")
+
+    def start(self) -> None:
+        """Start the watcher thread (no-op when already running or ``poll_sec`` is 0)."""
+        if self.poll_sec <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="model-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self) -> dict[str, Any]:
+        return {
+            **self.current().status(),
+            "watching": self._thread is not None and self._thread.is_alive(),
+            "poll_sec": self.poll_sec,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_checked": self.last_checked,
+        }
@@ -0,0 +1,344 @@
+"""Pre-fork launcher: one parent holding the models, N forked uvicorn workers.
+
+uvicorn's own ``--workers`` starts fresh interpreters, and each one imports
+the diagnosis stack and loads every model artifact again. ``PreforkServer``
+binds the listening socket and runs ``preload`` in the parent instead, then
+freezes the heap (``gc.freeze``) so the collector does not touch those pages,
+and forks the workers. The workers inherit the loaded models and keep sharing
+their pages copy-on-write.
+
+Workers are recycled gracefully. A worker stops accepting connections after
+``max_requests`` requests (plus a random ``max_requests_jitter``, so workers
+do not all restart at once) or once its RSS passes ``max_rss_mb``. It then
+finishes the requests in flight and exits, and the parent forks a
+replacement. Every ``memory_report_sec`` the parent logs the RSS, PSS and
+shared memory of each worker.
+
+Signals:
+
+- SIGTERM and SIGINT stop the server.
+- SIGHUP runs ``preload`` again, so the parent picks up new model
+  artifacts, then recycles every worker.
+
+POSIX only.
+"""
+
+from __future__ import annotations
+
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import time
+from multiprocessing.sharedctypes import RawArray
+from typing import Any, Callable, Optional
+
+from src.telemetry import current_rss_bytes, memory_breakdown
+
+
+logger = logging.getLogger(__name__)
+
+MAX_REQUESTS = 1000
+MAX_REQUESTS_JITTER = 100
+MAX_RSS_MB = 0.0
+MEMORY_REPORT_SEC = 60.0
+GRACEFUL_TIMEOUT_SEC = 30.0
+# Workers dying sooner than this after their fork are restarted with a delay,
+# so a broken app does not turn into a fork loop.
+MIN_WORKER_LIFETIME_SEC = 5.0
+RESPAWN_DELAY_SEC = 1.0
+POLL_SEC = 0.2
+
+
+class RecyclingApp:
+    """ASGI wrapper that counts HTTP requests and asks the worker to exit when over its limits.
+
+    ``stop`` is called once, after the response that crosses
+    ``max_requests`` or ``max_rss_bytes`` (zero disables a limit);
+    ``counter[slot]`` mirrors the request count for the parent's reports.
+    """
+
+    def __init__(
+        self,
+        asgi_app: Any,
+        stop: Callable[[str], None],
+        max_requests: int = 0,
+        max_rss_bytes: int = 0,
+        counter: Any = None,
+        slot: int = 0,
+    ):
+        self.app = asgi_app
+        self.stop = stop
+        self.max_requests = max(0, int(max_requests))
+        self.max_rss_bytes = max(0, int(max_rss_bytes))
+        self.counter = counter
+        self.slot = slot
+        self.requests = 0
+        self.stopping = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.requests += 1
+            if self.counter is not None:
+                self.counter[self.slot] = self.requests
+            self._check_limits()
+
+    def _check_limits(self) -> None:
+        if self.stopping:
+            return
+        reason = None
+        if self.max_requests and self.requests >= self.max_requests:
+            reason = f"served {self.requests} requests"
+        elif self.max_rss_bytes:
+            rss = current_rss_bytes()
+            if rss is not None and rss > self.max_rss_bytes:
+                reason = f"RSS {rss / 2**20:.0f} MB over {self.max_rss_bytes / 2**20:.0f} MB"
+        if reason is not None:
+            self.stopping = True
+            self.stop(reason)
+
+
+def _mb(value: Optional[int]) -> str:
+    return "?" if value is None else f"{value / 2**20:.0f} MB"
+
+
+class PreforkServer:
+    """Fork ``workers`` uvicorn servers of ``app`` that share one listening socket."""
+
+    def __init__(
+        self,
+        app: str,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        workers: int = 2,
+        preload: Optional[Callable[[], None]] = None,
+        max_requests: int = MAX_REQUESTS,
+        max_requests_jitter: int = MAX_REQUESTS_JITTER,
+        max_rss_mb: float = MAX_RSS_MB,
+        memory_report_sec: float = MEMORY_REPORT_SEC,
+        graceful_timeout_sec: float = GRACEFUL_TIMEOUT_SEC,
+        log_level: str = "info",
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = max(1, int(workers))
+        self.preload = preload
+        self.max_requests = max(0, int(max_requests))
+        self.max_requests_jitter = max(0, int(max_requests_jitter))
+        self.max_rss_bytes = int(max_rss_mb * 2**20)
+        self.memory_report_sec = float(memory_report_sec)
+        self.graceful_timeout_sec = float(graceful_timeout_sec)
+        self.log_level = log_level
+        self._socket: Optional[socket.socket] = None
+        self._asgi_app: Any = None
+        # slot -> (pid, forked_at); pid None while waiting to respawn.
+        self._slots: dict[int, tuple[Optional[int], float]] = {}
+        self._respawn_at: dict[int, float] = {}
+        self._requests = RawArray("q", self.workers)
+        self._stopping = False
+        self._recycle_all = False
+
+    def run(self) -> None:
+        from uvicorn.importer import import_from_string
+
+        self._socket = socket.create_server((self.host, self.port), backlog=2048, reuse_port=False)
+        self._socket.set_inheritable(True)
+        self._asgi_app = import_from_string(self.app)
+        self._reload()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_recycle)
+        logger.info(
+            "Listening on http://%s:%d with %d pre-forked workers",
+            self.host,
+            self.port,
+            self.workers,
+        )
+        for slot in range(self.workers):
+            self._spawn(slot)
+        next_report = time.monotonic() + self.memory_report_sec
+        try:
+            while not self._stopping:
+                self._reap()
+                if self._recycle_all:
+                    self._recycle_all = False
+                    self._reload()
+                    self._signal_workers(signal.SIGTERM)
+                now = time.monotonic()
+                for slot, due in list(self._respawn_at.items()):
+                    if now >= due:
+                        del self._respawn_at[slot]
+                        self._spawn(slot)
+                if self.memory_report_sec > 0 and now >= next_report:
+                    self.log_memory()
+                    next_report = now + self.memory_report_sec
+                time.sleep(POLL_SEC)
+        finally:
+            self._shutdown()
+
+    def _reload(self) -> None:
+        """Run ``preload`` (again, on SIGHUP) so the next forks share the current models."""
+        if self.preload is not None:
+            started = time.perf_counter()
+            try:
+                self.preload()
+            except Exception:  # keep serving with whatever the parent already holds
+                logger.exception("Preload failed")
+            logger.info(
+                "Preloaded models in %.1fs (parent RSS %s)",
+                time.perf_counter() - started,
+                _mb(current_rss_bytes()),
+            )
+        gc.collect()
+        gc.freeze()
+
+    def _handle_stop(self, _signum, _frame) -> None:
+        self._stopping = True
+
+    def _handle_recycle(self, _signum, _frame) -> None:
+        self._recycle_all = True
+
+    def _spawn(self, slot: int) -> None:
+        self._requests[slot] = 0
+        pid = os.fork()
+        if pid:
+            self._slots[slot] = (pid, time.monotonic())
+            logger.info("Worker %d started (pid %d)", slot, pid)
+            return
+        code = 1
+        try:
+            self._serve(slot)
+            code = 0
+        except BaseException:
+            logger.exception("Worker %d crashed", slot)
+        finally:
+            os._exit(code)
+
+    def _serve(self, slot: int) -> None:
+        """Worker body: one uvicorn server on the inherited socket, until recycled or stopped."""
+        import uvicorn
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        # A terminal hangup reaches the whole process group; the parent decides.
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        random.seed()
+        server: Optional[uvicorn.Server] = None
+
+        def stop(reason: str) -> None:
+            logger.info("Worker %d (pid %d) recycling: %s", slot, os.getpid(), reason)
+            if server is not None:
+                server.should_exit = True
+
+        max_requests = self.max_requests
+        if max_requests and self.max_requests_jitter:
+            max_requests += random.randint(0, self.max_requests_jitter)
+        asgi_app = RecyclingApp(
+            self._asgi_app,
+            stop,
+            max_requests=max_requests,
+            max_rss_bytes=self.max_rss_bytes,
+            counter=self._requests,
+            slot=slot,
+        )
+        config = uvicorn.Config(
+            asgi_app,
+            log_level=self.log_level,
+            timeout_graceful_shutdown=self.graceful_timeout_sec,
+        )
+        server = uvicorn.Server(config)
+        server.run(sockets=[self._socket])
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            slot = next(
+                (slot for slot, (worker_pid, _) in self._slots.items() if worker_pid == pid), None
+            )
+            if slot is None:
+                continue
+            _pid, forked_at = self._slots[slot]
+            self._slots[slot] = (None, forked_at)
+            code = os.waitstatus_to_exitcode(status)
+            if self._stopping:
+                continue
+            lifetime = time.monotonic() - forked_at
+            # uvicorn re-raises the SIGTERM it drained on, so that exit is clean too.
+            failed = code not in (0, -signal.SIGTERM, -signal.SIGINT)
+            if failed:
+                logger.warning(
+                    "Worker %d (pid %d) exited with %d after %.0fs", slot, pid, code, lifetime
+                )
+            delay = RESPAWN_DELAY_SEC if failed and lifetime < MIN_WORKER_LIFETIME_SEC else 0.0
+            self._respawn_at[slot] = time.monotonic() + delay
+
+    def _live_pids(self) -> list[int]:
+        return [pid for pid, _ in self._slots.values() if pid is not None]
+
+    def _signal_workers(self, signum: int) -> None:
+        for pid in self._live_pids():
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _shutdown(self) -> None:
+        logger.info("Stopping %d workers", len(self._live_pids()))
+        self._stopping = True
+        self._signal_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout_sec + 5.0
+        while self._live_pids() and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(POLL_SEC)
+        self._signal_workers(signal.SIGKILL)
+        while self._live_pids():
+            self._reap()
+            time.sleep(POLL_SEC)
+        if self._socket is not None:
+            self._socket.close()
+
+    def memory_report(self) -> list[dict[str, Any]]:
+        """Per-process memory of the parent and every live worker (bytes; None where unknown)."""
+        rows = [{"role": "parent", "slot": None, "pid": os.getpid(), "requests": None}]
+        for slot, (pid, _forked_at) in sorted(self._slots.items()):
+            if pid is not None:
+                rows.append(
+                    {"role": "worker", "slot": slot, "pid": pid, "requests": self._requests[slot]}
+                )
+        for row in rows:
+            memory = memory_breakdown(row["pid"]) or {"rss": current_rss_bytes(row["pid"])}
+            row.update({key: memory.get(key) for key in ("rss", "pss", "shared", "private")})
+        return rows
+
+    def log_memory(self) -> None:
+        rows = self.memory_report()
+        for row in rows:
+            name = "parent" if row["role"] == "parent" else f"worker {row['slot']}"
+            requests = "" if row["requests"] is None else f" · {row['requests']} requests"
+            logger.info(
+                "%s (pid %d): RSS %s · PSS %s · shared %s · private %s%s",
+                name,
+                row["pid"],
+                _mb(row["rss"]),
+                _mb(row["pss"]),
+                _mb(row["shared"]),
+                _mb(row["private"]),
+                requests,
+            )
+        pss = [row["pss"] for row in rows]
+        if all(value is not None for value in pss):
+            logger.info("Total PSS %s across %d processes", _mb(sum(pss)), len(rows))
@@ -0,0 +1,216 @@
+"""Content-addressed cache of web analysis results.
+
+Keys combine the upload's SHA-256, the analysis options and the versions of
+everything that decides a result: the model artifacts and rule thresholds
+(``model_version``) and the parser/feature/diagnosis source
+(``code_version``). Entries live in an in-memory LRU in front of a JSON file
+tier on disk, both expiring after ``ttl_sec``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from src.batch.manifest import code_version, model_stat_signature, model_version
+from src.runtime_paths import MODELS_DIR, project_root
+
+
+CACHE_DIR = project_root() / "data" / "cache" / "web_results"
+MEMORY_ENTRIES = 64
+DISK_MAX_MB = 512.0
+CACHE_TTL_SEC = 7 * 24 * 3600.0
+# Writes between full scans of the disk tier; in between, a running size
+# total decides whether the cap was crossed.
+DISK_RESCAN_WRITES = 256
+# Pruning goes below the cap, so a full cache is not rescanned on every write.
+DISK_PRUNE_TO = 0.8
+
+
+class ResultCache:
+    """Two-tier (memory LRU + disk) result cache with TTL and a disk size cap.
+
+    Subclasses change the on-disk encoding by overriding ``SUFFIX``,
+    ``_read`` and ``_write``.
+    """
+
+    SUFFIX = ".json"
+
+    def __init__(
+        self,
+        cache_dir: str | os.PathLike[str] | None = CACHE_DIR,
+        memory_entries: int = MEMORY_ENTRIES,
+        disk_max_mb: float = DISK_MAX_MB,
+        ttl_sec: float = CACHE_TTL_SEC,
+        models_dir: Path = MODELS_DIR,
+        model_version_func: Optional[Callable[[], str]] = None,
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.memory_entries = max(0, int(memory_entries))
+        self.disk_max_bytes = int(disk_max_mb * 1024 * 1024)
+        self.ttl_sec = float(ttl_sec)
+        self.models_dir = models_dir
+        # The version of the models actually serving, when that can lag the files on disk.
+        self.model_version_func = model_version_func
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._code_version: Optional[str] = None
+        self._model_signature: Optional[tuple] = None
+        self._model_version = ""
+        # Unknown until the first scan; other processes sharing the directory
+        # are picked up by the periodic rescan.
+        self._disk_bytes: Optional[int] = None
+        self._writes_since_scan = 0
+        self.hits = 0
+        self.misses = 0
+
+    def versions(self) -> dict[str, str]:
+        """Code and model versions; models are re-hashed only when their stat changes."""
+        if self._code_version is None:
+            self._code_version = code_version()
+        if self.model_version_func is not None:
+            return {"code": self._code_version, "models": self.model_version_func()}
+        signature = model_stat_signature(self.models_dir)
+        if signature != self._model_signature:
+            self._model_version = model_version("hybrid", self.models_dir)
+            self._model_signature = signature
+        return {"code": self._code_version, "models": self._model_version}
+
+    def key(self, sha256: str, options: Optional[dict[str, Any]] = None) -> str:
+        payload = json.dumps(
+            {"sha256": sha256, "options": options or {}, **self.versions()}, sort_keys=True
+        ).encode()
+        return hashlib.sha256(payload).hexdigest()
+
+    def _path(self, key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / key[:2] / f"{key}{self.SUFFIX}"
+
+    def _read(self, path: Path) -> Any:
+        with open(path, "r", encoding="utf-8") as cache_file:
+            return json.load(cache_file)
+
+    def _write(self, path: Path, payload: Any) -> None:
+        with open(path, "w", encoding="utf-8") as cache_file:
+            json.dump(payload, cache_file)
+
+    def get(self, key: str) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl_sec:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        path = self._path(key)
+        payload = None
+        if path is not None and path.exists():
+            try:
+                if now - path.stat().st_mtime < self.ttl_sec:
+                    payload = self._read(path)
+                else:
+                    path.unlink()
+            except (OSError, ValueError):
+                payload = None
+
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, path.stat().st_mtime if path is not None else now, payload)
+        return payload
+
+    def contains(self, key: str) -> bool:
+        """Whether an unexpired entry exists, without reading it from disk."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] < self.ttl_sec:
+                return True
+        path = self._path(key)
+        try:
+            return path is not None and now - path.stat().st_mtime < self.ttl_sec
+        except OSError:
+            return False
+
+    def _remember(self, key: str, stored_at: float, payload: Any) -> None:
+        if not self.memory_entries:
+            return
+        self._memory[key] = (stored_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, key: str, payload: Any) -> None:
+        with self._lock:
+            self._remember(key, time.time(), payload)
+        path = self._path(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.tmp")
+            self._write(tmp_path, payload)
+            added = tmp_path.stat().st_size
+            try:
+                added -= path.stat().st_size
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._writes_since_scan += 1
+            if self._disk_bytes is not None:
+                self._disk_bytes += added
+            rescan = (
+                self._disk_bytes is None
+                or self._disk_bytes > self.disk_max_bytes
+                or self._writes_since_scan >= DISK_RESCAN_WRITES
+            )
+        if rescan:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Drop expired files and, over the cap, the oldest down to ``DISK_PRUNE_TO`` of it.
+
+        Resets the running size total.
+        """
+        assert self.cache_dir is not None
+        now = time.time()
+        files = []
+        total = 0
+        for path in self.cache_dir.glob(f"*/*{self.SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime >= self.ttl_sec:
+                path.unlink(missing_ok=True)
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        target = self.disk_max_bytes * DISK_PRUNE_TO if total > self.disk_max_bytes else total
+        for _mtime, size, path in sorted(files):
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+            self._writes_since_scan = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"memory_entries": len(self._memory), "hits": self.hits, "misses": self.misses}
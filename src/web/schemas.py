@@ -42,3 +42,20 @@ class AnalysisResponse(BaseModel):
     timeline_events: list[TimelineEvent]
     rule_output_only: str
     rule_output_diagnoses: list[dict[str, Any]]
+    diagnosis_timeline: dict[str, Any] | None = None
+    flight_segments: dict[str, Any] | None = None
+    cached: bool = False
+    series_id: str | None = None
+
+
+class TriageResponse(BaseModel):
+    filename: str
+    partial: bool
+    engine: str
+    sample_every: int
+    decoded_messages: int
+    total_messages: int
+    extraction_success: bool
+    diagnoses: list[Diagnosis]
+    decision: dict[str, Any]
+    elapsed_sec: float
@@ -0,0 +1,227 @@
+"""Multi-resolution time series for on-demand dashboard zooming.
+
+``build_series_set`` turns every numeric field of the parsed messages into a
+min/max pyramid: level 0 holds the raw samples, and each further level folds
+``PYRAMID_FAN_OUT`` buckets of the previous one into one (first timestamp,
+minimum, maximum). A query for a time range and a point budget is answered
+from the finest level that fits the budget, so zooming into 1 kHz IMU data
+only ever ships about ``points`` buckets. Min/max (rather than LTTB) keeps
+short spikes visible at every zoom level, which is what diagnosis needs.
+
+``SeriesStore`` keeps pyramids in the result cache's two-tier layout, as
+``.npz`` files next to the cached responses.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+import numpy as np
+
+from src.web.result_cache import ResultCache
+
+
+PYRAMID_FAN_OUT = 4
+PYRAMID_MIN_BUCKETS = 256
+MAX_QUERY_POINTS = 5000
+SERIES_MEMORY_ENTRIES = 8
+# Fields that distinguish sensor instances (IMU I, BAT Instance, XKF C, ...).
+INSTANCE_FIELDS = ("I", "Instance", "Inst", "C", "IMU")
+SKIPPED_FIELDS = {"mavpackettype", "TimeUS"}
+CATALOG_KEY = "__catalog__"
+
+
+def _series_key(message: str, instance: Optional[str], field: str) -> str:
+    return f"{message}[{instance}].{field}" if instance is not None else f"{message}.{field}"
+
+
+def _pyramid(times: np.ndarray, values: np.ndarray, key: str) -> dict[str, np.ndarray]:
+    arrays = {f"{key}/0/t": times, f"{key}/0/min": values}
+    level_t, level_min, level_max = times, values, values
+    level = 0
+    while len(level_t) > PYRAMID_MIN_BUCKETS:
+        level += 1
+        starts = np.arange(0, len(level_t), PYRAMID_FAN_OUT)
+        level_t = level_t[starts]
+        level_min = np.fmin.reduceat(level_min, starts)
+        level_max = np.fmax.reduceat(level_max, starts)
+        arrays[f"{key}/{level}/t"] = level_t
+        arrays[f"{key}/{level}/min"] = level_min
+        arrays[f"{key}/{level}/max"] = level_max
+    return arrays
+
+
+def _numeric_column(messages: list[dict[str, Any]], field: str) -> Optional[np.ndarray]:
+    try:
+        column = np.array([message.get(field) for message in messages], dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    return column.astype(np.float32) if column.ndim == 1 else None
+
+
+def _json_values(values: np.ndarray) -> list[Optional[float]]:
+    # float32 carries ~7 significant digits; more would only pad the JSON.
+    return [None if math.isnan(v) else float(f"{v:.7g}") for v in values.tolist()]
+
+
+def build_series_set(parsed: Mapping[str, Any], start_time_us: Optional[int]) -> "SeriesSet":
+    """Pyramids for every numeric field of every parsed message type.
+
+    Times are seconds from ``start_time_us`` (the analysis response's ``t``
+    origin). Message types with several sensor instances get one series per
+    instance.
+    """
+    arrays: dict[str, np.ndarray] = {}
+    catalog: dict[str, Any] = {}
+    for message_type, messages in sorted(parsed.get("messages", {}).items()):
+        timed = [message for message in messages if message.get("TimeUS") is not None]
+        if not timed:
+            continue
+        origin = start_time_us if start_time_us is not None else timed[0]["TimeUS"]
+        instance_field = next((name for name in INSTANCE_FIELDS if name in timed[0]), None)
+        groups: dict[Optional[str], list[dict[str, Any]]] = {None: timed}
+        if instance_field is not None:
+            by_instance: dict[Optional[str], list[dict[str, Any]]] = {}
+            for message in timed:
+                by_instance.setdefault(str(message.get(instance_field)), []).append(message)
+            if len(by_instance) > 1:
+                groups = dict(sorted(by_instance.items()))
+
+        fields = [
+            name
+            for name, value in timed[0].items()
+            if name not in SKIPPED_FIELDS
+            and name != instance_field
+            and isinstance(value, (int, float))
+        ]
+        entry: dict[str, Any] = {
+            "fields": [],
+            "instances": [],
+            "count": 0,
+            "t_start": None,
+            "t_end": None,
+        }
+        for instance, group in groups.items():
+            times = (
+                np.array([message["TimeUS"] for message in group], dtype=np.int64) - origin
+            ) / 1e6
+            order = np.argsort(times, kind="stable")
+            if np.any(order != np.arange(len(order))):
+                times = times[order]
+                group = [group[i] for i in order]
+            for field in fields:
+                column = _numeric_column(group, field)
+                if column is None:
+                    continue
+                arrays.update(_pyramid(times, column, _series_key(message_type, instance, field)))
+                if field not in entry["fields"]:
+                    entry["fields"].append(field)
+            if instance is not None:
+                entry["instances"].append(instance)
+            entry["count"] += len(group)
+            t_start, t_end = float(times[0]), float(times[-1])
+            entry["t_start"] = (
+                t_start if entry["t_start"] is None else min(entry["t_start"], t_start)
+            )
+            entry["t_end"] = t_end if entry["t_end"] is None else max(entry["t_end"], t_end)
+        if entry["fields"]:
+            catalog[message_type] = entry
+    return SeriesSet(catalog, arrays)
+
+
+class SeriesSet:
+    """The pyramids of one log plus a catalog of its messages, fields and instances."""
+
+    def __init__(self, catalog: dict[str, Any], arrays: dict[str, np.ndarray]):
+        self.catalog = catalog
+        self.arrays = arrays
+
+    def query(
+        self,
+        message: str,
+        field: str,
+        instance: Optional[str] = None,
+        t0: Optional[float] = None,
+        t1: Optional[float] = None,
+        points: int = 500,
+    ) -> Optional[dict[str, Any]]:
+        """At most ``points`` min/max buckets of one series over ``[t0, t1]``; None if unknown."""
+        entry = self.catalog.get(message)
+        if entry is None or field not in entry["fields"]:
+            return None
+        if entry["instances"]:
+            instance = instance if instance is not None else entry["instances"][0]
+            if instance not in entry["instances"]:
+                return None
+        else:
+            instance = None
+        key = _series_key(message, instance, field)
+        if f"{key}/0/t" not in self.arrays:
+            return None
+        points = max(1, int(points))
+
+        level = 0
+        while True:
+            times = self.arrays[f"{key}/{level}/t"]
+            if t0 is None:
+                lo = 0
+            elif level == 0:
+                lo = int(np.searchsorted(times, t0, side="left"))
+            else:
+                # The bucket starting before t0 still covers it.
+                lo = max(0, int(np.searchsorted(times, t0, side="right")) - 1)
+            hi = len(times) if t1 is None else int(np.searchsorted(times, t1, side="right"))
+            if hi - lo <= points or f"{key}/{level + 1}/t" not in self.arrays:
+                break
+            level += 1
+
+        times = times[lo:hi]
+        mins = self.arrays[f"{key}/{level}/min"][lo:hi]
+        maxs = self.arrays[f"{key}/{level}/max"][lo:hi] if level else mins
+        bucket_size = PYRAMID_FAN_OUT**level
+        if len(times) > points:
+            # Below the coarsest stored level: fold once more on the fly.
+            step = math.ceil(len(times) / points)
+            starts = np.arange(0, len(times), step)
+            times = times[starts]
+            mins = np.fmin.reduceat(mins, starts)
+            maxs = np.fmax.reduceat(maxs, starts)
+            bucket_size *= step
+        return {
+            "message": message,
+            "field": field,
+            "instance": instance,
+            "level": level,
+            "bucket_size": bucket_size,
+            "t": np.round(times, 4).tolist(),
+            "min": _json_values(mins),
+            "max": _json_values(maxs),
+        }
+
+
+class SeriesStore(ResultCache):
+    """``ResultCache`` of ``SeriesSet`` objects, stored on disk as ``.npz`` archives."""
+
+    SUFFIX = ".npz"
+
+    def __init__(self, *args: Any, memory_entries: int = SERIES_MEMORY_ENTRIES, **kwargs: Any):
+        super().__init__(*args, memory_entries=memory_entries, **kwargs)
+
+    def _read(self, path: Path) -> SeriesSet:
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                arrays = {name: archive[name] for name in archive.files}
+        except Exception as e:  # truncated or foreign archive
+            raise ValueError(f"unreadable series archive {path}: {e}") from None
+        catalog = json.loads(str(arrays.pop(CATALOG_KEY)))
+        return SeriesSet(catalog, arrays)
+
+    def _write(self, path: Path, payload: SeriesSet) -> None:
+        # A file object, because np.savez appends ".npz" to the ".tmp" path.
+        with open(path, "wb") as archive:
+            np.savez(
+                archive, **payload.arrays, **{CATALOG_KEY: np.array(json.dumps(payload.catalog))}
+            )
@@ -0,0 +1,31 @@
+from typing import Any, cast
+
+import pytest
+
+from src.diagnosis.hybrid_engine import HybridEngine
+
+
+class _VibeRuleEngine:
+    """Flags vibration whenever the VibeZ peak exceeds 60."""
+
+    def diagnose(self, features):
+        if features.get("vibe_z_max", 0.0) > 60.0:
+            return [
+                {
+                    "failure_type": "vibration_high",
+                    "confidence": 0.9,
+                    "evidence": [],
+                    "severity": "critical",
+                }
+            ]
+        return []
+
+
+class _NoML:
+    available = False
+
+
+@pytest.fixture
+def vibe_engine() -> HybridEngine:
+    """Rule-only ``HybridEngine`` whose single rule is a VibeZ threshold."""
+    return HybridEngine(rule_engine=cast(Any, _VibeRuleEngine()), ml_classifier=cast(Any, _NoML()))
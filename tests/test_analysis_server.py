@@ -0,0 +1,139 @@
+import os
+import sys
+import threading
+from functools import partial
+
+from src.cli import server
+from src.cli.commands import analyze
+from src.cli.server import AnalysisServer, forward_to_server, request
+
+
+class _FakeWarm:
+    def __init__(self, cache_size=0):
+        self.pipeline = self.rule_engine = self.hybrid_engine = self.retrieval = object()
+        self._cache = {}
+        self.hits = self.misses = 0
+        self.model_signature = ()
+        self.rebuilds = 0
+
+    def refresh(self):
+        return False
+
+
+def _fake_run(args, warm=None):
+    print(f"log={args.logfile} warm={warm is not None} tty={sys.stdout.isatty()}")
+    if args.logfile.endswith("bad.BIN"):
+        print("corrupt", file=sys.stderr)
+        raise SystemExit(2)
+
+
+def test_analyze_forwards_to_running_server(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(server, "WarmAnalyzer", _FakeWarm)
+    monkeypatch.setattr(analyze, "run", _fake_run)
+    socket_path = str(tmp_path / "a.sock")
+    daemon = AnalysisServer(socket_path)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+
+    monkeypatch.chdir(tmp_path)
+    assert forward_to_server(["analyze", "flight.BIN", "--socket", socket_path]) == 0
+    assert forward_to_server(["analyze", "bad.BIN", "--socket", socket_path]) == 2
+    out = capsys.readouterr()
+    # Relative paths resolve against the client's cwd, not the daemon's.
+    assert f"log={tmp_path / 'flight.BIN'} warm=True tty=False" in out.out
+    assert "corrupt" in out.err
+
+    assert request({"op": "status"}, socket_path)["requests"] == 2
+    assert request({"op": "shutdown"}, socket_path) == {"stopped": True}
+    thread.join(timeout=5)
+    assert not os.path.exists(socket_path)
+
+
+def test_server_streams_output_before_the_command_finishes(tmp_path, monkeypatch):
+    seen_preliminary = threading.Event()
+
+    def triage_run(args, warm=None):
+        print("preliminary: HEALTHY")
+        # Only finishes once the client has already shown the first line.
+        print(f"streamed={seen_preliminary.wait(timeout=5)}")
+
+    monkeypatch.setattr(server, "WarmAnalyzer", _FakeWarm)
+    monkeypatch.setattr(analyze, "run", triage_run)
+    socket_path = str(tmp_path / "a.sock")
+    daemon = AnalysisServer(socket_path)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+
+    frames = []
+
+    def on_output(stream, data):
+        frames.append((stream, data))
+        if data.startswith("preliminary"):
+            seen_preliminary.set()
+
+    payload = {
+        "op": "run",
+        "version": server.PROTOCOL_VERSION,
+        "code": daemon.code_version,
+        "argv": ["analyze", "f.BIN", "--triage"],
+        "cwd": str(tmp_path),
+    }
+    assert request(payload, socket_path, on_output=on_output) == {"exit_code": 0}
+    assert "".join(data for _stream, data in frames) == "preliminary: HEALTHY\nstreamed=True\n"
+
+    request({"op": "shutdown"}, socket_path)
+    thread.join(timeout=5)
+
+
+def test_analyze_falls_back_in_process_without_server(tmp_path, capsys):
+    socket_path = str(tmp_path / "missing.sock")
+    assert forward_to_server(["analyze", "flight.BIN", "--socket", socket_path]) is None
+    assert (
+        forward_to_server(["analyze", "flight.BIN", "--server", "off", "--socket", socket_path])
+        is None
+    )
+    assert forward_to_server(["features", "flight.BIN", "--socket", socket_path]) is None
+    assert (
+        forward_to_server(["analyze", "flight.BIN", "--server", "on", "--socket", socket_path]) == 2
+    )
+    assert "unavailable" in capsys.readouterr().err
+
+
+def test_server_rebuilds_engines_on_model_change_and_refuses_other_code(
+    tmp_path, monkeypatch, capsys
+):
+    built = []
+
+    def fake_build(self):
+        self.model_signature = server.model_stat_signature(self.models_dir)
+        self.rule_engine = self.hybrid_engine = object()
+        built.append(self.hybrid_engine)
+
+    monkeypatch.setattr(server.WarmAnalyzer, "_build_engines", fake_build)
+    monkeypatch.setattr(
+        analyze, "run", lambda args, warm=None: print(f"engine={built.index(warm.hybrid_engine)}")
+    )
+    monkeypatch.setattr(server, "WarmAnalyzer", partial(server.WarmAnalyzer, models_dir=tmp_path))
+    socket_path = str(tmp_path / "a.sock")
+    daemon = AnalysisServer(socket_path)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+    try:
+        monkeypatch.chdir(tmp_path)
+        assert forward_to_server(["analyze", "flight.BIN", "--socket", socket_path]) == 0
+        (tmp_path / "rule_thresholds.yaml").write_text("changed: true\n")
+        assert forward_to_server(["analyze", "flight.BIN", "--socket", socket_path]) == 0
+        assert capsys.readouterr().out == "engine=0\nengine=1\n"
+        status = request({"op": "status"}, socket_path)
+        assert status["engine_rebuilds"] == 1 and status["code"] == daemon.code_version
+
+        # A client from another checkout runs in-process rather than get stale results.
+        monkeypatch.setattr(server, "code_version", lambda: "0" * 16)
+        assert forward_to_server(["analyze", "flight.BIN", "--socket", socket_path]) is None
+        argv = ["analyze", "flight.BIN", "--server", "on", "--socket", socket_path]
+        assert forward_to_server(argv) is None
+        assert "runs other code" in capsys.readouterr().err
+        assert request({"op": "status"}, socket_path)["requests"] == 2
+    finally:
+        request({"op": "shutdown"}, socket_path)
+        thread.join(timeout=5)
@@ -0,0 +1,149 @@
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from src.diagnosis.anomaly_detector import AnomalyDetector
+
+COLUMNS = [f"f{index}" for index in range(6)]
+
+
+def _iso_detector(tmp_path):
+    rng = np.random.default_rng(0)
+    healthy = rng.normal(size=(300, len(COLUMNS)))
+    scaler = StandardScaler().fit(healthy)
+    iso_forest = IsolationForest(n_estimators=40, contamination=0.05, random_state=42)
+    iso_forest.fit(scaler.transform(healthy))
+    path = tmp_path / "anomaly_detector.joblib"
+    joblib.dump({"iso_forest": iso_forest, "scaler": scaler}, path)
+    return AnomalyDetector(path), scaler, iso_forest
+
+
+class _Layer:
+    def __init__(self, weights=(), config=None):
+        self._weights = list(weights)
+        self._config = config or {}
+
+    def get_weights(self):
+        return self._weights
+
+    def get_config(self):
+        return self._config
+
+
+class InputLayer(_Layer):
+    pass
+
+
+class Dense(_Layer):
+    pass
+
+
+class BatchNormalization(_Layer):
+    pass
+
+
+class Dropout(_Layer):
+    pass
+
+
+class _Model:
+    """Keras-like Sequential model exposing ``layers`` and ``predict``."""
+
+    def __init__(self, layers):
+        self.layers = layers
+
+    def predict(self, X, verbose=0):
+        for layer in self.layers:
+            kind = type(layer).__name__
+            if kind == "Dense":
+                W, b = layer.get_weights()
+                X = X @ W + b
+                if layer.get_config()["activation"] == "relu":
+                    X = np.maximum(X, 0)
+            elif kind == "BatchNormalization":
+                gamma, beta, mean, var = layer.get_weights()
+                X = gamma * (X - mean) / np.sqrt(var + layer.get_config()["epsilon"]) + beta
+        return X
+
+
+def test_isolation_forest_numpy_path_matches_sklearn(tmp_path):
+    detector, scaler, iso_forest = _iso_detector(tmp_path)
+    assert detector.numpy_arrays is not None
+
+    rows = np.random.default_rng(1).normal(scale=2.0, size=(200, len(COLUMNS)))
+    batch = detector.score_batch(rows, COLUMNS)
+    X = scaler.transform(rows)
+
+    assert np.allclose(batch["anomaly_score"], -iso_forest.decision_function(X))
+    assert np.array_equal(batch["is_anomaly"], iso_forest.predict(X) == -1)
+    assert batch["is_anomaly"].any() and not batch["is_anomaly"].all()
+
+
+def test_exported_npz_scores_like_bundle(tmp_path):
+    detector, _scaler, _iso = _iso_detector(tmp_path)
+    npz_path = tmp_path / "anomaly_detector.npz"
+    detector.export_numpy(npz_path)
+    exported = AnomalyDetector(npz_path)
+
+    rows = [{name: float(index) - 2.5 for index, name in enumerate(COLUMNS)}, {"f0": 9.0}]
+    assert exported.available and exported.model_type == "isolation_forest"
+    for row in rows:
+        assert exported.score(row, COLUMNS) == detector.score(row, COLUMNS)
+
+
+def test_autoencoder_numpy_forward_matches_model_predict(tmp_path):
+    rng = np.random.default_rng(2)
+    healthy = rng.normal(size=(50, len(COLUMNS)))
+    encoder = _Model(
+        [
+            InputLayer(),
+            Dense([rng.normal(size=(6, 4)), rng.normal(size=4)], {"activation": "relu"}),
+            BatchNormalization(
+                [
+                    rng.uniform(0.5, 1.5, 4),
+                    rng.normal(size=4),
+                    rng.normal(size=4),
+                    rng.uniform(0.5, 2, 4),
+                ],
+                {"epsilon": 1e-3},
+            ),
+            Dropout(),
+        ]
+    )
+    decoder = _Model(
+        [Dense([rng.normal(size=(4, 6)), rng.normal(size=6)], {"activation": "linear"})]
+    )
+    scaler = StandardScaler().fit(healthy)
+    path = tmp_path / "ae.joblib"
+    joblib.dump({"encoder": encoder, "decoder": decoder, "scaler": scaler, "threshold": 1.5}, path)
+
+    detector = AnomalyDetector(path)
+    assert detector.numpy_arrays is not None
+    rows = rng.normal(size=(20, len(COLUMNS)))
+    batch = detector.score_batch(rows, COLUMNS)
+
+    X = scaler.transform(rows)
+    expected = np.abs(X - decoder.predict(encoder.predict(X))).mean(axis=1)
+    assert np.allclose(batch["anomaly_score"], expected)
+    assert np.array_equal(batch["is_anomaly"], expected > 1.5)
+
+    single = detector.score(dict(zip(COLUMNS, rows[3])), COLUMNS)
+    assert np.isclose(single["anomaly_score"], expected[3])
+    assert [item["feature"] for item in single["top_deviations"]] == [
+        item["feature"] for item in batch["top_deviations"][3]
+    ]
+
+
+def test_missing_model_and_column_mismatch_return_neutral_scores(tmp_path):
+    missing = AnomalyDetector(tmp_path / "missing.joblib")
+    assert missing.score({"f0": 1.0}, COLUMNS) == {
+        "anomaly_score": 0.0,
+        "is_anomaly": False,
+        "top_deviations": [],
+    }
+
+    detector, _scaler, _iso = _iso_detector(tmp_path)
+    batch = detector.score_batch([{"f0": 1.0}], COLUMNS[:3])
+    assert batch["top_deviations"] == [[]]
+    assert not batch["is_anomaly"][0]
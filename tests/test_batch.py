@@ -0,0 +1,307 @@
+import argparse
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from src.batch.manifest import RunManifest
+from src.batch.metrics import RunMetrics
+from src.batch.pool import LogWorkerPool
+from src.cli.commands import batch
+
+_INIT_CALLS = []
+
+
+def _init(tag):
+    _INIT_CALLS.append(tag)
+
+
+def _task(kind, value):
+    if kind == "crash":
+        os._exit(3)
+    if kind == "sleep":
+        time.sleep(value)
+    if kind == "raise":
+        raise ValueError(f"bad {value}")
+    return {"value": value, "inits": len(_INIT_CALLS)}
+
+
+def test_pool_isolates_crashes_timeouts_and_errors():
+    tasks = [("ok", 1), ("crash", 2), ("sleep", 30), ("raise", 4), ("ok", 5), ("ok", 6)]
+    pool = LogWorkerPool(2, _task, initializer=_init, initargs=("x",), timeout=1.0)
+
+    started = time.monotonic()
+    outcomes = {outcome.index: outcome for outcome in pool.run(tasks)}
+
+    assert time.monotonic() - started < 20
+    assert sorted(outcomes) == list(range(len(tasks)))
+    assert "crashed" in outcomes[1].error
+    assert "timed out" in outcomes[2].error
+    assert outcomes[3].error == "bad 4"
+    for index in (0, 4, 5):
+        assert outcomes[index].ok and outcomes[index].value["value"] == tasks[index][1]
+        # Initializer ran exactly once in the worker that served the task.
+        assert outcomes[index].value["inits"] == 1
+
+
+def test_parallel_batch_rows_follow_filename_order(tmp_path, monkeypatch):
+    for name, size in (("a.bin", 10), ("b.bin", 5000), ("c.bin", 100)):
+        (tmp_path / name).write_bytes(b"x" * size)
+
+    dispatched = []
+
+    class _RecordingPool:
+        def __init__(self, jobs, func, initializer=None, initargs=(), timeout=None):
+            pass
+
+        def run(self, tasks):
+            tasks = list(tasks)
+            dispatched.extend(filename for _path, filename in tasks)
+            from src.batch.pool import TaskOutcome
+
+            for index in reversed(range(len(tasks))):
+                filename = tasks[index][1]
+                if filename == "c.bin":
+                    yield TaskOutcome(
+                        index, False, task=tasks[index], error="worker crashed (exit code -9)"
+                    )
+                else:
+                    yield TaskOutcome(
+                        index,
+                        True,
+                        task=tasks[index],
+                        value={"filename": filename, "status": "HEALTHY"},
+                    )
+
+    monkeypatch.setattr(batch, "LogWorkerPool", _RecordingPool)
+    cached = {"filename": "d.bin", "status": "HEALTHY"}
+    entries = [("a.bin", None), ("b.bin", None), ("d.bin", cached), ("c.bin", None)]
+    rows = list(batch._iter_rows(str(tmp_path), entries, "rule", None, 4, None))
+
+    assert dispatched == ["b.bin", "c.bin", "a.bin"]
+    assert [row["filename"] for row, _fresh in rows] == ["a.bin", "b.bin", "d.bin", "c.bin"]
+    assert [fresh for _row, fresh in rows] == [True, True, False, True]
+    assert rows[3][0] == {
+        "filename": "c.bin",
+        "status": "ERROR",
+        "error": "worker crashed (exit code -9)",
+        "size_bytes": 100,
+        "elapsed_sec": 0.0,
+    }
+
+
+def test_parallel_rows_reach_the_manifest_as_they_finish(tmp_path, monkeypatch):
+    events = []
+
+    class _ReversePool:
+        def __init__(self, jobs, func, initializer=None, initargs=(), timeout=None):
+            events.append(("timeout", timeout))
+
+        def run(self, tasks):
+            from src.batch.pool import TaskOutcome
+
+            tasks = list(tasks)
+            for index in reversed(range(len(tasks))):
+                yield TaskOutcome(
+                    index, True, task=tasks[index], value={"filename": tasks[index][1]}
+                )
+
+    monkeypatch.setattr(batch, "LogWorkerPool", _ReversePool)
+    entries = [(name, None) for name in ("a.bin", "b.bin", "c.bin")]
+
+    def on_complete(filename, row):
+        events.append(("recorded", filename))
+
+    for row, _fresh in batch._iter_rows(str(tmp_path), entries, "rule", None, 2, 5.0, on_complete):
+        events.append(("released", row["filename"]))
+
+    # The last log is recorded before the first one, which holds back its release, finishes.
+    assert events == [
+        ("timeout", 5.0),
+        ("recorded", "c.bin"),
+        ("recorded", "b.bin"),
+        ("recorded", "a.bin"),
+        ("released", "a.bin"),
+        ("released", "b.bin"),
+        ("released", "c.bin"),
+    ]
+    parser = argparse.ArgumentParser()
+    batch.register(parser.add_subparsers())
+    assert parser.parse_args(["batch", "logs"]).timeout == batch.JOB_TIMEOUT_SEC
+
+
+def test_batch_run_writes_error_rows_for_unreadable_logs(tmp_path, capsys):
+    (tmp_path / "broken.bin").write_bytes(b"not a dataflash log")
+    out_dir = tmp_path / "out"
+
+    batch.run(
+        SimpleNamespace(
+            directory=str(tmp_path), output_dir=str(out_dir), engine="rule", jobs=2, timeout=30
+        )
+    )
+
+    summary = (out_dir / "batch_summary.csv").read_text().splitlines()
+    assert summary[1].startswith("broken.bin,ERROR")
+    assert "1 errors" in capsys.readouterr().out
+
+
+def test_manifest_skips_unchanged_logs_and_reprocesses_on_model_change(tmp_path, monkeypatch):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    for name in ("a.bin", "b.bin"):
+        (logs / name).write_bytes(name.encode() * 10)
+    out_dir = tmp_path / "out"
+    calls = []
+
+    def _fake_analyze(filepath, filename):
+        calls.append(filename)
+        if filename == "b.bin" and calls.count("b.bin") == 1:
+            raise ValueError("transient")
+        (out_dir / f"{filename[0]}_report.json").write_text("{}")
+        return {
+            "filename": filename,
+            "status": "HEALTHY",
+            "top_diagnosis": "-",
+            "confidence": "0.00",
+        }
+
+    monkeypatch.setattr(batch, "init_worker", lambda *_args: None)
+    monkeypatch.setattr(batch, "analyze_file", _fake_analyze)
+    args = SimpleNamespace(
+        directory=str(logs), output_dir=str(out_dir), engine="rule", jobs=1, timeout=None
+    )
+
+    batch.run(args)
+    assert calls == ["a.bin", "b.bin"]
+
+    # Unchanged a.bin is skipped; the failed b.bin is retried.
+    batch.run(args)
+    assert calls[2:] == ["b.bin"]
+    summary = (out_dir / "batch_summary.csv").read_text().splitlines()
+    assert [line.split(",")[:2] for line in summary[1:]] == [
+        ["a.bin", "HEALTHY"],
+        ["b.bin", "HEALTHY"],
+    ]
+
+    batch.run(args)
+    assert len(calls) == 3
+
+    (logs / "a.bin").write_bytes(b"changed")
+    batch.run(args)
+    assert calls[3:] == ["a.bin"]
+
+    monkeypatch.setattr(batch, "model_version", lambda _engine: "new-thresholds")
+    batch.run(args)
+    assert sorted(calls[4:]) == ["a.bin", "b.bin"]
+
+
+def test_recursive_batch_streams_jsonl_and_csv(tmp_path, monkeypatch, capsys):
+    logs = tmp_path / "logs"
+    for rel in ("top.BIN", "day1/a.bin", "day1/notes.txt", "day2/deep/b.bin", "skip/c.bin"):
+        path = logs / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+    out_dir = tmp_path / "out"
+
+    def _fake_analyze(filepath, filename):
+        assert os.path.exists(filepath)
+        # Rows written so far are already flushed to disk.
+        streamed = (out_dir / "batch_results.jsonl").read_text().splitlines()
+        return {
+            "filename": filename,
+            "status": "FAIL",
+            "top_diagnosis": "vibration_high",
+            "confidence": "0.80",
+            "streamed_before": len(streamed),
+        }
+
+    walks = []
+    real_discover = batch.discover_logs
+
+    def _counting_discover(*args, **kwargs):
+        walks.append(args[0])
+        return real_discover(*args, **kwargs)
+
+    monkeypatch.setattr(batch, "init_worker", lambda *_args: None)
+    monkeypatch.setattr(batch, "analyze_file", _fake_analyze)
+    monkeypatch.setattr(batch, "discover_logs", _counting_discover)
+    batch.run(
+        SimpleNamespace(
+            directory=str(logs), output_dir=str(out_dir), engine="rule", jobs=1, timeout=None,
+            recursive=True, include=["*.bin"], exclude=["skip"], manifest=None, force=False,
+        )
+    )
+    assert len(walks) == 1  # the tree is walked once per run
+
+    results = [
+        json.loads(line) for line in (out_dir / "batch_results.jsonl").read_text().splitlines()
+    ]
+    assert [row["filename"] for row in results] == ["top.BIN", "day1/a.bin", "day2/deep/b.bin"]
+    assert [row["streamed_before"] for row in results] == [0, 1, 2]
+    csv_rows = (out_dir / "batch_summary.csv").read_text().splitlines()
+    assert csv_rows[3].startswith("day2/deep/b.bin,FAIL,vibration_high")
+    assert "[ 3x] vibration_high" in capsys.readouterr().out
+    assert batch._report_path(str(out_dir), "day2/deep/b.bin").endswith("day2__deep__b_report.json")
+
+
+def test_run_metrics_report_tracks_stages_latency_and_slowest(tmp_path):
+    metrics = RunMetrics(total=5, jobs=2, slowest_n=2)
+    for index, elapsed in enumerate((0.5, 3.0, 1.0)):
+        metrics.observe(
+            {
+                "filename": f"log{index}.bin",
+                "status": "WARNING",
+                "size_bytes": 2_000_000,
+                "elapsed_sec": elapsed,
+                "timings": {"parse": elapsed * 0.75, "extract": elapsed * 0.25},
+                "peak_rss_mb": 100.0 + index,
+            }
+        )
+    metrics.observe(
+        {
+            "filename": "bad.bin",
+            "status": "ERROR",
+            "error": "x",
+            "size_bytes": 10,
+            "elapsed_sec": 0.1,
+        }
+    )
+    metrics.observe({"filename": "cached.bin", "status": "HEALTHY"}, fresh=False)
+
+    report = metrics.write(str(tmp_path / "report.json"))
+
+    assert report["logs"] == {"total": 5, "processed": 4, "skipped": 1, "errors": 1}
+    assert report["bytes_processed"] == 6_000_010
+    assert report["stage_sec"]["parse"]["share"] == 0.75
+    assert report["latency_sec"]["max"] == 3.0
+    assert report["latency_sec"]["p50"] == 0.75
+    assert [entry["filename"] for entry in report["slowest"]] == ["log1.bin", "log2.bin"]
+    assert report["slowest"][0]["timings"]["parse"] == 2.25
+    assert report["peak_rss_mb"]["worker_max"] == 102.0
+    assert metrics.eta_sec() == 0.0
+    assert json.loads((tmp_path / "report.json").read_text())["jobs"] == 2
+
+
+def test_manifest_tolerates_logs_that_vanish_or_cannot_be_read(tmp_path, monkeypatch):
+    log = tmp_path / "a.bin"
+    log.write_bytes(b"a" * 10)
+    row = {"filename": "a.bin", "status": "HEALTHY"}
+    with RunManifest(tmp_path / "m.sqlite", "code", "models") as manifest:
+        manifest.record("gone.bin", str(tmp_path / "gone.bin"), row)
+        assert manifest.row("gone.bin") is None
+
+        def unreadable(_path):
+            raise PermissionError("denied")
+
+        monkeypatch.setattr("src.batch.manifest.file_sha256", unreadable)
+        manifest.record("a.bin", str(log), row)
+        assert not manifest.is_current("a.bin", str(log))
+        monkeypatch.undo()
+
+        manifest.record("a.bin", str(log), row)
+        assert manifest.is_current("a.bin", str(log))
+        os.utime(log, ns=(0, 0))
+        monkeypatch.setattr("src.batch.manifest.file_sha256", unreadable)
+        assert not manifest.is_current("a.bin", str(log))
+        log.unlink()
+        assert not manifest.is_current("a.bin", str(log))
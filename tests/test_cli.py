@@ -200,8 +200,26 @@ def test_ui_command_reports_missing_optional_dependency(capsys):
 
     with patch("builtins.__import__", side_effect=fake_import):
         with pytest.raises(SystemExit) as exc_info:
-            ui.run(SimpleNamespace(port=8000))
+            ui.run(SimpleNamespace(port=8000, workers=1, no_job_api=False))
 
     assert exc_info.value.code == 1
     captured = capsys.readouterr()
     assert "Optional web UI dependencies are not installed." in captured.out
+
+
+def test_ui_refuses_prefork_workers_with_the_job_api(capsys):
+    with (
+        patch.object(sys, "argv", ["main", "ui", "--workers", "4"]),
+        pytest.raises(SystemExit) as exc,
+    ):
+        main()
+    assert exc.value.code == 2
+    assert "--no-job-api" in capsys.readouterr().err
+
+
+def test_queue_worker_wait_requires_a_job(tmp_path, capsys):
+    test_args = ["main", "queue-worker", str(tmp_path / "q.sqlite"), "--wait"]
+    with patch.object(sys, "argv", test_args), pytest.raises(SystemExit) as exc:
+        main()
+    assert exc.value.code == 2
+    assert "--wait needs --job" in capsys.readouterr().out
@@ -0,0 +1,74 @@
+from typing import Any, cast
+
+import numpy as np
+
+from src.constants import FEATURE_NAMES
+from src.diagnosis.context import DiagnosisContext
+from src.diagnosis.hybrid_engine import HybridEngine
+from src.retrieval.similarity import FailureRetrieval, _normalized_vector
+
+
+class _CountingRuleEngine:
+    def __init__(self):
+        self.calls = 0
+
+    def diagnose(self, _features):
+        self.calls += 1
+        return [
+            {
+                "failure_type": "vibration_high",
+                "confidence": 0.9,
+                "evidence": [],
+                "severity": "critical",
+            }
+        ]
+
+
+class _StubMLClassifier:
+    available = False
+
+
+def test_rule_results_are_computed_once_per_context():
+    rules = _CountingRuleEngine()
+    engine = HybridEngine(
+        rule_engine=cast(Any, rules), ml_classifier=cast(Any, _StubMLClassifier())
+    )
+    context = DiagnosisContext({"vibe_z_max": 70.0})
+
+    diagnoses = engine.diagnose(context.features, context=context)
+    rule_only = context.rule_results(rules)
+
+    assert rules.calls == 1
+    assert diagnoses[0]["failure_type"] == rule_only[0]["failure_type"] == "vibration_high"
+    assert engine.last_explain_data["rule"] is rule_only
+
+
+def test_feature_and_retrieval_vectors_are_memoised():
+    features = {"vibe_z_max": 40.0, "mag_field_range": "bad", "gps_hdop_mean": None}
+    context = DiagnosisContext(features)
+
+    vector = context.feature_vector(FEATURE_NAMES)
+    assert context.feature_vector(list(FEATURE_NAMES)) is vector
+    assert vector[FEATURE_NAMES.index("vibe_z_max")] == 40.0
+    assert vector[FEATURE_NAMES.index("mag_field_range")] == 0.0
+    assert context.retrieval_vector() is context.retrieval_vector()
+    assert np.array_equal(context.retrieval_vector(), _normalized_vector(features))
+
+    retrieval = FailureRetrieval()
+    assert retrieval.find_similar(features, context=context) == retrieval.find_similar(features)
+
+
+def test_time_indices_follow_start_time_priority():
+    parsed = {
+        "messages": {
+            "VIBE": [{"VibeZ": 1.0}, {"TimeUS": 5_000_000}, {"TimeUS": 6_000_000}],
+            "GPS": [{"TimeUS": 1_000_000}],
+        },
+        "errors": [{"time_us": 500_000}],
+    }
+    context = DiagnosisContext({}, parsed)
+
+    assert context.start_time_us == 5_000_000
+    assert context.message_times_us("VIBE").tolist() == [5_000_000, 6_000_000]
+    assert len(context.message_times_us("ATT")) == 0
+    assert DiagnosisContext({}, {"errors": [{"time_us": 500_000}]}).start_time_us == 500_000
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import time
+
+from src.batch import distributed
+from src.batch.distributed import LeaseQueue, QueueWorker, run_job
+
+
+def _noop_init(*_args):
+    pass
+
+
+def _fake_task(filepath, item_id):
+    if item_id.startswith("poison"):
+        os._exit(9)
+    with open(filepath, "rb") as f:
+        return {"filename": item_id, "status": "HEALTHY", "size": len(f.read())}
+
+
+def _sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_lease_expiry_retry_and_quarantine(tmp_path):
+    queue = LeaseQueue(tmp_path / "q.sqlite", lease_sec=0.2, max_attempts=2)
+    queue.create_job("j", "batch", str(tmp_path), {})
+    assert queue.add_items("j", [("a", "a.bin", "h1"), ("b", "b.bin", "h2")]) == 2
+    assert queue.add_items("j", [("a", "a.bin", "h1")]) == 0
+
+    first = queue.lease("w1", "j", limit=1)
+    assert [item.item_id for item in first] == ["a"] and first[0].attempts == 1
+    assert queue.heartbeat("w1", "j", ["a"]) == set()
+
+    # w1 goes silent; once its lease lapses w2 takes the item over.
+    time.sleep(0.3)
+    second = queue.lease("w2", "j", limit=2)
+    assert [item.item_id for item in second] == ["a", "b"] and second[0].attempts == 2
+    assert queue.heartbeat("w1", "j", ["a"]) == {"a"}
+    assert not queue.complete("w1", "j", "a", {"late": True})
+
+    # Out of attempts: a failure quarantines instead of re-queueing.
+    assert queue.fail("w2", "j", "a", "boom")
+    assert queue.complete("w2", "j", "b", {"ok": 1})
+    assert queue.progress("j") == {"queued": 0, "leased": 0, "done": 1, "quarantined": 1}
+    assert [(item_id, state) for item_id, state, _r, _e in queue.results("j")] == [
+        ("a", "quarantined"),
+        ("b", "done"),
+    ]
+
+    # A graceful leave hands the lease back without charging an attempt.
+    queue.add_items("j", [("c", "c.bin", "h3")])
+    queue.lease("w3", "j")
+    assert queue.release("w3") == 1
+    assert queue.lease("w4", "j")[0].attempts == 1
+    queue.close()
+
+
+def test_workers_drain_job_and_quarantine_poison_logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        distributed,
+        "_task_kinds",
+        lambda: {"batch": (_noop_init, _fake_task, lambda cfg: ())},
+    )
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    items = []
+    for name, data in (
+        ("a.bin", b"aa"),
+        ("poison.bin", b"pp"),
+        ("b.bin", b"bbbb"),
+        ("changed.bin", b"c"),
+    ):
+        (logs / name).write_bytes(data)
+        items.append((name, name, _sha(data)))
+    (logs / "changed.bin").write_bytes(b"edited after queueing")
+    queue_path = str(tmp_path / "q.sqlite")
+
+    with LeaseQueue(queue_path) as queue:
+        queue.create_job("fleet", "batch", str(logs), {})
+        queue.add_items("fleet", items)
+
+    # Two workers share the job, as they would from two hosts.
+    QueueWorker(queue_path, "fleet", jobs=1, max_attempts=2, worker_id="host-a").run()
+    QueueWorker(queue_path, "fleet", jobs=2, max_attempts=2, worker_id="host-b").run()
+
+    queue = run_job(queue_path, "fleet", "batch", str(logs), {}, [], local_worker=False)
+    results = {
+        item_id: (state, row, error) for item_id, state, row, error in queue.results("fleet")
+    }
+    queue.close()
+
+    assert results["a.bin"][:2] == ("done", {"filename": "a.bin", "status": "HEALTHY", "size": 2})
+    assert results["b.bin"][1]["size"] == 4
+    assert results["poison.bin"][0] == "quarantined" and "crashed" in results["poison.bin"][2]
+    assert results["changed.bin"] == ("quarantined", None, "content hash changed")
+
+
+def test_rerun_resets_items_when_code_models_or_options_change(tmp_path, monkeypatch):
+    queue = LeaseQueue(tmp_path / "q.sqlite", max_attempts=1)
+    queue.create_job("j", "batch", str(tmp_path), {})
+    assert queue.add_items("j", [("a", "a.bin", "h1"), ("b", "b.bin", "h2")], version="v1") == 2
+    for item in queue.lease("w", "j", limit=2):
+        if item.item_id == "a":
+            queue.complete("w", "j", "a", {"ok": 1})
+        else:
+            queue.fail("w", "j", "b", "boom")
+
+    # Same bytes, same version: done stays done, but quarantined logs get another go.
+    assert queue.add_items("j", [("a", "a.bin", "h1"), ("b", "b.bin", "h2")], version="v1") == 1
+    assert queue.lease("w", "j", limit=2)[0].attempts == 1
+    queue.release("w")
+
+    # New models/code/options: everything is re-run from zero attempts.
+    assert queue.add_items("j", [("a", "a.bin", "h1")], version="v2") == 1
+    assert queue.progress("j") == {"queued": 2, "leased": 0, "done": 0, "quarantined": 0}
+    queue.close()
+
+    models = {"version": "m1"}
+    monkeypatch.setattr(distributed, "model_version", lambda engine: models["version"] + engine)
+    before = distributed.job_version("batch", {"engine": "rule"})
+    assert distributed.job_version("batch", {"engine": "rule"}) == before
+    assert distributed.job_version("batch", {"engine": "hybrid"}) != before
+    assert distributed.job_version("benchmark", {"engine": "rule"}) != before
+    models["version"] = "m2"
+    assert distributed.job_version("batch", {"engine": "rule"}) != before
+
+
+def test_add_items_hashes_outside_the_write_lock_in_batches(tmp_path, monkeypatch):
+    import sqlite3
+
+    monkeypatch.setattr(distributed, "ADD_ITEMS_BATCH", 2)
+    path = tmp_path / "q.sqlite"
+    queue = LeaseQueue(path)
+    queue.create_job("j", "batch", str(tmp_path), {})
+    (tmp_path / "a.bin").write_bytes(b"a")
+    other_host = sqlite3.connect(path, timeout=0.1, isolation_level=None)
+
+    def items():
+        for item in distributed.hashed_items(str(tmp_path), ["a.bin", "gone.bin", "a.bin"]):
+            # Another host can still take the write lock while logs are hashed.
+            other_host.execute("BEGIN IMMEDIATE")
+            other_host.execute("ROLLBACK")
+            yield item
+
+    assert queue.add_items("j", items()) == 2
+    rows = other_host.execute("SELECT item_id, sha256 FROM items ORDER BY seq").fetchall()
+    assert rows == [("a.bin", _sha(b"a")), ("gone.bin", None)]
+    other_host.close()
+    queue.close()
+
+
+def test_workers_follow_republished_jobs_and_refuse_foreign_versions(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        distributed,
+        "_task_kinds",
+        lambda: {"batch": (_noop_init, _fake_task, lambda cfg: ())},
+    )
+    monkeypatch.setattr(distributed, "code_version", lambda: "code-a")
+    monkeypatch.setattr(distributed, "model_version", lambda engine: f"models-{engine}")
+    (tmp_path / "a.bin").write_bytes(b"aa")
+    queue_path = str(tmp_path / "q.sqlite")
+    with LeaseQueue(queue_path) as queue:
+        queue.create_job("fleet", "batch", str(tmp_path), {"engine": "rule"})
+        queue.add_items(
+            "fleet",
+            [("a.bin", "a.bin", None)],
+            version=distributed.job_version("batch", {"engine": "rule"}),
+        )
+    # This worker joined before the coordinator republished with another engine.
+    worker = QueueWorker(queue_path, "fleet", worker_id="old-spec")
+    with LeaseQueue(queue_path) as queue:
+        config = {"engine": "hybrid"}
+        queue.create_job("fleet", "batch", str(tmp_path), config)
+        queue.add_items(
+            "fleet", [("a.bin", "a.bin", None)], version=distributed.job_version("batch", config)
+        )
+    worker.run()
+    assert worker.completed == 1 and worker.mismatch is None and worker.spec["config"] == config
+
+    # A host running other code must not complete the items.
+    with LeaseQueue(queue_path) as queue:
+        queue.add_items("fleet", [("b.bin", "a.bin", None)], version="published-by-newer-code")
+    stale = QueueWorker(queue_path, "fleet", worker_id="stale-host")
+    stale.run(idle_poll_sec=0)
+    assert stale.completed == 0 and "different code or models" in stale.mismatch
+    with LeaseQueue(queue_path) as queue:
+        assert queue.progress("fleet") == {"queued": 1, "leased": 0, "done": 1, "quarantined": 0}
+        assert queue.lease("w", "fleet")[0].attempts == 1  # the refusal cost no attempt
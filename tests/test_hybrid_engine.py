@@ -1,5 +1,6 @@
 from typing import Any, cast
 
+from src.diagnosis import hybrid_engine
 from src.diagnosis.hybrid_engine import HybridEngine
 
 
@@ -86,3 +87,20 @@ def test_hybrid_engine_emits_hypothesis_scaffolding():
     explain = engine.last_explain_data
     assert explain["hypotheses"][0]["failure_type"] == "thrust_loss"
     assert "preceded" in explain["causal_arbiter"]["reason"]
+
+
+def test_rule_only_engine_never_loads_model_artifacts(monkeypatch):
+    def refuse(*_args, **_kwargs):
+        raise AssertionError("model artifacts loaded")
+
+    monkeypatch.setattr(hybrid_engine, "MLClassifier", refuse)
+    monkeypatch.setattr(hybrid_engine, "AnomalyDetector", refuse)
+
+    class StubRuleEngine:
+        def diagnose(self, _features):
+            diag = {"failure_type": "vibration_high", "confidence": 0.9, "evidence": []}
+            return [dict(diag, severity="critical")]
+
+    engine = HybridEngine.rule_only(cast(Any, StubRuleEngine()))
+    assert not engine.ml.available and not engine.anomaly_detector.available
+    assert [diag["failure_type"] for diag in engine.diagnose({})] == ["vibration_high"]
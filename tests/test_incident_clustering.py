@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+
+from src.batch.clustering import IncidentClusterer
+from src.constants import FEATURE_NAMES
+
+
+def _write_incidents(path, per_group=60, seed=0):
+    rng = np.random.default_rng(seed)
+    n = len(FEATURE_NAMES)
+    centers = {
+        "vibration_high": np.zeros(n),
+        "compass_interference": np.zeros(n),
+        "power_instability": np.zeros(n),
+    }
+    centers["vibration_high"][:5] = 80.0
+    centers["compass_interference"][10:15] = 500.0
+    centers["power_instability"][20:25] = -40.0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            json.dumps({"filename": "ok.bin", "status": "HEALTHY", "feature_vector": [0.0] * n})
+            + "\n"
+        )
+        f.write(json.dumps({"filename": "bad.bin", "status": "ERROR", "error": "x"}) + "\n")
+        for label, center in centers.items():
+            for i in range(per_group):
+                vector = center.copy()
+                # Per-log spread on the features the failures actually move.
+                vector[:25] += rng.normal(0.0, 2.0, 25)
+                row = {"filename": f"{label}_{i}.bin", "status": "WARNING", "top_diagnosis": label}
+                row["feature_vector"] = vector.round(4).tolist()
+                f.write(json.dumps(row) + "\n")
+
+
+def test_streaming_kmeans_groups_same_failure_across_logs(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    _write_incidents(path)
+
+    result = IncidentClusterer(method="kmeans", n_clusters=3, chunk_size=32).fit(str(path))
+
+    assert result["n_incidents"] == 180 and result["scaling"] == "batch"
+    assert sorted(cluster["size"] for cluster in result["clusters"]) == [60, 60, 60]
+    for cluster in result["clusters"]:
+        assert len(cluster["labels"]) == 1
+        assert cluster["exemplar"].startswith(cluster["dominant_label"])
+        assert len(cluster["members_sample"]) == 10
+    matrix = np.array(result["similarity"]["matrix"])
+    assert matrix.shape == (3, 3)
+    assert np.allclose(np.diag(matrix), 1.0) and (matrix[~np.eye(3, dtype=bool)] < 0.5).all()
+
+
+def test_dbscan_finds_dense_groups_and_flags_noise(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    _write_incidents(path, per_group=20)
+    with open(path, "a", encoding="utf-8") as f:
+        outlier = [1000.0] * len(FEATURE_NAMES)
+        f.write(
+            json.dumps(
+                {
+                    "filename": "odd.bin",
+                    "status": "CRITICAL",
+                    "top_diagnosis": "x",
+                    "feature_vector": outlier,
+                }
+            )
+            + "\n"
+        )
+
+    result = IncidentClusterer(method="dbscan", eps=1.0, min_samples=3, chunk_size=16).fit(
+        str(path)
+    )
+
+    assert result["n_clusters"] == 3
+    assert result["noise"] == 1
+    assert {cluster["dominant_label"] for cluster in result["clusters"]} == {
+        "vibration_high",
+        "compass_interference",
+        "power_instability",
+    }
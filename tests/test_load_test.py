@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.benchmark import load_test
+from src.parser.bin_parser import LogParser
+
+
+class _Handler(BaseHTTPRequestHandler):
+    seen: list[tuple[str, str, int]] = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.seen.append((self.path, self.headers["Content-Type"], len(body)))
+        status = 500 if b"bad" in body else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    _Handler.seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_synthetic_log_has_the_requested_size_and_parses(tmp_path):
+    path = load_test.synthetic_log(tmp_path / "synthetic.BIN", 0.05)
+
+    assert 0.05 * 2**20 <= path.stat().st_size < 0.06 * 2**20
+    parsed = LogParser(str(path)).parse()
+    assert parsed["metadata"]["vehicle_type"] == "Copter"
+    assert {"IMU", "ATT", "VIBE", "BAT"} <= set(parsed["messages"])
+    assert {message["I"] for message in parsed["messages"]["IMU"]} == {0, 1}
+
+
+def test_run_load_replays_the_corpus_and_summarizes(tmp_path, http_server):
+    good = tmp_path / "good.BIN"
+    good.write_bytes(b"good log")
+    bad = tmp_path / "bad.BIN"
+    bad.write_bytes(b"bad log")
+
+    closed = load_test.run_load([good, bad], http_server, requests=6, concurrency=3)
+    summary = load_test.summarize(
+        closed, rss_samples=[100 * 2**20, 300 * 2**20], config={"concurrency": 3}
+    )
+
+    overall = summary["overall"]
+    assert (overall["requests"], overall["ok"], overall["errors"]) == (6, 3, 3)
+    assert overall["error_rate_pct"] == 50.0
+    assert overall["rss_peak_mb"] == 300.0 and overall["rss_mean_mb"] == 200.0
+    assert summary["errors_by_type"] == {"HTTP 500": 3}
+    assert summary["per_file"]["good.BIN"]["errors"] == 0
+    assert summary["per_file"]["bad.BIN"]["latency_ms"]["p50"] == 0.0
+    assert {path for path, _type, _size in _Handler.seen} == {"/api/analyze"}
+    assert all(
+        content_type.startswith("multipart/form-data")
+        for _path, content_type, _size in _Handler.seen
+    )
+
+    _Handler.seen = []
+    opened = load_test.run_load(
+        [good], http_server, requests=4, concurrency=2, rate=200.0, endpoint="stream"
+    )
+    assert len(opened["records"]) == 4
+    assert _Handler.seen[0] == (
+        "/api/analyze/stream?filename=good.BIN",
+        "application/octet-stream",
+        8,
+    )
+
+    markdown = load_test.to_markdown(summary)
+    assert markdown.startswith("# Load Test Results")
+    assert "| good.BIN |" in markdown and "- HTTP 500: 3" in markdown
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    def summary(p50, p95, rps, rss, error_rate):
+        return {
+            "overall": {
+                "latency_ms": {"p50": p50, "p95": p95, "p99": p95},
+                "throughput_rps": rps,
+                "rss_peak_mb": rss,
+                "error_rate_pct": error_rate,
+            }
+        }
+
+    rows = load_test.compare(
+        summary(100, 200, 10.0, 500, 0.0), summary(105, 260, 8.0, 510, 2.5), 10.0, 1.0
+    )
+    flagged = {row["metric"] for row in rows if row["regression"]}
+
+    assert flagged == {"latency_ms.p95", "latency_ms.p99", "throughput_rps", "error_rate_pct"}
+    assert next(row for row in rows if row["metric"] == "throughput_rps")["change_pct"] == -20.0
@@ -129,3 +129,93 @@ def test_duration_and_message_counts(monkeypatch):
     assert parsed["metadata"]["total_messages"] == 2
     assert parsed["metadata"]["message_types"]["VIBE"] == 2
     assert parsed["metadata"]["duration_sec"] == 3.0
+
+
+class _FakeIndexedReader:
+    """Mimics DFReader_binary's per-type offset index; offsets are list positions."""
+
+    def __init__(self, messages):
+        self._messages = list(messages)
+        names = sorted({msg.get_type() for msg in self._messages})
+        self.id_to_name = dict(enumerate(names))
+        self.offsets = [
+            [i for i, msg in enumerate(self._messages) if msg.get_type() == name] for name in names
+        ]
+        self.counts = [len(offsets) for offsets in self.offsets]
+        self.data_len = len(self._messages)
+        self.offset = 0
+        self.remaining = self.data_len
+
+    def recv_msg(self):
+        if self.offset >= self.data_len:
+            return None
+        msg = self._messages[self.offset]
+        self.offset += 1
+        return msg
+
+
+def test_parse_triage_samples_high_rate_types(monkeypatch):
+    fake_messages = [_FakeMessage("PARM", {"Name": "Q_ENABLE", "Value": 1, "TimeUS": 0})]
+    for i in range(20):
+        fake_messages.append(_FakeMessage("ATT", {"Roll": float(i), "TimeUS": 1_000_000 + i}))
+        fake_messages.append(_FakeMessage("VIBE", {"VibeZ": 10.0, "TimeUS": 1_000_000 + i}))
+    fake_messages.append(_FakeMessage("ERR", {"Subsys": 5, "ECode": 1, "TimeUS": 5_000_000}))
+    monkeypatch.setattr(
+        "src.parser.bin_parser.DFReader.DFReader_binary",
+        lambda _filepath: _FakeIndexedReader(fake_messages),
+    )
+
+    parsed = LogParser("fake.BIN").parse_triage(sample_every=5)
+    metadata = parsed["metadata"]
+    assert [msg["Roll"] for msg in parsed["messages"]["ATT"]] == [0.0, 5.0, 10.0, 15.0]
+    assert len(parsed["messages"]["VIBE"]) == 20
+    assert parsed["errors"][0]["subsystem_name"] == "FAILSAFE_RADIO"
+    # Counts come from the index, not from what was decoded.
+    assert metadata["message_types"]["ATT"] == 20
+    assert metadata["total_messages"] == 42
+    assert metadata["duration_sec"] == 5.0
+    assert metadata["vehicle_type"] == "Plane"
+    assert metadata["triage"] == {"partial": True, "sample_every": 5, "decoded_messages": 26}
+
+
+def _fmt_message(type_id, name, fmt, columns):
+    import struct
+
+    length = 3 + struct.calcsize("<" + fmt.replace("Z", "64s").replace("N", "16s"))
+    return b"\xa3\x95\x80" + struct.pack(
+        "<BB4s16s64s", type_id, length, name.encode(), fmt.encode(), columns.encode()
+    )
+
+
+def _synthetic_log() -> bytes:
+    import struct
+
+    data = _fmt_message(0x81, "MSG", "QZ", "TimeUS,Message")
+    data += _fmt_message(0x82, "PARM", "QNf", "TimeUS,Name,Value")
+    data += _fmt_message(0x83, "VIBE", "Qfff", "TimeUS,VibeX,VibeY,VibeZ")
+    data += b"\xa3\x95\x81" + struct.pack("<Q64s", 1_000_000, b"ArduCopter V4.5.1")
+    data += b"\xa3\x95\x82" + struct.pack("<Q16sf", 1_100_000, b"FRAME_CLASS", 1.0)
+    data += b"garbage\xa3\x95\x99"  # junk and an unknown type are skipped
+    for i in range(20):
+        data += b"\xa3\x95\x83" + struct.pack("<Qfff", 2_000_000 + i * 100_000, 1.0, 2.0, float(i))
+    return data + b"\xa3\x95\x83\x00\x01"  # truncated trailing message
+
+
+def test_streaming_decoder_matches_full_parse(tmp_path):
+    from src.parser.streaming import StreamingLogDecoder
+
+    log_path = tmp_path / "synthetic.BIN"
+    data = _synthetic_log()
+    log_path.write_bytes(data)
+    expected = LogParser(str(log_path)).parse()
+
+    for chunk_size in (1, 5, len(data)):
+        decoder = StreamingLogDecoder(str(log_path))
+        for start in range(0, len(data), chunk_size):
+            decoder.feed(data[start:start + chunk_size])
+        parsed = decoder.finish()
+
+        assert parsed == expected
+        assert parsed["metadata"]["vehicle_type"] == "Copter"
+        assert len(parsed["messages"]["VIBE"]) == 20
+        assert parsed["metadata"]["duration_sec"] == 2.9
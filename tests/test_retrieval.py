@@ -1,5 +1,8 @@
+import json
 from pathlib import Path
 
+import numpy as np
+
 from src.retrieval.similarity import FailureRetrieval
 
 def test_empty_database(tmp_path):
@@ -72,3 +75,61 @@ def test_default_known_failures_path_is_repo_relative(monkeypatch, tmp_path):
     assert Path(retrieval.known_failures_path).is_absolute()
     assert Path(retrieval.known_failures_path).exists()
     assert retrieval.known.get("failures")
+
+
+def test_append_is_journaled_and_index_is_memory_mapped(tmp_path):
+    path = tmp_path / "known.json"
+    retrieval = FailureRetrieval(str(path))
+    retrieval.add_known_failure({"vibe_z_max": 100.0}, "vibration_high")
+    retrieval.add_known_failure({"mag_field_range": 900.0}, "compass_interference")
+
+    assert not path.exists()
+    assert len(Path(retrieval.journal_path).read_text().splitlines()) == 2
+
+    reloaded = FailureRetrieval(str(path))
+    assert isinstance(reloaded.matrix, np.memmap)
+    assert (
+        reloaded.find_similar({"mag_field_range": 850.0})[0]["failure_type"]
+        == "compass_interference"
+    )
+
+    reloaded.compact()
+    assert not Path(reloaded.journal_path).exists()
+    assert len(json.loads(path.read_text())["failures"]) == 2
+    assert isinstance(FailureRetrieval(str(path)).matrix, np.memmap)
+
+
+def test_index_rebuilds_when_source_changes(tmp_path):
+    path = tmp_path / "known.json"
+    retrieval = FailureRetrieval(str(path))
+    retrieval.add_known_failure({"vibe_z_max": 100.0}, "vibration_high")
+    retrieval.compact()
+
+    data = json.loads(path.read_text())
+    data["failures"][0]["features"] = {"gps_hdop_max": 5.0}
+    data["failures"][0]["failure_type"] = "gps_quality_poor"
+    path.write_text(json.dumps(data))
+
+    res = FailureRetrieval(str(path)).find_similar({"gps_hdop_max": 4.0})
+    assert res[0]["failure_type"] == "gps_quality_poor"
+
+
+def test_approximate_mode_matches_exact_top1(tmp_path):
+    rng = np.random.default_rng(3)
+    centers = {
+        "vibration_high": {"vibe_z_max": 80.0, "vibe_clip_total": 200.0},
+        "compass_interference": {"mag_field_range": 900.0, "mag_field_std": 120.0},
+        "power_instability": {"bat_volt_range": 3.0, "bat_curr_max": 60.0},
+    }
+    exact = FailureRetrieval(str(tmp_path / "known.json"), approximate=False)
+    for _ in range(40):
+        for label, center in centers.items():
+            noisy = {k: v * (1.0 + 0.05 * rng.standard_normal()) for k, v in center.items()}
+            exact.add_known_failure(noisy, label)
+
+    approx = FailureRetrieval(str(tmp_path / "known.json"), approximate=True)
+    for label, center in centers.items():
+        exact_hit = exact.find_similar(center, top_k=1)[0]
+        approx_hit = approx.find_similar(center, top_k=1)[0]
+        assert approx_hit["failure_type"] == exact_hit["failure_type"] == label
+        assert approx_hit["similarity"] > 0.99
@@ -0,0 +1,86 @@
+from src.diagnosis.segmentation import (
+    FlightSegmentAnalyzer,
+    find_flight_segments,
+    restrict_to_segments,
+)
+
+
+START_US = 1_000_000_000
+
+
+def _parsed() -> dict:
+    """Two flights (20-50 s, 120-140 s) inside arm periods with ground idle around them.
+
+    Only the second flight vibrates; the first arm includes 10 s of spin-up idle.
+    """
+    vibe, rcou, gps = [], [], []
+    for tenth in range(1600):
+        t_sec = tenth / 10
+        t_us = START_US + tenth * 100_000
+        flying = 20 <= t_sec < 50 or 120 <= t_sec < 140
+        pwm = 1450 if flying else 1100
+        rcou.append({"TimeUS": t_us, "C1": pwm, "C2": pwm, "C3": pwm, "C4": pwm})
+        vibe.append(
+            {
+                "TimeUS": t_us,
+                "VibeX": 5.0,
+                "VibeY": 5.0,
+                "VibeZ": 80.0 if 120 <= t_sec < 140 else 10.0,
+            }
+        )
+        gps.append(
+            {
+                "TimeUS": t_us,
+                "Status": 3,
+                "NSats": 12,
+                "HDop": 0.8,
+                "Spd": 0.2,
+                "Lat": 1,
+                "Lng": 1,
+                "Alt": 10,
+            }
+        )
+    events = [
+        {"time_us": START_US + 10_000_000, "id": 10, "name": "ARMED"},
+        {"time_us": START_US + 55_000_000, "id": 11, "name": "DISARMED"},
+        {"time_us": START_US + 70_000_000, "id": 10, "name": "ARMED"},
+        {"time_us": START_US + 80_000_000, "id": 11, "name": "DISARMED"},  # ground-only arm
+        {"time_us": START_US + 118_000_000, "id": 10, "name": "ARMED"},
+    ]
+    return {
+        "metadata": {"vehicle_type": "Copter", "duration_sec": 160.0},
+        "messages": {"VIBE": vibe, "RCOU": rcou, "GPS": gps},
+        "parameters": {},
+        "events": events,
+        "errors": [
+            {"time_us": START_US + 30_000_000, "subsystem": 5},
+            {"time_us": START_US + 90_000_000, "subsystem": 6},
+        ],
+    }
+
+
+def test_segments_trim_ground_idle_and_drop_ground_only_arms():
+    parsed = _parsed()
+    segments = find_flight_segments(parsed)
+
+    assert [(seg["t_start"], seg["t_end"], seg["source"]) for seg in segments] == [
+        (18.0, 52.0, "arm"),
+        (118.0, 142.0, "arm"),
+    ]
+
+    restricted = restrict_to_segments(parsed, segments)
+    assert len(restricted["messages"]["VIBE"]) == 341 + 241  # both bounds inclusive
+    assert [err["subsystem"] for err in restricted["errors"]] == [5]
+    assert restricted["metadata"]["duration_sec"] == 58.0
+
+
+def test_segment_analyzer_reports_each_flight_and_the_union(vibe_engine):
+    report = FlightSegmentAnalyzer(engine=vibe_engine, use_ml=False).analyze(_parsed())
+
+    assert [seg["decision"]["top_guess"] for seg in report["segments"]] == [None, "vibration_high"]
+    assert report["aggregate"]["by_label"] == {
+        "vibration_high": {"segments": [1], "max_confidence": 0.9}
+    }
+    assert report["aggregate"]["decision"]["top_guess"] == "vibration_high"
+    assert report["flight_sec"] == 58.0 and report["ground_sec"] == 101.9
+    assert report["features"]["_metadata"]["duration_sec"] == 58.0
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import pytest
+
+from src.batch.metrics import RunMetrics
+from src.telemetry import MetricsRegistry, memory_breakdown
+
+
+def test_registry_renders_prometheus_text_and_calls_stage_hooks(tmp_path):
+    registry = MetricsRegistry()
+    registry.describe("stage_duration_seconds", "histogram", "Stage time.", buckets=(0.1, 1.0))
+    seen = []
+    registry.add_hook(lambda stage, seconds, labels: seen.append((stage, seconds, labels)))
+
+    registry.record_stage("parse", 0.5, source="web")
+    registry.record_stage("parse", 2.0, source="web")
+    registry.inc("errors_total", where="analyze", type='Bad"Quote')
+    registry.set("job_queue_depth", 3, state="queued")
+    text = registry.render()
+
+    assert "# TYPE ardupilot_stage_duration_seconds histogram" in text
+    assert 'ardupilot_stage_duration_seconds_bucket{source="web",stage="parse",le="0.1"} 0' in text
+    assert 'ardupilot_stage_duration_seconds_bucket{source="web",stage="parse",le="1"} 1' in text
+    assert 'ardupilot_stage_duration_seconds_bucket{source="web",stage="parse",le="+Inf"} 2' in text
+    assert 'ardupilot_stage_duration_seconds_sum{source="web",stage="parse"} 2.5' in text
+    assert 'ardupilot_errors_total{type="Bad\\"Quote",where="analyze"} 1' in text
+    assert 'ardupilot_job_queue_depth{state="queued"} 3' in text
+    assert seen == [("parse", 0.5, {"source": "web"}), ("parse", 2.0, {"source": "web"})]
+
+    with pytest.raises(ValueError):
+        registry.inc("job_queue_depth")
+
+    path = tmp_path / "metrics.prom"
+    registry.write_textfile(str(path))
+    assert path.read_text() == registry.render()
+
+
+def test_run_metrics_mirrors_batch_rows_into_registry():
+    registry = MetricsRegistry()
+    metrics = RunMetrics(total=2, registry=registry)
+
+    metrics.observe(
+        {"status": "HEALTHY", "size_bytes": 100, "elapsed_sec": 0.3, "timings": {"parse": 0.2}}
+    )
+    metrics.observe({"status": "ERROR", "size_bytes": 50, "elapsed_sec": 0.1})
+    metrics.observe({"status": "HEALTHY", "size_bytes": 999}, fresh=False)
+
+    assert registry.value("bytes_processed_total", source="batch") == 150
+    assert registry.value("stage_duration_seconds", stage="parse", source="batch")["count"] == 1
+    assert registry.value("errors_total", where="batch", type="AnalysisError") == 1
+    assert registry.value("batch_logs_total", status="HEALTHY") == 1
+
+
+def test_memory_breakdown_reads_smaps_rollup():
+    memory = memory_breakdown()
+    if memory is None:
+        pytest.skip("smaps_rollup not available")
+    assert memory["rss"] > 0
+    assert 0 < memory["pss"] <= memory["rss"]
+    assert memory["shared"] + memory["private"] <= memory["rss"]
@@ -0,0 +1,106 @@
+import numpy as np
+import yaml
+
+from src.benchmark.calibration import compute_false_critical_rate
+from src.benchmark.results import BenchmarkResults
+from src.benchmark.threshold_tuning import (
+    FeatureCache,
+    ThresholdEvaluator,
+    _multi_hot,
+    candidate_thresholds_yaml,
+    default_search_space,
+    load_base_thresholds,
+    load_feature_cache,
+    tune_thresholds,
+    tuning_report,
+)
+from src.constants import FEATURE_NAMES, VALID_LABELS
+from src.diagnosis.rule_engine import RuleEngine
+
+
+def _cache() -> FeatureCache:
+    rows = [
+        ({"vibe_z_max": 70.0, "vibe_clip_total": 150.0}, ["vibration_high"]),
+        ({"vibe_z_max": 45.0}, ["vibration_high"]),
+        ({"vibe_z_max": 33.0}, ["healthy"]),
+        ({"mag_field_range": 900.0, "mag_field_std": 120.0}, ["compass_interference"]),
+        ({"gps_hdop_mean": 2.4, "gps_fix_pct": 1.0, "gps_nsats_min": 12.0}, ["healthy"]),
+        ({"gps_fix_pct": 1.0, "gps_nsats_min": 14.0}, ["healthy"]),
+    ]
+    features = np.zeros((len(rows), len(FEATURE_NAMES)))
+    for row_index, (values, _labels) in enumerate(rows):
+        for name, value in values.items():
+            features[row_index, FEATURE_NAMES.index(name)] = value
+    return FeatureCache(
+        filenames=[f"log_{index}.BIN" for index in range(len(rows))],
+        columns=list(FEATURE_NAMES),
+        features=features,
+        labels=_multi_hot([labels for _values, labels in rows]),
+    )
+
+
+def _evaluator(cache: FeatureCache, engine: str = "rule") -> ThresholdEvaluator:
+    base = load_base_thresholds()
+    space = default_search_space(base, rule_keys=["vibe_max_warn", "gps_hdop_limit"])
+    return ThresholdEvaluator(cache, space, base, engine=engine)
+
+
+def test_default_config_matches_rule_engine_benchmark():
+    cache = _cache()
+    evaluator = _evaluator(cache)
+    metrics = evaluator.evaluate(evaluator.default_indices()[None, :])
+
+    engine = RuleEngine(thresholds=evaluator.base_thresholds)
+    results = BenchmarkResults()
+    fcr_rows = []
+    for index in range(len(cache)):
+        predictions = engine.diagnose(cache.row_features(index))
+        truth = [label for label, flag in zip(VALID_LABELS, cache.labels[index]) if flag]
+        results.add_result(cache.filenames[index], truth, predictions, 0)
+        fcr_rows.append({"ground_truth": truth, "predicted": predictions})
+
+    expected = results.compute_metrics()["overall"]
+    assert metrics["macro_f1"][0] == expected["macro_f1"]
+    assert metrics["any_match_accuracy"][0] == expected["any_match_accuracy"]
+    assert metrics["false_critical_rate"][0] == compute_false_critical_rate(fcr_rows)
+
+
+def test_search_respects_false_critical_constraint():
+    evaluator = _evaluator(_cache(), engine="hybrid")
+
+    for search in ("grid", "random", "coordinate"):
+        result = tune_thresholds(evaluator, search=search, max_fcr=0.0, samples=50)
+        assert result.best_index is not None
+        assert result.metrics["false_critical_rate"][result.best_index] == 0.0
+        report = tuning_report(result)
+        assert report["pareto_front"]
+        assert report["best"]["macro_f1"] >= max(
+            f1
+            for f1, fcr in zip(result.metrics["macro_f1"], result.metrics["false_critical_rate"])
+            if fcr == 0.0
+        )
+
+
+def test_candidate_yaml_loads_into_rule_engine(tmp_path):
+    evaluator = _evaluator(_cache())
+    result = tune_thresholds(evaluator, search="coordinate")
+
+    path = tmp_path / "candidate.yaml"
+    path.write_text(candidate_thresholds_yaml(result))
+    loaded = RuleEngine(config_path=str(path)).thresholds
+
+    assert set(yaml.safe_load(path.read_text())) >= {"vibration", "gps"}
+    assert loaded["vibe_max_warn"] == result.best_config["vibe_max_warn"]
+    assert loaded["gps_hdop_limit"] == result.best_config["gps_hdop_limit"]
+
+
+def test_feature_cache_round_trip(tmp_path):
+    cache = _cache()
+    path = str(tmp_path / "cache.npz")
+    cache.save(path)
+    loaded = load_feature_cache(path)
+
+    assert loaded.filenames == cache.filenames
+    assert np.array_equal(loaded.features, cache.features)
+    assert np.array_equal(loaded.labels, cache.labels)
+    assert loaded.ml_probabilities is None
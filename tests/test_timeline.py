@@ -0,0 +1,57 @@
+import numpy as np
+
+from src.diagnosis.context import DiagnosisContext
+from src.diagnosis.timeline import DiagnosisTimeline, window_bounds
+
+
+def _parsed(duration_s: int = 30, spike_from_s: int = 20) -> dict:
+    start_us = 1_000_000_000
+    vibe, gps, att = [], [], []
+    for tenth in range(duration_s * 10):
+        t_us = start_us + tenth * 100_000
+        vibe.append(
+            {
+                "TimeUS": t_us,
+                "VibeX": 5.0,
+                "VibeY": 5.0,
+                "VibeZ": 80.0 if tenth >= spike_from_s * 10 else 10.0,
+            }
+        )
+        gps.append(
+            {"TimeUS": t_us, "Status": 3, "NSats": 12, "HDop": 0.8, "Lat": 1, "Lng": 1, "Alt": 10}
+        )
+        att.append({"TimeUS": t_us, "Roll": 0.0, "DesRoll": 0.0, "Pitch": 0.0, "DesPitch": 0.0})
+    return {
+        "metadata": {"vehicle_type": "Copter", "duration_sec": float(duration_s)},
+        "messages": {"VIBE": vibe, "GPS": gps, "ATT": att},
+        "parameters": {},
+    }
+
+
+def test_window_bounds_overlap_and_cover_tail():
+    bounds = window_bounds(0.0, 12_000_000.0, window_sec=5.0, overlap=0.5)
+    assert bounds[:, 0].tolist() == [0.0, 2_500_000.0, 5_000_000.0, 7_000_000.0]
+    assert np.all(bounds[:, 1] - bounds[:, 0] == 5_000_000.0)
+    assert window_bounds(0.0, 3_000_000.0).tolist() == [[0.0, 3_000_000.0]]
+
+
+def test_timeline_tracks_localize_onset(vibe_engine):
+    report = DiagnosisTimeline(engine=vibe_engine).analyze(_parsed())
+
+    track = report["tracks"]["vibration_high"]
+    assert len(track) == len(report["t_start"]) == len(report["valid"])
+    assert all(report["valid"])
+    onset = report["onsets"]["vibration_high"]
+    # First window containing the spike at 20 s starts at 17.5 s.
+    assert onset["t_sec"] == 17.5
+    assert onset["time_us"] == 1_017_500_000
+    assert track[0] == 0.0 and max(track) == onset["peak_confidence"]
+
+
+def test_timeline_onsets_feed_causal_arbiter(vibe_engine):
+    context = DiagnosisContext({"vibe_z_max": 80.0, "vibe_z_tanomaly": 1_000_500_000.0})
+    DiagnosisTimeline(engine=vibe_engine).analyze(_parsed(), context=context)
+
+    vibe_engine.diagnose(context.features, context=context)
+    hypothesis = vibe_engine.last_explain_data["hypotheses"][0]
+    assert hypothesis["tanomaly"] == 1_017_500_000.0
@@ -0,0 +1,98 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from src.batch import watch
+from src.batch.watch import FolderWatcher, StabilityTracker, WorkQueue
+
+
+def _noop_init(*_args):
+    pass
+
+
+def _fake_analyze(filepath, filename):
+    if filename.startswith("bad"):
+        raise ValueError("corrupt log")
+    return {"filename": filename, "status": "HEALTHY", "top_diagnosis": "-", "confidence": "0.00"}
+
+
+def _stat(size, mtime_ns=1):
+    return SimpleNamespace(st_size=size, st_mtime_ns=mtime_ns)
+
+
+def test_stability_tracker_waits_for_size_to_settle():
+    tracker = StabilityTracker(settle_sec=2.0)
+
+    assert tracker.observe({"a.bin": _stat(10)}, now=0.0) == []
+    assert tracker.observe({"a.bin": _stat(20, 2)}, now=1.0) == []  # still growing
+    assert tracker.observe({"a.bin": _stat(20, 2)}, now=2.5) == []
+    assert tracker.observe({"a.bin": _stat(20, 2)}, now=3.0) == [("a.bin", 20, 2, 0.0)]
+    # Reported once; an empty file never settles.
+    assert tracker.observe({"a.bin": _stat(20, 2), "e.bin": _stat(0)}, now=9.0) == []
+    assert tracker.observe({"a.bin": _stat(20, 2), "e.bin": _stat(0)}, now=20.0) == []
+
+
+def test_work_queue_requeues_running_rows_and_changed_files(tmp_path):
+    path = tmp_path / "q.sqlite"
+    with WorkQueue(path) as queue:
+        assert queue.enqueue("a.bin", 10, 1, first_seen=1.0)
+        assert not queue.enqueue("a.bin", 10, 1, first_seen=1.0)
+        assert [row[0] for row in queue.claim(4)] == ["a.bin"]
+
+    # A daemon killed mid-analysis leaves the row running; reopening re-queues it.
+    with WorkQueue(path) as queue:
+        assert queue.counts()["queued"] == 1
+        queue.claim(1)
+        queue.finish("a.bin")
+        assert not queue.enqueue("a.bin", 10, 1, first_seen=5.0)
+        assert queue.enqueue("a.bin", 11, 2, first_seen=5.0)
+        assert queue.counts() == {"queued": 1, "running": 0, "done": 0, "error": 0}
+
+
+def test_work_queue_reruns_a_file_rewritten_while_running(tmp_path):
+    with WorkQueue(tmp_path / "q.sqlite") as queue:
+        queue.enqueue("a.bin", 10, 1, first_seen=1.0)
+        queue.claim(1)
+
+        # The upload is overwritten mid-analysis: it must not be claimed twice.
+        assert queue.enqueue("a.bin", 20, 2, first_seen=2.0)
+        assert queue.claim(4) == []
+        assert queue.counts()["running"] == 1
+
+        # The first outcome closes the old version only; the new one runs next.
+        assert queue.finish("a.bin") is False
+        assert [(row[0], row[1]) for row in queue.claim(4)] == [("a.bin", 2.0)]
+        assert queue.finish("a.bin") is True
+        assert queue.counts() == {"queued": 0, "running": 0, "done": 1, "error": 0}
+        assert not queue.enqueue("a.bin", 20, 2, first_seen=3.0)
+
+
+def test_folder_watcher_processes_settled_uploads(tmp_path, monkeypatch):
+    drop = tmp_path / "drop"
+    drop.mkdir()
+    out_dir = tmp_path / "out"
+    monkeypatch.setattr(watch, "analyze_file", _fake_analyze)
+    monkeypatch.setattr(watch, "init_worker", _noop_init)
+
+    watcher = FolderWatcher(
+        str(drop), str(out_dir), engine_name="rule", jobs=2, poll_interval=0.05, settle_sec=0.1
+    )
+    (drop / "good.bin").write_bytes(b"x" * 10)
+    (drop / "bad.bin").write_bytes(b"x" * 10)
+    (drop / "notes.txt").write_text("ignored")
+
+    rows = []
+    deadline = time.monotonic() + 15
+    while len(rows) < 2 and time.monotonic() < deadline:
+        rows.extend(watcher.step())
+    stats = watcher.close()
+
+    assert sorted(row["filename"] for row in rows) == ["bad.bin", "good.bin"]
+    assert {row["filename"]: row["status"] for row in rows}["bad.bin"] == "ERROR"
+    assert stats["processed"] == 2 and stats["errors"] == 1 and stats["queue_depth"] == 0
+    assert stats["latency_sec"]["p50"] >= 0.1
+    assert json.loads((out_dir / "watch_stats.json").read_text())["processed"] == 2
+    assert len((out_dir / "batch_results.jsonl").read_text().splitlines()) == 2
+    assert (out_dir / "batch_summary.csv").read_text().splitlines()[0].startswith("filename,status")
+    assert os.path.exists(out_dir / "watch_queue.sqlite")
@@ -39,10 +39,10 @@ class _DummyPipeline:
 
 
 class _DummyHybridEngine:
-    def __init__(self):
+    def __init__(self, **_kwargs):
         self.last_explain_data = {"rule": [], "ml": [], "anomaly": {"is_anomaly": False}}
 
-    def diagnose(self, _features: dict) -> list[dict]:
+    def diagnose(self, _features: dict, context=None) -> list[dict]:
         return [
             {
                 "failure_type": "gps_quality_poor",
@@ -57,6 +57,9 @@ class _DummyHybridEngine:
 
 
 class _DummyRuleEngine:
+    def __init__(self, **_kwargs):
+        pass
+
     def diagnose(self, _features: dict) -> list[dict]:
         return [
             {
@@ -3,14 +3,30 @@ from __future__ import annotations
 import asyncio
 import io
 import json
+import tempfile
+import zipfile
 
 import pytest
 from starlette.datastructures import UploadFile
-from starlette.responses import JSONResponse
+from starlette.responses import Response
 
 fastapi = pytest.importorskip("fastapi")
 
 from src.web import app as web_app
+from src.web import encoding
+from src.web.model_store import ModelStore
+from src.web.result_cache import ResultCache
+from src.web.series import SeriesStore, build_series_set
+
+
+@pytest.fixture(autouse=True)
+def _isolated_result_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        web_app, "_RESULT_CACHE", ResultCache(cache_dir=tmp_path / "results", models_dir=tmp_path)
+    )
+    monkeypatch.setattr(
+        web_app, "_SERIES_STORE", SeriesStore(cache_dir=tmp_path / "series", models_dir=tmp_path)
+    )
 
 
 class _FakeParser:
@@ -43,10 +59,10 @@ class _FakePipeline:
 
 
 class _FakeHybridEngine:
-    def __init__(self):
+    def __init__(self, **_kwargs):
         self.last_explain_data = {"rule": [], "ml": [], "anomaly": {"is_anomaly": False}}
 
-    def diagnose(self, _features):
+    def diagnose(self, _features, context=None):
         return [
             {
                 "failure_type": "gps_quality_poor",
@@ -61,6 +77,9 @@ class _FakeHybridEngine:
 
 
 class _FakeRuleEngine:
+    def __init__(self, **_kwargs):
+        pass
+
     def diagnose(self, _features):
         return [
             {
@@ -80,8 +99,8 @@ def _make_upload(payload: bytes, filename: str = "flight.BIN") -> UploadFile:
 
 
 def _response_to_dict(response) -> dict:
-    """Extract dict from either AnalysisResponse (pydantic) or JSONResponse."""
-    if isinstance(response, JSONResponse):
+    """Extract dict from either AnalysisResponse (pydantic) or an encoded JSON response."""
+    if isinstance(response, Response):
         return json.loads(response.body)
     # Pydantic model (AnalysisResponse)
     return response.model_dump()
@@ -113,6 +132,249 @@ def test_api_rule_output_only_is_string(monkeypatch):
     assert isinstance(payload["rule_output_only"], str)
 
 
+def test_api_analyze_serves_repeat_uploads_from_cache(monkeypatch):
+    parses = []
+
+    class _CountingParser(_FakeParser):
+        def parse(self):
+            parses.append(self.path)
+            return super().parse()
+
+    monkeypatch.setattr(web_app, "LogParser", _CountingParser)
+    monkeypatch.setattr(web_app, "FeaturePipeline", _FakePipeline)
+    monkeypatch.setattr(web_app, "HybridEngine", _FakeHybridEngine)
+    monkeypatch.setattr(web_app, "RuleEngine", _FakeRuleEngine)
+
+    first = _response_to_dict(asyncio.run(web_app.analyze_log(_make_upload(b"abc"))))
+    second = _response_to_dict(
+        asyncio.run(web_app.analyze_log(_make_upload(b"abc", filename="copy.bin")))
+    )
+    other_content = _response_to_dict(asyncio.run(web_app.analyze_log(_make_upload(b"abd"))))
+
+    assert len(parses) == 2
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["metadata"]["filename"] == "copy.bin"
+    assert second["diagnoses"] == first["diagnoses"]
+    assert other_content["cached"] is False
+
+
+def test_cache_hit_whose_series_was_evicted_is_reanalysed(monkeypatch):
+    parses = []
+
+    class _CountingParser(_FakeParser):
+        def parse(self):
+            parses.append(self.path)
+            return super().parse()
+
+    monkeypatch.setattr(web_app, "LogParser", _CountingParser)
+    monkeypatch.setattr(web_app, "FeaturePipeline", _FakePipeline)
+    monkeypatch.setattr(web_app, "HybridEngine", _FakeHybridEngine)
+    monkeypatch.setattr(web_app, "RuleEngine", _FakeRuleEngine)
+
+    first = _response_to_dict(asyncio.run(web_app.analyze_log(_make_upload(b"abc"))))
+    store = web_app.get_series_store()
+    store._memory.clear()
+    store._path(first["series_id"]).unlink()
+
+    second = _response_to_dict(asyncio.run(web_app.analyze_log(_make_upload(b"abc"))))
+    assert len(parses) == 2 and second["cached"] is False
+    assert second["series_id"] == first["series_id"]
+    assert store.contains(first["series_id"])
+    assert (
+        asyncio.run(web_app.get_series_catalog(first["series_id"]))["series_id"]
+        == first["series_id"]
+    )
+
+
+def test_result_cache_disk_tier_expiry_and_model_invalidation(tmp_path):
+    cache = ResultCache(cache_dir=tmp_path / "results", memory_entries=0, models_dir=tmp_path)
+    key = cache.key("ab" * 32)
+    cache.put(key, {"value": 1})
+
+    assert ResultCache(cache_dir=tmp_path / "results", models_dir=tmp_path).get(key) == {"value": 1}
+
+    (tmp_path / "rule_thresholds.yaml").write_text("changed: true\n")
+    assert cache.key("ab" * 32) != key
+
+    expired = ResultCache(cache_dir=tmp_path / "results", ttl_sec=0, models_dir=tmp_path)
+    assert expired.get(key) is None
+    assert not list((tmp_path / "results").glob("*/*.json"))
+
+
+def test_result_cache_scans_the_disk_tier_only_when_the_size_total_says_so(tmp_path, monkeypatch):
+    cache = ResultCache(
+        cache_dir=tmp_path / "results", memory_entries=0, disk_max_mb=0.01, models_dir=tmp_path
+    )
+    scans = []
+    prune = cache._prune_disk
+    monkeypatch.setattr(cache, "_prune_disk", lambda: scans.append(1) or prune())
+
+    payload = {"value": "x" * 1000}
+    for i in range(5):
+        cache.put(cache.key(f"{i:064x}"), payload)
+    assert len(scans) == 1  # the first write learns the size, the rest are under the cap
+
+    for i in range(5, 40):
+        cache.put(cache.key(f"{i:064x}"), payload)
+    size = sum(path.stat().st_size for path in (tmp_path / "results").glob("*/*.json"))
+    assert size <= cache.disk_max_bytes and cache._disk_bytes == size
+    # Pruning to below the cap leaves room for a few writes before the next scan.
+    assert 1 < len(scans) <= 15
+
+
+def _imu_log(samples: int = 4000) -> dict:
+    imu = [
+        {"TimeUS": 1_000_000 + i * 1000, "I": i % 2, "AccZ": -9.8, "GyrX": 0.0}
+        for i in range(samples)
+    ]
+    imu[2501]["AccZ"] = 55.0
+    return {"messages": {"IMU": imu, "MSG": [{"TimeUS": 1_000_000, "Message": "ArduCopter"}]}}
+
+
+def test_series_pyramid_keeps_spikes_at_every_resolution(tmp_path):
+    series = build_series_set(_imu_log(), start_time_us=1_000_000)
+
+    assert series.catalog["IMU"]["instances"] == ["0", "1"]
+    assert series.catalog["IMU"]["fields"] == ["AccZ", "GyrX"]
+    assert "MSG" not in series.catalog
+
+    overview = series.query("IMU", "AccZ", instance="1", points=100)
+    assert len(overview["t"]) <= 100 and overview["bucket_size"] > 1
+    assert max(overview["max"]) == 55.0
+
+    zoomed = series.query("IMU", "AccZ", instance="1", t0=2.4, t1=2.6, points=500)
+    assert zoomed["level"] == 0
+    assert 2.501 in zoomed["t"] and 55.0 in zoomed["max"]
+    assert series.query("IMU", "AccZ", instance="7") is None
+
+    store = SeriesStore(cache_dir=tmp_path, memory_entries=0, models_dir=tmp_path)
+    store.put("cd" * 32, series)
+    assert store.get("cd" * 32).query("IMU", "AccZ", instance="1", points=100) == overview
+
+
+def test_api_series_endpoints_serve_analysed_log(monkeypatch):
+    class _ImuParser(_FakeParser):
+        def parse(self):
+            return {**super().parse(), **_imu_log()}
+
+    monkeypatch.setattr(web_app, "LogParser", _ImuParser)
+    monkeypatch.setattr(web_app, "FeaturePipeline", _FakePipeline)
+    monkeypatch.setattr(web_app, "HybridEngine", _FakeHybridEngine)
+    monkeypatch.setattr(web_app, "RuleEngine", _FakeRuleEngine)
+
+    payload = _response_to_dict(asyncio.run(web_app.analyze_log(_make_upload(b"imu"))))
+    series_id = payload["series_id"]
+
+    catalog = asyncio.run(web_app.get_series_catalog(series_id))
+    assert catalog["messages"]["IMU"]["count"] == 4000
+    data = _response_to_dict(
+        asyncio.run(
+            web_app.get_series_data(
+                series_id, "IMU", "AccZ", instance="1", t0=2.0, t1=3.0, points=50
+            )
+        )
+    )
+    assert len(data["t"]) <= 50 and max(data["max"]) == 55.0
+
+    assert (
+        asyncio.run(web_app.get_series_data(series_id, "IMU", "AccZ", points=0)).status_code == 400
+    )
+    assert asyncio.run(web_app.get_series_data(series_id, "IMU", "Nope")).status_code == 404
+    assert asyncio.run(web_app.get_series_catalog("0" * 64)).status_code == 404
+
+
+def test_metrics_endpoint_reports_stages_and_cache(monkeypatch):
+    monkeypatch.setattr(web_app, "LogParser", _FakeParser)
+    monkeypatch.setattr(web_app, "FeaturePipeline", _FakePipeline)
+    monkeypatch.setattr(web_app, "HybridEngine", _FakeHybridEngine)
+    monkeypatch.setattr(web_app, "RuleEngine", _FakeRuleEngine)
+    registry = web_app.METRICS
+    before = registry.value("stage_duration_seconds", stage="parse")
+    parse_count = before["count"] if before else 0
+    hits = registry.value("result_cache_requests_total", result="hit") or 0
+
+    asyncio.run(web_app.analyze_log(_make_upload(b"metrics")))
+    asyncio.run(web_app.analyze_log(_make_upload(b"metrics")))
+    text = asyncio.run(web_app.get_metrics()).body.decode()
+
+    assert registry.value("stage_duration_seconds", stage="parse")["count"] == parse_count + 1
+    assert registry.value("result_cache_requests_total", result="hit") == hits + 1
+    for stage in ("upload", "parse", "extract", "diagnose", "visualization", "serialize"):
+        assert f'ardupilot_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert 'ardupilot_process_resident_memory_bytes{pid=' in text
+
+
+def test_model_reload_applies_to_new_requests_and_status_endpoint(monkeypatch, tmp_path):
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    thresholds_path = models_dir / "rule_thresholds.yaml"
+    thresholds_path.write_text("vibration:\n  vibe_max_warn: 30.0\n")
+    store = ModelStore(models_dir, poll_sec=0)
+    monkeypatch.setattr(web_app, "_MODEL_STORE", store)
+    seen = []
+
+    class _RecordingRuleEngine(_FakeRuleEngine):
+        def __init__(self, thresholds=None):
+            seen.append(thresholds["vibe_max_warn"])
+
+    monkeypatch.setattr(web_app, "LogParser", _FakeParser)
+    monkeypatch.setattr(web_app, "FeaturePipeline", _FakePipeline)
+    monkeypatch.setattr(web_app, "HybridEngine", _FakeHybridEngine)
+    monkeypatch.setattr(web_app, "RuleEngine", _RecordingRuleEngine)
+
+    asyncio.run(web_app.analyze_log(_make_upload(b"before reload")))
+    old_version = asyncio.run(web_app.get_model_status())["version"]
+    thresholds_path.write_text("vibration:\n  vibe_max_warn: 22.5\n")
+    assert store.refresh(settle=False) is True
+    asyncio.run(web_app.analyze_log(_make_upload(b"after reload")))
+    status = asyncio.run(web_app.get_model_status())
+
+    assert seen == [30.0, 22.5]
+    assert status["version"] != old_version and status["reloads"] == 1
+    assert status["ml_classifier"]["available"] is False
+
+
+def test_batch_members_use_the_serving_model_set(monkeypatch, tmp_path):
+    from src.batch import worker
+
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    thresholds_path = models_dir / "rule_thresholds.yaml"
+    thresholds_path.write_text("vibration:\n  vibe_max_warn: 30.0\n")
+    monkeypatch.setattr(web_app, "_MODEL_STORE", ModelStore(models_dir, poll_sec=0))
+    monkeypatch.setattr(web_app, "_BATCH_MODELS_VERSION", None)
+    monkeypatch.setattr(worker, "_STATE", {})
+
+    class _ThresholdRuleEngine:
+        def __init__(self, thresholds=None):
+            self.thresholds = thresholds
+
+    class _WrappingHybridEngine:
+        def __init__(self, rule_engine=None, **_kwargs):
+            self.rules = rule_engine
+
+    monkeypatch.setattr(web_app, "RuleEngine", _ThresholdRuleEngine)
+    monkeypatch.setattr(web_app, "HybridEngine", _WrappingHybridEngine)
+    monkeypatch.setattr(
+        web_app,
+        "analyze_file",
+        lambda path, name: {
+            "filename": name,
+            "vibe_max_warn": worker._STATE["engine"].rules.thresholds["vibe_max_warn"],
+        },
+    )
+
+    assert web_app._run_batch_member("a.bin", "a.bin")["vibe_max_warn"] == 30.0
+    engine = worker._STATE["engine"]
+    assert web_app._run_batch_member("b.bin", "b.bin")["vibe_max_warn"] == 30.0
+    assert worker._STATE["engine"] is engine  # built once per model set
+
+    # Pool processes have no watcher: the member itself picks up the new files.
+    thresholds_path.write_text("vibration:\n  vibe_max_warn: 22.5\n")
+    assert web_app._run_batch_member("c.bin", "c.bin")["vibe_max_warn"] == 22.5
+
+
 def test_api_rejects_oversized_upload(monkeypatch):
     monkeypatch.setattr(web_app, "MAX_UPLOAD_BYTES", 4)
 
@@ -127,3 +389,285 @@ def test_api_rejects_oversized_upload(monkeypatch):
 
     assert response.status_code == 413
     assert "exceeds" in payload["error"]
+
+
+class _FakeStreamRequest:
+    def __init__(self, chunks, headers=None):
+        self._chunks = chunks
+        self.headers = headers or {}
+
+    async def stream(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+class _RecordingDecoder:
+    fed: list[bytes] = []
+
+    def __init__(self, _filename: str):
+        _RecordingDecoder.fed = []
+
+    def feed(self, chunk: bytes) -> int:
+        _RecordingDecoder.fed.append(chunk)
+        return 0
+
+    def finish(self):
+        return _FakeParser("").parse()
+
+
+def test_api_analyze_stream_decodes_body_chunks(monkeypatch):
+    monkeypatch.setattr(web_app, "StreamingLogDecoder", _RecordingDecoder)
+    monkeypatch.setattr(web_app, "FeaturePipeline", _FakePipeline)
+    monkeypatch.setattr(web_app, "HybridEngine", _FakeHybridEngine)
+    monkeypatch.setattr(web_app, "RuleEngine", _FakeRuleEngine)
+
+    chunks = [b"ab", b"cd", b"ef"]
+    response = asyncio.run(
+        web_app.analyze_log_stream(_FakeStreamRequest(chunks), filename="field.BIN")
+    )
+    payload = _response_to_dict(response)
+
+    assert b"".join(_RecordingDecoder.fed) == b"abcdef"
+    assert payload["metadata"]["filename"] == "field.BIN"
+    assert payload["rule_output_only"] == "compass_interference"
+
+    # Same bytes through the multipart endpoint share the content-addressed cache entry.
+    monkeypatch.setattr(web_app, "LogParser", _FakeParser)
+    cached = _response_to_dict(asyncio.run(web_app.analyze_log(_make_upload(b"abcdef"))))
+    assert cached["cached"] is True
+
+
+def test_encoding_negotiates_msgpack_gzip_and_projection():
+    payload = {"a": [1, -1, 1.5, None, True, "x"], "b": "y" * 2000}
+
+    assert encoding.dumps_msgpack({"a": payload["a"]}) == (
+        b"\x81\xa1a\x96\x01\xff\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00\xc0\xc3\xa1x"
+    )
+    response = encoding.encode_response(
+        payload, "application/msgpack;q=0.9, application/json;q=0.5", "gzip, br;q=0"
+    )
+    assert response.media_type == encoding.MSGPACK_TYPE
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.body) < 200
+
+    plain = encoding.encode_response(encoding.project(payload, "a"), "text/html", "identity")
+    assert plain.media_type == encoding.JSON_TYPE and "content-encoding" not in plain.headers
+    assert json.loads(plain.body) == {"a": payload["a"]}
+    with pytest.raises(encoding.ProjectionError):
+        encoding.project(payload, "a,nope")
+
+
+def test_api_analyze_fields_projection(monkeypatch):
+    monkeypatch.setattr(web_app, "StreamingLogDecoder", _RecordingDecoder)
+    monkeypatch.setattr(web_app, "FeaturePipeline", _FakePipeline)
+    monkeypatch.setattr(web_app, "HybridEngine", _FakeHybridEngine)
+    monkeypatch.setattr(web_app, "RuleEngine", _FakeRuleEngine)
+
+    request = _FakeStreamRequest([b"ab"], headers={"accept": "application/json"})
+    response = asyncio.run(
+        web_app.analyze_log_stream(request, filename="f.bin", fields="metadata,diagnoses")
+    )
+    assert set(_response_to_dict(response)) == {"metadata", "diagnoses"}
+
+    bad = asyncio.run(
+        web_app.analyze_log_stream(_FakeStreamRequest([b"ab"]), filename="f.bin", fields="bogus")
+    )
+    assert bad.status_code == 400
+
+
+def test_api_analyze_stream_enforces_limit(monkeypatch):
+    monkeypatch.setattr(web_app, "StreamingLogDecoder", _RecordingDecoder)
+    monkeypatch.setattr(web_app, "MAX_STREAM_UPLOAD_BYTES", 3)
+
+    response = asyncio.run(
+        web_app.analyze_log_stream(_FakeStreamRequest([b"ab", b"cd"]), filename="big.bin")
+    )
+
+    assert response.status_code == 413
+    assert "3 bytes" in _response_to_dict(response)["error"]
+
+
+def test_api_triage_returns_partial_verdict(monkeypatch):
+    calls = []
+
+    def _fake_triage(path, sample_every):
+        calls.append(sample_every)
+        return {
+            "partial": True,
+            "engine": "rule",
+            "sample_every": sample_every,
+            "decoded_messages": 10,
+            "total_messages": 100,
+            "extraction_success": True,
+            "diagnoses": _FakeRuleEngine().diagnose({}),
+            "decision": {
+                "status": "confirmed",
+                "top_guess": "compass_interference",
+                "top_confidence": 0.8,
+            },
+            "elapsed_sec": 0.01,
+        }
+
+    monkeypatch.setattr(web_app, "run_triage", _fake_triage)
+
+    payload = _response_to_dict(
+        asyncio.run(web_app.triage_log(_make_upload(b"abc"), sample_every=4))
+    )
+    assert payload["partial"] is True
+    assert payload["filename"] == "flight.BIN"
+    assert payload["diagnoses"][0]["failure_type"] == "compass_interference"
+    assert calls == [4]
+
+    response = asyncio.run(web_app.triage_log(_make_upload(b"abc"), sample_every=0))
+    assert response.status_code == 400
+
+
+class _FakeBatchManager:
+    """Records submitted batches and replays scripted snapshots for the batch endpoints."""
+
+    def __init__(self, snapshots=()):
+        self.submitted = []
+        self.snapshots = list(snapshots)
+
+    def submit_batch(self, members):
+        self.submitted.append(members)
+        return {"id": "b1", "status": "queued", "total": len(members), "version": 0}
+
+    def batch_snapshot(self, batch_id, since=0):
+        if batch_id != "b1" or not self.snapshots:
+            return None
+        snapshot = dict(self.snapshots[0])
+        if len(self.snapshots) > 1:
+            self.snapshots.pop(0)
+        snapshot["rows"] = snapshot.get("rows", [])[since:]
+        return snapshot
+
+
+def _zip_upload(entries, filename="logs.zip", compression=zipfile.ZIP_STORED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return UploadFile(file=io.BytesIO(buffer.getvalue()), filename=filename)
+
+
+def _encrypted_zip_upload():
+    """A one-member zip whose flag bits mark it encrypted (the stdlib cannot write real ones)."""
+    data = bytearray(_zip_upload({"a.bin": b"abc"}).file.getvalue())
+    for signature, flags_at in ((b"PK\x03\x04", 6), (b"PK\x01\x02", 8)):
+        offset = data.index(signature) + flags_at
+        data[offset] |= 0x1
+    return UploadFile(file=io.BytesIO(bytes(data)), filename="locked.zip")
+
+
+@pytest.fixture
+def batch_tmp(monkeypatch, tmp_path):
+    """Route the batch endpoint's temp files to an inspectable directory."""
+    directory = tmp_path / "batch_tmp"
+    directory.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(directory))
+    return directory
+
+
+def test_api_analyze_batch_queues_bins_from_files_and_zips(monkeypatch, batch_tmp):
+    manager = _FakeBatchManager()
+    monkeypatch.setattr(web_app, "_JOB_MANAGER", manager)
+
+    uploads = [
+        _zip_upload({"sd/a.bin": b"aa", "sd/params.parm": b"x", "sd/": b""}),
+        _make_upload(b"bbb", "b.BIN"),
+        _make_upload(b"notes", "notes.txt"),
+    ]
+    response = asyncio.run(web_app.analyze_batch(uploads))
+    payload = json.loads(response.body)
+
+    assert response.status_code == 202
+    assert (
+        payload["status_url"] == "/api/batches/b1"
+        and payload["events_url"] == "/api/batches/b1/events"
+    )
+    assert payload["skipped"] == ["logs.zip/sd/params.parm", "notes.txt"]
+    members = manager.submitted[0]
+    assert [name for _path, _task, name in members] == ["sd/a.bin", "b.BIN"]
+    assert [open(path, "rb").read() for path, _task, _name in members] == [b"aa", b"bbb"]
+    # Only the extracted members are left for the pool; the uploaded archive is gone.
+    assert sorted(p.name for p in batch_tmp.iterdir()) == sorted(
+        path.rsplit("/", 1)[1] for path, _t, _n in members
+    )
+
+
+def test_api_analyze_batch_rejects_bad_uploads_and_cleans_up(monkeypatch, batch_tmp):
+    monkeypatch.setattr(web_app, "_JOB_MANAGER", _FakeBatchManager())
+
+    def post(*uploads):
+        response = asyncio.run(web_app.analyze_batch(list(uploads)))
+        assert list(batch_tmp.iterdir()) == []
+        return response.status_code, json.loads(response.body)["error"]
+
+    status, error = post(_make_upload(b"x", "notes.txt"))
+    assert status == 400 and "No .BIN" in error
+    status, error = post(_make_upload(b"a", "a.bin"), _make_upload(b"not a zip", "broken.zip"))
+    assert status == 400 and "Unreadable archive broken.zip" in error
+    status, error = post(_encrypted_zip_upload())
+    assert status == 400 and "locked.zip" in error and "encrypted" in error
+
+    monkeypatch.setattr(web_app, "MAX_BATCH_FILES", 2)
+    status, error = post(_make_upload(b"a", "a.bin"), _zip_upload({"b.bin": b"b", "c.bin": b"c"}))
+    assert status == 413 and "at most 2 logs" in error
+
+    # A highly compressible member is stopped by the decompressed-size budget.
+    monkeypatch.setattr(web_app, "MAX_BATCH_UPLOAD_BYTES", 4096)
+    bomb = _zip_upload({"bomb.bin": b"\0" * 1_000_000}, "bomb.zip", zipfile.ZIP_DEFLATED)
+    assert bomb.file.getbuffer().nbytes < 4096
+    status, error = post(_make_upload(b"a" * 100, "a.bin"), bomb)
+    assert status == 413 and "bomb.zip/bomb.bin exceeds 3996 bytes" in error
+
+
+def test_api_batch_status_and_event_stream(monkeypatch):
+    rows = [{"filename": "a.bin", "status": "HEALTHY"}, {"filename": "b.bin", "status": "ERROR"}]
+    manager = _FakeBatchManager(
+        [
+            {"id": "b1", "status": "running", "version": 1, "rows": rows[:1]},
+            {"id": "b1", "status": "done", "version": 2, "rows": rows, "summary": {"total": 2}},
+        ]
+    )
+    monkeypatch.setattr(web_app, "_JOB_MANAGER", manager)
+    monkeypatch.setattr(web_app, "JOB_EVENT_INTERVAL_SEC", 0)
+
+    async def collect_events():
+        return [chunk async for chunk in web_app._batch_event_stream("b1")]
+
+    events = [event.split("\n", 1)[0] for event in asyncio.run(collect_events())]
+    assert events == ["event: file", "event: running", "event: file", "event: done"]
+
+    batch = asyncio.run(web_app.get_batch("b1"))
+    assert batch["status"] == "done" and batch["summary"] == {"total": 2}
+    assert asyncio.run(web_app.get_batch("missing")).status_code == 404
+    assert asyncio.run(web_app.batch_events("missing")).status_code == 404
+
+
+def test_batch_summary_counts_statuses_and_labels(monkeypatch):
+    monkeypatch.setattr(web_app, "model_scaler", lambda: None)
+    rows = [
+        {"filename": "a.bin", "status": "HEALTHY", "top_diagnosis": "-", "confidence": "0.00"},
+        {
+            "filename": "b.bin",
+            "status": "WARNING",
+            "top_diagnosis": "vibration_high",
+            "confidence": "0.80",
+        },
+        {"filename": "c.bin", "status": "ERROR", "error": "corrupt"},
+    ]
+
+    summary = web_app._batch_summary(rows)
+
+    assert (summary["total"], summary["healthy"], summary["issues"], summary["errors"]) == (
+        3,
+        1,
+        1,
+        1,
+    )
+    assert summary["clusters"] is None  # fewer than two incidents
+    assert [(group["label"], group["size"]) for group in summary["label_clusters"]] == [
+        ("vibration_high", 1)
+    ]
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import time
+import zipfile
+
+import pytest
+from starlette.datastructures import UploadFile
+
+fastapi = pytest.importorskip("fastapi")
+
+from src.web import app as web_app
+from src.web.jobs import JobManager, QueueFullError
+
+
+def _fake_job(path, filename, timeline=False, segments=False):
+    if filename.startswith("bad"):
+        raise ValueError("corrupt log")
+    time.sleep(0.2)
+    with open(path, "rb") as f:
+        return {"filename": filename, "size": len(f.read()), "timeline": timeline}
+
+
+def _wait_finished(manager, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.snapshot(job_id)
+        if job and job["status"] in ("done", "error"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _upload(tmp_path, name, data=b"abc"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_job_manager_queue_limit_results_and_ttl(tmp_path):
+    manager = JobManager(_fake_job, workers=1, queue_limit=1, ttl_sec=0.3)
+    try:
+        first = manager.submit(
+            _upload(tmp_path, "a.bin"), (str(tmp_path / "a.bin"), "a.bin"), "a.bin"
+        )
+        deadline = time.monotonic() + 5
+        while manager.snapshot(first["id"])["status"] == "queued" and time.monotonic() < deadline:
+            time.sleep(0.02)
+        bad_path = _upload(tmp_path, "bad.bin")
+        bad = manager.submit(bad_path, (bad_path, "bad.bin"), "bad.bin")
+        assert manager.snapshot(bad["id"])["queue_position"] == 1
+        with pytest.raises(QueueFullError):
+            manager.submit(_upload(tmp_path, "c.bin"), (str(tmp_path / "c.bin"), "c.bin"), "c.bin")
+
+        assert _wait_finished(manager, first["id"])["status"] == "done"
+        assert manager.result(first["id"]) == {"filename": "a.bin", "size": 3, "timeline": False}
+        failed = _wait_finished(manager, bad["id"])
+        assert failed["status"] == "error" and failed["error"] == "corrupt log"
+        # Uploads go once a job finishes; results go after the TTL.
+        assert not (tmp_path / "a.bin").exists() and not (tmp_path / "bad.bin").exists()
+        time.sleep(0.6)
+        assert manager.snapshot(first["id"]) is None
+    finally:
+        manager.shutdown()
+
+
+def test_jobs_api_returns_id_status_and_event_stream(monkeypatch):
+    manager = JobManager(_fake_job, workers=1, queue_limit=0)
+    monkeypatch.setattr(web_app, "_JOB_MANAGER", manager)
+    try:
+        response = asyncio.run(
+            web_app.create_job(UploadFile(file=io.BytesIO(b"abc"), filename="flight.BIN"))
+        )
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == str(web_app.JOB_RETRY_AFTER_SEC)
+
+        manager.queue_limit = 4
+        response = asyncio.run(
+            web_app.create_job(
+                UploadFile(file=io.BytesIO(b"abcd"), filename="flight.BIN"), timeline=True
+            )
+        )
+        assert response.status_code == 202
+        job_id = json.loads(response.body)["id"]
+
+        async def collect_events():
+            return [chunk async for chunk in web_app._job_event_stream(job_id)]
+
+        events = asyncio.run(collect_events())
+        assert events[-1].startswith("event: done")
+        job = json.loads(asyncio.run(web_app.get_job(job_id)).body)
+        assert job["result"] == {"filename": "flight.BIN", "size": 4, "timeline": True}
+        assert asyncio.run(web_app.get_job("missing")).status_code == 404
+    finally:
+        manager.shutdown()
+
+
+def test_job_api_can_be_disabled_and_shutdown_drains_jobs(monkeypatch, tmp_path):
+    monkeypatch.setattr(web_app, "JOB_API", False)
+    response = asyncio.run(
+        web_app.create_job(UploadFile(file=io.BytesIO(b"abc"), filename="flight.BIN"))
+    )
+    assert response.status_code == 404 and "disabled" in json.loads(response.body)["error"]
+    assert asyncio.run(web_app.get_batch("any")).status_code == 404
+    assert web_app._JOB_MANAGER is None
+
+    manager = JobManager(_fake_job, workers=1)
+    try:
+        job = manager.submit(
+            _upload(tmp_path, "a.bin"), (str(tmp_path / "a.bin"), "a.bin"), "a.bin"
+        )
+        assert manager.drain(10.0)
+        assert manager.snapshot(job["id"])["status"] == "done"
+        with pytest.raises(QueueFullError):
+            manager.submit(_upload(tmp_path, "b.bin"), (str(tmp_path / "b.bin"), "b.bin"), "b.bin")
+    finally:
+        manager.shutdown()
+
+
+def _fake_member(path, filename):
+    if filename.startswith("bad"):
+        raise ValueError("corrupt log")
+    time.sleep(0.3)
+    return {
+        "filename": filename,
+        "status": "WARNING",
+        "top_diagnosis": "vibration_high",
+        "confidence": "0.80",
+    }
+
+
+def _zip_bytes(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_analyze_batch_accepts_zip_and_files_under_batch_limits(monkeypatch, tmp_path):
+    manager = JobManager(
+        _fake_job,
+        workers=2,
+        batch_func=_fake_member,
+        batch_summary=web_app._batch_summary,
+        batch_concurrency=1,
+        batch_limit=1,
+    )
+    monkeypatch.setattr(web_app, "_JOB_MANAGER", manager)
+    monkeypatch.setattr("src.web.app.model_scaler", lambda: None)
+    try:
+        archive = _zip_bytes({"dump/a.bin": b"a", "dump/b.BIN": b"bb", "dump/notes.txt": b"x"})
+        uploads = [
+            UploadFile(file=io.BytesIO(archive), filename="sd_card.zip"),
+            UploadFile(file=io.BytesIO(b"ccc"), filename="c.bin"),
+            UploadFile(file=io.BytesIO(b"d"), filename="bad.bin"),
+        ]
+        response = asyncio.run(web_app.analyze_batch(uploads))
+        assert response.status_code == 202
+        batch = json.loads(response.body)
+        assert batch["total"] == 4
+        assert batch["skipped"] == ["sd_card.zip/dump/notes.txt"]
+
+        busy = asyncio.run(
+            web_app.analyze_batch([UploadFile(file=io.BytesIO(b"e"), filename="e.bin")])
+        )
+        assert busy.status_code == 429
+
+        # One batch member at a time leaves the second worker to interactive jobs.
+        job_path = _upload(tmp_path, "live.bin")
+        job = manager.submit(job_path, (job_path, "live.bin"), "live.bin")
+        assert _wait_finished(manager, job["id"])["status"] == "done"
+        assert manager.batch_snapshot(batch["id"])["running"] <= 1
+
+        async def collect_events():
+            return [chunk async for chunk in web_app._batch_event_stream(batch["id"])]
+
+        events = asyncio.run(collect_events())
+        files = [json.loads(e.split("data: ", 1)[1]) for e in events if e.startswith("event: file")]
+        assert sorted(row["filename"] for row in files) == [
+            "bad.bin",
+            "c.bin",
+            "dump/a.bin",
+            "dump/b.BIN",
+        ]
+        assert events[-1].startswith("event: done")
+        summary = json.loads(events[-1].split("data: ", 1)[1])["summary"]
+        assert (summary["total"], summary["issues"], summary["errors"]) == (4, 3, 1)
+        assert (summary["label_clusters"][0]["label"], summary["label_clusters"][0]["size"]) == (
+            "vibration_high",
+            3,
+        )
+
+        bad_zip = asyncio.run(
+            web_app.analyze_batch([UploadFile(file=io.BytesIO(b"not a zip"), filename="x.zip")])
+        )
+        assert bad_zip.status_code == 400
+    finally:
+        manager.shutdown()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import shutil
+
+import pytest
+
+from src.runtime_paths import MODELS_DIR
+from src.web.model_store import ModelStore, load_model_set
+from src.web.result_cache import ResultCache
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    directory = tmp_path / "models"
+    directory.mkdir()
+    for name in (
+        "rule_thresholds.yaml",
+        "feature_columns.json",
+        "label_columns.json",
+        "manifest.json",
+    ):
+        shutil.copy(MODELS_DIR / name, directory / name)
+    return directory
+
+
+def _set_threshold(models_dir, key, value):
+    path = models_dir / "rule_thresholds.yaml"
+    text = path.read_text()
+    old = next(line for line in text.splitlines() if line.strip().startswith(f"{key}:"))
+    path.write_text(text.replace(old, f"  {key}: {value}"))
+
+
+def test_store_swaps_in_settled_threshold_changes_and_keeps_the_old_set_intact(models_dir):
+    store = ModelStore(models_dir, poll_sec=0)
+    before = store.current()
+    assert before.thresholds["vibe_max_warn"] == 30.0
+    assert store.refresh() is False
+
+    _set_threshold(models_dir, "vibe_max_warn", 25.0)
+    assert store.refresh() is False  # first sighting: wait for the files to settle
+    assert store.refresh() is True
+
+    after = store.current()
+    assert after is not before and after.version != before.version
+    assert after.thresholds["vibe_max_warn"] == 25.0
+    # Requests that took the old set keep analysing with it.
+    assert before.thresholds["vibe_max_warn"] == 30.0
+    status = store.status()
+    assert status["version"] == after.version and status["reloads"] == 1
+    assert (
+        status["files"]["rule_thresholds.yaml"] is not None
+        and status["files"]["classifier.joblib"] is None
+    )
+
+
+def test_store_rejects_broken_candidates_until_the_files_change_again(models_dir):
+    store = ModelStore(models_dir, poll_sec=0)
+    serving = store.current()
+
+    (models_dir / "rule_thresholds.yaml").write_text("vibration:\n  vibe_max_warn: [oops\n")
+    assert store.refresh(settle=False) is False
+    assert store.current() is serving
+    assert store.failures == 1 and "rule_thresholds.yaml" in store.last_error
+    assert store.refresh(settle=False) is False
+    assert store.failures == 1  # the rejected signature is not retried
+
+    # A classifier whose manifest/artifacts do not check out is not served either.
+    (models_dir / "rule_thresholds.yaml").write_text("vibration:\n  vibe_max_warn: 20.0\n")
+    (models_dir / "classifier.joblib").write_bytes(b"not a model")
+    assert store.refresh(settle=False) is False
+    assert store.current() is serving and "ML classifier rejected" in store.last_error
+
+    (models_dir / "classifier.joblib").unlink()
+    assert store.refresh(settle=False) is True
+    assert store.current().thresholds["vibe_max_warn"] == 20.0
+    assert store.last_error is None
+
+
+def test_startup_load_is_lenient_and_result_cache_keys_follow_the_serving_version(
+    models_dir, tmp_path
+):
+    (models_dir / "classifier.joblib").write_bytes(b"not a model")
+    models = load_model_set(models_dir, strict=False)
+    assert models.ml_classifier.available is False
+
+    store = ModelStore(models_dir, poll_sec=0)
+    cache = ResultCache(
+        cache_dir=None, models_dir=models_dir, model_version_func=lambda: store.current().version
+    )
+    key = cache.key("abc")
+    _set_threshold(models_dir, "vibe_max_warn", 25.0)
+    (models_dir / "classifier.joblib").unlink()
+    # Files changed, but the serving set has not: keys must not move yet.
+    assert cache.key("abc") == key
+    assert store.refresh(settle=False) is True
+    assert cache.key("abc") != key
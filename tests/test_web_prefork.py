@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+import os
+
+import pytest
+
+from src.web import prefork
+from src.web.prefork import PreforkServer, RecyclingApp
+
+
+async def _ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _noop(_message=None):
+    return {"type": "http.disconnect"}
+
+
+def _call(asgi_app, scope_type="http"):
+    asyncio.run(asgi_app({"type": scope_type}, _noop, _noop))
+
+
+def test_recycling_app_stops_once_after_max_requests():
+    reasons = []
+    counter = [0, 0]
+    asgi_app = RecyclingApp(_ok_app, reasons.append, max_requests=3, counter=counter, slot=1)
+
+    _call(asgi_app, "lifespan")
+    for _ in range(5):
+        _call(asgi_app)
+
+    assert asgi_app.requests == 5
+    assert counter == [0, 5]
+    assert reasons == ["served 3 requests"]
+
+
+def test_recycling_app_stops_over_rss_ceiling_even_when_the_request_fails(monkeypatch):
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    reasons = []
+    rss = {"value": 100 * 2**20}
+    monkeypatch.setattr(prefork, "current_rss_bytes", lambda: rss["value"])
+    asgi_app = RecyclingApp(failing_app, reasons.append, max_rss_bytes=200 * 2**20)
+
+    with pytest.raises(RuntimeError):
+        _call(asgi_app)
+    assert reasons == []
+
+    rss["value"] = 250 * 2**20
+    with pytest.raises(RuntimeError):
+        _call(asgi_app)
+    assert reasons == ["RSS 250 MB over 200 MB"]
+
+
+def test_memory_report_covers_parent_and_live_workers(monkeypatch):
+    monkeypatch.setattr(
+        prefork,
+        "memory_breakdown",
+        lambda pid: {"rss": 300, "pss": 100, "shared": 250, "private": 50},
+    )
+    server = PreforkServer("src.web.app:app", workers=2)
+    server._slots = {0: (1234, 0.0), 1: (None, 0.0)}
+    server._requests[0] = 7
+
+    rows = server.memory_report()
+
+    assert [(row["role"], row["pid"], row["requests"]) for row in rows] == [
+        ("parent", os.getpid(), None),
+        ("worker", 1234, 7),
+    ]
+    assert rows[1]["pss"] == 100 and rows[1]["shared"] == 250
+